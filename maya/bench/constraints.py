@@ -0,0 +1,137 @@
+"""
+Benchmarks the two ways core.matrix preserves the offset of a matrix constraint: the decompose/plusMinusAverage/
+compose network of offset_constraint and the single multMatrix of offset_pick. Each run constrains a number of
+driven nodes to posed drivers both ways and records the nodes created, the build time and how long the driven
+nodes take to evaluate, along with how far each driven node ends up from where a parent constraint puts it once
+the drivers move (the network subtracts euler angles and scales so it drifts as soon as anything rotates).
+Inside Maya both modes are built in Maya itself (in new scenes, so save yours first) and evaluated by the parallel
+evaluation manager; run headless, the in-memory scene (see core.memory) stands in for it:
+
+    python -m bench.constraints --count 200 --kind parent
+"""
+import argparse
+import random
+import time
+
+from core import mathutils
+from core import matrix
+from core import optimize
+from core import scene
+
+
+MODES = ["network", "matrix"]
+KINDS = {"point": {"translate": True}, "orient": {"rotate": True}, "scale": {"scale": True},
+         "parent": {"translate": True, "rotate": True, "scale": True, "shear": True}}
+
+
+def make_pairs(count, seed=0):
+    """
+    Builds randomly posed driver/driven pairs
+    :param count: int: the number of pairs
+    :param seed: int: the random seed (both modes get the same poses)
+    :return: list: the driver/driven pairs
+    """
+    rand = random.Random(seed)
+    pairs = []
+    for i in range(count):
+        pair = []
+        for name in ["src", "tgt"]:
+            node = scene.create_node("transform", f"pair{str(i).zfill(3)}_{name}_grp")
+            scene.set_attr(f"{node}.translate", [rand.uniform(-10.0, 10.0) for _ in range(3)])
+            scene.set_attr(f"{node}.rotate", [rand.uniform(-90.0, 90.0) for _ in range(3)])
+            pair.append(node)
+        scene.set_attr(f"{pair[0]}.scale", [rand.uniform(0.5, 2.0)] * 3)
+        pairs.append(pair)
+    return pairs
+
+
+def constrain(pairs, mode, kind):
+    """
+    Constrains every pair with a given offset mode
+    :param pairs: list: the driver/driven pairs
+    :param mode: str: 'network' (offset_constraint) or 'matrix' (offset_pick)
+    :param kind: str: the type of constraint (a key of KINDS)
+    """
+    for driver, driven in pairs:
+        if mode == "matrix":
+            matrix.make_constraint(driver, driven, offset=True, **KINDS[kind])
+            continue
+        driver_mtrx = scene.get_matrix(driver)
+        pick = matrix.make_constraint(driver, driven, **KINDS[kind])
+        matrix.offset_constraint(pick, pick=True, matrix=driver_mtrx)
+
+
+def get_drift(pairs, rest):
+    """
+    Returns how far the driven nodes are from where a parent constraint with their offsets preserved would put
+    them
+    :param pairs: list: the driver/driven pairs
+    :param rest: list: the world matrices of every driver and driven node before the drivers moved
+    :return: float: the largest difference of any matrix element
+    """
+    drift = 0.0
+    for (driver, driven), (driver_rest, driven_rest) in zip(pairs, rest):
+        expected = mathutils.mult_all([driven_rest, mathutils.inverse(driver_rest), scene.get_matrix(driver)])
+        drift = max([drift] + [abs(a - b) for a, b in zip(expected, scene.get_matrix(driven))])
+    return drift
+
+
+def run(count=100, kind="parent", repeat=5, seed=0, backend=None):
+    """
+    Builds and measures both offset modes, each in a new scene
+    :param count: int: the number of constrained pairs
+    :param kind: str: the type of constraint (a key of KINDS)
+    :param repeat: int: the number of evaluations averaged
+    :param seed: int: the random seed of the poses
+    :param backend: the scene backend to build in (Maya when running inside it, a new in-memory scene otherwise)
+    :return: dict: per mode stats
+    """
+    results = {}
+    previous = scene.set_backend(backend if backend is not None else scene.get_live())
+    evaluation = scene.set_evaluation("parallel")
+    try:
+        for mode in MODES:
+            scene.new_scene()
+            pairs = make_pairs(count, seed)
+            nodes = len(scene.list_nodes())
+            start = time.perf_counter()
+            constrain(pairs, mode, kind)
+            build = time.perf_counter() - start
+            drivens = [driven for _, driven in pairs]
+            rest = [[scene.get_matrix(node) for node in pair] for pair in pairs]
+            evaluation_time = optimize.time_evaluation(drivens, repeat)
+            # Move every driver and see where the driven nodes end up
+            rand = random.Random(seed + 1)
+            for driver, _ in pairs:
+                scene.set_attr(f"{driver}.rotate", [rand.uniform(-90.0, 90.0) for _ in range(3)])
+                scene.set_attr(f"{driver}.translate", [rand.uniform(-10.0, 10.0) for _ in range(3)])
+            drift = get_drift(pairs, rest) if kind == "parent" else None
+            results[mode] = {"nodes": len(scene.list_nodes()) - nodes, "build": build,
+                             "evaluation": evaluation_time, "drift": drift}
+    finally:
+        scene.set_evaluation(evaluation)
+        scene.set_backend(previous)
+    return results
+
+
+def format_results(results):
+    lines = [f"{'mode':<10}{'nodes':>8}{'build (s)':>12}{'eval (s)':>12}{'drift':>12}"]
+    for mode, entry in results.items():
+        drift = f"{entry['drift']:>12.2e}" if entry["drift"] is not None else f"{'-':>12}"
+        lines.append(f"{mode:<10}{entry['nodes']:>8}{entry['build']:>12.4f}{entry['evaluation']:>12.4f}{drift}")
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the offset modes of the matrix constraints")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--kind", choices=sorted(KINDS), default="parent")
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(args)
+    results = run(options.count, options.kind, options.repeat)
+    print(format_results(results))
+    return results
+
+
+if __name__ == "__main__":
+    main()
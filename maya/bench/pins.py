@@ -0,0 +1,112 @@
+"""
+Benchmarks the ways a ribbon pins its skin joints (see rigs.ribbon.Ribbon.make_skin_joints): a follicle for every
+joint, a uvPin node for every joint or one uvPin shared by all of them. Each run builds a plain ribbon with a given
+number of skin joints in a new scene per mode and records the pinning nodes created, the build time, how long the
+skin joints take to evaluate and how much memory the scene holds once it's built.
+
+Inside Maya the ribbons are built in Maya itself (in new scenes, so save yours first) and evaluated by the parallel
+evaluation manager, which is what the pin mode a rig of a given size should default to is picked from. Run
+headless, the in-memory scene (see core.memory) stands in for Maya and says more about itself than about Maya: it
+works out a point on a surface from every one of the surface's CVs, so the "single" mode (a uvPin evaluated per
+skin joint as each joint is parented) builds in O(N^2), and it evaluates one plug at a time:
+
+    python -m bench.pins --counts 10 50 200
+"""
+import argparse
+import time
+import tracemalloc
+
+from core import optimize
+from core import scene
+from rigs import ribbon
+
+
+MODES = {"follicle": {"matrix": False}, "single": {"shared_pin": False}, "shared": {"shared_pin": True}}
+PINTYPES = ["follicle", "uvPin"]
+NOTE = ("Times are from the in-memory scene, which evaluates surfaces from every CV (making the single mode's build\n"
+        "O(N^2)) and plugs one at a time. Neither carries over to Maya; run the benchmark inside Maya to pick a mode")
+
+
+def build(count, mode):
+    """
+    Builds a ribbon pinned with a given mode
+    :param count: int: the number of skin joints
+    :param mode: str: the pinning mode (a key of MODES)
+    :return: Ribbon: the ribbon
+    """
+    return ribbon.Ribbon(f"pins{str(count).zfill(3)}", spans=count, width=count * 0.5, sine=False, twist=False,
+                         lock_tip=False, **MODES[mode])
+
+
+def run(counts=(10, 50, 200), repeat=5, backend=None):
+    """
+    Builds and measures every pinning mode for every number of skin joints
+    :param counts: list: the numbers of skin joints
+    :param repeat: int: the number of evaluations averaged
+    :param backend: the scene backend to build in (Maya when running inside it, a new in-memory scene otherwise)
+    :return: dict: per count, per mode stats
+    """
+    results = {}
+    previous = scene.set_backend(backend if backend is not None else scene.get_live())
+    evaluation = scene.set_evaluation("parallel")
+    try:
+        for count in counts:
+            for mode in MODES:
+                scene.new_scene()
+                start = time.perf_counter()
+                rbn = build(count, mode)
+                elapsed = time.perf_counter() - start
+                nodes = sum(len(scene.list_nodes(node_type)) for node_type in PINTYPES)
+                evaluation_time = optimize.time_evaluation(rbn.skinJoints, repeat)
+                results.setdefault(count, {})[mode] = {"nodes": nodes, "build": elapsed,
+                                                       "evaluation": evaluation_time,
+                                                       "memory": measure_memory(count, mode)}
+    finally:
+        scene.set_evaluation(evaluation)
+        scene.set_backend(previous)
+    return results
+
+
+def measure_memory(count, mode):
+    """
+    Builds a ribbon in a new scene while tracing allocations (which slows the build down, so it isn't timed)
+    :param count: int: the number of skin joints
+    :param mode: str: the pinning mode (a key of MODES)
+    :return: int: the bytes the scene holds once the ribbon is built and evaluated
+    """
+    scene.new_scene()
+    # Allocations are traced for the in-memory scene, whose memory is the Python objects it's made of
+    tracemalloc.start()
+    try:
+        before = scene.memory_usage()
+        rbn = build(count, mode)
+        scene.evaluate(rbn.skinJoints)
+        return scene.memory_usage() - before
+    finally:
+        tracemalloc.stop()
+
+
+def format_results(results, headless=True):
+    lines = [f"{'pins':<6}{'mode':<10}{'nodes':>8}{'build (s)':>12}{'eval (s)':>12}{'memory (KB)':>14}"]
+    for count, modes in results.items():
+        for mode, entry in modes.items():
+            lines.append(f"{count:<6}{mode:<10}{entry['nodes']:>8}{entry['build']:>12.4f}{entry['evaluation']:>12.4f}"
+                         f"{entry['memory'] / 1024.0:>14.1f}")
+    if headless:
+        lines.append(NOTE)
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ways a ribbon pins its skin joints")
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args(args)
+    backend = scene.get_live()
+    results = run(options.counts, options.repeat, backend)
+    print(format_results(results, headless=not isinstance(backend, scene.MayaScene)))
+    return results
+
+
+if __name__ == "__main__":
+    main()
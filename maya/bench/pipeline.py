@@ -0,0 +1,240 @@
+"""
+Benchmarks the rig build pipeline on synthetic guide sets. Each run builds the guides for a configurable number
+of chains (optionally as mirrored LT/RT pairs) plus long tail chains, then runs every build stage over them and
+records the wall time, scene calls and nodes created per stage. Results are plain dicts that can be saved as
+JSON and compared between runs:
+
+    python -m bench.pipeline --chains 4 --joints 4 --tails 1 --tail-joints 12 --out before.json
+    python -m bench.pipeline --chains 4 --joints 4 --tails 1 --tail-joints 12 --out after.json --compare before.json
+
+Pass --folded to also profile the build (see core.profiler) and save a flame graph of it, --migrate to replace the
+legacy constraints of the finished rig with matrix constraints (see core.migrate) and --optimize to run the graph
+optimizer (see core.optimize) over it and report what it removed. Pass --adaptive to let every ribbon work out its
+own span count from the shape of its chain (see rigs.ribbon.Builder) and report the counts chosen.
+"""
+import argparse
+import contextlib
+import json
+import time
+
+from core import guides
+from core import memory
+from core import migrate
+from core import optimize
+from core import profiler
+from core import scene
+from jnts import driver
+from jnts import fkik
+from jnts import twist
+from rigs import ribbon
+from rigs import spline
+
+
+STAGES = ["guides", "driver", "fkik", "twist", "spline", "ribbon"]
+
+
+def make_guide_sets(chains=4, joints=4, mirror=True, tails=1, tail_joints=12, spacing=5.0, bend=1.5):
+    """
+    Builds a synthetic set of guides. Chains are spread out and given a slight bend so none of them are straight
+    lines (which would hide the cost of orienting joints)
+    :param chains: int: the number of limb chains
+    :param joints: int: the number of joints per limb chain
+    :param mirror: bool: whether or not every limb chain gets a mirrored RT copy
+    :param tails: int: the number of long tail chains
+    :param tail_joints: int: the number of joints per tail chain
+    :param spacing: float: the distance between chains
+    :param bend: float: how far the mid guides of a chain are pushed off the line between its base and tip
+    :return: list: the guides objects
+    """
+    guidesObjs = []
+    for i in range(chains):
+        sides = ["LT", "RT"] if mirror else ["LT"]
+        for side in sides:
+            guidesObj = guides.Build(f"limb{str(i + 1).zfill(2)}", side, chain_len=joints, mirror=side == "RT")
+            offset_guides(guidesObj, i * spacing, bend)
+            guidesObjs.append(guidesObj)
+    for i in range(tails):
+        guidesObj = guides.Build(f"tail{str(i + 1).zfill(2)}", "BK", chain_len=tail_joints, axis="Z")
+        offset_guides(guidesObj, -(i + 1) * spacing, bend)
+        guidesObjs.append(guidesObj)
+    return guidesObjs
+
+
+def offset_guides(guides_obj, height, bend):
+    """
+    Lifts a chain's guides to a given height and pushes its mid guides up and down in turn. The guides are placed
+    in world space (their parents are scaled, and negatively so on mirrored chains) so a mirrored chain ends up an
+    exact mirror of its LT copy
+    :param guides_obj: Build: the guides of the chain
+    :param height: float: the world height of the chain
+    :param bend: float: how far the mid guides are pushed off the line between the base and tip guides
+    """
+    allGuides = guides_obj.allGuides
+    positions = [scene.get_position(guide) for guide in allGuides]
+    offsets = [0.0] + [bend if i % 2 else -bend for i in range(len(allGuides) - 2)] + [0.0]
+    # Parents are placed before their children so moving a parent doesn't throw off a child already in place
+    for guide, position, offset in zip(allGuides, positions, offsets):
+        scene.set_position(guide, [position[0], height + offset, position[2]], world=True)
+
+
+def get_counts():
+    """
+    Returns the scene's running operation counts (only backends that count their calls report anything)
+    :return: dict: the counts or None
+    """
+    report = getattr(scene.get_backend(), "report", None)
+    if report is None:
+        return None
+    return report()
+
+
+def measure(stats, stage, func, *args, **kwargs):
+    """
+    Runs a build function and adds its wall time, scene calls and nodes created to the stage's stats
+    :param stats: dict: the stats of every stage
+    :param stage: str: the name of the stage being measured
+    :param func: the function being run
+    :return: the function's result
+    """
+    before = get_counts()
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    after = get_counts()
+    entry = stats.setdefault(stage, {"time": 0.0, "runs": 0, "calls": 0, "batched_ops": 0, "nodes_created": 0})
+    entry["time"] += elapsed
+    entry["runs"] += 1
+    if before is not None:
+        entry["calls"] += after["total_calls"] - before["total_calls"]
+        entry["batched_ops"] += after["batched_ops"] - before["batched_ops"]
+        entry["nodes_created"] += after["total_nodes_created"] - before["total_nodes_created"]
+    return result
+
+
+def run(chains=4, joints=4, mirror=True, tails=1, tail_joints=12, backend=None, profile=False, optimized=False,
+        migrated=False, adaptive=False):
+    """
+    Builds a synthetic rig and measures every stage of the build
+    :param backend: the scene backend to build in (a new in-memory scene by default)
+    :param profile: bool: whether or not to profile the build as well (the profiler is added to the results)
+    :param optimized: bool: whether or not to optimize the finished rig (the optimizer report is added to the results)
+    :param migrated: bool: whether or not to migrate the legacy constraints of the finished rig (the migration report is
+    added to the results)
+    :param adaptive: bool: whether or not the ribbons work out their own span counts (their fits are added to the
+    results)
+    :return: dict: the run's settings, per stage stats and totals
+    """
+    previous = scene.set_backend(backend if backend is not None else memory.MemoryScene())
+    stats = {}
+    fits = []
+    try:
+        with profiler.profile() if profile else contextlib.nullcontext() as prof:
+            guidesObjs = measure(stats, "guides", make_guide_sets, chains, joints, mirror, tails, tail_joints)
+            for guidesObj in guidesObjs:
+                driverObj = measure(stats, "driver", driver.Build, guidesObj)
+                measure(stats, "fkik", fkik.Build, driverObj)
+                measure(stats, "twist", twist.Build, driverObj.driver_joints[0], chain_data=driverObj.chain_data)
+                measure(stats, "spline", spline.make_split_spline, driverObj.driver_joints,
+                        chain_data=driverObj.chain_data)
+                rbnObj = measure(stats, "ribbon", ribbon.Builder, driverObj, adaptive=adaptive)
+                fits.append(rbnObj.fit)
+        counts = get_counts()
+        migration = migrate.run() if migrated else None
+        report = optimize.run() if optimized else None
+    finally:
+        scene.set_backend(previous)
+    total = {key: sum(stats[stage][key] for stage in stats) for key in ["time", "calls", "batched_ops",
+                                                                        "nodes_created"]}
+    results = {"settings": {"chains": chains, "joints": joints, "mirror": mirror, "tails": tails,
+                            "tail_joints": tail_joints},
+               "stages": {stage: stats[stage] for stage in STAGES if stage in stats},
+               "total": total,
+               "calls": counts["calls"] if counts is not None else None}
+    if prof is not None:
+        results["profile"] = prof
+    if migration is not None:
+        results["migrate"] = migration
+    if adaptive:
+        results["ribbons"] = fits
+    if report is not None:
+        results["optimize"] = report
+    return results
+
+
+def save(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def compare(before, after):
+    """
+    Returns the change of every stage stat between two runs
+    :param before: dict: the results of the earlier run
+    :param after: dict: the results of the later run
+    :return: dict: per stage {stat: [before, after, ratio]}
+    """
+    delta = {}
+    for stage in list(after["stages"]) + ["total"]:
+        old = before["total"] if stage == "total" else before["stages"].get(stage)
+        new = after["total"] if stage == "total" else after["stages"][stage]
+        if old is None:
+            continue
+        delta[stage] = {key: [old[key], new[key], new[key] / old[key] if old[key] else None]
+                        for key in ["time", "calls", "batched_ops", "nodes_created"]}
+    return delta
+
+
+def format_results(results):
+    lines = [f"{'stage':<8}{'time (s)':>12}{'calls':>10}{'ops':>10}{'nodes':>10}"]
+    for stage, entry in list(results["stages"].items()) + [("total", results["total"])]:
+        lines.append(f"{stage:<8}{entry['time']:>12.4f}{entry['calls']:>10}{entry['batched_ops']:>10}"
+                     f"{entry['nodes_created']:>10}")
+    return "\n".join(lines)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Benchmark the rig build pipeline on synthetic guides")
+    parser.add_argument("--chains", type=int, default=4)
+    parser.add_argument("--joints", type=int, default=4)
+    parser.add_argument("--no-mirror", action="store_true")
+    parser.add_argument("--tails", type=int, default=1)
+    parser.add_argument("--tail-joints", type=int, default=12)
+    parser.add_argument("--out", help="path of the JSON file the results are saved to")
+    parser.add_argument("--compare", help="path of an earlier results file to compare against")
+    parser.add_argument("--folded", help="profile the build and save a flame graph (folded stacks) to this path")
+    parser.add_argument("--migrate", action="store_true",
+                        help="replace the legacy constraints of the finished rig and report what was replaced")
+    parser.add_argument("--optimize", action="store_true", help="optimize the finished rig and report the savings")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="fit the ribbons' span counts to their chains and report the counts chosen")
+    options = parser.parse_args(args)
+    results = run(options.chains, options.joints, not options.no_mirror, options.tails, options.tail_joints,
+                  profile=options.folded is not None, optimized=options.optimize, migrated=options.migrate,
+                  adaptive=options.adaptive)
+    print(format_results(results))
+    if options.migrate:
+        print(migrate.format_report(results["migrate"]))
+    if options.adaptive:
+        print(ribbon.format_fit(results["ribbons"]))
+    if options.optimize:
+        print(optimize.format_report(results["optimize"]))
+    if options.folded:
+        prof = results.pop("profile")
+        prof.write_folded(options.folded)
+        results["profile"] = prof.report()
+    if options.out:
+        save(results, options.out)
+    if options.compare:
+        for stage, stats in compare(load(options.compare), results).items():
+            ratios = ", ".join(f"{key} x{value[2]:.2f}" for key, value in stats.items() if value[2] is not None)
+            print(f"{stage}: {ratios}")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,15 @@
-# Maya
-import pymel.core as pm
-
 # Skwerl
+from core import guides
+from core import registry
+from core import scene
 from jnts import driver
 
 
 def build_rig():
-    if pm.ls("guides_grp"):
-        pm.error("No guides in scene")
-    for guides in pm.listRelatives("guides_grp", c=1):
-        name = str(guides).split("_")[0]
-        prime = driver.Build(name)
+    if not scene.exists("guides_grp"):
+        scene.error("No guides in scene")
+    with scene.building(), registry.session():
+        for guidesObj in guides.make_guides_objects():
+            prime = driver.Build(guidesObj)
 
 
@@ -0,0 +1,172 @@
+"""
+Array-backed snapshot of a joint chain. The builders keep asking the scene the same questions about the same
+joints (which joints are in the chain, where they are, how long it is, which way it points), so a chain is
+captured once and the snapshot is handed from module to module instead. A module that edits the joints refreshes
+the snapshot afterwards; nothing else does.
+
+    chain = ChainData.capture(driver_joints)
+    chain.positions[0], chain.long_axis, chain.get_length()
+"""
+from core import constants
+from core import matrices
+from core import scene
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def capture(joints, parents=None):
+    """
+    Captures a chain if NumPy is available
+    :param joints: list: the joints of the chain
+    :param parents: list: the index of each joint's parent in the chain (-1 for none); queried if not given
+    :return: ChainData: the captured chain (None without NumPy)
+    """
+    if np is None:
+        return None
+    return ChainData.capture(joints, parents)
+
+
+class ChainData(object):
+    __slots__ = ["names", "parents", "matrices", "orients", "rotate_order", "lengths"]
+
+    def __init__(self, names, parents, matrices, orients, rotate_order):
+        """
+        Holds the facts of a joint chain the builders need
+        :param names: list: the joints of the chain, base to tip
+        :param parents: list: the index of each joint's parent in the chain (-1 for joints parented outside it)
+        :param matrices: list: the world matrix of each joint
+        :param orients: list: the joint orient of each joint
+        :param rotate_order: str: the rotate order of the chain (aim, up and tertiary axes)
+        """
+        self.names = list(names)
+        self.parents = np.asarray(parents, dtype=int)
+        self.matrices = np.reshape(np.asarray(matrices, dtype=float), (-1, 4, 4))
+        self.orients = np.reshape(np.asarray(orients, dtype=float), (-1, 3))
+        self.rotate_order = rotate_order.upper()
+        # The distance from each joint to its parent (0 for joints parented outside the chain)
+        offsets = self.positions - self.positions[np.maximum(self.parents, 0)]
+        self.lengths = np.where(self.parents >= 0, np.linalg.norm(offsets, axis=1), 0.0)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def capture(cls, joints, parents=None):
+        """
+        Queries the scene for a chain
+        :param joints: list: the joints of the chain
+        :param parents: list: the index of each joint's parent in the chain (-1 for none); queried if not given
+        :return: ChainData: the captured chain
+        """
+        if parents is None:
+            parents = [joints.index(p) if p in joints else -1 for p in [scene.get_parent(jnt) for jnt in joints]]
+        return cls(joints, parents, [scene.get_matrix(jnt) for jnt in joints],
+                   [scene.get_attr(f"{jnt}.jointOrient") for jnt in joints], scene.get_rotate_order(joints[0]))
+
+    def refresh(self):
+        """
+        Queries the scene for the chain again (after the joints have been edited)
+        :return: ChainData: the same chain
+        """
+        self.__init__(self.names, self.parents, [scene.get_matrix(jnt) for jnt in self.names],
+                      [scene.get_attr(f"{jnt}.jointOrient") for jnt in self.names],
+                      scene.get_rotate_order(self.names[0]))
+        return self
+
+    def segment(self, start, end):
+        """
+        Returns part of the chain as a chain of its own
+        :param start: int: the index of the first joint
+        :param end: int: the index after the last joint
+        :return: ChainData: the part of the chain
+        """
+        parents = self.parents[start:end] - start
+        parents[(parents < 0) | (parents >= end - start)] = -1
+        return ChainData(self.names[start:end], parents, self.matrices[start:end], self.orients[start:end],
+                         self.rotate_order)
+
+    @property
+    def positions(self):
+        return self.matrices[:, 3, :3]
+
+    @property
+    def length(self):
+        return float(self.lengths.sum())
+
+    @property
+    def long_axis(self):
+        """
+        The world axis the base joint's aim axis most closely points along (see driver.Build.get_long_axis)
+        """
+        aim = np.abs(self.matrices[0, constants.get_axis_index(self.rotate_order[0]), :3])
+        return constants.AXES[int(np.argmax(aim))]
+
+    def get_translates(self):
+        """
+        Returns the local translate of every joint (joints parented outside the chain get their world position)
+        :return: array: (N, 3) translates
+        """
+        points = np.concatenate([self.positions, np.ones((len(self), 1))], axis=1)
+        parents = np.where(self.parents[:, None, None] >= 0, self.matrices[np.maximum(self.parents, 0)], np.eye(4))
+        return np.einsum("nj,njk->nk", points, np.linalg.inv(parents))[:, :3]
+
+    def get_splits(self, splits, spacing="uniform", samples=16):
+        """
+        Returns the local transforms of the split joints of every span of the chain (see utils.split_chain), each
+        split joint parented to the one before it and the first to the base of its span
+            - uniform: the split joints are spread evenly along the aim axis of each span's base joint
+            - curve: the split joints follow a smooth curve through the chain and are spread evenly along its length
+        :param splits: int: the number of in between joints of each span (the tip of the span is added on top)
+        :param spacing: str: how the split joints are spaced ('uniform' or 'curve')
+        :param samples: int: how many points per split joint the curve's length is measured with
+        :return: array, array: (spans, splits + 1, 3) translates and joint orients
+        """
+        count = splits + 1
+        aimIndex = constants.get_axis_index(self.rotate_order[0])
+        if spacing == "uniform":
+            translates = np.zeros((len(self) - 1, count, 3))
+            translates[:, :, aimIndex] = self.get_translates()[1:, aimIndex, None] / count
+            return translates, np.zeros_like(translates)
+        if spacing != "curve":
+            raise ValueError(f"Unknown spacing '{spacing}'")
+        # Sample each span of a Catmull-Rom curve through the joints (it passes through every one of them)
+        pts = self.positions
+        pts = np.concatenate([2 * pts[:1] - pts[1:2], pts, 2 * pts[-1:] - pts[-2:-1]])
+        t = np.linspace(0.0, 1.0, count * samples + 1)[:, None]
+        weights = 0.5 * np.stack([-t ** 3 + 2 * t ** 2 - t, 3 * t ** 3 - 5 * t ** 2 + 2,
+                                  -3 * t ** 3 + 4 * t ** 2 + t, t ** 3 - t ** 2], axis=-1)[:, 0]
+        windows = np.stack([pts[i:i + len(self) - 1] for i in range(4)], axis=1)
+        curve = np.einsum("mk,skj->smj", weights, windows)
+        # Find the points an even distance apart along each span
+        lengths = np.concatenate([np.zeros((len(curve), 1)),
+                                  np.cumsum(np.linalg.norm(np.diff(curve, axis=1), axis=2), axis=1)], axis=1)
+        targets = lengths[:, -1:] * np.arange(count + 1) / count
+        positions = np.stack([np.stack([np.interp(targets[s], lengths[s], curve[s, :, a]) for a in range(3)], -1)
+                              for s in range(len(curve))])
+        # Aim each joint at the next with the up axis of its span's base joint (the tip copies the one before it)
+        bases = self.matrices[:-1, :3, :3] / np.linalg.norm(self.matrices[:-1, :3, :3], axis=2)[:, :, None]
+        upIndex = constants.get_axis_index(self.rotate_order[1])
+        aimDir = np.diff(positions, axis=1)
+        aimDir = np.concatenate([aimDir, aimDir[:, -1:]], axis=1)
+        shape = aimDir.shape
+        frames = matrices.aim(np.broadcast_to(np.eye(3)[aimIndex], shape).reshape(-1, 3),
+                                   np.broadcast_to(np.eye(3)[upIndex], shape).reshape(-1, 3), aimDir.reshape(-1, 3),
+                                   np.broadcast_to(bases[:, None, upIndex], shape).reshape(-1, 3))
+        frames = frames.reshape(shape + (3,))
+        frames[:, 0] = bases
+        # Each split joint relative to the one before it (the rotations are orthonormal so transposes invert them)
+        translates = np.einsum("snj,snkj->snk", positions[:, 1:] - positions[:, :-1], frames[:, :-1])
+        orients = np.einsum("snij,snkj->snik", frames[:, 1:], frames[:, :-1])
+        return translates, matrices.get_eulers(orients.reshape(-1, 3, 3)).reshape(translates.shape)
+
+    def get_length(self, aim="X"):
+        """
+        Returns the length of the chain along an axis the same way utils.get_length_of_chain does (the sum of the
+        local translates of every joint after the base)
+        :param aim: str: the axis being measured along
+        :return: float: the length of the chain
+        """
+        return float(self.get_translates()[1:, constants.get_axis_index(aim)].sum())
@@ -1,9 +1,11 @@
-import pymel.core as pm
+from core import scene
 
 AXES = ["X", "Y", "Z"]
 TRNSFRMATTRS = ["translate", "rotate", "scale"]
 FROZENMTRX = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
 ROTATEORDER = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
+# How much bigger or smaller a duplicated joint is than its source (based on the type of chain it belongs to)
+DUPLICATERADIUS = {"FK": 0.65, "IK": 1.6, "twst": 2.0}
 
 
 def get_attr_suffix(attr):
@@ -116,7 +118,7 @@ def is_straight_line(vectors):
     :return: bool: if the vectors exist on a straight line
     """
     if len(vectors) < 3 or [v for v in vectors if type(v) != list]:
-        pm.warning("Three vectors are needed to properly calculate. Function returns True")
+        scene.warning("Three vectors are needed to properly calculate. Function returns True")
         return True
     ab_len = round(((vectors[0][0] - vectors[1][0]) ** 2 + (vectors[0][1] - vectors[1][1]) ** 2 + (
                 vectors[0][2] - vectors[1][2]) ** 2) ** 0.5, 3)
@@ -1,5 +1,6 @@
-import pymel.core as pm
 from core import constants
+from core import profiler
+from core import scene
 from core import utils
 
 
@@ -12,22 +13,23 @@ SIDES = {"LT": "RT_",
 
 
 def get_guides_from_group(group):
-    guides = [node for node in reversed(pm.listRelatives(group, ad=1)) if node.name().split("_")[-1] == "guide"]
+    guides = [node for node in scene.get_descendants(group) if node.split("_")[-1] == "guide"]
     if not guides:
         return None
     return guides
 
 
+@profiler.stage
 def make_guides_objects():
     """
     Creates a list of Guides Objects from an imported Guides Group that can be used to build a rig
     :return: list: Guides Objects created from group
     """
-    if not pm.ls("guides_grp"):
-        pm.warning("guides group is not in Maya scene")
+    if not scene.exists("guides_grp"):
+        scene.warning("guides group is not in Maya scene")
     guidesObjList = []
-    for group in pm.listRelatives("guides_grp", c=1):
-        name = group.name().replace("_guides_grp", "")
+    for group in scene.get_children("guides_grp"):
+        name = group.replace("_guides_grp", "")
         side = name[:2]
         chainLength = len(get_guides_from_group(group))
         mirror = False
@@ -36,12 +38,13 @@ def make_guides_objects():
         invert = False
         if name.split("_")[1] in ["leg"]:
             invert = True
-        guidesObj = Build(name, side=side, chain_len=chainLength, mirror=mirror, invert=invert)
+        guidesObj = Build(name[len(side) + 1:], side=side, chain_len=chainLength, mirror=mirror, invert=invert)
         guidesObjList.append(guidesObj)
     return guidesObjList
 
 
 class Build(object):
+    @profiler.stage
     def __init__(self, name, side, chain_len=3, axis="X", scale=10,
                  invert=False, mirror=False, mirror_axis="X", link=False):
         self.name = f"{side}_{name}"
@@ -58,13 +61,13 @@ class Build(object):
         self.curve = self.make_guides_curve()
         if link:
             self.linkGuides = self.link_guides()
-        pm.select(cl=1)
+        scene.clear_selection()
 
     def get_guides(self):
-        if pm.listRelatives(self.guidesGrp, c=1):
+        if scene.get_children(self.guidesGrp):
             guides = get_guides_from_group(self.guidesGrp)
             if len(guides) != self.chainLength:
-                pm.delete(pm.listRelatives(self.guidesGrp, c=1))
+                scene.delete(scene.get_children(self.guidesGrp))
                 guides = self.make_guides()
         else:
             guides = self.make_guides()
@@ -73,19 +76,19 @@ class Build(object):
     def link_guides(self):
         linkGuides = []
         for guide in [guide for guide in self.allGuides
-                      if pm.ls(guide.name().replace(f"{self.side}_", SIDES[self.side]))]:
-            linkGuide = pm.PyNode(guide.name().replace(f"{self.side}_", SIDES[self.side]))
+                      if scene.exists(guide.replace(f"{self.side}_", SIDES[self.side]))]:
+            linkGuide = guide.replace(f"{self.side}_", SIDES[self.side])
             linkGuides.append(linkGuide)
-            decMtrx = utils.check_hypergraph_node(linkGuide.name().replace("_guide", "_mtrx"), "decomposeMatrix")
-            mult = utils.check_hypergraph_node(linkGuide.name().replace("_guide", "_mult"), "multiplyDivide")
-            if guide.name().split("_")[-2] == "base":
-                eval(f"mult.input2{self.mirrorAxis}.set(-1)")
+            decMtrx = utils.check_hypergraph_node(linkGuide.replace("_guide", "_mtrx"), "decomposeMatrix")
+            mult = utils.check_hypergraph_node(linkGuide.replace("_guide", "_mult"), "multiplyDivide")
+            if guide.split("_")[-2] == "base":
+                scene.set_attr(f"{mult}.input2{self.mirrorAxis}", -1)
             else:
                 for axis in [axis for axis in constants.AXES if axis != self.mirrorAxis]:
-                    eval(f"mult.input2{axis}.set(-1)")
-            pm.connectAttr(linkGuide.matrix, decMtrx.inputMatrix, f=1)
-            pm.connectAttr(decMtrx.outputTranslate, mult.input1, f=1)
-            pm.connectAttr(mult.output, guide.translate, f=1)
+                    scene.set_attr(f"{mult}.input2{axis}", -1)
+            scene.connect_attr(f"{linkGuide}.matrix", f"{decMtrx}.inputMatrix")
+            scene.connect_attr(f"{decMtrx}.outputTranslate", f"{mult}.input1")
+            scene.connect_attr(f"{mult}.output", f"{guide}.translate")
         return linkGuides
 
     def make_guides(self):
@@ -100,39 +103,40 @@ class Build(object):
             span = constants.get_span(i, self.chainLength, base_tip=1)
             guideName = f"{self.name}_{span}_guide"
             # Create and position the locator
-            guide = pm.spaceLocator(n=guideName)
+            guide = scene.create_locator(guideName)
             guidesList.append(guide)
-            eval(f"guide.translate{self.axis}.set(i * scale)")
+            scene.set_attr(f"{guide}.translate{self.axis}", i * scale)
             # Lock attributes you don't want to be changed so the rig is built properly
             for v in constants.AXES:
-                pm.setAttr(f"{guide}.rotate{v}", lock=True, keyable=False, channelBox=False)
+                scene.set_attr_state(f"{guide}.rotate{v}", lock=True, keyable=False, channel_box=False)
                 if i == 0:
-                    pm.setAttr(f"{guide}.scale{v}", scale / 5)
-                pm.setAttr(f"{guide}.scale{v}", lock=True, keyable=False, channelBox=False)
+                    scene.set_attr(f"{guide}.scale{v}", scale / 5)
+                scene.set_attr_state(f"{guide}.scale{v}", lock=True, keyable=False, channel_box=False)
             # Parent to the appropriate node
             if i == 0:
-                pm.parent(guide, self.guidesGrp)
+                scene.parent(guide, self.guidesGrp)
             else:
-                pm.parent(guide, prevGuide)
+                scene.parent(guide, prevGuide)
             prevGuide = guide
         if self.invert and not self.mirror and not self.axis == self.mirrorAxis:
             scale = -scale
-        eval(f"guidesList[0].translate{self.mirrorAxis}.set(scale * .1)")
+        scene.set_attr(f"{guidesList[0]}.translate{self.mirrorAxis}", scale * .1)
         return guidesList
 
     def make_guides_curve(self):
-        if pm.ls("{}_guides_crv".format(self.name)):
-            return pm.PyNode("{}_guides_crv".format(self.name))
+        curve = scene.find("{}_guides_crv".format(self.name))
+        if curve is not None:
+            return curve
         # Get the coordinates for each point of the curve
-        ptsPos = [pm.xform(guide, q=1, ws=1, rp=1) for guide in self.allGuides]
-        curve = pm.curve(d=1, p=ptsPos, n="{}_guides_crv".format(self.name))
-        pm.parent(curve, self.guidesGrp)
-        pm.setAttr("{}.inheritsTransform".format(curve), 0)
-        pm.setAttr("{}.template".format(curve), 1)
+        ptsPos = [scene.get_position(guide) for guide in self.allGuides]
+        curve = scene.create_curve("{}_guides_crv".format(self.name), ptsPos, degree=1)
+        scene.parent(curve, self.guidesGrp)
+        scene.set_attr("{}.inheritsTransform".format(curve), 0)
+        scene.set_attr("{}.template".format(curve), 1)
         # Apply custer handles so the guides can move the curve
         for i, guide in enumerate(self.allGuides):
-            cluster = pm.cluster("{}.cv[{}]".format(curve, i), n=guide.replace("_guide", "_clstr"))[1]
-            pm.setAttr("{}.visibility".format(cluster), 0)
-            pm.parent(cluster, guide)
+            cluster = scene.cluster("{}.cv[{}]".format(curve, i), guide.replace("_guide", "_clstr"))[1]
+            scene.set_attr("{}.visibility".format(cluster), 0)
+            scene.parent(cluster, guide)
         return curve
 
@@ -0,0 +1,268 @@
+"""
+Plain Python vector and 4x4 matrix helpers. Matrices are flat 16 item lists laid out the same way Maya returns
+them from xform/getAttr (row major, row vectors, translation in the last row) so the results can be handed
+straight to the scene functions.
+
+These work on one matrix at a time and don't need NumPy, which the in-memory scene relies on. Anything working on
+a batch of matrices uses core.matrices, which follows the same conventions (tests/test_matrices.py checks the two
+agree).
+"""
+import math
+
+
+IDENTITY = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
+
+
+#############
+# Vectors
+#############
+
+def add(a, b):
+    return [a[0] + b[0], a[1] + b[1], a[2] + b[2]]
+
+
+def sub(a, b):
+    return [a[0] - b[0], a[1] - b[1], a[2] - b[2]]
+
+
+def scale(v, s):
+    return [v[0] * s, v[1] * s, v[2] * s]
+
+
+def dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def cross(a, b):
+    return [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+
+
+def length(v):
+    return math.sqrt(dot(v, v))
+
+
+def distance(a, b):
+    return length(sub(a, b))
+
+
+def normalize(v):
+    """
+    Returns a unit length copy of a given vector (zero length vectors are returned unchanged)
+    :param v: list: the vector being normalized
+    :return: list: the normalized vector
+    """
+    vLen = length(v)
+    if vLen < 1e-12:
+        return list(v)
+    return [v[0] / vLen, v[1] / vLen, v[2] / vLen]
+
+
+def lerp(a, b, t):
+    return [a[i] + (b[i] - a[i]) * t for i in range(len(a))]
+
+
+#############
+# Matrices
+#############
+
+def mult(a, b):
+    """
+    Multiplies two matrices the same way a multMatrix node does (a is applied first)
+    :param a: list: the first matrix
+    :param b: list: the second matrix
+    :return: list: the product
+    """
+    return [a[r * 4] * b[c] + a[r * 4 + 1] * b[4 + c] + a[r * 4 + 2] * b[8 + c] + a[r * 4 + 3] * b[12 + c]
+            for r in range(4) for c in range(4)]
+
+
+def mult_all(matrices):
+    """
+    Multiplies a list of matrices in order
+    :param matrices: list: the matrices being multiplied
+    :return: list: the product (identity if no matrices are given)
+    """
+    result = list(IDENTITY)
+    for m in matrices:
+        result = mult(result, m)
+    return result
+
+
+def inverse(m):
+    """
+    Returns the inverse of a given matrix using Gauss-Jordan elimination
+    :param m: list: the matrix being inverted
+    :return: list: the inverted matrix (identity if the matrix is singular)
+    """
+    a = [list(m[r * 4:r * 4 + 4]) + [1.0 if r == c else 0.0 for c in range(4)] for r in range(4)]
+    for c in range(4):
+        pivot = max(range(c, 4), key=lambda r: abs(a[r][c]))
+        if abs(a[pivot][c]) < 1e-12:
+            return list(IDENTITY)
+        a[c], a[pivot] = a[pivot], a[c]
+        p = a[c][c]
+        a[c] = [v / p for v in a[c]]
+        for r in range(4):
+            if r != c and a[r][c]:
+                f = a[r][c]
+                a[r] = [v - f * w for v, w in zip(a[r], a[c])]
+    return [a[r][4 + c] for r in range(4) for c in range(4)]
+
+
+def transform_point(p, m):
+    return [p[0] * m[0] + p[1] * m[4] + p[2] * m[8] + m[12],
+            p[0] * m[1] + p[1] * m[5] + p[2] * m[9] + m[13],
+            p[0] * m[2] + p[1] * m[6] + p[2] * m[10] + m[14]]
+
+
+def transform_vector(v, m):
+    return [v[0] * m[0] + v[1] * m[4] + v[2] * m[8],
+            v[0] * m[1] + v[1] * m[5] + v[2] * m[9],
+            v[0] * m[2] + v[1] * m[6] + v[2] * m[10]]
+
+
+def get_row(m, i):
+    return list(m[i * 4:i * 4 + 3])
+
+
+def from_rows(x, y, z, t=(0.0, 0.0, 0.0)):
+    """
+    Builds a matrix out of three axis vectors and a position
+    :return: list: the matrix
+    """
+    return [x[0], x[1], x[2], 0.0, y[0], y[1], y[2], 0.0, z[0], z[1], z[2], 0.0, t[0], t[1], t[2], 1.0]
+
+
+def translation(t):
+    return from_rows([1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0], t)
+
+
+def scaling(s):
+    return from_rows([s[0], 0.0, 0.0], [0.0, s[1], 0.0], [0.0, 0.0, s[2]])
+
+
+def axis_rotation(axis, angle):
+    """
+    Returns the rotation matrix of a given angle around a single axis
+    :param axis: int: the axis index (0-2)
+    :param angle: float: the angle in degrees
+    :return: list: the rotation matrix
+    """
+    c = math.cos(math.radians(angle))
+    s = math.sin(math.radians(angle))
+    if axis == 0:
+        return from_rows([1.0, 0.0, 0.0], [0.0, c, s], [0.0, -s, c])
+    if axis == 1:
+        return from_rows([c, 0.0, -s], [0.0, 1.0, 0.0], [s, 0.0, c])
+    return from_rows([c, s, 0.0], [-s, c, 0.0], [0.0, 0.0, 1.0])
+
+
+def rotation(rotate, rotate_order="xyz"):
+    """
+    Returns the rotation matrix of a set of euler angles
+    :param rotate: list: the angles in degrees
+    :param rotate_order: str: the order the rotations are applied in (ex: xyz)
+    :return: list: the rotation matrix
+    """
+    result = list(IDENTITY)
+    for axis in rotate_order.lower():
+        i = "xyz".index(axis)
+        if rotate[i]:
+            result = mult(result, axis_rotation(i, rotate[i]))
+    return result
+
+
+def euler(m, rotate_order="xyz"):
+    """
+    Returns the euler angles of the rotation stored in a given matrix (matrices.get_eulers does the same for a
+    batch of matrices with NumPy)
+    :param m: list: the matrix being queried (scale is removed first)
+    :param rotate_order: str: the order the rotations are applied in (ex: xyz)
+    :return: list: the angles in degrees
+    """
+    rows = [normalize(get_row(m, r)) for r in range(3)]
+    # Work with the column vector form of the matrix, which is R = Rk * Rj * Ri for an order of ijk
+    c = [[rows[col][row] for col in range(3)] for row in range(3)]
+    i, j, k = ["xyz".index(axis) for axis in rotate_order.lower()]
+    sign = 1.0 if (i, j, k) in [(0, 1, 2), (1, 2, 0), (2, 0, 1)] else -1.0
+    angles = [0.0, 0.0, 0.0]
+    sinJ = max(-1.0, min(1.0, -sign * c[k][i]))
+    angles[j] = math.asin(sinJ)
+    if abs(sinJ) < 1.0 - 1e-9:
+        angles[i] = math.atan2(sign * c[k][j], c[k][k])
+        angles[k] = math.atan2(sign * c[j][i], c[i][i])
+    else:
+        # Gimbal lock; put all of the remaining rotation on the first axis
+        angles[i] = math.atan2(-sign * c[j][k], c[j][j])
+    return [math.degrees(a) for a in angles]
+
+
+def compose(translate=(0.0, 0.0, 0.0), rotate=(0.0, 0.0, 0.0), scale=(1.0, 1.0, 1.0), rotate_order="xyz",
+            joint_orient=None, rotate_axis=None):
+    """
+    Builds a transform's local matrix from its channels (scale, rotate axis, rotate, joint orient then translate)
+    :return: list: the matrix
+    """
+    m = scaling(scale)
+    if rotate_axis is not None:
+        m = mult(m, rotation(rotate_axis, "xyz"))
+    m = mult(m, rotation(rotate, rotate_order))
+    if joint_orient is not None:
+        m = mult(m, rotation(joint_orient, "xyz"))
+    m[12:15] = [float(v) for v in translate]
+    return m
+
+
+def decompose(m, rotate_order="xyz"):
+    """
+    Splits a matrix into its translate, rotate and scale channels
+    :param m: list: the matrix being decomposed
+    :param rotate_order: str: the rotate order of the returned rotation
+    :return: list, list, list: the translation, rotation (degrees) and scale
+    """
+    scl = [length(get_row(m, r)) for r in range(3)]
+    if dot(cross(get_row(m, 0), get_row(m, 1)), get_row(m, 2)) < 0:
+        scl[0] = -scl[0]
+        m = list(m)
+        m[0:3] = [-v for v in m[0:3]]
+    return list(m[12:15]), euler(m, rotate_order), scl
+
+
+def orthonormal(m):
+    """
+    Returns the rotation part of a matrix with scale and translation removed
+    :param m: list: the matrix
+    :return: list: the rotation matrix
+    """
+    return from_rows(*[normalize(get_row(m, r)) for r in range(3)])
+
+
+def aim(aim_axis, up_axis, aim_dir, up_dir):
+    """
+    Returns the rotation that points a local aim axis along a world direction with its local up axis as close to
+    a world up direction as possible (what an aimConstraint does; matrices.aim does the same for a batch with NumPy)
+    :param aim_axis: list: the local aim vector
+    :param up_axis: list: the local up vector
+    :param aim_dir: list: the world direction to aim at
+    :param up_dir: list: the world up direction
+    :return: list: the rotation matrix
+    """
+    aimL = normalize(aim_axis)
+    tertL = normalize(cross(aimL, up_axis))
+    upL = cross(tertL, aimL)
+    aimW = normalize(aim_dir)
+    tertW = cross(aimW, up_dir)
+    if length(tertW) < 1e-9:
+        # Aim and up are parallel so fall back on any perpendicular vector
+        tertW = cross(aimW, [0.0, 0.0, 1.0] if abs(aimW[2]) < 0.9 else [1.0, 0.0, 0.0])
+    tertW = normalize(tertW)
+    upW = cross(tertW, aimW)
+    local = from_rows(aimL, upL, tertL)
+    world = from_rows(aimW, upW, tertW)
+    # local is orthonormal so its transpose is its inverse
+    localT = from_rows(*[[local[c * 4 + r] for c in range(3)] for r in range(3)])
+    return mult(localT, world)
+
+
+def is_close(a, b, tolerance=1e-6):
+    return all(abs(x - y) <= tolerance for x, y in zip(a, b))
@@ -0,0 +1,363 @@
+"""
+Batches of 4x4 matrices done offline with NumPy, following what the matrix nodes core.matrix builds would
+output (composeMatrix, decomposeMatrix, pickMatrix, blendMatrix and multMatrix). Builders can work out a network's
+static values (offsets, rest poses) for every node at once up front instead of asking the scene for them one
+worldMatrix at a time, and a built network can be checked against what it should produce.
+
+    worlds = matrices.compose(translates, rotates, rotate_order="yzx")
+    translate, rotate, scale, shear = matrices.decompose(worlds)
+    offsets = matrices.get_offsets(driven_worlds, driver_worlds)
+
+Matrices use the same layout as core.mathutils (row vectors, translation in the last row) and come in as anything
+that reshapes to (N, 4, 4), flat 16 item lists included. Angles are in degrees.
+"""
+from core import constants
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def as_matrices(matrices):
+    """
+    Returns any number of matrices as an array
+    :param matrices: list: a matrix or a list of matrices (flat or 4x4)
+    :return: array: (N, 4, 4) matrices
+    """
+    return np.reshape(np.asarray(matrices, dtype=float), (-1, 4, 4))
+
+
+def normalize(vectors):
+    """
+    Returns vectors scaled to a length of 1
+    :param vectors: array: (N, 3) vectors
+    :return: array: (N, 3) unit vectors
+    """
+    return vectors / np.linalg.norm(vectors, axis=1)[:, None]
+
+
+def get_rotate_orders(rotate_order, count):
+    """
+    Returns the index of the rotate order of every matrix in a batch
+    :param rotate_order: str, int or list: one rotate order for all of them or one for each (name or index)
+    :param count: int: the number of matrices
+    :return: array: (N,) indices into constants.ROTATEORDER
+    """
+    if isinstance(rotate_order, (str, int, np.integer)):
+        rotate_order = [rotate_order]
+    orders = [constants.ROTATEORDER.index(o.lower()) if isinstance(o, str) else int(o) for o in rotate_order]
+    return np.broadcast_to(np.asarray(orders, dtype=int), (count,))
+
+
+#############
+# Products
+#############
+
+def mult(*matrices):
+    """
+    Multiplies batches of matrices in order the same way a multMatrix node does (the first is applied first)
+    :param matrices: list: the batches being multiplied (each (N, 4, 4) or a single matrix that is broadcast)
+    :return: array: (N, 4, 4) products
+    """
+    result = as_matrices(matrices[0])
+    for m in matrices[1:]:
+        result = result @ as_matrices(m)
+    return result
+
+
+def inverse(matrices):
+    return np.linalg.inv(as_matrices(matrices))
+
+
+def get_offsets(driven, driver):
+    """
+    Returns the static matrices the offset multMatrix nodes start with (see matrix.offset_driven) so each driven
+    node keeps its current world matrix while it follows its driver (offset * driver = driven)
+    :param driven: array: (N, 4, 4) world matrices of the driven nodes
+    :param driver: array: (N, 4, 4) world matrices of the driver nodes
+    :return: array: (N, 4, 4) offsets
+    """
+    return mult(driven, inverse(driver))
+
+
+#############
+# Rotations
+#############
+
+def get_axis_rotations(axis, angles):
+    """
+    Returns the rotation matrices of angles around a single axis
+    :param axis: int: the axis index (0-2)
+    :param angles: array: (N,) angles in degrees
+    :return: array: (N, 3, 3) rotation matrices
+    """
+    c = np.cos(np.radians(angles))
+    s = np.sin(np.radians(angles))
+    j, k = [i for i in range(3) if i != axis]
+    # Rows j and k of a right handed rotation (mathutils.axis_rotation); the y axis runs the other way round
+    sign = -1.0 if axis == 1 else 1.0
+    result = np.zeros((len(c), 3, 3))
+    result[:, axis, axis] = 1.0
+    result[:, j, j] = c
+    result[:, j, k] = sign * s
+    result[:, k, j] = -sign * s
+    result[:, k, k] = c
+    return result
+
+
+def get_rotations(rotates, rotate_order="xyz"):
+    """
+    Returns the rotation matrices of sets of euler angles
+    :param rotates: array: (N, 3) angles in degrees
+    :param rotate_order: str, int or list: one rotate order for all of them or one for each
+    :return: array: (N, 3, 3) rotation matrices
+    """
+    rotates = np.reshape(np.asarray(rotates, dtype=float), (-1, 3))
+    axes = [get_axis_rotations(i, rotates[:, i]) for i in range(3)]
+    orders = get_rotate_orders(rotate_order, len(rotates))
+    result = np.empty((len(rotates), 3, 3))
+    for index in np.unique(orders):
+        i, j, k = ["xyz".index(axis) for axis in constants.ROTATEORDER[index]]
+        mask = orders == index
+        result[mask] = axes[i][mask] @ axes[j][mask] @ axes[k][mask]
+    return result
+
+
+def get_eulers(rotations, rotate_order="xyz"):
+    """
+    Returns the euler angles of orthonormal rotation matrices (see mathutils.euler)
+    :param rotations: array: (N, 3, 3) rotation matrices
+    :param rotate_order: str, int or list: one rotate order for all of them or one for each
+    :return: array: (N, 3) angles in degrees
+    """
+    # Work with the column vector form of the matrices, which is R = Rk * Rj * Ri for an order of ijk
+    c = np.swapaxes(np.reshape(np.asarray(rotations, dtype=float), (-1, 3, 3)), 1, 2)
+    orders = get_rotate_orders(rotate_order, len(c))
+    result = np.zeros((len(c), 3))
+    for index in np.unique(orders):
+        i, j, k = ["xyz".index(axis) for axis in constants.ROTATEORDER[index]]
+        sign = 1.0 if constants.ROTATEORDER[index] in ["xyz", "yzx", "zxy"] else -1.0
+        m = c[orders == index]
+        angles = np.zeros((len(m), 3))
+        sinJ = np.clip(-sign * m[:, k, i], -1.0, 1.0)
+        angles[:, j] = np.arcsin(sinJ)
+        locked = np.abs(sinJ) >= 1.0 - 1e-9
+        angles[:, i] = np.where(locked, np.arctan2(-sign * m[:, j, k], m[:, j, j]),
+                                np.arctan2(sign * m[:, k, j], m[:, k, k]))
+        # Gimbal lock puts all of the remaining rotation on the first axis
+        angles[:, k] = np.where(locked, 0.0, np.arctan2(sign * m[:, j, i], m[:, i, i]))
+        result[orders == index] = angles
+    return np.degrees(result)
+
+
+def aim(aim_axis, up_axis, aim_dir, up_dir):
+    """
+    Returns the rotations that point each local aim axis along its world aim direction with its local up axis as
+    close to its world up direction as possible, the same way an aimConstraint does (see mathutils.aim)
+    :param aim_axis: array: (N, 3) local aim vectors
+    :param up_axis: array: (N, 3) local up vectors
+    :param aim_dir: array: (N, 3) world aim directions
+    :param up_dir: array: (N, 3) world up directions
+    :return: array: (N, 3, 3) rotation matrices (rows are the world directions of the local axes)
+    """
+    aimL = normalize(aim_axis)
+    tertL = normalize(np.cross(aimL, up_axis))
+    upL = np.cross(tertL, aimL)
+    aimW = normalize(aim_dir)
+    tertW = np.cross(aimW, up_dir)
+    parallel = np.linalg.norm(tertW, axis=1) < 1e-9
+    if parallel.any():
+        # Aim and up are parallel so fall back on any perpendicular vector
+        other = np.where(np.abs(aimW[:, 2:3]) < 0.9, [0.0, 0.0, 1.0], [1.0, 0.0, 0.0])
+        tertW[parallel] = np.cross(aimW, other)[parallel]
+    tertW = normalize(tertW)
+    upW = np.cross(tertW, aimW)
+    local = np.stack([aimL, upL, tertL], axis=1)
+    world = np.stack([aimW, upW, tertW], axis=1)
+    return np.einsum("nji,njk->nik", local, world)
+
+
+def get_quaternions(rotations):
+    """
+    Returns the unit quaternions (x, y, z, w) of rotation matrices
+    :param rotations: array: (N, 3, 3) orthonormal rotation matrices
+    :return: array: (N, 4) quaternions
+    """
+    m = np.reshape(np.asarray(rotations, dtype=float), (-1, 3, 3))
+    # Build the quaternion off whichever of w, x, y or z is largest so it never divides by a small number
+    diagonal = np.stack([m[:, 0, 0], m[:, 1, 1], m[:, 2, 2]], axis=1)
+    trace = diagonal.sum(axis=1)
+    choice = np.argmax(np.concatenate([diagonal, trace[:, None]], axis=1), axis=1)
+    result = np.empty((len(m), 4))
+    for i in range(4):
+        mask = choice == i
+        if not mask.any():
+            continue
+        r = m[mask]
+        if i == 3:
+            s = 2.0 * np.sqrt(1.0 + trace[mask])
+            q = [r[:, 1, 2] - r[:, 2, 1], r[:, 2, 0] - r[:, 0, 2], r[:, 0, 1] - r[:, 1, 0], 0.25 * s * s]
+        else:
+            j, k = (i + 1) % 3, (i + 2) % 3
+            s = 2.0 * np.sqrt(1.0 + r[:, i, i] - r[:, j, j] - r[:, k, k])
+            q = [None] * 4
+            q[i] = 0.25 * s * s
+            q[j] = r[:, i, j] + r[:, j, i]
+            q[k] = r[:, i, k] + r[:, k, i]
+            q[3] = r[:, j, k] - r[:, k, j]
+        result[mask] = np.stack(q, axis=1) / s[:, None]
+    return result
+
+
+def from_quaternions(quaternions):
+    """
+    Returns the rotation matrices of unit quaternions (the inverse of get_quaternions)
+    :param quaternions: array: (N, 4) quaternions (x, y, z, w)
+    :return: array: (N, 3, 3) rotation matrices
+    """
+    x, y, z, w = np.reshape(np.asarray(quaternions, dtype=float), (-1, 4)).T
+    return np.stack([np.stack([1 - 2 * (y * y + z * z), 2 * (x * y + z * w), 2 * (x * z - y * w)], axis=1),
+                     np.stack([2 * (x * y - z * w), 1 - 2 * (x * x + z * z), 2 * (y * z + x * w)], axis=1),
+                     np.stack([2 * (x * z + y * w), 2 * (y * z - x * w), 1 - 2 * (x * x + y * y)], axis=1)], axis=1)
+
+
+def slerp(a, b, weights):
+    """
+    Spherically interpolates between two sets of quaternions along the shortest path
+    :param a: array: (N, 4) quaternions at a weight of 0
+    :param b: array: (N, 4) quaternions at a weight of 1
+    :param weights: array: (N,) weights
+    :return: array: (N, 4) quaternions
+    """
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), (len(a),))[:, None]
+    cos = np.sum(a * b, axis=1, keepdims=True)
+    b = np.where(cos < 0.0, -b, b)
+    cos = np.abs(cos)
+    angle = np.arccos(np.clip(cos, -1.0, 1.0))
+    sin = np.sin(angle)
+    # Nearly identical rotations fall back on a straight line to stay stable
+    close = sin < 1e-6
+    sin = np.where(close, 1.0, sin)
+    wa = np.where(close, 1.0 - weights, np.sin((1.0 - weights) * angle) / sin)
+    wb = np.where(close, weights, np.sin(weights * angle) / sin)
+    result = wa * a + wb * b
+    return result / np.linalg.norm(result, axis=1, keepdims=True)
+
+
+#############
+# Nodes
+#############
+
+def compose(translate=None, rotate=None, scale=None, shear=None, rotate_order="xyz", count=None):
+    """
+    Builds matrices from their channels the same way a composeMatrix node does (scale, shear, rotate then
+    translate). Channels that are not given are left at their defaults
+    :param translate: array: (N, 3) translations
+    :param rotate: array: (N, 3) rotations in degrees
+    :param scale: array: (N, 3) scales
+    :param shear: array: (N, 3) shears (xy, xz, yz)
+    :param rotate_order: str, int or list: one rotate order for all of them or one for each
+    :param count: int: the number of matrices (only needed when none of the channels are given)
+    :return: array: (N, 4, 4) matrices
+    """
+    channels = [np.reshape(np.asarray(c, dtype=float), (-1, 3)) if c is not None else None
+                for c in [translate, rotate, scale, shear]]
+    if count is None:
+        count = max([len(c) for c in channels if c is not None] or [1])
+    translate, rotate, scale, shear = [np.broadcast_to(c, (count, 3)) if c is not None else None for c in channels]
+    m = np.broadcast_to(np.eye(3), (count, 3, 3)).copy()
+    if rotate is not None:
+        m = get_rotations(rotate, rotate_order)
+    if shear is not None:
+        sh = np.broadcast_to(np.eye(3), (count, 3, 3)).copy()
+        sh[:, 1, 0] = shear[:, 0]
+        sh[:, 2, 0] = shear[:, 1]
+        sh[:, 2, 1] = shear[:, 2]
+        m = sh @ m
+    if scale is not None:
+        m = scale[:, :, None] * m
+    result = np.broadcast_to(np.eye(4), (count, 4, 4)).copy()
+    result[:, :3, :3] = m
+    if translate is not None:
+        result[:, 3, :3] = translate
+    return result
+
+
+def get_components(matrices):
+    """
+    Splits matrices into translation, rotation, scale and shear (the inverse of compose). A mirrored matrix gets a
+    negative x scale
+    :param matrices: array: (N, 4, 4) matrices
+    :return: array, array, array, array: (N, 3) translations, (N, 3, 3) rotations, (N, 3) scales and shears
+    """
+    matrices = as_matrices(matrices)
+    rows = matrices[:, :3, :3].copy()
+    mirrored = np.linalg.det(rows) < 0.0
+    rows[mirrored, 0] *= -1.0
+    # Gram-Schmidt the rows in order; what gets projected out of each row is its shear
+    scale = np.zeros((len(rows), 3))
+    rotation = np.zeros_like(rows)
+    scale[:, 0] = np.linalg.norm(rows[:, 0], axis=1)
+    rotation[:, 0] = rows[:, 0] / scale[:, 0, None]
+    xy = np.sum(rows[:, 1] * rotation[:, 0], axis=1)
+    y = rows[:, 1] - xy[:, None] * rotation[:, 0]
+    scale[:, 1] = np.linalg.norm(y, axis=1)
+    rotation[:, 1] = y / scale[:, 1, None]
+    xz = np.sum(rows[:, 2] * rotation[:, 0], axis=1)
+    yz = np.sum(rows[:, 2] * rotation[:, 1], axis=1)
+    z = rows[:, 2] - xz[:, None] * rotation[:, 0] - yz[:, None] * rotation[:, 1]
+    scale[:, 2] = np.linalg.norm(z, axis=1)
+    rotation[:, 2] = z / scale[:, 2, None]
+    shear = np.stack([xy / scale[:, 1], xz / scale[:, 2], yz / scale[:, 2]], axis=1)
+    scale[mirrored, 0] *= -1.0
+    return matrices[:, 3, :3].copy(), rotation, scale, shear
+
+
+def decompose(matrices, rotate_order="xyz"):
+    """
+    Splits matrices into their channels the same way a decomposeMatrix node does
+    :param matrices: array: (N, 4, 4) matrices
+    :param rotate_order: str, int or list: one rotate order for all of them or one for each
+    :return: array, array, array, array: (N, 3) translations, rotations (degrees), scales and shears (xy, xz, yz)
+    """
+    translate, rotation, scale, shear = get_components(matrices)
+    return translate, get_eulers(rotation, rotate_order), scale, shear
+
+
+def pick(matrices, translate=True, rotate=True, scale=True, shear=True):
+    """
+    Keeps only some of the channels of matrices the same way a pickMatrix node does (the use attributes)
+    :param matrices: array: (N, 4, 4) matrices
+    :param translate: bool or array: whether the translation is kept (for all of them or (N,) for each)
+    :param rotate: bool or array: whether the rotation is kept
+    :param scale: bool or array: whether the scale is kept
+    :param shear: bool or array: whether the shear is kept
+    :return: array: (N, 4, 4) matrices
+    """
+    channels = list(decompose(matrices))
+    defaults = [0.0, 0.0, 1.0, 0.0]
+    for i, use in enumerate([translate, rotate, scale, shear]):
+        use = np.broadcast_to(np.asarray(use, dtype=bool), (len(channels[i]),))
+        channels[i] = np.where(use[:, None], channels[i], defaults[i])
+    return compose(*channels)
+
+
+def blend(matrices, targets, weights, envelope=1.0):
+    """
+    Blends matrices toward any number of targets in turn the same way a blendMatrix node does: translation, scale
+    and shear are blended linearly and rotation along the shortest arc
+    :param matrices: array: (N, 4, 4) input matrices
+    :param targets: list: (N, 4, 4) matrices for each target
+    :param weights: list: the weight of each target (a float or (N,) weights)
+    :param envelope: float: scales every weight
+    :return: array: (N, 4, 4) matrices
+    """
+    translate, rotation, scale, shear = get_components(matrices)
+    rotation = get_quaternions(rotation)
+    for target, weight in zip(targets, weights):
+        weight = np.broadcast_to(np.asarray(weight, dtype=float) * envelope, (len(translate),))
+        t, r, s, sh = get_components(target)
+        translate, scale, shear = [a + weight[:, None] * (b - a) for a, b in [(translate, t), (scale, s), (shear, sh)]]
+        rotation = slerp(rotation, get_quaternions(r), weight)
+    return compose(translate, get_eulers(from_quaternions(rotation)), scale, shear)
@@ -1,140 +1,158 @@
-import pymel.core as pm
-import maya.api.OpenMaya as om
 
 from core import constants
+from core import mathutils
+from core import matrices
+from core import profiler
+from core import scene
 from core import utils
 
 
+@profiler.stage
 def constrain(driver, driven, frozen=False, offset=False, reset=False):
     """
     Uses matrix nodes to constrain a driven object to a driver. The function can account for frozen transforms,
     preserve offsets, and resets transforms if told to.
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param frozen: bool: if the driver node has frozen transforms
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the offset multMatrix node
-    """
-    # TODO: Check for frozen transforms instead of asking the user to set the attribute
-    if frozen:
-        pm.move(driven, list(pm.dt.Vector()), rpr=1)
-        # pm.makeIdentity(driven, a=1)
-    pm.connectAttr(driver.worldMatrix[0], driven.offsetParentMatrix, f=1)
-    if reset:
-        utils.reset_transforms([driven], m=False)
-    if offset:
-        # TODO: offset may be preserved by turning off inherit transforms!
-        offset = offset_driven(driver, driven)
-        return offset
-    return None
+    :return: str: the offset multMatrix node
+    """
+    with scene.transaction():
+        # TODO: Check for frozen transforms instead of asking the user to set the attribute
+        if frozen:
+            scene.move(driven, [0.0, 0.0, 0.0], pivot=True)
+            # scene.freeze(driven)
+        scene.connect_attr(f"{driver}.worldMatrix[0]", f"{driven}.offsetParentMatrix")
+        if reset:
+            utils.reset_transforms([driven], m=False)
+        if offset:
+            # TODO: offset may be preserved by turning off inherit transforms!
+            offset = offset_driven(driver, driven)
+            return offset
+        return None
 
 
+@profiler.stage
 def decompose_constraint(target, pick=False):
     """
     Creates a decompose matrix to a compose matrix node at the offsetParentMatrix input of a defined
     target node. The function can also work for pickMatrix node but it has to be told to do so.
-    :param target: PyNode: the node receiving the offsetParentMatrix data
+    :param target: str: the node receiving the offsetParentMatrix data
     :param pick: bool: whether the target node is a pickMatrix node
-    :return: PyNode, PyNode: the created decompose and compose matrix nodes
+    :return: str, str: the created decompose and compose matrix nodes
     """
-    # Set the source attribute based on pick attribute
-    if pick:
-        source_attr = "inputMatrix"
-    else:
-        source_attr = "offsetParentMatrix"
-    # Check to see if decompose/compose matrix node pair already exists
-    if pm.listConnections(eval(f"target.{source_attr}"))[0] == "composeMatrix":
-        comp = pm.listConnections(eval(f"target.{source_attr}"))[0]
-        dec = pm.PyNode(comp.name().replace("_comp", "_dec"))
+    with scene.transaction():
+        # Set the source attribute based on pick attribute
+        if pick:
+            source_attr = "inputMatrix"
+        else:
+            source_attr = "offsetParentMatrix"
+        # Check to see if decompose/compose matrix node pair already exists
+        source = scene.list_connections(f"{target}.{source_attr}", destination=False)[0]
+        if scene.node_type(source.split(".")[0]) == "composeMatrix":
+            comp = source.split(".")[0]
+            dec = comp.replace("_comp", "_dec")
+            return dec, comp
+        # Set variables and create decompose/compose matrix node pair
+        name = "_".join(source.split(".")[0].split("_")[:-1])
+        dec = utils.check_hypergraph_node(f"{name}_dec", "decomposeMatrix")
+        comp = utils.check_hypergraph_node(f"{name}_comp", "composeMatrix")
+        # Make attribute connections
+        scene.connect_attr(source, f"{dec}.inputMatrix")
+        for attr in constants.TRNSFRMATTRS:
+            scene.connect_attr(f"{dec}.output{attr.capitalize()}", f"{comp}.input{attr.capitalize()}")
+        scene.connect_attr(f"{comp}.outputMatrix", f"{target}.{source_attr}")
         return dec, comp
-    # Set variables and create decompose/compose matrix node pair
-    source = pm.listConnections(eval(f"target.{source_attr}"), p=1)[0]
-    name = "_".join(source.name().split(".")[0].split("_")[:-1])
-    dec = utils.check_hypergraph_node(f"{name}_dec", "decomposeMatrix", shading=False)
-    comp = utils.check_hypergraph_node(f"{name}_comp", "composeMatrix", shading=False)
-    # Make attribute connections
-    pm.connectAttr(source, dec.inputMatrix)
-    for attr in constants.TRNSFRMATTRS:
-        pm.connectAttr(eval(f"dec.output{attr.capitalize()}"), eval(f"comp.input{attr.capitalize()}"), f=1)
-    pm.connectAttr(comp.outputMatrix, eval(f"target.{source_attr}"), f=1)
-    return dec, comp
 
 
+@profiler.stage
 def make_blend(drivers, driven, decompose=False):
     """
     Creates a blendMatrix node between a defined pair of driver/driven nodes. The function can also use a decompose
     matrix node to directly drive the driven transforms rather than its offset parent matrix.
     :param drivers: list: the source nodes driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driven: str: the target node being controlled by the driver node
     :param decompose: bool: if the driven node needs its transforms to be constrained
     :return: the blendMatrix node that is created.
     """
-    # Set variables and create blend node
-    blend_name = "_".join(driven.name().split("_")[:-1] + ["blend"])
-    if pm.ls(blend_name):
-        return pm.PyNode(blend_name)
-    blend = utils.check_hypergraph_node(blend_name, "blendMatrix", shading=False)
-    # Connect drivers to blend
-    driven.inheritsTransform.set(0)
-    for i, driver in enumerate(drivers):
-        if i:
-            blend.target[i-1].targetMatrix.get()
-            pm.connectAttr(driver.worldMatrix[0], blend.target[i-1].targetMatrix, f=1)
-            continue
-        pm.connectAttr(driver.worldMatrix[0], blend.inputMatrix, f=1)
-    # Connect blend to driven
-    pm.connectAttr(blend.outputMatrix, driven.offsetParentMatrix, f=1)
-    utils.reset_transforms([driven], m=False)
-    if decompose:
-        make_decompose(blend, driven)
-    return blend
-
-
-def make_decompose(driver, driven):
+    with scene.transaction():
+        # Set variables and create blend node
+        blend_name = "_".join(driven.split("_")[:-1] + ["blend"])
+        blend = scene.find(blend_name)
+        if blend is not None:
+            return blend
+        blend = utils.check_hypergraph_node(blend_name, "blendMatrix")
+        # Connect drivers to blend
+        scene.set_attr(f"{driven}.inheritsTransform", 0)
+        for i, driver in enumerate(drivers):
+            if i:
+                scene.connect_attr(f"{driver}.worldMatrix[0]", f"{blend}.target[{i - 1}].targetMatrix")
+                continue
+            scene.connect_attr(f"{driver}.worldMatrix[0]", f"{blend}.inputMatrix")
+        # Connect blend to driven
+        scene.connect_attr(f"{blend}.outputMatrix", f"{driven}.offsetParentMatrix")
+        utils.reset_transforms([driven], m=False)
+        if decompose:
+            make_decompose(blend, driven, source=f"{blend}.outputMatrix")
+        return blend
+
+
+@profiler.stage
+def make_decompose(driver, driven, source=None):
     """
     Creates a decomposeMatrix node between a defined pair of driver/driven nodes.
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
+    :param source: str: the plug connected to the driven node's offsetParentMatrix if it's already known
     :return: the decomposeMatrix node that is created.
     """
-    # Set variables and create decompose node
-    decompose_name = "_".join(driver.name().split("_")[:-1] + ["to"] + driven.name().split("_")[:-1] + ["dec"])
-    decompose = utils.check_hypergraph_node(decompose_name, "decomposeMatrix", shading=False)
-    driver_attr = pm.listConnections(driven.offsetParentMatrix, p=1)[0]
-    pm.disconnectAttr(driver_attr, driven.offsetParentMatrix)
-    # Make connections
-    pm.connectAttr(driver_attr, decompose.inputMatrix, f=1)
-    for attr in constants.TRNSFRMATTRS:
-        pm.connectAttr(eval(f"decompose.output{attr.capitalize()}"), eval(f"driven.{attr}"), f=1)
-    return decompose
+    with scene.transaction():
+        # Set variables and create decompose node
+        decompose_name = "_".join(driver.split("_")[:-1] + ["to"] + driven.split("_")[:-1] + ["dec"])
+        decompose = utils.check_hypergraph_node(decompose_name, "decomposeMatrix")
+        driver_attr = source
+        if driver_attr is None:
+            driver_attr = scene.list_connections(f"{driven}.offsetParentMatrix", destination=False)[0]
+        scene.disconnect_attr(driver_attr, f"{driven}.offsetParentMatrix")
+        # Make connections
+        scene.connect_attr(driver_attr, f"{decompose}.inputMatrix")
+        for attr in constants.TRNSFRMATTRS:
+            scene.connect_attr(f"{decompose}.output{attr.capitalize()}", f"{driven}.{attr}")
+        return decompose
 
 
-def make_pick(driver, driven):
+@profiler.stage
+def make_pick(driver, driven, source=None):
     """
     Creates a pickMatrix node between a defined pair of driver/driven nodes
     :param driver: the source node for the matrix data
     :param driven: the target node for the matrix data
+    :param source: str: the plug connected to the driven node's offsetParentMatrix if it's already known
     :return: the pickMatrix node that is created.
     """
-    # Set variables and create pick node
-    pick_name = "_".join(driver.name().split("_")[:-1] + ["to"] + driven.name().split("_")[:-1] + ["pick"])
-    pick = utils.check_hypergraph_node(pick_name, "pickMatrix", shading=False)
-    source = pm.listConnections(driven.offsetParentMatrix, p=1)[0]
-    # Make connections
-    pm.connectAttr(source, pick.inputMatrix, f=1)
-    pm.connectAttr(pick.outputMatrix, driven.offsetParentMatrix, f=1)
-    return pick
+    with scene.transaction():
+        # Set variables and create pick node
+        pick_name = "_".join(driver.split("_")[:-1] + ["to"] + driven.split("_")[:-1] + ["pick"])
+        pick = utils.check_hypergraph_node(pick_name, "pickMatrix")
+        if source is None:
+            source = scene.list_connections(f"{driven}.offsetParentMatrix", destination=False)[0]
+        # Make connections
+        scene.connect_attr(source, f"{pick}.inputMatrix")
+        scene.connect_attr(f"{pick}.outputMatrix", f"{driven}.offsetParentMatrix")
+        return pick
 
 
+@profiler.stage
 def make_constraint(driver, driven, translate=False, rotate=False, scale=False, shear=False,
                     frozen=False, offset=False, reset=False):
     """
     Uses a pickMatrix node to set up a constraint between a defined pair of driver/driven nodes and constrains
     a defined set of tranform attributes. The function can also account for frozen transforms, maintain offsets,
     and reset transforms of the driven node.
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param translate: bool: whether or not to constrain the translate attribute of the driven node
     :param rotate: bool: whether or not to constrain the rotate attribute of the driven node
     :param scale: bool: whether or not to constrain the scale attribute of the driven node
@@ -142,153 +160,250 @@ def make_constraint(driver, driven, translate=False, rotate=False, scale=False,
     :param frozen: bool: if the driver node has frozen transforms
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
-    """
-    constrain(driver, driven, frozen=frozen, reset=reset)
-    # Set pickMatrix constraint attributes
-    pick = make_pick(driver, driven)
-    if not translate:
-        pick.useTranslate.set(0)
-    if not rotate:
-        pick.useRotate.set(0)
-    if not scale:
-        pick.useScale.set(0)
-    if not shear:
-        pick.useShear.set(0)
-    if offset:
-        # TODO: offset may be preserved by turning off inherit transforms!
-        offset_constraint(pick, pick=True)
-    return pick
-
-
-def offset_constraint(target, pick=False):
+    :return: str: the pickMatrix node controlling the constraints
+    """
+    # The driver's world matrix is what the offset is taken from, so query it before anything is queued
+    driver_mtrx = scene.get_matrix(driver) if offset else None
+    with scene.transaction():
+        constrain(driver, driven, frozen=frozen, reset=reset)
+        # Set pickMatrix constraint attributes
+        pick = make_pick(driver, driven, source=f"{driver}.worldMatrix[0]")
+        if not translate:
+            scene.set_attr(f"{pick}.useTranslate", 0)
+        if not rotate:
+            scene.set_attr(f"{pick}.useRotate", 0)
+        if not scale:
+            scene.set_attr(f"{pick}.useScale", 0)
+        if not shear:
+            scene.set_attr(f"{pick}.useShear", 0)
+        if offset:
+            offset_pick(pick, driven, get_pick_offset(driver_mtrx, translate, rotate, scale, shear))
+        return pick
+
+
+def get_pick_offset(matrix, translate=True, rotate=True, scale=True, shear=True):
+    """
+    Returns the matrix that cancels out what a pickMatrix node outputs for a given input matrix, so a constraint
+    built from the driver's current world matrix leaves the driven node where it is and only passes on how the
+    driver moves from here
+    :param matrix: list: the pickMatrix node's input matrix (the driver's world matrix)
+    :param translate: bool: whether the pickMatrix node uses the translation
+    :param rotate: bool: whether the pickMatrix node uses the rotation
+    :param scale: bool: whether the pickMatrix node uses the scale
+    :param shear: bool: whether the pickMatrix node uses the shear
+    :return: list: the offset matrix
+    """
+    if matrices.np is not None:
+        return matrices.inverse(matrices.pick(matrix, translate, rotate, scale, shear))[0].reshape(16).tolist()
+    # Without NumPy there is no shear to pick
+    translate_val, rotate_val, scale_val = mathutils.decompose(matrix)
+    picked = mathutils.compose(translate_val if translate else [0.0, 0.0, 0.0],
+                               rotate_val if rotate else [0.0, 0.0, 0.0], scale_val if scale else [1.0, 1.0, 1.0])
+    return mathutils.inverse(picked)
+
+
+@profiler.stage
+def offset_pick(pick, driven, offset):
+    """
+    Preserves the offset of a pickMatrix constraint with a single multMatrix node between the pickMatrix node and
+    the driven node's offsetParentMatrix. The offset comes first so the driver's movement is added on top of the
+    driven node's current transforms
+    :param pick: str: the pickMatrix node controlling the constraint
+    :param driven: str: the target node being controlled by the pickMatrix node
+    :param offset: list: the offset matrix (see get_pick_offset)
+    :return: str: the multMatrix node creating the offset
+    """
+    with scene.transaction():
+        mult = utils.check_hypergraph_node(pick.replace("_pick", "_offset"), "multMatrix")
+        scene.set_attr(f"{mult}.matrixIn[0]", offset)
+        scene.connect_attr(f"{pick}.outputMatrix", f"{mult}.matrixIn[1]")
+        scene.connect_attr(f"{mult}.matrixSum", f"{driven}.offsetParentMatrix")
+        return mult
+
+
+@profiler.stage
+def offset_constraint(target, pick=False, matrix=None):
     """
     Sets up a decompose/compose matrix pair with a set of plusMinusAverage nodes in between that subtract the
     source node's transform data to preserve the offset of the defined target node
-    :param target: PyNode: the node receiving the transform data
+    :param target: str: the node receiving the transform data
     :param pick: bool: whether the target node is a pickMatrix node
+    :param matrix: list: the matrix the decompose node will output if it's already known (saves evaluating it)
     :return: tup, list: the created decompose/compose matrix pair and a list of the offset nodes
     """
-    # Get the decompose/compose matrix pair
-    dec = decompose_constraint(target, pick)
-    offsets = []
-    for attr in constants.TRNSFRMATTRS:
-        # Create the offset node and set the transform variables
-        suffix = constants.get_attr_suffix(attr)
-        offset = utils.check_hypergraph_node(dec[0].name().replace("_dec", f"{suffix}_offset"), "plusMinusAverage")
-        offset_val = eval(f"dec.output{attr.capitalize()}.get()")
-        if attr == "scale":
-            offset_val = offset_val + 1
-        # Make connections
-        offset.input3D[1].set(offset_val)
-        offset.operation.set(2)
-        pm.connectAttr(eval(f"dec[0].output{attr.capitalize()}"), offset.input3D[0], f=1)
-        pm.connectAttr(offset.output3D, eval(f"dec[1].input{attr.capitalize()}"), f=1)
-        offsets.append(offset)
-    return dec, offsets
+    # Query the matrix the decompose node will take in before anything is queued so the transaction only has to
+    # commit once
+    if matrix is None:
+        source = scene.list_connections(f"{target}.{'inputMatrix' if pick else 'offsetParentMatrix'}",
+                                        destination=False)[0]
+        if scene.node_type(source.split(".")[0]) == "composeMatrix":
+            source = f"{source.split('.')[0].replace('_comp', '_dec')}.inputMatrix"
+        matrix = scene.get_attr(source)
+    if matrices.np is not None:
+        values = dict(zip(constants.TRNSFRMATTRS, [v[0].tolist() for v in matrices.decompose(matrix)]))
+    else:
+        values = dict(zip(constants.TRNSFRMATTRS, mathutils.decompose(matrix)))
+    with scene.transaction():
+        # Get the decompose/compose matrix pair
+        dec = decompose_constraint(target, pick)
+        offsets = []
+        for attr in constants.TRNSFRMATTRS:
+            # Create the offset node and set the transform variables
+            suffix = constants.get_attr_suffix(attr)
+            offset = utils.check_hypergraph_node(dec[0].replace("_dec", f"{suffix}_offset"), "plusMinusAverage")
+            offset_val = values[attr]
+            if attr == "scale":
+                offset_val = [v - 1 for v in offset_val]
+            # Make connections
+            scene.set_attr(f"{offset}.input3D[1]", offset_val)
+            scene.set_attr(f"{offset}.operation", 2)
+            scene.connect_attr(f"{dec[0]}.output{attr.capitalize()}", f"{offset}.input3D[0]")
+            scene.connect_attr(f"{offset}.output3D", f"{dec[1]}.input{attr.capitalize()}")
+            offsets.append(offset)
+        return dec, offsets
 
 
-def offset_driven(driver, driven):
+@profiler.stage
+def offset_driven(driver, driven, world_matrices=None):
     """
     Creates a multMatrix node to preserve the offset on a defined driver/driven pair
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
-    :return: PyNode: the multMatrix node creating the offset
-    """
-    # Set the variables and create the multMatrix node controlling the offset
-    mult_name = "_".join(driver.name().split("_")[:-1] + ["to"] + driven.name().split("_")[:-1] + ["mult"])
-    mult = utils.check_hypergraph_node(mult_name, "multMatrix")
-    parent = utils.get_parent_and_children(driven)[0]
-    driven_mtrx = om.MMatrix(driven.worldMatrix.get())
-    driver_imtrx = om.MMatrix(driver.worldInverseMatrix.get())
-    # Set and connect attributes
-    mult.matrixIn[0].set(driven_mtrx * driver_imtrx)
-    pm.connectAttr(driver.worldMatrix[0], mult.matrixIn[1], f=1)
-    if parent is not None:
-        pm.connectAttr(parent.inverseMatrix[0], mult.matrixIn[2], f=1)
-    pm.connectAttr(mult.matrixSum, driven.offsetParentMatrix, f=1)
-    return mult
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
+    :param world_matrices: dict: the world matrices of any of the nodes that are already known
+    :return: str: the multMatrix node creating the offset
+    """
+    return make_offsets([driver], [driven], world_matrices)[0]
 
 
+@profiler.stage
+def make_offsets(drivers, drivens, world_matrices=None):
+    """
+    Creates the offset multMatrix nodes of any number of driver/driven pairs at once (see offset_driven). The world
+    matrix of each node is queried once (or taken from the known matrices) and every offset is worked out up front
+    so the nodes are created in a single transaction
+    :param drivers: list: the source nodes driving the driven nodes
+    :param drivens: list: the target nodes being controlled by the driver nodes
+    :param world_matrices: dict: the world matrices of any of the nodes that are already known
+    :return: list: the multMatrix nodes creating the offsets
+    """
+    # Query the scene before anything is queued so the transaction only has to commit once
+    worlds = dict(world_matrices or {})
+    for node in drivers + drivens:
+        if node not in worlds:
+            worlds[node] = scene.get_matrix(node)
+    parents = [scene.get_parent(driven) for driven in drivens]
+    if matrices.np is not None:
+        offsets = matrices.get_offsets([worlds[n] for n in drivens], [worlds[n] for n in drivers])
+        offsets = offsets.reshape(-1, 16).tolist()
+    else:
+        offsets = [mathutils.mult(worlds[driven], mathutils.inverse(worlds[driver]))
+                   for driver, driven in zip(drivers, drivens)]
+    mults = []
+    with scene.transaction():
+        for driver, driven, parent, offset in zip(drivers, drivens, parents, offsets):
+            # Set the variables and create the multMatrix node controlling the offset
+            mult_name = "_".join(driver.split("_")[:-1] + ["to"] + driven.split("_")[:-1] + ["mult"])
+            mult = utils.check_hypergraph_node(mult_name, "multMatrix")
+            # Set and connect attributes
+            scene.set_attr(f"{mult}.matrixIn[0]", offset)
+            scene.connect_attr(f"{driver}.worldMatrix[0]", f"{mult}.matrixIn[1]")
+            if parent is not None:
+                scene.connect_attr(f"{parent}.worldInverseMatrix[0]", f"{mult}.matrixIn[2]")
+            scene.connect_attr(f"{mult}.matrixSum", f"{driven}.offsetParentMatrix")
+            mults.append(mult)
+    return mults
+
+
+@profiler.stage
 def orient_constraint(driver, driven, offset=False, reset=False):
     """
     Uses matrix functionality to create a more direct orient constraint
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
+    :return: str: the pickMatrix node controlling the constraints
     """
-    pick = make_constraint(driver, driven, rotate=True, offset=offset, reset=reset)
-    return pick
+    with scene.transaction():
+        pick = make_constraint(driver, driven, rotate=True, offset=offset, reset=reset)
+        return pick
 
 
+@profiler.stage
 def parent_constraint(driver, driven, frozen=False, offset=False, reset=False):
     """
     Uses matrix functionality to create a more direct parent constraint
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param frozen: bool: if the driver node has frozen transforms
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
+    :return: str: the pickMatrix node controlling the constraints
     """
-    constrain(driver, driven, offset, reset)
-    pick = make_constraint(driver, driven, translate=True, rotate=True, scale=True, shear=True,
-                           frozen=frozen, offset=offset, reset=reset)
-    return pick
+    with scene.transaction():
+        pick = make_constraint(driver, driven, translate=True, rotate=True, scale=True, shear=True,
+                               frozen=frozen, offset=offset, reset=reset)
+        return pick
 
 
+@profiler.stage
 def point_constraint(driver, driven, frozen=False, offset=False, reset=False):
     """
     Uses matrix functionality to create a more direct point constraint
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param frozen: bool: if the driver node has frozen transforms
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
+    :return: str: the pickMatrix node controlling the constraints
     """
-    pick = make_constraint(driver, driven, frozen=frozen, translate=True, offset=offset, reset=reset)
-    return pick
+    with scene.transaction():
+        pick = make_constraint(driver, driven, frozen=frozen, translate=True, offset=offset, reset=reset)
+        return pick
 
 
+@profiler.stage
 def scale_constraint(driver, driven, offset=False, reset=False):
     """
     Uses matrix functionality to create a more direct scale constraint
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
+    :return: str: the pickMatrix node controlling the constraints
     """
-    pick = make_constraint(driver, driven, scale=True, offset=offset, reset=reset)
-    return pick
+    with scene.transaction():
+        pick = make_constraint(driver, driven, scale=True, offset=offset, reset=reset)
+        return pick
 
 
+@profiler.stage
 def shear_constraint(driver, driven, offset=False, reset=False):
     """
     Uses matrix functionality to create a more direct orient constraint
-    :param driver: PyNode: the source node driving the driven node
-    :param driven: PyNode: the target node being controlled by the driver node
+    :param driver: str: the source node driving the driven node
+    :param driven: str: the target node being controlled by the driver node
     :param offset: bool: whether or not to preserve the offset of the driven node
     :param reset: bool: whether or not to reset the transforms of the driven node
-    :return: PyNode: the pickMatrix node controlling the constraints
+    :return: str: the pickMatrix node controlling the constraints
     """
-    pick = make_constraint(driver, driven, shear=True, offset=offset, reset=reset)
-    return pick
+    with scene.transaction():
+        pick = make_constraint(driver, driven, shear=True, offset=offset, reset=reset)
+        return pick
 
 
+@profiler.stage
 def worldspace_to_matrix(source, target):
     """
     Queires the world matrix position of a defined source node and applies it to the offsetParentMatrix of
     a defined target node.
     This is an older function that probably needs to account for frozen transforms in the source node
-    :param source: PyNode: the node whose matrix position is being queried
-    :param target: PyNode: the node receiving the matrix position data
+    :param source: str: the node whose matrix position is being queried
+    :param target: str: the node receiving the matrix position data
     """
-    if int(pm.about(v=1)) >= 2020:
-        target.offsetParentMatrix.set(pm.xform(source, q=1, ws=1, m=1))
-    else:
-        pm.matchTransform(target, source)
+    with scene.transaction():
+        if scene.maya_version() >= 2020:
+            scene.set_attr(f"{target}.offsetParentMatrix", scene.get_matrix(source))
+        else:
+            scene.match_transform(target, source)
 
@@ -0,0 +1,1564 @@
+"""
+Pure Python stand-in for a Maya scene. MemoryScene implements the scene API with plain Python objects so the
+builders can run (and be measured) without Maya: nodes, DAG parenting, attributes, connections, constraints
+and world-matrix math are all modelled here. Utility nodes evaluate on demand when one of their outputs is
+queried. Constraints, IK handles and deformers are created as nodes but only affect the scene at the moment
+they're made, which is all the builders rely on.
+
+Every call the builders make through the scene API is counted, along with the nodes that get created, so a
+build can report how much work it issued (see MemoryScene.report).
+"""
+import re
+import tracemalloc
+
+from core import constants
+from core import mathutils as mu
+from core import scene
+
+
+TRANSFORMS = ["transform", "joint", "ikHandle", "ikEffector", "pointConstraint", "orientConstraint",
+              "scaleConstraint", "parentConstraint", "aimConstraint"]
+SHAPES = ["locator", "nurbsCurve", "nurbsSurface", "lattice", "baseLattice", "clusterHandle", "deformSine",
+          "deformTwist", "deformBend", "deformSquash", "deformWave", "deformFlare", "follicle"]
+# Shape attributes that Maya lets you reach through the shape's transform
+SHAPEATTRS = ["spans", "spansU", "spansV", "degree", "degreeU", "degreeV", "worldSpace[0]", "local"]
+VECTORS = ["translate", "rotate", "scale", "jointOrient", "rotateAxis", "preferredAngle", "rotatePivot", "scalePivot",
+           "inputTranslate", "inputRotate", "inputScale", "outputTranslate", "outputRotate", "outputScale",
+           "dWorldUpVector"]
+TYPEDVECTORS = {"multiplyDivide": {"input1": "XYZ", "input2": "XYZ", "output": "XYZ"},
+                "blendColors": {"color1": "RGB", "color2": "RGB", "output": "RGB"},
+                "condition": {"colorIfTrue": "RGB", "colorIfFalse": "RGB", "outColor": "RGB"}}
+DEFAULTS = {"scaleX": 1.0, "scaleY": 1.0, "scaleZ": 1.0, "visibility": 1, "inheritsTransform": 1, "radius": 1.0,
+            "useTranslate": 1, "useRotate": 1, "useScale": 1, "useShear": 1, "envelope": 1.0, "weight": 1.0,
+            "blender": 0.5, "inputScaleX": 1.0, "inputScaleY": 1.0, "inputScaleZ": 1.0, "colorIfFalseR": 1.0,
+            "colorIfFalseG": 1.0, "colorIfFalseB": 1.0,
+            "conversionFactor": 1.0, "normalizedIsoParms": 1, "useEulerRotation": 1, "segmentScaleCompensate": 1}
+TYPEDDEFAULTS = {"animBlendNodeAdditiveDA": {"weightA": 1.0, "weightB": 1.0},
+                 "multiplyDivide": {"operation": 1, "input2X": 1.0, "input2Y": 1.0, "input2Z": 1.0},
+                 "plusMinusAverage": {"operation": 1},
+                 "multDoubleLinear": {"input1": 1.0, "input2": 1.0}}
+PLUGPATTERN = re.compile(r"^([^.]+)\.(.+)$")
+INDEXPATTERN = re.compile(r"\[(\d+)(?::(\d+))?\]")
+MATRIXIN = re.compile(r"^matrixIn\[(\d+)\]$")
+TARGET = re.compile(r"^target\[(\d+)\]")
+INPUT1D = re.compile(r"^input1D\[(\d+)\]$")
+INPUT3D = re.compile(r"^input3D\[(\d+)\]")
+
+
+class Values(dict):
+    __slots__ = ["cache"]
+
+    def __init__(self, cache):
+        """
+        A dict of node values that clears the scene's evaluation cache whenever one of them changes
+        :param cache: dict: the evaluation cache of the scene the node belongs to
+        """
+        super().__init__()
+        self.cache = cache
+
+    def __setitem__(self, key, value):
+        self.cache.clear()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.cache.clear()
+        dict.__delitem__(self, key)
+
+    def update(self, *args, **kwargs):
+        self.cache.clear()
+        dict.update(self, *args, **kwargs)
+
+    def pop(self, *args):
+        self.cache.clear()
+        return dict.pop(self, *args)
+
+
+class Node(object):
+    __slots__ = ["name", "type", "parent", "children", "attrs", "user", "locked", "data", "history", "inputs",
+                 "outputs"]
+
+    def __init__(self, name, node_type, cache):
+        """
+        A single node in a MemoryScene
+        :param name: str: the node's unique name
+        :param node_type: str: the Maya node type it stands in for (ex: joint)
+        :param cache: dict: the evaluation cache of the scene the node belongs to
+        """
+        self.name = name
+        self.type = node_type
+        self.parent = None
+        self.children = []
+        self.attrs = Values(cache)
+        self.user = []
+        self.locked = set()
+        self.data = Values(cache)
+        self.history = []
+        self.inputs = set()
+        self.outputs = set()
+
+    def is_dag(self):
+        return self.type in TRANSFORMS or self.type in SHAPES
+
+    def is_shape(self):
+        return self.type in SHAPES
+
+
+class MemoryScene(scene.Scene):
+    def __init__(self, version=2024):
+        """
+        An in-memory scene that can stand in for Maya when running the builders headless
+        :param version: int: the Maya version the scene reports
+        """
+        self.version = version
+        self.nodes = {}
+        self.sources = {}
+        self.destinations = {}
+        self.selection = []
+        self.warnings = []
+        self.cache = {}
+        self.evaluating = set()
+        self.evaluation = "off"
+        self.calls = {}
+        self.created = {}
+        self.ops = 0
+        # Count every call made through the scene API. The counted wrappers live on the instance so calls made
+        # internally between methods aren't counted
+        for name in scene.API:
+            setattr(self, name, self.counted(name, getattr(self, name)))
+
+    def counted(self, name, method):
+        calls = self.calls
+
+        def call(*args, **kwargs):
+            calls[name] = calls.get(name, 0) + 1
+            return method(*args, **kwargs)
+        call.__name__ = name
+        return call
+
+    def report(self):
+        """
+        Returns the operation counts of everything issued against the scene so far
+        :return: dict: calls per API function, total calls, queued ops, nodes created per type and live nodes
+        """
+        return {"calls": dict(sorted(self.calls.items())),
+                "total_calls": sum(self.calls.values()),
+                "batched_ops": self.ops,
+                "nodes_created": dict(sorted(self.created.items())),
+                "total_nodes_created": sum(self.created.values()),
+                "nodes": len(self.nodes)}
+
+    def reset_counts(self):
+        """
+        Clears the operation counts without touching the scene
+        """
+        self.calls.clear()
+        self.created.clear()
+        self.ops = 0
+
+    ###################
+    # Internal helpers
+    ###################
+
+    def _node(self, name):
+        node = self.nodes.get(str(name).split(".")[0])
+        if node is None:
+            raise RuntimeError(f"No object matches name: {name}")
+        return node
+
+    def _plug(self, plug):
+        """
+        Splits a plug into its node and attribute, redirecting shape attributes reached through a transform
+        :param plug: str: the plug (ex: "node.translateX")
+        :return: Node, str: the node and attribute
+        """
+        match = PLUGPATTERN.match(plug)
+        if match is None:
+            raise RuntimeError(f"{plug} is not a valid plug")
+        node = self._node(match.group(1))
+        attr = match.group(2)
+        if attr in ["worldMatrix", "worldInverseMatrix", "worldSpace", "parentMatrix"]:
+            attr = f"{attr}[0]"
+        if not node.is_shape() and (attr in SHAPEATTRS or attr.startswith("cv[")) and attr not in node.attrs:
+            shapes = self._shapes(node)
+            if shapes:
+                node = shapes[0]
+        return node, attr
+
+    def _name(self, key):
+        return f"{key[0].name}.{key[1]}"
+
+    def _unique(self, name):
+        if name not in self.nodes:
+            return name
+        match = re.match(r"^(.*?)(\d*)$", name)
+        base = match.group(1)
+        i = int(match.group(2)) + 1 if match.group(2) else 1
+        while f"{base}{i}" in self.nodes:
+            i += 1
+        return f"{base}{i}"
+
+    def _create(self, node_type, name, parent=None):
+        node = Node(self._unique(name), node_type, self.cache)
+        self.nodes[node.name] = node
+        self.created[node_type] = self.created.get(node_type, 0) + 1
+        if parent is not None:
+            node.parent = parent
+            parent.children.append(node)
+        return node
+
+    def _create_shape(self, transform, node_type, name=None):
+        return self._create(node_type, name or f"{transform.name}Shape", transform)
+
+    def _shapes(self, node):
+        return [child for child in node.children if child.is_shape()]
+
+    def _transform_children(self, node):
+        return [child for child in node.children if not child.is_shape()]
+
+    def _descendants(self, node):
+        result = []
+        for child in self._transform_children(node):
+            result.append(child)
+            result.extend(self._descendants(child))
+        return result
+
+    def _leaves(self, node, attr):
+        """
+        Returns the child attributes of a compound attribute or None if the attribute isn't a compound
+        """
+        if attr in VECTORS:
+            return [f"{attr}{axis}" for axis in "XYZ"]
+        typed = TYPEDVECTORS.get(node.type, {})
+        if attr in typed:
+            return [f"{attr}{axis}" for axis in typed[attr]]
+        if node.type == "plusMinusAverage":
+            if re.match(r"^input3D\[\d+\]$", attr):
+                return [f"{attr}.input3D{axis}" for axis in "xyz"]
+            if attr == "output3D":
+                return [f"output3D{axis}" for axis in "xyz"]
+        return None
+
+    def _compound(self, node, attr):
+        """
+        Returns the compound attribute a child attribute belongs to and its index (or None)
+        """
+        if node.type == "plusMinusAverage":
+            match = re.match(r"^(input3D\[\d+\])\.input3D([xyz])$", attr)
+            if match:
+                return match.group(1), "xyz".index(match.group(2))
+            match = re.match(r"^output3D([xyz])$", attr)
+            if match:
+                return "output3D", "xyz".index(match.group(1))
+        if len(attr) > 1:
+            parent, axis = attr[:-1], attr[-1]
+            leaves = self._leaves(node, parent)
+            if leaves is not None and f"{parent}{axis}" in leaves:
+                return parent, leaves.index(f"{parent}{axis}")
+        return None
+
+    def _default(self, node, attr):
+        if "matrix" in attr.lower() and not attr.lower().startswith("use"):
+            return list(mu.IDENTITY)
+        base = INDEXPATTERN.sub("", attr.split(".")[-1])
+        typed = TYPEDDEFAULTS.get(node.type, {})
+        if attr in typed:
+            return typed[attr]
+        if base in DEFAULTS:
+            return DEFAULTS[base]
+        if attr == "rotateOrder":
+            return 0
+        return 0.0
+
+    # Values
+    def _get(self, node, attr):
+        """
+        Returns the value of an attribute, pulling it through its incoming connection if it has one. Values are
+        cached until the next change to the scene
+        """
+        key = (node, attr)
+        if key in self.cache:
+            return self.cache[key]
+        if key in self.evaluating:
+            # Cycle; fall back on the stored value
+            return node.attrs.get(attr, self._default(node, attr))
+        self.evaluating.add(key)
+        try:
+            value = self._evaluate(node, attr)
+        finally:
+            self.evaluating.discard(key)
+        self.cache[key] = value
+        return value
+
+    def _evaluate(self, node, attr):
+        source = self.sources.get((node, attr))
+        if source is not None:
+            return self._get(source[0], source[1])
+        leaves = self._leaves(node, attr)
+        if leaves is not None:
+            return [self._get(node, leaf) for leaf in leaves]
+        if node.inputs:
+            compound = self._compound(node, attr)
+            if compound is not None and compound[0] in node.inputs:
+                return self._get(node, compound[0])[compound[1]]
+        if attr in node.attrs:
+            return node.attrs[attr]
+        compute = getattr(self, f"_compute_{node.type}", None)
+        if compute is not None:
+            value = compute(node, attr)
+            if value is not None:
+                return value
+        if node.type in TRANSFORMS or node.is_shape():
+            value = self._compute_dag(node, attr)
+            if value is not None:
+                return value
+        return self._default(node, attr)
+
+    def _indices(self, node, pattern):
+        """
+        Returns the sorted indices of the set or connected elements of a multi attribute
+        :param pattern: regex: matches the element attributes and captures their index
+        """
+        indices = set()
+        for attr in list(node.attrs) + list(node.inputs):
+            match = pattern.match(attr)
+            if match:
+                indices.add(int(match.group(1)))
+        return sorted(indices)
+
+    def _set(self, node, attr, value):
+        leaves = self._leaves(node, attr)
+        if leaves is not None and isinstance(value, (list, tuple)):
+            for leaf, v in zip(leaves, value):
+                node.attrs[leaf] = v
+            return
+        if isinstance(value, tuple):
+            value = list(value)
+        node.attrs[attr] = value
+
+    def _connect(self, source, destination):
+        self._disconnect(destination)
+        self.cache.clear()
+        self.sources[destination] = source
+        self.destinations.setdefault(source, []).append(destination)
+        destination[0].inputs.add(destination[1])
+        source[0].outputs.add(source[1])
+
+    def _disconnect(self, destination):
+        source = self.sources.pop(destination, None)
+        if source is not None:
+            self.cache.clear()
+            destination[0].inputs.discard(destination[1])
+            self.destinations[source].remove(destination)
+            if not self.destinations[source]:
+                del self.destinations[source]
+                source[0].outputs.discard(source[1])
+        return source
+
+    # Transforms
+    def _channels(self, node):
+        roo = constants.ROTATEORDER[int(self._get(node, "rotateOrder"))]
+        return self._get(node, "translate"), self._get(node, "rotate"), self._get(node, "scale"), roo
+
+    def _local(self, node):
+        return self._get(node, "matrix")
+
+    def _parent_world(self, node):
+        """
+        Returns the matrix a node's local matrix is multiplied by (its offset parent matrix and parent's world)
+        """
+        return self._get(node, "#parentWorld")
+
+    def _world(self, node):
+        return self._get(node, "worldMatrix[0]")
+
+    def _local_matrix(self, node):
+        if node.is_shape():
+            return list(mu.IDENTITY)
+        translate = [self._get(node, f"translate{axis}") for axis in "XYZ"]
+        rotate = [self._get(node, f"rotate{axis}") for axis in "XYZ"]
+        scl = [self._get(node, f"scale{axis}") for axis in "XYZ"]
+        roo = constants.ROTATEORDER[int(self._get(node, "rotateOrder"))]
+        rotateAxis = [self._get(node, f"rotateAxis{axis}") for axis in "XYZ"]
+        jointOrient = None
+        if node.type == "joint":
+            jointOrient = [self._get(node, f"jointOrient{axis}") for axis in "XYZ"]
+        return mu.compose(translate, rotate, scl, roo, jointOrient, rotateAxis if any(rotateAxis) else None)
+
+    def _parent_world_matrix(self, node):
+        offset = self._get(node, "offsetParentMatrix") if not node.is_shape() else mu.IDENTITY
+        if node.parent is None or not self._get(node, "inheritsTransform"):
+            return list(offset)
+        return mu.mult(offset, self._world(node.parent))
+
+    def _set_local(self, node, matrix):
+        """
+        Sets a node's channels so its local matrix matches a given matrix. Joints keep their rotate values and
+        take up the difference in their joint orient, the same way Maya does when joints are reparented
+        """
+        translate, rotate, scl = mu.decompose(matrix, self._channels(node)[3])
+        node.attrs.update({f"translate{a}": v for a, v in zip("XYZ", translate)})
+        node.attrs.update({f"scale{a}": v for a, v in zip("XYZ", scl)})
+        if node.type == "joint":
+            rot = mu.rotation(self._get(node, "rotate"), self._channels(node)[3])
+            orient = mu.mult(mu.inverse(rot), mu.orthonormal(matrix))
+            node.attrs.update({f"jointOrient{a}": v for a, v in zip("XYZ", mu.euler(orient))})
+        else:
+            node.attrs.update({f"rotate{a}": v for a, v in zip("XYZ", rotate)})
+
+    def _set_world_rotation(self, node, rotation):
+        """
+        Sets the rotate channels of a node so its world orientation matches a given rotation matrix
+        """
+        local = mu.mult(rotation, mu.inverse(mu.orthonormal(self._parent_world(node))))
+        if node.type == "joint":
+            local = mu.mult(local, mu.inverse(mu.rotation(self._get(node, "jointOrient"))))
+        rotate = mu.euler(local, self._channels(node)[3])
+        node.attrs.update({f"rotate{a}": v for a, v in zip("XYZ", rotate)})
+
+    def _set_world_position(self, node, position):
+        local = mu.transform_point(position, mu.inverse(self._parent_world(node)))
+        node.attrs.update({f"translate{a}": v for a, v in zip("XYZ", local)})
+
+    def _pivot(self, node):
+        return [self._get(node, f"rotatePivot{axis}") for axis in "XYZ"]
+
+    def _world_pivot(self, node):
+        return mu.transform_point(self._pivot(node), self._world(node))
+
+    # Geometry
+    def _points(self, shape):
+        if shape.type == "nurbsSurface":
+            return [p for row in shape.data["cvs"] for p in row]
+        return list(shape.data.get("cvs", []))
+
+    def _map_points(self, shape, matrix):
+        if shape.type == "nurbsSurface":
+            shape.data["cvs"] = [[mu.transform_point(p, matrix) for p in row] for row in shape.data["cvs"]]
+        elif "cvs" in shape.data:
+            shape.data["cvs"] = [mu.transform_point(p, matrix) for p in shape.data["cvs"]]
+
+    def _components(self, component):
+        """
+        Returns the shape and the list of point indices of a component (ex: "crv.cv[2]" or "lat.pt[0:1][0][3]")
+        """
+        node_name, attr = component.split(".", 1)
+        node = self._node(node_name)
+        if not node.is_shape():
+            node = self._shapes(node)[0]
+        ranges = [(int(a), int(b) if b else int(a)) for a, b in INDEXPATTERN.findall(attr)]
+        indices = [[]]
+        for start, end in ranges:
+            indices = [index + [i] for index in indices for i in range(start, end + 1)]
+        return node, indices
+
+    def _get_point(self, shape, index):
+        if shape.type == "nurbsSurface":
+            return shape.data["cvs"][index[0]][index[1]]
+        if shape.type == "lattice":
+            return shape.data["points"][tuple(index)]
+        return shape.data["cvs"][index[0]]
+
+    def _set_point(self, shape, index, position):
+        self.cache.clear()
+        if shape.type == "nurbsSurface":
+            shape.data["cvs"][index[0]][index[1]] = position
+        elif shape.type == "lattice":
+            shape.data["points"][tuple(index)] = position
+        else:
+            shape.data["cvs"][index[0]] = position
+
+    def _world_points(self, shape):
+        world = self._world(shape.parent)
+        return [mu.transform_point(p, world) for p in self._points(shape)]
+
+    def _curve_point(self, shape, u, world=None):
+        """
+        Evaluates a point on a curve shape at a given parameter using de Boor's algorithm
+        """
+        cvs = shape.data["cvs"]
+        degree = min(shape.data["degree"], len(cvs) - 1)
+        knots = get_knots(len(cvs), degree)
+        point = de_boor(cvs, knots, degree, u)
+        if world is not None:
+            point = mu.transform_point(point, world)
+        return point
+
+    def _surface_point(self, shape, u, v):
+        rows = shape.data["cvs"]
+        du, dv = shape.data["degree"]
+        du = min(du, len(rows) - 1)
+        dv = min(dv, len(rows[0]) - 1)
+        column = [de_boor(row, get_knots(len(row), dv), dv, v) for row in rows]
+        return de_boor(column, get_knots(len(rows), du), du, u)
+
+    def _arc_length(self, shape, world):
+        spans = len(shape.data["cvs"]) - shape.data["degree"]
+        steps = max(16, spans * 32)
+        pts = [self._curve_point(shape, spans * i / float(steps), world) for i in range(steps + 1)]
+        return sum(mu.distance(a, b) for a, b in zip(pts, pts[1:]))
+
+    # Evaluation of the node types the builders use
+    def _compute_dag(self, node, attr):
+        if attr == "worldMatrix[0]":
+            return mu.mult(self._local(node), self._parent_world(node))
+        if attr == "worldInverseMatrix[0]":
+            return mu.inverse(self._world(node))
+        if attr == "matrix":
+            return self._local_matrix(node)
+        if attr == "inverseMatrix":
+            return mu.inverse(self._local(node))
+        if attr == "#parentWorld":
+            return self._parent_world_matrix(node)
+        if attr == "parentMatrix[0]":
+            return self._world(node.parent) if node.parent is not None else list(mu.IDENTITY)
+        if attr in ["worldSpace[0]", "local"]:
+            return node
+        if attr == "spans" and "cvs" in node.data:
+            return len(node.data["cvs"]) - node.data["degree"]
+        if attr == "degree" and "degree" in node.data:
+            return node.data["degree"]
+        if attr in ["degreeU", "degreeV"] and "degree" in node.data:
+            return node.data["degree"]["UV".index(attr[-1])]
+        if attr in ["spansU", "spansV"] and "cvs" in node.data:
+            counts = [len(node.data["cvs"]), len(node.data["cvs"][0])]
+            return counts["UV".index(attr[-1])] - node.data["degree"]["UV".index(attr[-1])]
+        return None
+
+    def _compute_decomposeMatrix(self, node, attr):
+        if not attr.startswith("output"):
+            return None
+        roo = constants.ROTATEORDER[int(self._get(node, "inputRotateOrder"))]
+        translate, rotate, scl = mu.decompose(self._get(node, "inputMatrix"), roo)
+        values = {"outputTranslate": translate, "outputRotate": rotate, "outputScale": scl}
+        if attr in values:
+            return values[attr]
+        if attr[:-1] in values:
+            return values[attr[:-1]]["XYZ".index(attr[-1])]
+        return None
+
+    def _compute_composeMatrix(self, node, attr):
+        if attr != "outputMatrix":
+            return None
+        roo = constants.ROTATEORDER[int(self._get(node, "inputRotateOrder"))]
+        return mu.compose(self._get(node, "inputTranslate"), self._get(node, "inputRotate"),
+                          self._get(node, "inputScale"), roo)
+
+    def _compute_multMatrix(self, node, attr):
+        if attr != "matrixSum":
+            return None
+        indices = self._indices(node, MATRIXIN)
+        return mu.mult_all([self._get(node, f"matrixIn[{i}]") for i in indices])
+
+    def _compute_inverseMatrix(self, node, attr):
+        if attr != "outputMatrix":
+            return None
+        return mu.inverse(self._get(node, "inputMatrix"))
+
+    def _compute_pickMatrix(self, node, attr):
+        if attr != "outputMatrix":
+            return None
+        translate, rotate, scl = mu.decompose(self._get(node, "inputMatrix"))
+        if not self._get(node, "useTranslate"):
+            translate = [0.0, 0.0, 0.0]
+        if not self._get(node, "useRotate"):
+            rotate = [0.0, 0.0, 0.0]
+        if not self._get(node, "useScale"):
+            scl = [1.0, 1.0, 1.0]
+        return mu.compose(translate, rotate, scl)
+
+    def _compute_blendMatrix(self, node, attr):
+        if attr != "outputMatrix":
+            return None
+        result = self._get(node, "inputMatrix")
+        envelope = self._get(node, "envelope")
+        indices = self._indices(node, TARGET)
+        for i in indices:
+            weight = self._get(node, f"target[{i}].weight") * envelope
+            target = self._get(node, f"target[{i}].targetMatrix")
+            translate = mu.lerp(result[12:15], target[12:15], weight)
+            rows = [mu.lerp(mu.get_row(result, r), mu.get_row(target, r), weight) for r in range(3)]
+            result = mu.from_rows(rows[0], rows[1], rows[2], translate)
+        return result
+
+    def _compute_multDoubleLinear(self, node, attr):
+        if attr != "output":
+            return None
+        return self._get(node, "input1") * self._get(node, "input2")
+
+    def _compute_addDoubleLinear(self, node, attr):
+        if attr != "output":
+            return None
+        return self._get(node, "input1") + self._get(node, "input2")
+
+    def _compute_animBlendNodeAdditiveDA(self, node, attr):
+        if attr != "output":
+            return None
+        return (self._get(node, "inputA") * self._get(node, "weightA") +
+                self._get(node, "inputB") * self._get(node, "weightB"))
+
+    def _compute_multiplyDivide(self, node, attr):
+        if not attr.startswith("output") or len(attr) != 7:
+            return None
+        axis = attr[-1]
+        a, b = self._get(node, f"input1{axis}"), self._get(node, f"input2{axis}")
+        operation = int(self._get(node, "operation"))
+        if operation == 1:
+            return a * b
+        if operation == 2:
+            return a / b if b else 0.0
+        if operation == 3:
+            return a ** b
+        return a
+
+    def _compute_plusMinusAverage(self, node, attr):
+        if attr not in ["output3Dx", "output3Dy", "output3Dz", "output1D"]:
+            return None
+        operation = int(self._get(node, "operation"))
+        if attr == "output1D":
+            indices, axis = self._indices(node, INPUT1D), None
+        else:
+            indices, axis = self._indices(node, INPUT3D), attr[-1]
+        if axis is None:
+            values = [self._get(node, f"input1D[{i}]") for i in indices]
+        else:
+            values = [self._get(node, f"input3D[{i}].input3D{axis}") for i in indices]
+        if not values:
+            return 0.0
+        if operation == 2:
+            return values[0] - sum(values[1:])
+        if operation == 3:
+            return sum(values) / len(values)
+        return sum(values)
+
+    def _compute_condition(self, node, attr):
+        if attr not in ["outColorR", "outColorG", "outColorB"]:
+            return None
+        first, second = self._get(node, "firstTerm"), self._get(node, "secondTerm")
+        operation = int(self._get(node, "operation"))
+        result = [first == second, first != second, first > second, first >= second, first < second,
+                  first <= second][operation]
+        channel = "colorIfTrue" if result else "colorIfFalse"
+        return self._get(node, f"{channel}{attr[-1]}")
+
+    def _compute_blendColors(self, node, attr):
+        if attr not in ["outputR", "outputG", "outputB"]:
+            return None
+        blender = self._get(node, "blender")
+        return (self._get(node, f"color1{attr[-1]}") * blender +
+                self._get(node, f"color2{attr[-1]}") * (1 - blender))
+
+    def _compute_reverse(self, node, attr):
+        if attr not in ["outputX", "outputY", "outputZ"]:
+            return None
+        return 1.0 - self._get(node, f"input{attr[-1]}")
+
+    def _compute_unitConversion(self, node, attr):
+        if attr != "output":
+            return None
+        return self._get(node, "input") * self._get(node, "conversionFactor")
+
+    def _compute_curveInfo(self, node, attr):
+        if attr != "arcLength":
+            return None
+        shape = self._get(node, "inputCurve")
+        if not isinstance(shape, Node):
+            return 0.0
+        return self._arc_length(shape, self._world(shape.parent))
+
+    def _compute_distanceBetween(self, node, attr):
+        if attr != "distance":
+            return None
+        a = mu.add(self._get(node, "point1") if "point1" in node.inputs else [0.0] * 3,
+                   self._get(node, "inMatrix1")[12:15])
+        b = mu.add(self._get(node, "point2") if "point2" in node.inputs else [0.0] * 3,
+                   self._get(node, "inMatrix2")[12:15])
+        return mu.distance(a, b)
+
+    def _surface_frame(self, shape, u, v, world, normalized=True):
+        """
+        Returns the world position, U tangent and normal of a surface at a given parameter
+        :param normalized: bool: whether the parameter runs from 0 to 1 rather than over the spans
+        """
+        spansU = len(shape.data["cvs"]) - shape.data["degree"][0]
+        spansV = len(shape.data["cvs"][0]) - shape.data["degree"][1]
+        if normalized:
+            u, v = u * spansU, v * spansV
+        delta = 1e-4
+        point = mu.transform_point(self._surface_point(shape, u, v), world)
+        uA, uB = max(0.0, u - delta), min(float(spansU), u + delta)
+        vA, vB = max(0.0, v - delta), min(float(spansV), v + delta)
+        tangent = mu.normalize(mu.sub(mu.transform_point(self._surface_point(shape, uB, v), world),
+                                      mu.transform_point(self._surface_point(shape, uA, v), world)))
+        binormal = mu.sub(mu.transform_point(self._surface_point(shape, u, vB), world),
+                          mu.transform_point(self._surface_point(shape, u, vA), world))
+        return point, tangent, mu.normalize(mu.cross(tangent, binormal))
+
+    def _compute_follicle(self, node, attr):
+        if attr == "#frame":
+            # The follicle's X axis runs along U and its Z axis along the normal
+            shape = self._get(node, "inputSurface")
+            if not isinstance(shape, Node) or shape.type != "nurbsSurface":
+                return list(mu.IDENTITY)
+            point, tangent, normal = self._surface_frame(shape, self._get(node, "parameterU"),
+                                                         self._get(node, "parameterV"),
+                                                         self._get(node, "inputWorldMatrix"))
+            return mu.from_rows(tangent, mu.cross(normal, tangent), normal, point)
+        if not attr.startswith("out"):
+            return None
+        translate, rotate, _ = mu.decompose(self._get(node, "#frame"))
+        values = {"outTranslate": translate, "outRotate": rotate}
+        if attr in values:
+            return values[attr]
+        if attr[:-1] in values:
+            return values[attr[:-1]]["XYZ".index(attr[-1])]
+        return None
+
+    def _compute_uvPin(self, node, attr):
+        match = re.match(r"^outputMatrix\[(\d+)\]$", attr)
+        if match is None:
+            return None
+        shape = self._get(node, "deformedGeometry")
+        if not isinstance(shape, Node) or shape.type != "nurbsSurface":
+            return list(mu.IDENTITY)
+        i = match.group(1)
+        u = self._get(node, f"coordinate[{i}].coordinateU")
+        v = self._get(node, f"coordinate[{i}].coordinateV")
+        point, tangent, normal = self._surface_frame(shape, u, v, self._world(shape.parent),
+                                                     self._get(node, "normalizedIsoParms"))
+        tangentAxis = int(self._get(node, "tangentAxis"))
+        normalAxis = int(self._get(node, "normalAxis"))
+        rows = [None, None, None]
+        rows[tangentAxis % 3] = tangent if tangentAxis < 3 else mu.scale(tangent, -1)
+        rows[normalAxis % 3] = normal if normalAxis < 3 else mu.scale(normal, -1)
+        missing = [r for r in range(3) if rows[r] is None]
+        if len(missing) != 1:
+            return mu.from_rows(tangent, normal, mu.cross(tangent, normal), point)
+        r = missing[0]
+        rows[r] = mu.normalize(mu.cross(rows[(r + 1) % 3], rows[(r + 2) % 3]))
+        return mu.from_rows(rows[0], rows[1], rows[2], point)
+
+    # Deletion
+    def _delete(self, node):
+        if node.name not in self.nodes:
+            return
+        for child in list(node.children):
+            self._delete(child)
+        for attr in list(node.inputs):
+            self._disconnect((node, attr))
+        for attr in list(node.outputs):
+            for destination in list(self.destinations.get((node, attr), [])):
+                self._disconnect(destination)
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        geometry = node.data.get("geometry")
+        if geometry is not None and node in geometry.history:
+            geometry.history.remove(node)
+        # Deformers go with the geometry they deform
+        for deformer in list(node.history):
+            self._delete(deformer)
+        self.cache.clear()
+        del self.nodes[node.name]
+        if node.name in self.selection:
+            self.selection.remove(node.name)
+
+    def _bake_lattice(self, shape, ffd):
+        lattice = ffd.data["lattice"]
+        points, base, divisions = lattice.data["points"], lattice.data["base"], lattice.data["divisions"]
+        bbMin, bbMax = base[(0, 0, 0)], base[tuple(d - 1 for d in divisions)]
+        world = self._world(shape.parent)
+        inverse = mu.inverse(world)
+
+        def deform(p):
+            params = []
+            for axis in range(3):
+                size = bbMax[axis] - bbMin[axis]
+                t = (p[axis] - bbMin[axis]) / size if abs(size) > 1e-9 else 0.5
+                t = max(0.0, min(1.0, t)) * (divisions[axis] - 1)
+                cell = min(int(t), divisions[axis] - 2) if divisions[axis] > 1 else 0
+                params.append((cell, t - cell))
+            result = [0.0, 0.0, 0.0]
+            for corner in range(8):
+                index, weight = [], 1.0
+                for axis in range(3):
+                    bit = (corner >> axis) & 1
+                    cell, t = params[axis]
+                    if divisions[axis] == 1:
+                        if bit:
+                            weight = 0.0
+                        index.append(0)
+                        continue
+                    index.append(cell + bit)
+                    weight *= t if bit else 1.0 - t
+                if weight:
+                    offset = mu.sub(points[tuple(index)], base[tuple(index)])
+                    result = mu.add(result, mu.scale(offset, weight))
+            return mu.add(p, result)
+
+        if shape.type == "nurbsSurface":
+            shape.data["cvs"] = [[mu.transform_point(deform(mu.transform_point(p, world)), inverse) for p in row]
+                                 for row in shape.data["cvs"]]
+        else:
+            shape.data["cvs"] = [mu.transform_point(deform(mu.transform_point(p, world)), inverse)
+                                 for p in shape.data["cvs"]]
+
+    ###################
+    # Scene API
+    ###################
+
+    # Nodes
+    def exists(self, name):
+        name = str(name)
+        if "." not in name:
+            return name in self.nodes
+        node_name, attr = name.split(".", 1)
+        if node_name not in self.nodes:
+            return False
+        node = self.nodes[node_name]
+        return attr in node.attrs or attr in node.user or attr in node.inputs
+
+    def find(self, name):
+        return name if name in self.nodes else None
+
+    def node_type(self, node):
+        return self._node(node).type
+
+    def list_nodes(self, node_type=None):
+        return [name for name, node in self.nodes.items() if node_type is None or node.type == node_type]
+
+    def create_node(self, node_type, name, parent=None, shading=False):
+        if node_type in SHAPES:
+            transform = self._node(parent) if parent is not None else self._create("transform", f"{node_type}1")
+            return self._create_shape(transform, node_type, name).name
+        return self._create(node_type, name, self._node(parent) if parent is not None else None).name
+
+    def create_group(self, name, parent=None):
+        return self._create("transform", name, self._node(parent) if parent is not None else None).name
+
+    def create_joint(self, name, position=None, radius=1.0, rotate_order="xyz", parent=None):
+        jnt = self._create("joint", name)
+        jnt.attrs["radius"] = radius
+        jnt.attrs["rotateOrder"] = constants.ROTATEORDER.index(rotate_order.lower())
+        if position is not None:
+            jnt.attrs.update({f"translate{a}": float(v) for a, v in zip("XYZ", position)})
+        if parent is not None:
+            self._reparent(jnt, self._node(parent))
+        self.selection = [jnt.name]
+        return jnt.name
+
+    def create_locator(self, name):
+        loc = self._create("transform", name)
+        self._create_shape(loc, "locator")
+        self.selection = [loc.name]
+        return loc.name
+
+    def create_curve(self, name, points, degree=1):
+        crv = self._create("transform", name)
+        shape = self._create_shape(crv, "nurbsCurve")
+        shape.data["cvs"] = [[float(v) for v in p] for p in points]
+        shape.data["degree"] = degree
+        self.selection = [crv.name]
+        return crv.name
+
+    def create_circle(self, name, normal=(0, 1, 0), radius=1.0, center=(0, 0, 0)):
+        crv = self._create("transform", name)
+        shape = self._create_shape(crv, "nurbsCurve")
+        n = mu.normalize(normal)
+        u = mu.normalize(mu.cross(n, [0.0, 1.0, 0.0] if abs(n[1]) < 0.9 else [1.0, 0.0, 0.0]))
+        v = mu.cross(n, u)
+        pts = []
+        for i in range(8):
+            angle = 2.0 * 3.141592653589793 * i / 8.0
+            from math import cos, sin
+            pts.append(mu.add(center, mu.add(mu.scale(u, radius * cos(angle)), mu.scale(v, radius * sin(angle)))))
+        shape.data["cvs"] = pts + pts[:3]
+        shape.data["degree"] = 3
+        self.selection = [crv.name]
+        return crv.name
+
+    def create_nurbs_plane(self, name, pivot, axis, width, length_ratio, degree=3, patches_u=1, patches_v=1):
+        rbn = self._create("transform", name)
+        shape = self._create_shape(rbn, "nurbsSurface")
+        n = mu.normalize(axis)
+        u = mu.cross(n, [0.0, 1.0, 0.0])
+        u = mu.normalize(u) if mu.length(u) > 1e-9 else [1.0, 0.0, 0.0]
+        v = mu.cross(u, n)
+        length = width * length_ratio
+        rows = []
+        for s in get_greville(patches_u, degree):
+            row = []
+            for t in get_greville(patches_v, degree):
+                row.append(mu.add(pivot, mu.add(mu.scale(u, (s - 0.5) * width), mu.scale(v, (t - 0.5) * length))))
+            rows.append(row)
+        shape.data["cvs"] = rows
+        shape.data["degree"] = (degree, degree)
+        shape.attrs["spansU"] = patches_u
+        shape.attrs["spansV"] = patches_v
+        self.selection = [rbn.name]
+        return rbn.name
+
+    def delete(self, nodes):
+        if not nodes:
+            return
+        if isinstance(nodes, str):
+            nodes = [nodes]
+        # Look every node up first like Maya does; deleting one node can take others with it
+        for node in [self._node(name) for name in nodes]:
+            self._delete(node)
+
+    def delete_history(self, node):
+        node = self._node(node)
+        shapes = self._shapes(node) if not node.is_shape() else [node]
+        for shape in shapes:
+            for deformer in list(shape.history):
+                if deformer.type == "ffd":
+                    self._bake_lattice(shape, deformer)
+                for extra in deformer.data.get("nodes", []):
+                    self._delete(extra)
+                self._delete(deformer)
+            shape.history = []
+
+    def rename(self, node, name):
+        node = self._node(node)
+        old = node.name
+        del self.nodes[old]
+        node.name = self._unique(name)
+        self.nodes[node.name] = node
+        for shape in self._shapes(node):
+            if shape.name.startswith(f"{old}Shape"):
+                del self.nodes[shape.name]
+                shape.name = self._unique(f"{node.name}Shape")
+                self.nodes[shape.name] = shape
+        self.selection = [node.name if s == old else s for s in self.selection]
+        return node.name
+
+    def duplicate(self, node, name, parent_only=False):
+        source = self._node(node)
+        dup = self._duplicate(source, name, source.parent, parent_only)
+        self.selection = [dup.name]
+        return dup.name
+
+    def _duplicate(self, source, name, parent, parent_only):
+        dup = self._create(source.type, name, parent)
+        dup.attrs.update({k: (list(v) if isinstance(v, list) else v) for k, v in source.attrs.items()})
+        dup.user = list(source.user)
+        dup.locked = set(source.locked)
+        dup.data.update(copy_data(source.data))
+        if parent_only:
+            return dup
+        for child in source.children:
+            if child.is_shape():
+                self._duplicate(child, f"{dup.name}Shape", dup, False)
+            else:
+                self._duplicate(child, child.name, dup, False)
+        return dup
+
+    # Hierarchy
+    def get_parent(self, node):
+        parent = self._node(node).parent
+        return parent.name if parent is not None else None
+
+    def get_children(self, node, node_type=None):
+        return [child.name for child in self._transform_children(self._node(node))
+                if node_type is None or child.type == node_type]
+
+    def get_descendants(self, node, node_type=None):
+        return [desc.name for desc in self._descendants(self._node(node))
+                if node_type is None or desc.type == node_type]
+
+    def get_shapes(self, node):
+        return [shape.name for shape in self._shapes(self._node(node))]
+
+    def _reparent(self, node, parent):
+        world = self._world(node)
+        self.cache.clear()
+        if node.parent is not None:
+            node.parent.children.remove(node)
+        node.parent = parent
+        if parent is not None:
+            parent.children.append(node)
+        local = mu.mult(world, mu.inverse(self._parent_world(node)))
+        self._set_local(node, local)
+
+    def parent(self, nodes, parent=None):
+        if isinstance(nodes, str):
+            nodes = [nodes]
+        target = self._node(parent) if parent is not None else None
+        result = []
+        for name in nodes:
+            node = self._node(name)
+            if node.parent is target:
+                continue
+            check = target
+            while check is not None:
+                if check is node:
+                    raise RuntimeError(f"Cannot parent {node.name} to its own descendant")
+                check = check.parent
+            self._reparent(node, target)
+            result.append(node.name)
+        return result
+
+    def parent_shape(self, shape, transform):
+        shape, transform = self._node(shape), self._node(transform)
+        self.cache.clear()
+        if shape.parent is not None:
+            shape.parent.children.remove(shape)
+        shape.parent = transform
+        transform.children.append(shape)
+
+    # Attributes
+    def get_attr(self, plug):
+        node, attr = self._plug(plug)
+        value = self._get(node, attr)
+        if isinstance(value, Node):
+            return value.name
+        return list(value) if isinstance(value, list) else value
+
+    def set_attr(self, plug, value):
+        node, attr = self._plug(plug)
+        if attr in node.locked:
+            raise RuntimeError(f"The attribute '{plug}' is locked or connected and cannot be modified.")
+        self._set(node, attr, value)
+
+    def set_attr_state(self, plug, lock=None, keyable=None, channel_box=None):
+        node, attr = self._plug(plug)
+        if lock is not None:
+            if lock:
+                node.locked.add(attr)
+            else:
+                node.locked.discard(attr)
+
+    def add_attr(self, node, name, attr_type="float", nice_name=None, enum=None, default=None,
+                 minimum=None, maximum=None, keyable=True):
+        target = self._node(node)
+        if name in target.user:
+            raise RuntimeError(f"Found more than one attribute named {name} on {node}")
+        target.user.append(name)
+        if attr_type == "string":
+            value = default or ""
+        elif default is not None:
+            value = default
+        elif attr_type in ["enum", "byte", "long", "short", "bool"]:
+            value = 0
+        else:
+            value = 0.0
+        target.attrs[name] = value
+        target.data.setdefault("attrs", {})[name] = {"type": attr_type, "min": minimum, "max": maximum,
+                                                     "enum": enum, "nice": nice_name, "keyable": keyable}
+        return f"{target.name}.{name}"
+
+    def delete_attr(self, plug):
+        node, attr = self._plug(plug)
+        if attr in node.user:
+            node.user.remove(attr)
+        node.attrs.pop(attr, None)
+        node.data.get("attrs", {}).pop(attr, None)
+        self._disconnect((node, attr))
+        for destination in list(self.destinations.get((node, attr), [])):
+            self._disconnect(destination)
+
+    def list_attrs(self, node, user_defined=True):
+        node = self._node(node)
+        if user_defined:
+            return list(node.user)
+        return list(node.attrs)
+
+    def list_indices(self, plug):
+        node, attr = self._plug(plug)
+        return self._indices(node, re.compile(rf"^{re.escape(attr)}\[(\d+)\]"))
+
+    # Connections
+    def connect_attr(self, source, destination, force=True):
+        src, dst = self._plug(source), self._plug(destination)
+        current = self.sources.get(dst)
+        if current == src:
+            return
+        if current is not None and not force:
+            raise RuntimeError(f"{destination} already has an incoming connection")
+        self._connect(src, dst)
+
+    def disconnect_attr(self, source, destination):
+        dst = self._plug(destination)
+        if self.sources.get(dst) != self._plug(source):
+            raise RuntimeError(f"There is no connection from {source} to {destination} to disconnect")
+        self._disconnect(dst)
+
+    def list_connections(self, plug, source=True, destination=True, plugs=True, pairs=False):
+        if "." in plug:
+            keys = [self._plug(plug)]
+        else:
+            node = self._node(plug)
+            keys = [(node, attr) for attr in sorted(node.inputs | node.outputs)]
+        if pairs:
+            result = []
+            for key in keys:
+                if source and key in self.sources:
+                    result.append((self._name(self.sources[key]), self._name(key)))
+                if destination:
+                    result.extend((self._name(key), self._name(other)) for other in self.destinations.get(key, []))
+            return result
+        result = []
+        for key in keys:
+            others = []
+            if source and key in self.sources:
+                others.append(self.sources[key])
+            if destination:
+                others.extend(self.destinations.get(key, []))
+            for other in others:
+                item = f"{other[0].name}.{other[1]}" if plugs else other[0].name
+                if item not in result:
+                    result.append(item)
+        return result
+
+    def is_connected(self, source, destination):
+        return self.sources.get(self._plug(destination)) == self._plug(source)
+
+    # Transforms
+    def get_position(self, node, world=True):
+        if "." in node:
+            shape, indices = self._components(node)
+            point = self._get_point(shape, indices[0])
+            if world and shape.type != "lattice":
+                point = mu.transform_point(point, self._world(shape.parent))
+            return list(point)
+        node = self._node(node)
+        if world:
+            return self._world_pivot(node)
+        return mu.transform_point(self._pivot(node), self._local(node))
+
+    def set_position(self, node, position, world=False):
+        node = self._node(node)
+        if world:
+            self._set_world_position(node, position)
+        else:
+            node.attrs.update({f"translate{a}": float(v) for a, v in zip("XYZ", position)})
+
+    def get_matrix(self, node, world=True):
+        node = self._node(node)
+        return list(self._world(node) if world else self._local(node))
+
+    def set_matrix(self, node, matrix, world=True):
+        node = self._node(node)
+        local = mu.mult(list(matrix), mu.inverse(self._parent_world(node))) if world else list(matrix)
+        self._set_local(node, local)
+
+    def set_rotation(self, node, rotation, world=False):
+        node = self._node(node)
+        if world:
+            self._set_world_rotation(node, mu.rotation(rotation, self._channels(node)[3]))
+        else:
+            node.attrs.update({f"rotate{a}": float(v) for a, v in zip("XYZ", rotation)})
+
+    def move(self, node, vector, relative=False, object_space=False, pivot=False, axes=None):
+        if "." in node:
+            shape, indices = self._components(node)
+            world = self._world(shape.parent) if shape.type != "lattice" else mu.IDENTITY
+            for index in indices:
+                point = mu.transform_point(self._get_point(shape, index), world)
+                values = list(vector)
+                for i, axis in enumerate(axes or "XYZ"):
+                    i_axis = "XYZ".index(axis.upper())
+                    point[i_axis] = values[i] + (point[i_axis] if relative else 0.0)
+                self._set_point(shape, index, mu.transform_point(point, mu.inverse(world)))
+            return
+        node = self._node(node)
+        if relative:
+            delta = list(vector)
+            if object_space:
+                delta = mu.transform_vector(delta, mu.orthonormal(self._world(node)))
+            target = mu.add(self._world(node)[12:15], delta)
+            self._set_world_position(node, target)
+            return
+        # Absolute moves put the node's rotate pivot at the given position
+        offset = mu.sub(list(vector), self._world_pivot(node))
+        if axes is not None:
+            offset = [offset[i] if "XYZ"[i] in axes.upper() else 0.0 for i in range(3)]
+        self._set_world_position(node, mu.add(self._world(node)[12:15], offset))
+
+    def set_pivot(self, node, position, world=True):
+        node = self._node(node)
+        if world:
+            position = mu.transform_point(position, mu.inverse(self._world(node)))
+        else:
+            position = mu.transform_point(position, mu.inverse(self._local(node)))
+        node.attrs.update({f"rotatePivot{a}": v for a, v in zip("XYZ", position)})
+        node.attrs.update({f"scalePivot{a}": v for a, v in zip("XYZ", position)})
+
+    def center_pivot(self, node):
+        node = self._node(node)
+        pts = [p for shape in self._shapes(node) for p in self._points(shape)]
+        if not pts:
+            return
+        center = [(min(p[i] for p in pts) + max(p[i] for p in pts)) / 2.0 for i in range(3)]
+        node.attrs.update({f"rotatePivot{a}": v for a, v in zip("XYZ", center)})
+        node.attrs.update({f"scalePivot{a}": v for a, v in zip("XYZ", center)})
+
+    def get_rotate_order(self, node):
+        return constants.ROTATEORDER[int(self._get(self._node(node), "rotateOrder"))].upper()
+
+    def set_rotate_order(self, node, rotate_order, preserve=True):
+        node = self._node(node)
+        if preserve:
+            rotation = mu.rotation(self._get(node, "rotate"), self._channels(node)[3])
+            node.attrs["rotateOrder"] = constants.ROTATEORDER.index(rotate_order.lower())
+            rotate = mu.euler(rotation, rotate_order)
+            node.attrs.update({f"rotate{a}": v for a, v in zip("XYZ", rotate)})
+        else:
+            node.attrs["rotateOrder"] = constants.ROTATEORDER.index(rotate_order.lower())
+
+    def freeze(self, node, translate=True, rotate=True, scale=True, normal=0):
+        node = self._node(node)
+        translation, rotation, scl, roo = self._channels(node)
+        if node.type == "joint":
+            # Joints move their rotation into the joint orient and keep their translation
+            if rotate:
+                orient = mu.mult(mu.rotation(rotation, roo), mu.rotation(self._get(node, "jointOrient")))
+                node.attrs.update({f"jointOrient{a}": v for a, v in zip("XYZ", mu.euler(orient))})
+                node.attrs.update({f"rotate{a}": 0.0 for a in "XYZ"})
+            return
+        old = self._local(node)
+        if translate:
+            node.attrs.update({f"translate{a}": 0.0 for a in "XYZ"})
+        if rotate:
+            node.attrs.update({f"rotate{a}": 0.0 for a in "XYZ"})
+        if scale:
+            node.attrs.update({f"scale{a}": 1.0 for a in "XYZ"})
+        baked = mu.mult(old, mu.inverse(self._local(node)))
+        if mu.is_close(baked, mu.IDENTITY, 1e-12):
+            return
+        for shape in self._shapes(node):
+            self._map_points(shape, baked)
+        for axis in ["rotatePivot", "scalePivot"]:
+            pivot = mu.transform_point([self._get(node, f"{axis}{a}") for a in "XYZ"], baked)
+            node.attrs.update({f"{axis}{a}": v for a, v in zip("XYZ", pivot)})
+        for child in self._transform_children(node):
+            self._set_local(child, mu.mult(self._local(child), baked))
+
+    def match_transform(self, node, target):
+        node = self._node(node)
+        world = self._world(self._node(target))
+        self._set_local(node, mu.mult(world, mu.inverse(self._parent_world(node))))
+
+    # Constraints and deformers
+    def _constraint(self, constraint_type, drivers, driven):
+        # Flatten the arguments the same way the constraint commands do; the last node is the one constrained
+        nodes = [n for arg in [drivers, driven] for n in ([arg] if isinstance(arg, str) else arg)]
+        drivers = [self._node(driver) for driver in nodes[:-1]]
+        driven = self._node(nodes[-1])
+        const = self._create(constraint_type, f"{driven.name}_{constraint_type}1", driven)
+        for i, driver in enumerate(drivers):
+            const.attrs[f"{driver.name}W{i}"] = 1.0
+            const.user.append(f"{driver.name}W{i}")
+            self._connect((driver, "parentMatrix[0]"), (const, f"target[{i}].targetParentMatrix"))
+        const.data["drivers"] = drivers
+        return const, drivers, driven
+
+    def point_constraint(self, drivers, driven, maintain_offset=False):
+        const, drivers, driven = self._constraint("pointConstraint", drivers, driven)
+        if not maintain_offset:
+            pts = [self._world_pivot(driver) for driver in drivers]
+            self._set_world_position(driven, [sum(p[i] for p in pts) / len(pts) for i in range(3)])
+        return const.name
+
+    def orient_constraint(self, drivers, driven, maintain_offset=False):
+        const, drivers, driven = self._constraint("orientConstraint", drivers, driven)
+        if not maintain_offset:
+            self._set_world_rotation(driven, mu.orthonormal(self._world(drivers[0])))
+        return const.name
+
+    def scale_constraint(self, drivers, driven, maintain_offset=False):
+        const, drivers, driven = self._constraint("scaleConstraint", drivers, driven)
+        if not maintain_offset:
+            scl = mu.decompose(self._world(drivers[0]))[2]
+            parentScale = mu.decompose(self._parent_world(driven))[2]
+            driven.attrs.update({f"scale{a}": s / p if p else s for a, s, p in zip("XYZ", scl, parentScale)})
+        return const.name
+
+    def parent_constraint(self, drivers, driven, maintain_offset=False):
+        const, drivers, driven = self._constraint("parentConstraint", drivers, driven)
+        if not maintain_offset:
+            world = self._world(drivers[0])
+            self._set_world_rotation(driven, mu.orthonormal(world))
+            self._set_world_position(driven, world[12:15])
+        return const.name
+
+    def aim_constraint(self, drivers, driven, aim, up, world_up_type="vector", world_up_object=None,
+                       world_up_vector=(0, 1, 0)):
+        const, drivers, driven = self._constraint("aimConstraint", drivers, driven)
+        position = self._world(driven)[12:15]
+        target = [sum(self._world_pivot(d)[i] for d in drivers) / len(drivers) for i in range(3)]
+        if world_up_type == "object":
+            upDir = mu.sub(self._world(self._node(world_up_object))[12:15], position)
+            const.data["worldUpObject"] = world_up_object
+        else:
+            upDir = list(world_up_vector)
+        self._set_world_rotation(driven, mu.aim(aim, up, mu.sub(target, position), upDir))
+        return const.name
+
+    def constraint_weights(self, constraint):
+        const = self._node(constraint)
+        return [f"{const.name}.{driver.name}W{i}" for i, driver in enumerate(const.data.get("drivers", []))]
+
+    def ik_handle(self, name, start, end, solver="ikRPsolver", curve=None):
+        start, end = self._node(start), self._node(end)
+        hndl = self._create("ikHandle", name)
+        self._set_world_position(hndl, self._world(end)[12:15])
+        eff = self._create("ikEffector", "effector1", end.parent)
+        self._set_local(eff, self._local(end))
+        hndl.attrs["ikSolver"] = solver
+        hndl.data["joints"] = [start, end]
+        self._connect((start, "message"), (hndl, "startJoint"))
+        self._connect((eff, "handlePath[0]"), (hndl, "endEffector"))
+        if curve is not None:
+            crv = self._node(curve)
+            shape = crv if crv.is_shape() else self._shapes(crv)[0]
+            self._connect((shape, "worldSpace[0]"), (hndl, "inCurve"))
+        self.selection = [hndl.name]
+        return [hndl.name, eff.name]
+
+    def skin_cluster(self, joints, node, name):
+        target = self._node(node)
+        shape = target if target.is_shape() else self._shapes(target)[0]
+        skin = self._create("skinCluster", name)
+        for i, jnt in enumerate(joints):
+            self._connect((self._node(jnt), "worldMatrix[0]"), (skin, f"matrix[{i}]"))
+            skin.attrs[f"bindPreMatrix[{i}]"] = mu.inverse(self._world(self._node(jnt)))
+        shape.history.append(skin)
+        skin.data["geometry"] = shape
+        return skin.name
+
+    def cluster(self, component, name):
+        shape, indices = self._components(component)
+        clstr = self._create("cluster", name)
+        hndl = self._create("transform", f"{clstr.name}Handle")
+        self._create_shape(hndl, "clusterHandle")
+        pts = [mu.transform_point(self._get_point(shape, index), self._world(shape.parent)) for index in indices]
+        center = [sum(p[i] for p in pts) / len(pts) for i in range(3)]
+        hndl.attrs.update({f"rotatePivot{a}": v for a, v in zip("XYZ", center)})
+        hndl.attrs.update({f"scalePivot{a}": v for a, v in zip("XYZ", center)})
+        clstr.data["nodes"] = [hndl]
+        self._connect((hndl, "worldMatrix[0]"), (clstr, "matrix"))
+        shape.history.append(clstr)
+        clstr.data["geometry"] = shape
+        self.selection = [hndl.name]
+        return [clstr.name, hndl.name]
+
+    def lattice(self, node, divisions, object_centered=True):
+        target = self._node(node)
+        shape = target if target.is_shape() else self._shapes(target)[0]
+        pts = self._world_points(shape)
+        bbMin = [min(p[i] for p in pts) for i in range(3)]
+        bbMax = [max(p[i] for p in pts) for i in range(3)]
+        ffd = self._create("ffd", "ffd1")
+        lat = self._create("transform", f"{ffd.name}Lattice")
+        latShape = self._create_shape(lat, "lattice")
+        base = self._create("transform", f"{ffd.name}Base")
+        self._create_shape(base, "baseLattice")
+        divisions = [int(d) for d in divisions]
+        grid = {}
+        for i in range(divisions[0]):
+            for j in range(divisions[1]):
+                for k in range(divisions[2]):
+                    grid[(i, j, k)] = [bbMin[a] + (bbMax[a] - bbMin[a]) * (n / float(divisions[a] - 1)
+                                                                           if divisions[a] > 1 else 0.5)
+                                       for a, n in enumerate([i, j, k])]
+        latShape.data.update({"points": grid, "base": {k: list(v) for k, v in grid.items()},
+                              "divisions": divisions})
+        ffd.data.update({"lattice": latShape, "nodes": [lat, base]})
+        self._connect((latShape, "worldMatrix[0]"), (ffd, "deformedLatticeMatrix"))
+        shape.history.append(ffd)
+        ffd.data["geometry"] = shape
+        self.selection = [lat.name]
+        return [ffd.name, lat.name, base.name]
+
+    def nonlinear(self, node, deformer_type):
+        target = self._node(node)
+        shape = target if target.is_shape() else self._shapes(target)[0]
+        dfrm = self._create("nonLinear", f"{deformer_type}1")
+        hndl = self._create("transform", f"{dfrm.name}Handle")
+        hndlShape = self._create_shape(hndl, f"deform{deformer_type.capitalize()}")
+        dfrm.data["nodes"] = [hndl]
+        self._connect((hndl, "worldMatrix[0]"), (dfrm, "matrix"))
+        self._connect((hndlShape, "deformerData"), (dfrm, "deformerData"))
+        shape.history.append(dfrm)
+        dfrm.data["geometry"] = shape
+        self.selection = [hndl.name]
+        return [dfrm.name, hndl.name]
+
+    def blend_shape(self, source, target, name=None, index=None, weight=1.0):
+        source, target = self._node(source), self._node(target)
+        shape = target if target.is_shape() else self._shapes(target)[0]
+        if index is not None:
+            bs = self._node(name)
+        else:
+            bs = self._create("blendShape", name or "blendShape1")
+            bs.data["targets"] = []
+            shape.history.append(bs)
+            bs.data["geometry"] = shape
+            index = 0
+        bs.data["targets"].append(source.name)
+        bs.attrs[f"weight[{index}]"] = weight
+        bs.attrs[source.name] = weight
+        bs.user.append(source.name)
+        sourceShape = source if source.is_shape() else self._shapes(source)[0]
+        self._connect((sourceShape, "worldSpace[0]"),
+                      (bs, f"inputTarget[0].inputTargetGroup[{index}].inputTargetItem[6000].inputGeomTarget"))
+        return bs.name
+
+    def blend_shape_targets(self, target):
+        return list(self._node(target).data.get("targets", []))
+
+    def point_on_curve(self, curve, parameter, percentage=True):
+        crv = self._node(curve)
+        shape = crv if crv.is_shape() else self._shapes(crv)[0]
+        if percentage:
+            parameter = parameter * (len(shape.data["cvs"]) - shape.data["degree"])
+        return self._curve_point(shape, parameter, self._world(shape.parent))
+
+    def rebuild_curve(self, curve, spans):
+        crv = self._node(curve)
+        shape = crv if crv.is_shape() else self._shapes(crv)[0]
+        degree = shape.data["degree"]
+        oldSpans = len(shape.data["cvs"]) - degree
+        count = int(spans) + degree
+        shape.data["cvs"] = [self._curve_point(shape, oldSpans * i / float(count - 1)) for i in range(count)]
+
+    def get_points(self, node):
+        shape = self._node(node)
+        shape = shape if shape.is_shape() else self._shapes(shape)[0]
+        return [list(p) for p in self._points(shape)]
+
+    def set_points(self, node, points):
+        shape = self._node(node)
+        shape = shape if shape.is_shape() else self._shapes(shape)[0]
+        points = [[float(v) for v in p] for p in points]
+        if shape.type == "nurbsSurface":
+            count = len(shape.data["cvs"][0])
+            shape.data["cvs"] = [points[i:i + count] for i in range(0, len(points), count)]
+        else:
+            shape.data["cvs"] = points
+
+    # Session
+    def select(self, nodes):
+        if isinstance(nodes, str):
+            nodes = [nodes]
+        self.selection = [self._node(node).name for node in nodes]
+
+    def clear_selection(self):
+        self.selection = []
+
+    def selected(self, node_type=None):
+        return [name for name in self.selection if node_type is None or self.nodes[name].type == node_type]
+
+    def maya_version(self):
+        return self.version
+
+    def warning(self, message):
+        self.warnings.append(message)
+
+    def error(self, message):
+        raise RuntimeError(message)
+
+    def suspend(self, undo=True):
+        # There is no undo queue, viewport or evaluation manager to suspend
+        return None
+
+    def resume(self, state):
+        pass
+
+    def dirty(self):
+        self.cache.clear()
+
+    def new_scene(self):
+        self.nodes.clear()
+        self.sources.clear()
+        self.destinations.clear()
+        self.selection = []
+        self.cache.clear()
+        self.evaluating.clear()
+
+    def set_evaluation(self, mode):
+        # Plugs are always evaluated one at a time; the mode is only kept so it can be handed back
+        previous = self.evaluation
+        self.evaluation = mode
+        return previous
+
+    def evaluate(self, nodes):
+        self.cache.clear()
+        return [list(self._get(*self._plug(f"{node}.worldMatrix[0]"))) for node in nodes]
+
+    def memory_usage(self):
+        # The scene is plain Python objects, so what it holds is only known while tracemalloc is tracing
+        return tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+
+    # Batching
+    def apply(self, ops):
+        names = {}
+        for op in ops:
+            # Replay through the class so the queued ops aren't counted as individual calls
+            result = getattr(type(self), op[0])(self, *op[1:])
+            if op[0] == "create_node":
+                names[op[2]] = result
+        self.ops += len(ops)
+        return names
+
+
+def get_knots(count, degree):
+    """
+    Returns the full clamped uniform knot vector used by curves built with the curve command
+    :param count: int: the number of control points
+    :param degree: int: the degree of the curve
+    :return: list: the knots
+    """
+    spans = count - degree
+    return [0.0] * degree + [float(i) for i in range(spans + 1)] + [float(spans)] * degree
+
+
+def get_greville(spans, degree):
+    """
+    Returns the normalized Greville abscissae of a clamped uniform knot vector, which is where a planar NURBS
+    surface puts its control points so the surface is evenly parameterized
+    :param spans: int: the number of spans
+    :param degree: int: the degree
+    :return: list: the abscissae between 0 and 1
+    """
+    knots = get_knots(spans + degree, degree)
+    return [sum(knots[i + 1:i + degree + 1]) / float(degree * spans) for i in range(spans + degree)]
+
+
+def de_boor(points, knots, degree, u):
+    """
+    Evaluates a B-spline at a given parameter
+    :param points: list: the control points
+    :param knots: list: the full knot vector (len(points) + degree + 1 knots)
+    :param degree: int: the degree of the spline
+    :param u: float: the parameter
+    :return: list: the point
+    """
+    if degree < 1:
+        return list(points[0])
+    span = degree
+    while span < len(points) - 1 and u >= knots[span + 1]:
+        span += 1
+    d = [list(points[j + span - degree]) for j in range(degree + 1)]
+    for r in range(1, degree + 1):
+        for j in range(degree, r - 1, -1):
+            i = j + span - degree
+            denom = knots[i + degree - r + 1] - knots[i]
+            alpha = (u - knots[i]) / denom if denom else 0.0
+            d[j] = mu.lerp(d[j - 1], d[j], alpha)
+    return d[degree]
+
+
+def copy_data(data):
+    result = {}
+    for key, value in data.items():
+        if key == "cvs":
+            value = [[list(p) for p in row] if row and isinstance(row[0], list) else list(row) for row in value]
+        elif key in ["points", "base"]:
+            value = {k: list(v) for k, v in value.items()}
+        elif isinstance(value, list):
+            value = list(value)
+        elif isinstance(value, dict):
+            value = dict(value)
+        result[key] = value
+    return result
@@ -0,0 +1,198 @@
+"""
+Post-build migration of the legacy constraint nodes (pointConstraint, orientConstraint, scaleConstraint,
+parentConstraint and aimConstraint) a rig is left with to the offsetParentMatrix constraints of core.matrix, which
+evaluate much faster. A constraint is only replaced when the matrix constraint is sure to do exactly what it did;
+the rest are left alone and reported with the reason why.
+
+Every matrix constraint is built with its offset preserved. It holds the driven node where the legacy constraint
+put it (offsets included) and passes on how the driver moves from there. That only matches the legacy constraint
+when:
+
+    point    the driver has no pivot offset and the driven node's parents sit at the origin and never move
+    orient   the driven node sits at the origin of parents that sit at the origin and never move
+    scale    the driven node sits at the origin of parents that sit at the origin and never move, unrotated
+    parent   the driver is not scaled or sheared (a parentConstraint ignores scale; the multMatrix doesn't)
+
+Constraints with more than one target, aim constraints and anything else driving the same node are never
+replaced. Drivers are assumed to keep their scale.
+
+    report = migrate.run()
+    print(migrate.format_report(report))
+"""
+from core import constants
+from core import mathutils
+from core import matrix
+from core import optimize
+from core import profiler
+from core import scene
+from core import utils
+
+
+CONSTRAINTS = ["pointConstraint", "orientConstraint", "scaleConstraint", "parentConstraint", "aimConstraint"]
+# The attributes a transform is moved through
+TRANSFORMATTRS = ["translate", "rotate", "scale", "shear", "jointOrient", "offsetParentMatrix", "inheritsTransform"]
+TOLERANCE = 1e-6
+
+
+def run(nodes=None, repeat=5):
+    """
+    Migrates the legacy constraints of the rig in the current scene and measures what it saved
+    :param nodes: list: the nodes whose world matrices are timed and compared before and after (all joints by default)
+    :param repeat: int: how many times the evaluation is timed
+    :return: dict: constraints converted per type, the constraints left alone, evaluation times and the largest
+    change in any world matrix
+    """
+    nodes = scene.list_nodes("joint") if nodes is None else nodes
+    report = {"nodes_before": len(scene.list_nodes())}
+    before = optimize.get_pose(nodes)
+    report["eval_before"] = optimize.time_evaluation(nodes, repeat)
+    report["converted"], report["skipped"] = migrate()
+    report["eval_after"] = optimize.time_evaluation(nodes, repeat)
+    report["nodes_after"] = len(scene.list_nodes())
+    report["drift"] = max([abs(a - b) for old, new in zip(before, optimize.get_pose(nodes))
+                           for a, b in zip(old, new)] or [0])
+    return report
+
+
+@profiler.stage
+def migrate():
+    """
+    Replaces every legacy constraint in the current scene that can be replaced exactly
+    :return: dict, list: the constraints converted per type and [constraint, type, reason] of the ones left alone
+    """
+    converted = {node_type: 0 for node_type in CONSTRAINTS}
+    skipped = []
+    for node_type in CONSTRAINTS:
+        for const in scene.list_nodes(node_type):
+            # Checked one at a time; converting a constraint can make another one unsafe to convert
+            driven = scene.get_parent(const)
+            drivers, weights = get_targets(const)
+            reason = get_reason(const, node_type, driven, drivers, weights)
+            if reason is not None:
+                skipped.append([const, node_type, reason])
+                continue
+            convert(const, node_type, driven, drivers[0])
+            converted[node_type] += 1
+    return converted, skipped
+
+
+def format_report(report):
+    total = sum(report["converted"].values())
+    lines = [f"constraints: {total} converted, {len(report['skipped'])} left "
+             f"(nodes: {report['nodes_before']} -> {report['nodes_after']})"]
+    lines.extend(f"  {name:<18}{count:>6}" for name, count in report["converted"].items())
+    change = report["eval_after"] / report["eval_before"] - 1 if report["eval_before"] else 0.0
+    lines.append(f"evaluation: {report['eval_before']:.4f}s -> {report['eval_after']:.4f}s ({change:+.1%})")
+    lines.append(f"max drift: {report['drift']:.2e}")
+    lines.extend(f"  left {const} ({node_type}): {reason}" for const, node_type, reason in report["skipped"])
+    return "\n".join(lines)
+
+
+#############
+# Checks
+#############
+
+def get_targets(const):
+    """
+    Returns the drivers of a constraint and their weights
+    :param const: str: the constraint being queried
+    :return: list, list: the driver nodes and their weights in target order
+    """
+    drivers = []
+    for i in scene.list_indices(f"{const}.target"):
+        found = scene.list_connections(f"{const}.target[{i}].targetParentMatrix", destination=False, plugs=False)
+        drivers.extend(found[:1])
+    weights = [scene.get_attr(plug) for plug in scene.constraint_weights(const)]
+    return drivers, weights
+
+
+def get_reason(const, node_type, driven, drivers, weights):
+    """
+    Returns why a legacy constraint can't be replaced exactly by a matrix constraint
+    :param const: str: the constraint being checked
+    :param node_type: str: the type of the constraint
+    :param driven: str: the node being constrained
+    :param drivers: list: the drivers of the constraint
+    :param weights: list: the weights of the drivers
+    :return: str: the reason (None if it can be replaced)
+    """
+    if node_type == "aimConstraint":
+        return "aim constraints have no core.matrix equivalent"
+    if driven is None or len(drivers) != 1 or len(weights) != len(drivers):
+        return f"blends {len(drivers)} targets" if len(drivers) > 1 else "its targets could not be found"
+    if weights[0] <= 0.0:
+        return "its only target is weighted off"
+    if is_driven(driven, ignore=const):
+        return "something else drives the same node"
+    if node_type == "parentConstraint":
+        # The offset multMatrix compensates for the parent so any parent will do
+        world = scene.get_matrix(drivers[0])
+        if not mathutils.is_close(mathutils.orthonormal(world)[:12], world[:12], TOLERANCE):
+            return "the driver is scaled or sheared"
+        return None
+    # The pickMatrix constraints replace the driven node's offsetParentMatrix and don't make up for its parents
+    if not mathutils.is_close(scene.get_attr(f"{driven}.offsetParentMatrix"), mathutils.IDENTITY, TOLERANCE):
+        return "the driven node already has an offsetParentMatrix"
+    parent = scene.get_parent(driven)
+    if parent is not None and not mathutils.is_close(scene.get_matrix(parent), mathutils.IDENTITY, TOLERANCE):
+        return "the driven node's parent is not at the origin"
+    while parent is not None:
+        if is_driven(parent):
+            return "the driven node's parent moves"
+        parent = scene.get_parent(parent)
+    if node_type == "pointConstraint":
+        pivots = [scene.get_attr(f"{drivers[0]}.{attr}{axis}") for attr in ["rotatePivot", "rotatePivotTranslate"]
+                  for axis in constants.AXES]
+        if any(abs(v) > TOLERANCE for v in pivots):
+            return "the driver has a pivot offset"
+        return None
+    local = scene.get_matrix(driven, world=False)
+    if any(abs(v) > TOLERANCE for v in local[12:15]):
+        return "the driven node is away from the origin (it would swing around it)"
+    if node_type == "scaleConstraint" and not mathutils.is_close(mathutils.orthonormal(local),
+                                                                   mathutils.IDENTITY, TOLERANCE):
+        return "the driven node is rotated (it would be skewed)"
+    return None
+
+
+def is_driven(node, ignore=None):
+    """
+    Returns whether a transform is moved by a connection or a legacy constraint
+    :param node: str: the node being checked
+    :param ignore: str: a constraint on the node that doesn't count
+    :return: bool: if the node is driven
+    """
+    for attr, source in optimize.get_incoming(node).items():
+        if source.split(".")[0] != ignore and any(attr.startswith(a) for a in TRANSFORMATTRS):
+            return True
+    return any(child != ignore and scene.node_type(child) in CONSTRAINTS for child in scene.get_children(node))
+
+
+#############
+# Converting
+#############
+
+@profiler.stage
+def convert(const, node_type, driven, driver):
+    """
+    Replaces a legacy constraint with the matrix constraint that does the same thing (see get_reason). The driven
+    node keeps the values the legacy constraint left it with
+    :param const: str: the legacy constraint
+    :param node_type: str: the type of the constraint
+    :param driven: str: the node being constrained
+    :param driver: str: the driver of the constraint
+    :return: str: the node at the head of the matrix constraint (pickMatrix or multMatrix)
+    """
+    world = scene.get_matrix(driven)
+    scene.delete(const)
+    with scene.transaction():
+        if node_type == "pointConstraint":
+            return matrix.point_constraint(driver, driven, offset=True)
+        if node_type == "orientConstraint":
+            return matrix.orient_constraint(driver, driven, offset=True)
+        if node_type == "scaleConstraint":
+            return matrix.scale_constraint(driver, driven, offset=True)
+        # The driven node's world matrix becomes the offset and its own transforms are cleared
+        mult = matrix.make_offsets([driver], [driven], {driven: world})[0]
+        utils.reset_transforms([driven], m=False)
+        return mult
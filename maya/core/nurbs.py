@@ -0,0 +1,348 @@
+"""
+NURBS curve and surface math done offline with NumPy. Builders that only need to know where a curve or surface is,
+which way it goes or how long it is can work it out from the control points instead of asking the scene one sample
+at a time (pointOnCurve, curveInfo) or waiting for pins to evaluate (uvPin).
+
+    curve = Curve.from_scene("LT_arm_upper_crv")
+    curve.sample(5), curve.get_tangents([0.0, 1.0]), curve.length
+    surface = Surface.plane([0, 0, 0], [1, 0, 0], 10.0, 0.3, patches_u=8)
+    surface.get_pin_matrices([0.0, 0.5, 1.0], 0.5, normal_axis=1, tangent_axis=0)
+
+Curves and surfaces are non-rational with the clamped uniform knots the curve and nurbsPlane commands give them,
+parameterized from 0 to their number of spans.
+"""
+from core import scene
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Gauss-Legendre nodes and weights (on 0 to 1) used to integrate the speed of a curve
+GAUSS = [[0.04691007703066802, 0.23076534494715845, 0.5, 0.7692346550528415, 0.9530899229693319],
+         [0.11846344252809454, 0.23931433524968324, 0.28444444444444444, 0.23931433524968324, 0.11846344252809454]]
+
+
+def get_knots(count, degree):
+    """
+    Returns the full clamped uniform knot vector of a curve built with the curve command
+    :param count: int: the number of control points
+    :param degree: int: the degree of the curve
+    :return: array: the knots (count + degree + 1 of them)
+    """
+    spans = count - degree
+    return np.concatenate([np.zeros(degree), np.arange(spans + 1, dtype=float), np.full(degree, float(spans))])
+
+
+def get_basis(knots, degree, count, params, derivative=False):
+    """
+    Returns the B-spline basis functions of a set of knots at any number of parameters
+    :param knots: array: the full knot vector
+    :param degree: int: the degree
+    :param count: int: the number of control points
+    :param params: list: the parameters (clamped to the knots' range)
+    :param derivative: bool: return the derivatives of the basis functions instead
+    :return: array: (params, count) weights of each control point
+    """
+    k = knots
+    spans = count - degree
+    u = np.clip(np.asarray(params, dtype=float), 0.0, spans)[:, None]
+    basis = ((k[:-1] <= u) & (u < k[1:])).astype(float)
+    # The end of the range belongs to its last span
+    basis[u[:, 0] >= spans] = np.eye(len(k) - 1)[count - 1]
+    for p in range(1, degree + 1):
+        left = k[p:-1] - k[:-p - 1]
+        right = k[p + 1:] - k[1:-p]
+        left = np.where(left > 0.0, left, np.inf)
+        right = np.where(right > 0.0, right, np.inf)
+        if derivative and p == degree:
+            return p * (basis[:, :-1] / left - basis[:, 1:] / right)
+        basis = (u - k[:-p - 1]) / left * basis[:, :-1] + (k[p + 1:] - u) / right * basis[:, 1:]
+    if derivative:
+        return np.zeros_like(basis)
+    return basis
+
+
+def get_greville(spans, degree):
+    """
+    Returns the normalized Greville abscissae of a clamped uniform knot vector, which is where a planar NURBS
+    surface puts its control points so the surface is evenly parameterized
+    :param spans: int: the number of spans
+    :param degree: int: the degree
+    :return: array: the abscissae between 0 and 1
+    """
+    knots = get_knots(spans + degree, degree)
+    windows = np.stack([knots[i + 1:i + spans + degree + 1] for i in range(degree)])
+    return windows.sum(axis=0) / float(degree * spans)
+
+
+def get_transforms(points, matrix):
+    """
+    Transforms points by a matrix
+    :param points: array: (..., 3) points
+    :param matrix: list: the matrix
+    :return: array: the transformed points
+    """
+    matrix = np.reshape(np.asarray(matrix, dtype=float), (4, 4))
+    return points @ matrix[:3, :3] + matrix[3, :3]
+
+
+class Curve(object):
+    __slots__ = ["points", "degree", "knots", "table"]
+
+    def __init__(self, points, degree=3):
+        """
+        Holds the control points of a curve and evaluates it
+        :param points: list: the world space control points
+        :param degree: int: the degree of the curve (lowered for curves with too few points, like Maya does)
+        """
+        self.points = np.reshape(np.asarray(points, dtype=float), (-1, 3))
+        self.degree = min(int(degree), len(self.points) - 1)
+        self.knots = get_knots(len(self.points), self.degree)
+        # The arc length table is only worked out when it's first needed
+        self.table = None
+
+    @classmethod
+    def from_scene(cls, curve):
+        """
+        Reads a curve from the scene
+        :param curve: str: the curve (or its transform) being read
+        :return: Curve: the curve in world space
+        """
+        shape = curve if scene.node_type(curve) == "nurbsCurve" else scene.get_shapes(curve)[0]
+        points = np.asarray(scene.get_points(shape), dtype=float)
+        return cls(get_transforms(points, scene.get_matrix(scene.get_parent(shape))),
+                   scene.get_attr(f"{shape}.degree"))
+
+    @classmethod
+    def from_chain(cls, chain_data, cubic=True):
+        """
+        Returns the curve utils.make_curve_from_chain builds for a chain without building it
+        :param chain_data: ChainData: the captured chain
+        :param cubic: bool: whether the curve would be cubic (chains of 4 joints or fewer are always linear)
+        :return: Curve: the curve
+        """
+        return cls(chain_data.positions, 3 if cubic and len(chain_data) > 4 else 1)
+
+    @property
+    def spans(self):
+        return len(self.points) - self.degree
+
+    @property
+    def length(self):
+        return float(self.get_table()[1][-1])
+
+    def get_basis(self, params, derivative=False):
+        """
+        Returns the B-spline basis functions of the curve at any number of parameters
+        :param params: list: the parameters (clamped to the curve's range)
+        :param derivative: bool: return the derivatives of the basis functions instead
+        :return: array: (params, points) weights of each control point
+        """
+        return get_basis(self.knots, self.degree, len(self.points), params, derivative)
+
+    def get_points(self, params):
+        """
+        Returns the positions of the curve at any number of parameters
+        :param params: list: the parameters
+        :return: array: (params, 3) positions
+        """
+        return self.get_basis(params) @ self.points
+
+    def get_tangents(self, params, normalize=True):
+        """
+        Returns the first derivatives of the curve at any number of parameters
+        :param params: list: the parameters
+        :param normalize: bool: return unit tangents rather than the derivatives themselves
+        :return: array: (params, 3) tangents
+        """
+        tangents = self.get_basis(params, derivative=True) @ self.points
+        if normalize:
+            return tangents / np.maximum(np.linalg.norm(tangents, axis=1), 1e-12)[:, None]
+        return tangents
+
+    def get_table(self, samples=16):
+        """
+        Returns (and caches) the arc length of the curve at evenly spaced parameters
+        :param samples: int: the number of table entries per span
+        :return: array, array: the parameters and the arc length from the start of the curve to each of them
+        """
+        if self.table is None:
+            params = np.linspace(0.0, self.spans, self.spans * samples + 1)
+            self.table = params, np.concatenate([[0.0], np.cumsum(self.integrate(params[:-1], params[1:]))])
+        return self.table
+
+    def integrate(self, start, end):
+        """
+        Returns the arc length of the curve between pairs of parameters
+        :param start: array: the parameters each length starts at
+        :param end: array: the parameters each length ends at
+        :return: array: the lengths
+        """
+        start, end = np.asarray(start, dtype=float), np.asarray(end, dtype=float)
+        nodes, weights = np.asarray(GAUSS[0]), np.asarray(GAUSS[1])
+        params = start[:, None] + (end - start)[:, None] * nodes
+        speeds = np.linalg.norm(self.get_tangents(params.ravel(), normalize=False), axis=1).reshape(params.shape)
+        return (speeds * weights).sum(axis=1) * (end - start)
+
+    def get_lengths(self, params):
+        """
+        Returns the arc length from the start of the curve to any number of parameters
+        :param params: list: the parameters
+        :return: array: the lengths
+        """
+        tableParams, tableLengths = self.get_table()
+        params = np.clip(np.asarray(params, dtype=float), 0.0, self.spans)
+        index = np.clip(np.searchsorted(tableParams, params, side="right") - 1, 0, len(tableParams) - 1)
+        return tableLengths[index] + self.integrate(tableParams[index], params)
+
+    def get_params(self, lengths):
+        """
+        Returns the parameters at given arc lengths along the curve (the inverse of get_lengths)
+        :param lengths: list: the lengths from the start of the curve
+        :return: array: the parameters
+        """
+        tableParams, tableLengths = self.get_table()
+        lengths = np.clip(np.asarray(lengths, dtype=float), 0.0, tableLengths[-1])
+        params = np.interp(lengths, tableLengths, tableParams)
+        # A couple of Newton steps take out the error of interpolating the table
+        for _ in range(2):
+            speed = np.linalg.norm(self.get_tangents(params, normalize=False), axis=1)
+            step = (lengths - self.get_lengths(params)) / np.maximum(speed, 1e-12)
+            params = np.clip(params + step, 0.0, self.spans)
+        return params
+
+    def sample(self, count, by_length=False):
+        """
+        Returns evenly spaced points along the curve from its start to its end
+        :param count: int: the number of points
+        :param by_length: bool: space the points evenly by arc length rather than by parameter
+        :return: array: (count, 3) positions
+        """
+        fractions = np.linspace(0.0, 1.0, count)
+        if by_length:
+            return self.get_points(self.get_params(fractions * self.length))
+        return self.get_points(fractions * self.spans)
+
+
+class Surface(object):
+    __slots__ = ["points", "degree", "knots"]
+
+    def __init__(self, points, degree=(3, 3)):
+        """
+        Holds the control points of a surface and evaluates it
+        :param points: list: (u, v, 3) world space control points (rows run along u)
+        :param degree: tuple: the degree in u and v (lowered for directions with too few points, like Maya does)
+        """
+        self.points = np.asarray(points, dtype=float)
+        self.degree = tuple(min(int(d), n - 1) for d, n in zip(degree, self.points.shape[:2]))
+        self.knots = tuple(get_knots(n, d) for n, d in zip(self.points.shape[:2], self.degree))
+
+    @classmethod
+    def from_scene(cls, surface):
+        """
+        Reads a surface from the scene
+        :param surface: str: the surface (or its transform) being read
+        :return: Surface: the surface in world space
+        """
+        shape = surface if scene.node_type(surface) == "nurbsSurface" else scene.get_shapes(surface)[0]
+        points = np.asarray(scene.get_points(shape), dtype=float)
+        degree = (int(scene.get_attr(f"{shape}.degreeU")), int(scene.get_attr(f"{shape}.degreeV")))
+        rows = int(scene.get_attr(f"{shape}.spansU")) + degree[0]
+        points = get_transforms(points, scene.get_matrix(scene.get_parent(shape))).reshape(rows, -1, 3)
+        return cls(points, degree)
+
+    @classmethod
+    def plane(cls, pivot, axis, width, length_ratio, degree=3, patches_u=1, patches_v=1, matrix=None):
+        """
+        Returns the surface the nurbsPlane command builds (see scene.create_nurbs_plane)
+        :param pivot: list: the center of the plane
+        :param axis: list: the normal of the plane
+        :param width: float: the width of the plane (along u)
+        :param length_ratio: float: the length of the plane (along v) relative to its width
+        :param degree: int: the degree in both directions
+        :param patches_u: int: the number of spans along u
+        :param patches_v: int: the number of spans along v
+        :param matrix: list: the matrix the plane's transform puts it through
+        :return: Surface: the plane
+        """
+        normal = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+        uDir = np.cross(normal, [0.0, 1.0, 0.0])
+        uDir = uDir / np.linalg.norm(uDir) if np.linalg.norm(uDir) > 1e-9 else np.array([1.0, 0.0, 0.0])
+        vDir = np.cross(uDir, normal)
+        s = get_greville(patches_u, degree)[:, None, None] - 0.5
+        t = get_greville(patches_v, degree)[None, :, None] - 0.5
+        points = np.asarray(pivot, dtype=float) + s * width * uDir + t * width * length_ratio * vDir
+        if matrix is not None:
+            points = get_transforms(points, matrix)
+        return cls(points, (degree, degree))
+
+    @property
+    def spans(self):
+        return tuple(n - d for n, d in zip(self.points.shape[:2], self.degree))
+
+    def evaluate(self, u, v, normalized=True):
+        """
+        Returns the positions and both first derivatives of the surface at any number of (u, v) pairs
+        :param u: list: the u parameters (a single value is used for every v)
+        :param v: list: the v parameters (a single value is used for every u)
+        :param normalized: bool: whether the parameters run from 0 to 1 rather than 0 to the number of spans
+        :return: array, array, array: (params, 3) positions, u derivatives and v derivatives
+        """
+        u, v = np.broadcast_arrays(np.atleast_1d(np.asarray(u, dtype=float)),
+                                   np.atleast_1d(np.asarray(v, dtype=float)))
+        if normalized:
+            u, v = u * self.spans[0], v * self.spans[1]
+        counts = self.points.shape[:2]
+        bu = get_basis(self.knots[0], self.degree[0], counts[0], u)
+        bv = get_basis(self.knots[1], self.degree[1], counts[1], v)
+        du = get_basis(self.knots[0], self.degree[0], counts[0], u, derivative=True)
+        dv = get_basis(self.knots[1], self.degree[1], counts[1], v, derivative=True)
+        points = np.einsum("ni,ijk,nj->nk", bu, self.points, bv)
+        tangents = np.einsum("ni,ijk,nj->nk", du, self.points, bv)
+        binormals = np.einsum("ni,ijk,nj->nk", bu, self.points, dv)
+        return points, tangents, binormals
+
+    def get_points(self, u, v, normalized=True):
+        """
+        Returns the positions of the surface at any number of (u, v) pairs
+        :return: array: (params, 3) positions
+        """
+        return self.evaluate(u, v, normalized)[0]
+
+    def get_frames(self, u, v, normalized=True):
+        """
+        Returns the positions and unit tangent, binormal and normal of the surface at any number of (u, v) pairs.
+        The normal is the cross product of the tangent (along u) and the binormal (along v)
+        :return: array, array, array, array: (params, 3) positions, tangents, binormals and normals
+        """
+        points, tangents, binormals = self.evaluate(u, v, normalized)
+        tangents = tangents / np.linalg.norm(tangents, axis=1)[:, None]
+        normals = np.cross(tangents, binormals)
+        normals = normals / np.linalg.norm(normals, axis=1)[:, None]
+        return points, tangents, np.cross(normals, tangents), normals
+
+    def get_pin_matrices(self, u, v, normal_axis=1, tangent_axis=0, normalized=True):
+        """
+        Returns the matrices uvPin nodes pinned to the surface output (see Ribbon.matrix_pin)
+        :param u: list: the u coordinates
+        :param v: list: the v coordinates
+        :param normal_axis: int: the axis the normal is put on (0-2 for X, Y, Z and 3-5 for -X, -Y, -Z)
+        :param tangent_axis: int: the axis the tangent is put on (0-2 for X, Y, Z and 3-5 for -X, -Y, -Z)
+        :param normalized: bool: whether the coordinates run from 0 to 1 rather than 0 to the number of spans
+        :return: array: (params, 4, 4) world matrices
+        """
+        points, tangents, _, normals = self.get_frames(u, v, normalized)
+        matrices = np.zeros((len(points), 4, 4))
+        matrices[:, 3, :3] = points
+        matrices[:, 3, 3] = 1.0
+        if normal_axis % 3 == tangent_axis % 3:
+            matrices[:, 0, :3], matrices[:, 1, :3] = tangents, normals
+            matrices[:, 2, :3] = np.cross(tangents, normals)
+            return matrices
+        matrices[:, tangent_axis % 3, :3] = tangents if tangent_axis < 3 else -tangents
+        matrices[:, normal_axis % 3, :3] = normals if normal_axis < 3 else -normals
+        # The axis left over completes a right handed frame
+        r = 3 - normal_axis % 3 - tangent_axis % 3
+        matrices[:, r, :3] = np.cross(matrices[:, (r + 1) % 3, :3], matrices[:, (r + 2) % 3, :3])
+        return matrices
@@ -0,0 +1,689 @@
+"""
+Post-build optimizer for the dependency graph of a rig. The matrix and math helpers favour being easy to call over
+making the fewest nodes, so a finished rig is left with duplicate decompose/compose pairs, offset nodes that
+offset nothing, conversion nodes and utility nodes left over from reruns. The optimizer only touches the utility
+nodes (see OUTPUTS) upstream of the rig's nodes (its joints by default), so anything else in the scene is left
+alone, and runs these passes over them until none of them finds anything more to do:
+
+    dead         utility nodes that drive nothing are deleted (unless the builders find them by name, see KEEP)
+    merged       utility nodes of the same type with the same inputs and settings are merged into one
+    identity     utility nodes that pass one of their inputs through unchanged are bypassed
+    folded       utility nodes without any inputs are replaced by the values they output
+    conversions  chains of unitConversion nodes are collapsed into one and removed if they cancel out, and angles
+                 converted to numbers and back around a linear node (what utils.invert_attribute leaves) are
+                 worked on as angles instead
+
+The report checks the rig still poses the same way by moving the transforms that drive it to a few random poses
+(see get_drivers) and comparing the world matrices before and after at each of them.
+
+    report = optimize.run()
+    print(optimize.format_report(report))
+"""
+import math
+import random
+import time
+
+from core import profiler
+from core import scene
+
+
+PASSES = ["dead", "merged", "identity", "folded", "conversions"]
+# The output attributes of the utility nodes the optimizer works on
+OUTPUTS = {"addDoubleLinear": ["output"],
+           "animBlendNodeAdditiveDA": ["output"],
+           "blendColors": ["output"],
+           "blendMatrix": ["outputMatrix"],
+           "composeMatrix": ["outputMatrix"],
+           "condition": ["outColor"],
+           "curveInfo": ["arcLength"],
+           "decomposeMatrix": ["outputTranslate", "outputRotate", "outputScale", "outputShear", "outputQuat"],
+           "distanceBetween": ["distance"],
+           "inverseMatrix": ["outputMatrix"],
+           "multDoubleLinear": ["output"],
+           "multMatrix": ["matrixSum"],
+           "multiplyDivide": ["output"],
+           "pickMatrix": ["outputMatrix"],
+           "plusMinusAverage": ["output1D", "output2D", "output3D"],
+           "reverse": ["output"],
+           "unitConversion": ["output"]}
+# The input attributes that decide what a utility node outputs
+SETTINGS = {"addDoubleLinear": ["input1", "input2"],
+            "animBlendNodeAdditiveDA": ["inputA", "inputB", "weightA", "weightB"],
+            "blendColors": ["blender", "color1", "color2"],
+            "blendMatrix": ["inputMatrix", "envelope"],
+            "composeMatrix": ["inputTranslate", "inputRotate", "inputScale", "inputShear", "inputRotateOrder",
+                              "useEulerRotation"],
+            "condition": ["operation", "firstTerm", "secondTerm", "colorIfTrue", "colorIfFalse"],
+            "curveInfo": [],
+            "decomposeMatrix": ["inputMatrix", "inputRotateOrder"],
+            "distanceBetween": ["point1", "point2", "inMatrix1", "inMatrix2"],
+            "inverseMatrix": ["inputMatrix"],
+            "multDoubleLinear": ["input1", "input2"],
+            "multMatrix": [],
+            "multiplyDivide": ["operation", "input1", "input2"],
+            "pickMatrix": ["inputMatrix", "useTranslate", "useRotate", "useScale", "useShear"],
+            "plusMinusAverage": ["operation"],
+            "reverse": ["input"],
+            "unitConversion": ["input", "conversionFactor"]}
+# Multi attributes and the attributes of each of their elements
+MULTIS = {"blendMatrix": {"target": ["targetMatrix", "weight"]},
+          "multMatrix": {"matrixIn": [""]},
+          "plusMinusAverage": {"input1D": [""], "input2D": [""], "input3D": [""]}}
+# Utility nodes the builders find by name once they're made (ex: the curveInfo node utils.make_curve_from_joints
+# makes for the stretch setups), by type and name suffix. They're kept even if nothing is connected to them yet
+KEEP = {"curveInfo": "_info", "distanceBetween": "_dist"}
+# The nodes whose channels are moved to check the graph does the same thing in other poses
+TRANSFORMS = ["transform", "joint"]
+AXES = "XYZ"
+TOLERANCE = 1e-6
+# The factor of the unitConversion Maya puts between an angle (in radians) and a plain number (in degrees)
+DEGREES = 180.0 / math.pi
+# Nodes whose output is a linear function of a single input
+LINEAR = ["multDoubleLinear", "addDoubleLinear", "reverse"]
+SAMPLES = 3
+
+
+def run(nodes=None, repeat=5):
+    """
+    Optimizes the utility nodes of the rig in the current scene and measures what it saved
+    :param nodes: list: the nodes whose world matrices are timed and compared before and after (all joints by default)
+    :param repeat: int: how many times the evaluation is timed
+    :return: dict: node counts, nodes removed per pass, evaluation times and the largest change in any world matrix
+    at the current pose and a few others
+    """
+    nodes = scene.list_nodes("joint") if nodes is None else nodes
+    report = {"nodes_before": len(scene.list_nodes()), "removed": {name: 0 for name in PASSES}}
+    drivers = get_drivers(nodes)
+    before = get_poses(nodes, drivers)
+    report["eval_before"] = time_evaluation(nodes, repeat)
+    optimize(report["removed"], nodes)
+    report["eval_after"] = time_evaluation(nodes, repeat)
+    report["nodes_after"] = len(scene.list_nodes())
+    report["total_removed"] = report["nodes_before"] - report["nodes_after"]
+    report["drift"] = max([abs(a - b) for old, new in zip(before, get_poses(nodes, drivers))
+                           for a, b in zip(old, new)] or [0])
+    return report
+
+
+@profiler.stage
+def optimize(removed=None, nodes=None):
+    """
+    Runs every pass over the utility nodes of a rig until none of them changes anything
+    :param removed: dict: the running count of nodes removed per pass (updated in place)
+    :param nodes: list: the nodes of the rig (all joints by default); the passes work on the utility nodes upstream
+    of them (see get_upstream)
+    :return: dict: the nodes removed per pass
+    """
+    removed = {name: 0 for name in PASSES} if removed is None else removed
+    scope = get_upstream(scene.list_nodes("joint") if nodes is None else nodes)
+    passes = [remove_dead, merge_duplicates, bypass_identities, fold_constants, collapse_conversions]
+    changed = True
+    while changed:
+        changed = False
+        for name, func in zip(PASSES, passes):
+            count = func(scope)
+            removed[name] += count
+            changed = changed or bool(count)
+    return removed
+
+
+def format_report(report):
+    lines = [f"nodes: {report['nodes_before']} -> {report['nodes_after']} ({report['total_removed']} removed)"]
+    lines.extend(f"  {name:<12}{report['removed'][name]:>6}" for name in PASSES)
+    change = report["eval_after"] / report["eval_before"] - 1 if report["eval_before"] else 0.0
+    lines.append(f"evaluation: {report['eval_before']:.4f}s -> {report['eval_after']:.4f}s ({change:+.1%})")
+    lines.append(f"max drift: {report['drift']:.2e}")
+    return "\n".join(lines)
+
+
+#############
+# Measuring
+#############
+
+def get_pose(nodes):
+    return [scene.get_attr(f"{node}.worldMatrix[0]") for node in nodes]
+
+
+def get_poses(nodes, drivers, samples=SAMPLES):
+    """
+    Returns the world matrices of the given nodes at the current pose and at a few random poses of their drivers
+    :param nodes: list: the nodes being queried
+    :param drivers: list: the plugs that move them (see get_drivers)
+    :param samples: int: the number of random poses
+    :return: list: the world matrices of every node at every pose
+    """
+    poses = get_pose(nodes)
+    for _ in get_samples(drivers, samples):
+        poses.extend(get_pose(nodes))
+    return poses
+
+
+def time_evaluation(nodes, repeat=5):
+    """
+    Returns the average time it takes to evaluate the world matrices of the given nodes from a dirty graph (see
+    scene.evaluate). The first evaluation isn't timed since the evaluation manager builds its graph during it
+    :param nodes: list: the nodes being evaluated
+    :param repeat: int: the number of evaluations averaged
+    :return: float: seconds per evaluation
+    """
+    scene.evaluate(nodes)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        scene.evaluate(nodes)
+    return (time.perf_counter() - start) / max(repeat, 1)
+
+
+#############
+# Sampling
+#############
+
+def get_drivers(nodes):
+    """
+    Returns the channels that move the given nodes: the translate and rotate channels of every transform upstream of
+    them (through their connections and parents) that aren't driven themselves. Scale is left alone, so drivers are
+    assumed to keep their scale (as in core.migrate)
+    :param nodes: list: the nodes being driven
+    :return: list: the driving plugs
+    """
+    plugs = []
+    for node in get_upstream(nodes):
+        if scene.node_type(node) not in TRANSFORMS:
+            continue
+        incoming = get_incoming(node)
+        for attr in [f"{attr}{axis}" for attr in ["translate", "rotate"] for axis in AXES]:
+            if not any(is_within(attr, dst) or is_within(dst, attr) for dst in incoming):
+                plugs.append(f"{node}.{attr}")
+    return sorted(plugs)
+
+
+def get_upstream(nodes):
+    """
+    Returns the given nodes along with every node upstream of them, through their incoming connections and parents
+    :param nodes: list: the nodes being queried
+    :return: set: the nodes
+    """
+    seen = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        stack.extend(source.split(".")[0] for source in get_incoming(node).values())
+        parent = scene.get_parent(node)
+        if parent is not None:
+            stack.append(parent)
+    return seen
+
+
+def get_samples(drivers, samples=SAMPLES, seed=0):
+    """
+    Moves the driving channels to a few random values in turn (yielding once they're set) and puts them back where
+    they were afterwards. Locked channels stay where they are
+    :param drivers: list: the driving plugs (see get_drivers)
+    :param samples: int: the number of random poses
+    :param seed: int: the random seed (every check sees the same poses)
+    """
+    rand = random.Random(seed)
+    rest = {plug: scene.get_attr(plug) for plug in drivers}
+    try:
+        for _ in range(samples):
+            for plug, value in rest.items():
+                span = 45.0 if ".rotate" in plug else 1.0
+                set_sample(plug, value + rand.uniform(-span, span))
+            yield
+    finally:
+        for plug, value in rest.items():
+            set_sample(plug, value)
+
+
+def set_sample(plug, value):
+    try:
+        scene.set_attr(plug, value)
+    except RuntimeError:
+        pass
+
+
+#############
+# Passes
+#############
+
+@profiler.stage
+def remove_dead(scope=None):
+    """
+    Deletes the utility nodes that don't drive anything. Deleting one can leave the nodes feeding it dead, so the
+    pass repeats until there are none left
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes deleted
+    """
+    count = 0
+    while True:
+        dead = [node for node, node_type in get_utilities(scope=scope)
+                if not get_outgoing(node, node_type) and not is_kept(node, node_type)]
+        if not dead:
+            return count
+        scene.delete(dead)
+        count += len(dead)
+
+
+@profiler.stage
+def merge_duplicates(scope=None):
+    """
+    Merges utility nodes that compute the same thing from the same inputs, moving the outgoing connections of each
+    duplicate over to the first node found
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes merged away
+    """
+    seen = {}
+    duplicates = []
+    for node, node_type in get_utilities(scope=scope):
+        key = get_signature(node, node_type)
+        if key in seen and not is_kept(node, node_type):
+            duplicates.append((node, node_type, seen[key]))
+        elif key not in seen:
+            seen[key] = node
+    for node, node_type, keep in duplicates:
+        for source, destination in get_outgoing(node, node_type):
+            scene.connect_attr(f"{keep}.{source.split('.', 1)[1]}", destination)
+    if duplicates:
+        scene.delete([duplicate[0] for duplicate in duplicates])
+    return len(duplicates)
+
+
+@profiler.stage
+def bypass_identities(scope=None):
+    """
+    Bypasses utility nodes that output one of their inputs unchanged (ex: a multMatrix with a single connected
+    matrix and identities for the rest, or an offset that subtracts zero)
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes bypassed
+    """
+    count = 0
+    for node, node_type in get_utilities(scope=scope):
+        if not scene.exists(node):
+            continue
+        mapping = get_passthrough(node, node_type, get_incoming(node))
+        if mapping is not None and bypass(node, node_type, mapping):
+            count += 1
+    return count
+
+
+@profiler.stage
+def fold_constants(scope=None):
+    """
+    Replaces utility nodes that have no incoming connections with the values they output
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes folded
+    """
+    folded = []
+    for node, node_type in get_utilities(scope=scope):
+        if get_incoming(node) or is_kept(node, node_type):
+            continue
+        for source, destination in get_outgoing(node, node_type):
+            value = scene.get_attr(source)
+            scene.disconnect_attr(source, destination)
+            scene.set_attr(destination, value)
+        folded.append(node)
+    if folded:
+        scene.delete(folded)
+    return len(folded)
+
+
+@profiler.stage
+def collapse_conversions(scope=None):
+    """
+    Collapses a unitConversion fed by another unitConversion into one node carrying both factors. A conversion
+    whose factor comes to 1 is then left for the identity pass to remove. Angles that are converted to numbers,
+    put through a linear node and converted back are then worked on as angles (see retype_conversions)
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes removed
+    """
+    count = 0
+    for node, _ in get_utilities(["unitConversion"], scope=scope):
+        if not scene.exists(node):
+            continue
+        incoming = get_incoming(node)
+        source = incoming.get("input")
+        if source is None or "conversionFactor" in incoming:
+            continue
+        inner = source.split(".")[0]
+        inner_incoming = get_incoming(inner)
+        if scene.node_type(inner) != "unitConversion" or "conversionFactor" in inner_incoming:
+            continue
+        factor = scene.get_attr(f"{node}.conversionFactor") * scene.get_attr(f"{inner}.conversionFactor")
+        if "input" in inner_incoming:
+            scene.connect_attr(inner_incoming["input"], f"{node}.input")
+        else:
+            scene.disconnect_attr(source, f"{node}.input")
+            scene.set_attr(f"{node}.input", scene.get_attr(f"{inner}.input"))
+        scene.set_attr(f"{node}.conversionFactor", factor)
+        if not get_outgoing(inner, "unitConversion"):
+            scene.delete(inner)
+            count += 1
+    return count + retype_conversions(scope)
+
+
+def retype_conversions(scope=None):
+    """
+    Replaces an angle that's converted to a number, put through a linear node (multDoubleLinear, addDoubleLinear or
+    one channel of a reverse) and converted back to an angle with an animBlendNodeAdditiveDA, which works on angles
+    so neither conversion is needed. The blend node's weight and offset are the scale and offset the linear node
+    applies (the offset is measured in the angle's own units, so it holds whatever units the scene uses)
+    :param scope: set: the nodes the pass may touch (see get_utilities)
+    :return: int: the number of nodes removed
+    """
+    count = 0
+    for node, node_type in get_utilities(LINEAR, scope=scope):
+        if not scene.exists(node):
+            continue
+        pair = get_angle_pair(node, node_type)
+        if pair is None:
+            continue
+        before, after, weight = pair
+        source = get_incoming(before)["input"]
+        destinations = [destination for _, destination in get_outgoing(after, "unitConversion")]
+        offset = scene.get_attr(destinations[0]) - weight * scene.get_attr(source)
+        blend = scene.create_node("animBlendNodeAdditiveDA", f"{node}_angle")
+        scene.set_attr(f"{blend}.weightA", weight)
+        scene.set_attr(f"{blend}.inputB", offset if abs(offset) > TOLERANCE else 0.0)
+        scene.connect_attr(source, f"{blend}.inputA")
+        for destination in destinations:
+            scene.connect_attr(f"{blend}.output", destination)
+        dead = [after, node]
+        if len(get_outgoing(before, "unitConversion")) == 1:
+            dead.append(before)
+        scene.delete(dead)
+        count += len(dead) - 1
+    return count
+
+
+def get_angle_pair(node, node_type):
+    """
+    Works out whether a linear node sits between an angle converted to a number and that number converted back
+    :param node: str: the linear node
+    :param node_type: str: the type of the node (one of LINEAR)
+    :return: tuple: the unitConversion before it, the one after it and the scale it applies (or None)
+    """
+    incoming = get_incoming(node)
+    if node_type == "reverse":
+        inputs = [attr for attr in incoming if attr in ["inputX", "inputY", "inputZ"]]
+        if len(inputs) != 1 or len(incoming) != 1:
+            return None
+        attr, output, weight = inputs[0], f"output{inputs[0][-1]}", -1.0
+    else:
+        inputs = [attr for attr in ["input1", "input2"] if attr in incoming]
+        if len(inputs) != 1 or len(incoming) != 1:
+            return None
+        attr, output = inputs[0], "output"
+        other = f"{node}.input{3 - int(attr[-1])}"
+        weight = scene.get_attr(other) if node_type == "multDoubleLinear" else 1.0
+    outgoing = get_outgoing(node, node_type)
+    if len(outgoing) != 1 or outgoing[0][0] != f"{node}.{output}":
+        return None
+    before = incoming[attr].split(".")[0]
+    after, after_attr = outgoing[0][1].split(".", 1)
+    if incoming[attr] != f"{before}.output" or after_attr != "input":
+        return None
+    for conversion in [before, after]:
+        if scene.node_type(conversion) != "unitConversion" or "conversionFactor" in get_incoming(conversion):
+            return None
+    if "input" not in get_incoming(before) or not get_outgoing(after, "unitConversion"):
+        return None
+    factors = [scene.get_attr(f"{conversion}.conversionFactor") for conversion in [before, after]]
+    if abs(factors[0] - DEGREES) > TOLERANCE * DEGREES or abs(factors[0] * factors[1] - 1.0) > TOLERANCE:
+        return None
+    return before, after, weight
+
+
+#############
+# Graph
+#############
+
+def get_utilities(node_types=None, scope=None):
+    """
+    Returns the utility nodes in the scene the optimizer can work on
+    :param node_types: list: the node types to look for (every type in OUTPUTS by default)
+    :param scope: set: only return these nodes (every utility node in the scene by default)
+    :return: list: (node, node type) tuples
+    """
+    return [(node, node_type) for node_type in (node_types or OUTPUTS) for node in scene.list_nodes(node_type)
+            if scope is None or node in scope]
+
+
+def is_kept(node, node_type):
+    """
+    Returns whether a utility node is one the builders find by name and so can't be removed (see KEEP)
+    :param node: str: the node being queried
+    :param node_type: str: the type of the node
+    :return: bool: if it has to be kept
+    """
+    return node_type in KEEP and node.endswith(KEEP[node_type])
+
+
+def get_incoming(node):
+    """
+    Returns the incoming connections of a node
+    :param node: str: the node being queried
+    :return: dict: the source plug of each connected attribute of the node
+    """
+    return {destination.split(".", 1)[1]: source
+            for source, destination in scene.list_connections(node, destination=False, pairs=True)}
+
+
+def get_outgoing(node, node_type):
+    """
+    Returns the connections coming out of the outputs of a utility node (message connections and the like don't
+    count)
+    :param node: str: the node being queried
+    :param node_type: str: the type of the node
+    :return: list: (source plug, destination plug) tuples
+    """
+    return [(source, destination) for source, destination in scene.list_connections(node, source=False, pairs=True)
+            if any(is_within(source.split(".", 1)[1], attr) for attr in OUTPUTS[node_type])]
+
+
+def is_within(attr, parent):
+    """
+    Returns whether an attribute is a given attribute or one of its children
+    :param attr: str: the attribute (ex: input3D[0].input3Dx or outputTranslateX)
+    :param parent: str: the attribute it might belong to (ex: input3D[0] or outputTranslate)
+    :return: bool: if it belongs to it
+    """
+    if attr == parent or attr.startswith(f"{parent}."):
+        return True
+    return attr[:-1] == parent and attr[-1] in "XYZRGBxyz"
+
+
+def get_settings(node, node_type):
+    settings = list(SETTINGS[node_type])
+    for multi, children in MULTIS.get(node_type, {}).items():
+        for i in scene.list_indices(f"{node}.{multi}"):
+            settings.extend(f"{multi}[{i}].{child}" if child else f"{multi}[{i}]" for child in children)
+    return settings
+
+
+def get_signature(node, node_type):
+    """
+    Returns a key that is the same for every utility node that computes the same thing: its type, its incoming
+    connections and the values of the settings that aren't connected
+    :param node: str: the node being queried
+    :param node_type: str: the type of the node
+    :return: tuple: the key
+    """
+    incoming = get_incoming(node)
+    values = [(attr, freeze(scene.get_attr(f"{node}.{attr}"))) for attr in get_settings(node, node_type)
+              if not any(is_within(dst, attr) or is_within(attr, dst) for dst in incoming)]
+    return node_type, tuple(sorted(incoming.items())), tuple(values)
+
+
+def freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, float):
+        return round(value, 6) + 0.0
+    return value
+
+
+def is_value(value, expected):
+    if isinstance(value, (list, tuple)):
+        return all(is_value(v, expected) for v in value)
+    return abs(value - expected) < TOLERANCE
+
+
+def is_identity(matrix):
+    return all(abs(v - (1.0 if i % 5 == 0 else 0.0)) < TOLERANCE for i, v in enumerate(matrix))
+
+
+def is_constant(node, attr, incoming, expected):
+    """
+    Returns whether an attribute is unconnected and set to a given value
+    """
+    if any(is_within(dst, attr) or is_within(attr, dst) for dst in incoming):
+        return False
+    return is_value(scene.get_attr(f"{node}.{attr}"), expected)
+
+
+#############
+# Identities
+#############
+
+def get_passthrough(node, node_type, incoming):
+    """
+    Works out whether a utility node outputs one of its inputs unchanged
+    :param node: str: the node being queried
+    :param node_type: str: the type of the node
+    :param incoming: dict: the incoming connections of the node
+    :return: dict: the output attributes of the node mapped to the plugs they're equal to (or None)
+    """
+    if node_type == "unitConversion" and is_constant(node, "conversionFactor", incoming, 1.0):
+        return {"output": f"{node}.input"}
+    if node_type in ["multDoubleLinear", "addDoubleLinear"]:
+        neutral = 1.0 if node_type == "multDoubleLinear" else 0.0
+        for a, b in [(1, 2), (2, 1)]:
+            if is_constant(node, f"input{b}", incoming, neutral):
+                return {"output": f"{node}.input{a}"}
+    if node_type == "multiplyDivide":
+        operation = None if "operation" in incoming else int(scene.get_attr(f"{node}.operation"))
+        if operation == 0 or (operation in [1, 2, 3] and is_constant(node, "input2", incoming, 1.0)):
+            return get_vector_mapping(node, "output", "input1", incoming)
+    if node_type == "multMatrix":
+        indices = scene.list_indices(f"{node}.matrixIn")
+        driven = [i for i in indices if f"matrixIn[{i}]" in incoming]
+        if len(driven) == 1 and all(is_identity(scene.get_attr(f"{node}.matrixIn[{i}]"))
+                                    for i in indices if i != driven[0]):
+            return {"matrixSum": f"{node}.matrixIn[{driven[0]}]"}
+    if node_type == "inverseMatrix" and "inputMatrix" in incoming:
+        inner = incoming["inputMatrix"].split(".")[0]
+        if scene.node_type(inner) == "inverseMatrix":
+            return {"outputMatrix": f"{inner}.inputMatrix"}
+    if node_type == "pickMatrix":
+        if all(is_constant(node, f"use{attr}", incoming, 1) for attr in ["Translate", "Rotate", "Scale", "Shear"]):
+            return {"outputMatrix": f"{node}.inputMatrix"}
+    if node_type == "blendMatrix":
+        targets = scene.list_indices(f"{node}.target")
+        if is_constant(node, "envelope", incoming, 0.0) or all(
+                is_constant(node, f"target[{i}].weight", incoming, 0.0) for i in targets):
+            return {"outputMatrix": f"{node}.inputMatrix"}
+    if node_type == "plusMinusAverage":
+        return get_sum_passthrough(node, incoming)
+    if node_type == "composeMatrix":
+        return get_round_trip(node, incoming)
+    return None
+
+
+def get_vector_mapping(node, output, attr, incoming):
+    mapping = {output: f"{node}.{attr}"}
+    if attr not in incoming:
+        mapping.update({f"{output}{axis}": f"{node}.{attr}{axis}" for axis in AXES})
+    return mapping
+
+
+def get_sum_passthrough(node, incoming):
+    """
+    A plusMinusAverage is a pass through when only one of its inputs is connected and the rest add (or subtract)
+    zero. Subtracting only passes the first input through
+    """
+    if "operation" in incoming:
+        return None
+    operation = int(scene.get_attr(f"{node}.operation"))
+    multis = {multi: scene.list_indices(f"{node}.{multi}") for multi in ["input1D", "input3D"]}
+    if operation not in [1, 2, 3] or (multis["input1D"] and multis["input3D"]):
+        return None
+    multi = "input1D" if multis["input1D"] else "input3D"
+    indices = multis[multi]
+    driven = [i for i in indices if any(is_within(dst, f"{multi}[{i}]") for dst in incoming)]
+    if len(driven) != 1:
+        return None
+    if operation == 3 and len(indices) > 1:
+        return None
+    if operation == 2 and driven[0] != indices[0]:
+        return None
+    if not all(is_constant(node, f"{multi}[{i}]", incoming, 0.0) for i in indices if i != driven[0]):
+        return None
+    element = f"{multi}[{driven[0]}]"
+    if multi == "input1D":
+        return {"output1D": f"{node}.{element}"}
+    mapping = {"output3D": f"{node}.{element}"}
+    if element not in incoming:
+        mapping.update({f"output3D{axis}": f"{node}.{element}.input3D{axis}" for axis in "xyz"})
+    return mapping
+
+
+def get_round_trip(node, incoming):
+    """
+    A composeMatrix that rebuilds the matrix a decomposeMatrix has just broken down (the pair decompose_constraint
+    makes) outputs that matrix unchanged, as long as it carries no shear and both use the same rotate order
+    """
+    sources = [incoming.get(f"input{attr}") for attr in ["Translate", "Rotate", "Scale"]]
+    if None in sources:
+        return None
+    dec = sources[0].split(".")[0]
+    if sources != [f"{dec}.output{attr}" for attr in ["Translate", "Rotate", "Scale"]]:
+        return None
+    if scene.node_type(dec) != "decomposeMatrix" or "inputRotateOrder" in get_incoming(dec):
+        return None
+    if not (is_constant(node, "inputShear", incoming, 0.0) and is_constant(node, "useEulerRotation", incoming, 1)
+            and is_value(scene.get_attr(f"{dec}.outputShear"), 0.0)):
+        return None
+    if not is_constant(node, "inputRotateOrder", incoming, scene.get_attr(f"{dec}.inputRotateOrder")):
+        return None
+    # A matrix that picks up shear in another pose wouldn't make it through, so check the pair in a few of them
+    matches = [is_value([a - b for a, b in zip(scene.get_attr(f"{node}.outputMatrix"),
+                                               scene.get_attr(f"{dec}.inputMatrix"))], 0.0)
+               for _ in get_samples(get_drivers([dec]))]
+    if not all(matches):
+        return None
+    return {"outputMatrix": f"{dec}.inputMatrix"}
+
+
+def bypass(node, node_type, mapping):
+    """
+    Connects whatever feeds the inputs a utility node passes through straight to the plugs the node drives (or sets
+    them to the input values if they aren't connected) and deletes the node
+    :param node: str: the node being bypassed
+    :param node_type: str: the type of the node
+    :param mapping: dict: the output attributes of the node mapped to the plugs they're equal to
+    :return: bool: if the node could be bypassed
+    """
+    edits = []
+    for source, destination in get_outgoing(node, node_type):
+        plug = mapping.get(source.split(".", 1)[1])
+        if plug is None:
+            return False
+        owner, attr = plug.split(".", 1)
+        incoming = get_incoming(owner)
+        if attr in incoming:
+            edits.append((source, destination, incoming[attr], None))
+        elif any(is_within(dst, attr) or is_within(attr, dst) for dst in incoming):
+            # Only part of the input is connected
+            return False
+        else:
+            edits.append((source, destination, None, scene.get_attr(plug)))
+    for source, destination, driver, value in edits:
+        if driver is not None:
+            scene.connect_attr(driver, destination)
+        else:
+            scene.disconnect_attr(source, destination)
+            scene.set_attr(destination, value)
+    scene.delete(node)
+    return True
@@ -0,0 +1,625 @@
+"""
+Plan mode. Instead of editing the scene step by step, a build can be compiled into a plan: an ordered list of
+typed operations (create, parent, set, connect, ...) worked out from the guide data alone, which is then
+applied to the scene in bulk:
+
+    result = plan.compile_plan(guidesObj, stages=["driver", "fkik", "ribbon"])
+    result.apply()
+
+The compute phase runs the builders against a recording in-memory scene seeded with copies of the guides and
+turns the final state of that scene into operations, so temporary constraints, unparenting and other
+intermediate steps never reach the real scene. Plans are plain JSON so they can be saved, diffed and cached;
+compiling the same guides with the same options again returns the cached plan without running the builders.
+Applying a plan twice leaves the scene as the first pass did.
+
+Operations are lists so they survive a JSON round trip:
+    ["create", node_type, name, parent]        creates a node (skipped if the name already exists)
+    ["parent", node, parent]                   parents a node, keeping its world transform
+    ["add_attr", node, name, settings]         adds a user attribute
+    ["set", plug, value]                       sets a plug value
+    ["points", node, points]                   moves every control point of a curve or surface
+    ["command", name, args, kwargs, result, shapes]
+                                               runs a scene API command (constraints, IK handles, deformers and
+                                               geometry) and renames what it makes to the planned names
+                                               (skipped if those names already existed)
+    ["connect", source, destination]           connects two plugs
+    ["lock", plug]                             locks a plug
+"""
+import difflib
+import hashlib
+import json
+import os
+
+from core import memory
+from core import scene
+from jnts import driver
+from jnts import fkik
+from rigs import ribbon
+from rigs import stretch
+
+
+VERSION = 1
+CACHE = {}
+# Scene functions whose nodes are rebuilt with create operations
+DECLARED = ["create_node", "create_group", "create_joint", "create_locator", "duplicate"]
+GEOMETRY = ["create_curve", "create_circle", "create_nurbs_plane"]
+# Scene functions that are replayed as commands because Maya sets up more than their nodes (constraints,
+# IK handles and deformers are wired into the nodes they act on)
+COMMANDS = ["point_constraint", "orient_constraint", "scale_constraint", "parent_constraint", "aim_constraint",
+            "ik_handle", "skin_cluster", "cluster", "lattice", "nonlinear", "blend_shape"]
+# The channels of the driven node each constraint type takes over
+CONSTRAINED = {"pointConstraint": ["translate"], "orientConstraint": ["rotate"], "scaleConstraint": ["scale"],
+               "parentConstraint": ["translate", "rotate"], "aimConstraint": ["rotate"]}
+CHANNELS = ["translate", "rotate", "scale", "jointOrient"]
+# Values commands read off the scene when they run, which are always written back in case things moved after
+BOUND = {"skinCluster": "bindPreMatrix"}
+
+
+class Ref(object):
+    __slots__ = ["node", "attr"]
+
+    def __init__(self, node, attr=None):
+        """
+        A node (or plug) passed to a recorded command. Nodes get renamed during a build so the final name is
+        only looked up when the plan is compiled
+        :param node: Node: the node being referenced
+        :param attr: str: the rest of the plug or component (ex: "cv[0]")
+        """
+        self.node = node
+        self.attr = attr
+
+    def name(self):
+        return f"{self.node.name}.{self.attr}" if self.attr else self.node.name
+
+
+class PlanScene(memory.MemoryScene):
+    def __init__(self, version=2024):
+        """
+        An in-memory scene that records what the builders do to it so the result can be compiled into a plan
+        :param version: int: the Maya version the scene reports
+        """
+        self.log = []
+        self.made = []
+        self.explicit = set()
+        self.seeded = {}
+        super().__init__(version)
+
+    def counted(self, name, method):
+        call = super().counted(name, method)
+        if name not in DECLARED + GEOMETRY + COMMANDS:
+            return call
+
+        def record(*args, **kwargs):
+            entry = {"name": name, "args": self.to_refs(list(args)), "kwargs": self.to_refs(kwargs)}
+            start = len(self.made)
+            result = call(*args, **kwargs)
+            entry["result"] = self.to_refs(result)
+            entry["nodes"] = self.made[start:]
+            for node in entry["nodes"]:
+                node.data["#entry"] = len(self.log)
+                node.data["#initial"] = {k: (list(v) if isinstance(v, list) else v) for k, v in node.attrs.items()}
+            self.log.append(entry)
+            return result
+        record.__name__ = name
+        return record
+
+    def to_refs(self, value):
+        """
+        Swaps the node and plug names in a command's arguments for references to the nodes
+        """
+        if isinstance(value, str):
+            nodeName = value.split(".", 1)[0]
+            if nodeName in self.nodes:
+                return Ref(self.nodes[nodeName], value[len(nodeName) + 1:] or None)
+            return value
+        if isinstance(value, (list, tuple)):
+            return [self.to_refs(v) for v in value]
+        if isinstance(value, dict):
+            return {k: self.to_refs(v) for k, v in value.items()}
+        return value
+
+    def _create(self, node_type, name, parent=None):
+        node = super()._create(node_type, name, parent)
+        self.made.append(node)
+        return node
+
+    def connect_attr(self, source, destination, force=True):
+        super().connect_attr(source, destination, force)
+        self.explicit.add((self._plug(source), self._plug(destination)))
+
+    def seed(self, nodes):
+        """
+        Copies nodes from the current scene backend into this scene so the builders can read them
+        :param nodes: list: [name, node type, parent, world matrix, shapes] for each node, parents first
+        """
+        for name, node_type, parent, matrix, shapes in nodes:
+            node = memory.MemoryScene._create(self, node_type, name, self.nodes.get(parent))
+            memory.MemoryScene.set_matrix(self, name, matrix)
+            for shapeName, shapeType in shapes:
+                memory.MemoryScene._create(self, shapeType, shapeName, node)
+        for node in self.nodes.values():
+            self.seeded[node.name] = (node, dict(node.attrs))
+        self.reset_counts()
+
+
+def resolve(value):
+    if isinstance(value, Ref):
+        return value.name()
+    if isinstance(value, list):
+        return [resolve(v) for v in value]
+    if isinstance(value, dict):
+        return {k: resolve(v) for k, v in value.items()}
+    return value
+
+
+def get_refs(value):
+    if isinstance(value, Ref):
+        return [value.node]
+    if isinstance(value, list):
+        return [node for v in value for node in get_refs(v)]
+    if isinstance(value, dict):
+        return [node for v in value.values() for node in get_refs(v)]
+    return []
+
+
+def is_geometry(node):
+    return node.type == "transform" and any(child.type in ["nurbsCurve", "nurbsSurface"] for child in node.children)
+
+
+def get_seed(guides_obj):
+    """
+    Reads the guides a build depends on from the current scene
+    :param guides_obj: obj: the guides object being built
+    :return: list: [name, node type, parent, world matrix, shapes] for the guides and their parents, parents first
+    """
+    nodes = {}
+    for guide in guides_obj.allGuides:
+        node = guide
+        while node is not None and node not in nodes:
+            parent = scene.get_parent(node)
+            shapes = [[shape, scene.node_type(shape)] for shape in scene.get_shapes(node)]
+            nodes[node] = [node, scene.node_type(node), parent,
+                           [round(v, 6) for v in scene.get_matrix(node)], shapes]
+            node = parent
+
+    def depth(item):
+        level, parent = 0, item[2]
+        while parent is not None:
+            level += 1
+            parent = nodes[parent][2] if parent in nodes else None
+        return level
+    return sorted(nodes.values(), key=depth)
+
+
+def get_key(guides_obj, seed, stages, options):
+    settings = {k: v for k, v in sorted(vars(guides_obj).items()) if isinstance(v, (str, int, float, bool))}
+    data = json.dumps([VERSION, settings, seed, list(stages), options], sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+#############
+# Stages
+#############
+
+def build_driver(context, **kwargs):
+    context["driver"] = driver.Build(context["guides"], **kwargs)
+
+
+def build_fkik(context, **kwargs):
+    context["fkik"] = fkik.Build(context["driver"], **kwargs)
+
+
+def build_stretch(context, **kwargs):
+    driverObj = context["driver"]
+    kwargs.setdefault("chain_data", driverObj.chain_data)
+    kwargs.setdefault("curve_data", driverObj.crv_data)
+    context["stretch"] = stretch.Build(driverObj.driver_joints, driverObj.crv, **kwargs)
+
+
+def build_ribbon(context, **kwargs):
+    context["ribbon"] = ribbon.Builder(context["driver"], **kwargs)
+
+
+STAGES = {"driver": build_driver, "fkik": build_fkik, "stretch": build_stretch, "ribbon": build_ribbon}
+
+
+class Plan(object):
+    def __init__(self, ops, key=None):
+        """
+        An ordered list of scene operations that builds part of a rig when applied
+        :param ops: list: the operations (see the module docstring)
+        :param key: str: the fingerprint of the guides and options the plan was compiled from
+        """
+        self.ops = ops
+        self.key = key
+
+    def __len__(self):
+        return len(self.ops)
+
+    def counts(self):
+        """
+        Returns how many operations of each type the plan has
+        :return: dict: operation counts keyed by type
+        """
+        counts = {}
+        for op in self.ops:
+            counts[op[0]] = counts.get(op[0], 0) + 1
+        return counts
+
+    def to_json(self):
+        return json.dumps({"version": VERSION, "key": self.key, "ops": self.ops})
+
+    def lines(self):
+        return [json.dumps(op, sort_keys=True) for op in self.ops]
+
+    def diff(self, other):
+        """
+        Compares this plan with another one
+        :param other: Plan: the plan being compared against
+        :return: str: a unified diff with one operation per line (empty if the plans match)
+        """
+        return "\n".join(difflib.unified_diff(self.lines(), other.lines(), fromfile=self.key or "a",
+                                              tofile=other.key or "b", lineterm=""))
+
+    def save(self, file_path):
+        with open(file_path, "w") as f:
+            f.write(self.to_json())
+
+    def apply(self):
+        """
+        Applies the plan to the current scene. Node creation, plug values and connections are committed in
+        bulk; commands and parenting are run as they come. Commands whose nodes were already in the scene before
+        the plan was applied are skipped, so applying a plan again doesn't duplicate them
+        :return: dict: the planned names of the nodes created by commands mapped to their actual names
+        """
+        names = {}
+        existing = {name for op in self.ops if op[0] == "command" for name in get_made(op) if scene.exists(name)}
+        with scene.building(), scene.transaction():
+            for op in self.ops:
+                if op[0] == "command" and is_applied(op, existing):
+                    names.update({name: name for name in get_planned(op)})
+                    continue
+                APPLY[op[0]](op, names)
+        return names
+
+
+def from_json(text):
+    data = json.loads(text)
+    if data.get("version") != VERSION:
+        return None
+    return Plan(data["ops"], data.get("key"))
+
+
+def load(file_path):
+    """
+    Loads a saved plan
+    :param file_path: str: the plan file
+    :return: Plan: the plan or None if it was saved by a different version
+    """
+    with open(file_path, "r") as f:
+        return from_json(f.read())
+
+
+#############
+# Compiling
+#############
+
+def compile_plan(guides_obj, stages=("driver", "fkik", "ribbon"), options=None, cache=True, cache_dir=None):
+    """
+    Works out the plan that builds a guides object's chain without touching the current scene
+    :param guides_obj: obj: the guides object being built
+    :param stages: list: the build stages to run, in order (see STAGES)
+    :param options: dict: keyword arguments for each stage, keyed by stage name
+    :param cache: bool: whether or not a plan compiled from the same guides and options can be reused
+    :param cache_dir: str: a folder plans are also cached to so they outlive the session
+    :return: Plan: the plan
+    """
+    options = options or {}
+    seed = get_seed(guides_obj)
+    key = get_key(guides_obj, seed, stages, options)
+    if cache:
+        cached = CACHE.get(key)
+        file_path = os.path.join(cache_dir, f"{key}.json") if cache_dir else None
+        if cached is None and file_path and os.path.exists(file_path):
+            cached = load(file_path)
+        if cached is not None:
+            CACHE[key] = cached
+            return cached
+    planScene = PlanScene(scene.maya_version())
+    planScene.seed(seed)
+    previous = scene.set_backend(planScene)
+    try:
+        context = {"guides": guides_obj}
+        for stage in stages:
+            STAGES[stage](context, **options.get(stage, {}))
+    finally:
+        scene.set_backend(previous)
+    result = Plan(compile_scene(planScene), key)
+    if cache:
+        CACHE[key] = result
+        if cache_dir:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+            result.save(os.path.join(cache_dir, f"{key}.json"))
+    return result
+
+
+def compile_scene(plan_scene):
+    """
+    Turns the final state of a recorded scene into plan operations
+    :param plan_scene: PlanScene: the scene the builders ran against
+    :return: list: the operations
+    """
+    ps = plan_scene
+    seeded = set(ps.seeded)
+    alive = [node for name, node in ps.nodes.items() if name not in seeded]
+    entries = {}
+    for node in alive:
+        index = node.data.get("#entry")
+        if index is not None and ps.log[index]["name"] in COMMANDS:
+            entries.setdefault(index, []).append(node)
+    commandNodes = {node for nodes in entries.values() for node in nodes}
+    # Early nodes are created with their final parent; late ones are parented once the commands have run
+    early = []
+
+    def is_early(node):
+        while node is not None:
+            if node.name in seeded:
+                return True
+            if node in commandNodes or (node.is_shape() and is_geometry(node.parent)):
+                return False
+            node = node.parent
+        return True
+    for node in alive:
+        if node not in commandNodes and is_early(node):
+            early.append(node)
+    late = [node for node in alive if node not in commandNodes and node not in early
+            and not (node.is_shape() and is_geometry(node.parent))]
+    ops = []
+    # Nodes
+    for node in sorted(early, key=get_depth):
+        if node.is_shape() and is_geometry(node.parent):
+            continue
+        if is_geometry(node):
+            ops.extend(get_geometry_ops(ps, node))
+            if node.parent is not None:
+                ops.append(["parent", node.name, node.parent.name])
+            continue
+        ops.append(["create", node.type, node.name, node.parent.name if node.parent is not None else None])
+    for node in sorted(late, key=get_depth):
+        if is_geometry(node):
+            ops.extend(get_geometry_ops(ps, node))
+        else:
+            ops.append(["create", node.type, node.name, None])
+    constrained = get_constrained(alive)
+    for node in [ps.nodes[name] for name in seeded] + sorted(early, key=get_depth):
+        ops.extend(get_attr_ops(ps, node, constrained))
+    # Commands, replayed in the order they were made. Blend shape calls that add targets to an existing node
+    # don't make anything so they're kept as long as everything they use is still around
+    for index, entry in enumerate(ps.log):
+        if index in entries or (entry["name"] == "blend_shape" and not entry["nodes"] and all(
+                ps.nodes.get(node.name) is node for node in get_refs(entry["args"]) + get_refs(entry["kwargs"]))):
+            ops.append(get_command_op(ps, entry))
+    # Late nodes go under their parents now that every parent exists
+    for node in sorted(late, key=get_depth):
+        if node.parent is not None:
+            ops.append(["parent", node.name, node.parent.name])
+        ops.extend(get_attr_ops(ps, node, constrained, channels=True))
+    for node in [node for node in alive if node in commandNodes]:
+        if not node.is_shape() and node.parent is not None and node.parent not in commandNodes:
+            ops.append(["parent", node.name, node.parent.name])
+        ops.extend(get_attr_ops(ps, node, constrained))
+    # Connections and locks
+    for source, destination in sorted(ps.explicit, key=lambda c: (c[1][0].name, c[1][1])):
+        if ps.sources.get(destination) != source or source[0].name not in ps.nodes \
+                or destination[0].name not in ps.nodes:
+            continue
+        ops.append(["connect", f"{source[0].name}.{source[1]}", f"{destination[0].name}.{destination[1]}"])
+    for node in alive:
+        if node in commandNodes:
+            continue
+        for attr in sorted(node.locked):
+            ops.append(["lock", f"{node.name}.{attr}"])
+    return ops
+
+
+def get_depth(node):
+    depth = 0
+    while node.parent is not None:
+        depth += 1
+        node = node.parent
+    return depth
+
+
+def get_constrained(nodes):
+    """
+    Returns the channels driven by the constraints in a list of nodes
+    :return: set: (node, attribute) pairs
+    """
+    result = set()
+    for node in nodes:
+        if node.type in CONSTRAINED and node.parent is not None:
+            for channel in CONSTRAINED[node.type]:
+                result.update((node.parent, f"{channel}{axis}") for axis in "XYZ")
+                result.add((node.parent, channel))
+    return result
+
+
+def get_geometry_ops(plan_scene, node):
+    """
+    Returns the commands that rebuild the final curves or surface under a transform
+    """
+    ops = []
+    shapes = [child for child in node.children if child.type in ["nurbsCurve", "nurbsSurface"]]
+    for i, shape in enumerate(shapes):
+        name = node.name if i == 0 else f"{shape.name}_tmp"
+        if shape.type == "nurbsSurface":
+            cvs = shape.data["cvs"]
+            degree = shape.data["degree"]
+            ops.append(["command", "create_nurbs_plane", [name, [0.0, 0.0, 0.0], [0.0, 1.0, 0.0], 1.0, 1.0],
+                        {"degree": degree[0], "patches_u": len(cvs) - degree[0],
+                         "patches_v": len(cvs[0]) - degree[1]}, name, {name: [shape.name]}])
+            ops.append(["points", shape.name, plan_scene._points(shape)])
+        else:
+            ops.append(["command", "create_curve", [name, plan_scene._points(shape)],
+                        {"degree": shape.data["degree"]}, name, {name: [shape.name]}])
+        if i:
+            ops.append(["command", "parent_shape", [shape.name, node.name], {}, None, {}])
+            ops.append(["command", "delete", [name], {}, None, {}])
+    return ops
+
+
+def get_command_op(plan_scene, entry):
+    result = resolve(entry["result"])
+    shapes = {}
+    for name in result if isinstance(result, list) else [result]:
+        if name in plan_scene.nodes:
+            shapes[name] = [shape.name for shape in plan_scene._shapes(plan_scene.nodes[name])]
+    return ["command", entry["name"], resolve(entry["args"]), resolve(entry["kwargs"]), result, shapes]
+
+
+def get_attr_ops(plan_scene, node, constrained, channels=False):
+    """
+    Returns the operations that give a node its final user attributes and values
+    :param node: Node: the node
+    :param constrained: set: the channels driven by constraints, which are left alone
+    :param channels: bool: whether or not to set every transform channel, even the ones at their default
+    """
+    ps = plan_scene
+    ops = []
+    seeded = ps.seeded.get(node.name)
+    commandNode = "#entry" in node.data and ps.log[node.data["#entry"]]["name"] in COMMANDS
+    # Seeded and command made nodes only need the values that changed since they were made
+    initial = seeded[1] if seeded else node.data.get("#initial") if commandNode else None
+    if not commandNode:
+        for name in node.user:
+            if seeded and name in seeded[1]:
+                continue
+            ops.append(["add_attr", node.name, name, dict(node.data.get("attrs", {}).get(name, {}))])
+    geometry = node.type in ["nurbsCurve", "nurbsSurface"]
+    keys = list(node.attrs)
+    if channels and not node.is_shape():
+        keys += [f"{channel}{axis}" for channel in CHANNELS for axis in "XYZ"
+                 if f"{channel}{axis}" not in node.attrs and (channel != "jointOrient" or node.type == "joint")]
+    for attr in keys:
+        if geometry and attr in memory.SHAPEATTRS:
+            continue
+        if (node, attr) in constrained or (node, attr) in ps.sources:
+            continue
+        compound = ps._compound(node, attr)
+        if compound is not None and compound[0] in node.inputs:
+            continue
+        value = node.attrs.get(attr, ps._default(node, attr))
+        if initial is not None:
+            if attr in initial and initial[attr] == value and not attr.startswith(BOUND.get(node.type, "#")):
+                continue
+        elif value == ps._default(node, attr) and attr not in node.user and not (
+                channels and attr[:-1] in CHANNELS):
+            continue
+        ops.append(["set", f"{node.name}.{attr}", value])
+    return ops
+
+
+#############
+# Applying
+#############
+
+def apply_create(op, names):
+    if not scene.exists(op[2]):
+        scene.create_node(op[1], op[2], parent=op[3])
+
+
+def apply_parent(op, names):
+    if scene.get_parent(op[1]) != op[2]:
+        scene.parent(op[1], op[2])
+
+
+def apply_add_attr(op, names):
+    if not scene.exists(f"{op[1]}.{op[2]}"):
+        settings = op[3]
+        scene.add_attr(op[1], op[2], attr_type=settings.get("type", "float"), nice_name=settings.get("nice"),
+                       enum=settings.get("enum"), minimum=settings.get("min"), maximum=settings.get("max"),
+                       keyable=settings.get("keyable", True))
+
+
+def apply_set(op, names):
+    scene.set_attr(op[1], op[2])
+
+
+def apply_points(op, names):
+    scene.set_points(op[1], op[2])
+
+
+def apply_command(op, names):
+    result = getattr(scene, op[1])(*op[2], **op[3])
+    if op[4] is None:
+        return
+    planned = op[4] if isinstance(op[4], list) else [op[4]]
+    made = result if isinstance(result, list) else [result]
+    for name, node in zip(planned, made):
+        if node != name:
+            node = scene.rename(node, name)
+        names[name] = node
+        for shape, shapeName in zip(scene.get_shapes(node) if name in op[5] else [], op[5].get(name, [])):
+            if shape != shapeName:
+                scene.rename(shape, shapeName)
+
+
+def get_planned(op):
+    """
+    Returns the names a command operation gives the nodes it makes
+    """
+    if op[4] is None:
+        return []
+    return op[4] if isinstance(op[4], list) else [op[4]]
+
+
+def get_made(op):
+    """
+    Returns the names of every node and shape a command operation makes
+    """
+    return get_planned(op) + [shape for shapes in op[5].values() for shape in shapes]
+
+
+def is_applied(op, existing):
+    """
+    Returns whether a command operation was applied by an earlier pass. Commands that make nodes were if those
+    nodes already existed (blend shape calls that only add targets return the blend shape they were given, which
+    was made by an earlier pass too), and the commands that swap a curve's extra shapes in are if there's nothing
+    left to swap
+    :param op: list: the command operation
+    :param existing: set: the names of the nodes the plan makes that were in the scene before it was applied
+    """
+    if op[1] == "delete":
+        return not scene.exists(op[2][0])
+    if op[1] == "parent_shape":
+        return not scene.exists(op[2][0]) or scene.get_parent(op[2][0]) == op[2][1]
+    planned = get_planned(op)
+    shapes = [shape for shapes in op[5].values() for shape in shapes]
+    return bool(planned) and all(name in existing for name in planned) or \
+        bool(shapes) and all(shape in existing for shape in shapes)
+
+
+def apply_connect(op, names):
+    scene.connect_attr(op[1], op[2])
+
+
+def apply_lock(op, names):
+    scene.set_attr_state(op[1], lock=True)
+
+
+APPLY = {"create": apply_create, "parent": apply_parent, "add_attr": apply_add_attr, "set": apply_set,
+         "points": apply_points, "command": apply_command, "connect": apply_connect, "lock": apply_lock}
+
+
+def build(guides_objs, stages=("driver", "fkik", "ribbon"), options=None, cache_dir=None):
+    """
+    Compiles and applies the plans of a list of guides objects
+    :param guides_objs: list: the guides objects being built
+    :return: list: the plans that were applied
+    """
+    plans = [compile_plan(guidesObj, stages, options, cache_dir=cache_dir) for guidesObj in guides_objs]
+    with scene.building():
+        for p in plans:
+            p.apply()
+    return plans
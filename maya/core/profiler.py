@@ -0,0 +1,248 @@
+"""
+Opt-in build profiler. Functions marked with the stage decorator are left untouched until profiling is switched
+on, so an unprofiled build runs exactly the same code it always has. While a profile is running every marked
+function is swapped for a timed wrapper and the scene backend active at the time is wrapped with a counter, which
+records nested wall time, scene commands issued and nodes created per stage:
+
+    with profiler.profile() as prof:
+        builder.build_rig()
+    print(prof.format())
+    prof.write_folded("build.folded")   # flamegraph.pl / speedscope compatible
+"""
+import contextlib
+import sys
+import time
+
+from core import scene
+
+
+STAGES = []
+PROFILER = None
+# Scene functions that create nodes and how many nodes they make (lists count their items)
+CREATES = ["create_node", "create_group", "create_joint", "create_locator", "create_curve", "create_circle",
+           "create_nurbs_plane", "duplicate", "point_constraint", "orient_constraint", "scale_constraint",
+           "parent_constraint", "aim_constraint", "ik_handle", "skin_cluster", "cluster", "lattice", "nonlinear",
+           "blend_shape"]
+
+
+def stage(func):
+    """
+    Marks a function or method as a profiling stage. The function itself is returned unchanged; it is only
+    wrapped while a profile is running
+    :param func: the function being marked
+    :return: the same function
+    """
+    STAGES.append(func)
+    return func
+
+
+def get_label(func):
+    module = func.__module__.split(".")[-1]
+    return f"{module}.{func.__qualname__}".replace(".__init__", "")
+
+
+def get_owner(func):
+    """
+    Returns the module or class a marked function is looked up on
+    :param func: the marked function
+    :return: the owner or None if it can't be found
+    """
+    owner = sys.modules.get(func.__module__)
+    for part in func.__qualname__.split(".")[:-1]:
+        if owner is None or part == "<locals>":
+            return None
+        owner = getattr(owner, part, None)
+    return owner
+
+
+class Frame(object):
+    __slots__ = ["name", "calls", "time", "commands", "nodes", "children"]
+
+    def __init__(self, name):
+        """
+        The accumulated measurements of a stage at a single place in the call tree
+        :param name: str: the stage's label
+        """
+        self.name = name
+        self.calls = 0
+        self.time = 0.0
+        self.commands = 0
+        self.nodes = 0
+        self.children = {}
+
+    def child(self, name):
+        frame = self.children.get(name)
+        if frame is None:
+            frame = self.children[name] = Frame(name)
+        return frame
+
+    def total(self, key):
+        return getattr(self, key) + sum(child.total(key) for child in self.children.values())
+
+    def self_time(self):
+        return max(0.0, self.time - sum(child.time for child in self.children.values()))
+
+    def as_dict(self):
+        return {"name": self.name, "calls": self.calls, "time": self.time, "self_time": self.self_time(),
+                "commands": self.commands, "total_commands": self.total("commands"), "nodes": self.nodes,
+                "total_nodes": self.total("nodes"),
+                "children": [child.as_dict() for child in self.children.values()]}
+
+
+class Counter(object):
+    def __init__(self, backend, profiler):
+        """
+        Wraps a scene backend so every command issued through the scene API is counted against the running stage
+        :param backend: the backend being wrapped
+        :param profiler: Profiler: the profiler the counts go to
+        """
+        self.backend = backend
+        for name in scene.API:
+            setattr(self, name, self.counted(name, getattr(backend, name), profiler))
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    @staticmethod
+    def counted(name, method, profiler):
+        def call(*args, **kwargs):
+            result = method(*args, **kwargs)
+            frame = profiler.stack[-1]
+            frame.commands += 1
+            if name == "apply":
+                frame.nodes += len([op for op in args[0] if op[0] == "create_node"])
+            elif name in CREATES:
+                frame.nodes += len(result) if isinstance(result, list) else 1
+            return result
+        call.__name__ = name
+        return call
+
+
+class Profiler(object):
+    def __init__(self, name="build"):
+        """
+        Records the nested timings and scene counts of every marked stage run while it is active
+        :param name: str: the label of the root of the call tree
+        """
+        self.root = Frame(name)
+        self.stack = [self.root]
+        self.patched = []
+        self.backend = None
+        self.start = None
+
+    def enter(self, name):
+        frame = self.stack[-1].child(name)
+        frame.calls += 1
+        self.stack.append(frame)
+        return frame
+
+    def exit(self, frame, elapsed):
+        frame.time += elapsed
+        self.stack.pop()
+
+    def wrap(self, func):
+        label = get_label(func)
+        profiler = self
+
+        def wrapper(*args, **kwargs):
+            frame = profiler.enter(label)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.exit(frame, time.perf_counter() - start)
+        wrapper.__name__ = func.__name__
+        wrapper.__qualname__ = func.__qualname__
+        wrapper.__doc__ = func.__doc__
+        wrapper.__wrapped__ = func
+        return wrapper
+
+    def enable(self):
+        """
+        Swaps every marked function for its timed wrapper and starts counting scene commands
+        """
+        for func in STAGES:
+            owner = get_owner(func)
+            if owner is None or getattr(owner, "__dict__", {}).get(func.__name__) is not func:
+                continue
+            setattr(owner, func.__name__, self.wrap(func))
+            self.patched.append((owner, func))
+        self.backend = scene.set_backend(Counter(scene.get_backend(), self))
+        self.start = time.perf_counter()
+
+    def disable(self):
+        """
+        Puts the original functions and scene backend back
+        """
+        self.root.time += time.perf_counter() - self.start
+        for owner, func in reversed(self.patched):
+            setattr(owner, func.__name__, func)
+        self.patched = []
+        scene.set_backend(self.backend)
+        self.backend = None
+
+    def report(self):
+        """
+        Returns the call tree of the profile
+        :return: dict: nested frames with their calls, times, commands and nodes
+        """
+        return self.root.as_dict()
+
+    def folded(self, metric="time"):
+        """
+        Returns the profile in the folded stack format read by flame graph tools
+        :param metric: str: what the stacks are weighted by; time (microseconds), commands or nodes
+        :return: str: one "root;stage;stage weight" line per stack
+        """
+        lines = []
+
+        def walk(frame, path):
+            path = f"{path};{frame.name}" if path else frame.name
+            if metric == "time":
+                weight = int(round(frame.self_time() * 1e6))
+            else:
+                weight = getattr(frame, metric)
+            if weight:
+                lines.append(f"{path} {weight}")
+            for child in frame.children.values():
+                walk(child, path)
+        walk(self.root, "")
+        return "\n".join(lines)
+
+    def write_folded(self, file_path, metric="time"):
+        with open(file_path, "w") as f:
+            f.write(self.folded(metric) + "\n")
+
+    def format(self):
+        """
+        Returns the profile as an indented table
+        :return: str: the table
+        """
+        lines = [f"{'stage':<60}{'calls':>7}{'time (s)':>11}{'self (s)':>11}{'cmds':>8}{'nodes':>8}"]
+
+        def walk(frame, depth):
+            lines.append(f"{'  ' * depth + frame.name:<60}{frame.calls:>7}{frame.time:>11.4f}"
+                         f"{frame.self_time():>11.4f}{frame.total('commands'):>8}{frame.total('nodes'):>8}")
+            for child in sorted(frame.children.values(), key=lambda c: -c.time):
+                walk(child, depth + 1)
+        walk(self.root, 0)
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile(name="build"):
+    """
+    Profiles the enclosed code. Profiles don't nest; an inner profile just reuses the outer one
+    :param name: str: the label of the root of the call tree
+    """
+    global PROFILER
+    if PROFILER is not None:
+        yield PROFILER
+        return
+    PROFILER = Profiler(name)
+    PROFILER.enable()
+    try:
+        yield PROFILER
+    finally:
+        PROFILER.disable()
+        PROFILER = None
@@ -0,0 +1,219 @@
+import contextlib
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+SESSION = None
+
+
+class Registry(object):
+    def __init__(self):
+        """
+        Caches the nodes looked up or created during a single build session so the make/check helpers don't
+        have to scan the scene by name every time they're called. Entries are stored as MObjectHandles keyed by
+        their hash codes and indexed by short name, so DAG nodes that share a short name under different parents
+        don't overwrite each other; their paths are worked out when they're looked up. The index is kept up to date
+        through node rename and removal callbacks
+        """
+        self.handles = {}
+        self.names = {}
+        self.keys = {}
+        self.callbacks = {}
+        self.depth = 0
+
+    def add(self, node):
+        """
+        Registers a node with the session so later lookups by its name skip the scene scan
+        :param node: str: the node being registered
+        :return: the same node
+        """
+        obj = get_mobject(node)
+        if obj is None:
+            return node
+        handle = om.MObjectHandle(obj)
+        key = handle.hashCode()
+        self.index(key, handle, om.MFnDependencyNode(obj).name())
+        if key not in self.callbacks:
+            self.callbacks[key] = [om.MNodeMessage.addNameChangedCallback(obj, self.renamed),
+                                   om.MNodeMessage.addNodePreRemovalCallback(obj, self.removed)]
+        return node
+
+    def index(self, key, handle, name):
+        """
+        Files a node under its short name, dropping any entry it had under an older one
+        :param key: int: the hash code of the node's handle
+        :param handle: MObjectHandle: the node's handle
+        :param name: str: the node's short name
+        """
+        self.drop(key)
+        self.handles[key] = handle
+        self.names[key] = name
+        self.keys.setdefault(name, set()).add(key)
+
+    def drop(self, key):
+        """
+        Removes a node from the cache
+        :param key: int: the hash code of the node's handle
+        """
+        self.handles.pop(key, None)
+        name = self.names.pop(key, None)
+        if name is not None:
+            self.keys[name].discard(key)
+            if not self.keys[name]:
+                del self.keys[name]
+
+    def clear(self):
+        """
+        Removes every callback the session registered and empties the cache
+        """
+        for ids in self.callbacks.values():
+            om.MMessage.removeCallbacks(ids)
+        self.handles = {}
+        self.names = {}
+        self.keys = {}
+        self.callbacks = {}
+
+    def find(self, name):
+        """
+        Returns the node with a given name, looking in the cache before falling back on a selection list lookup.
+        The name can be a short name or a (partial or full) DAG path, and a short name shared by more than one
+        cached node is treated as ambiguous the same way Maya does
+        :param name: str: the name of the node being queried
+        :return: str: the node or None if it doesn't exist
+        """
+        name = str(name)
+        found = []
+        for key in list(self.keys.get(name.split("|")[-1], [])):
+            handle = self.handles[key]
+            if not handle.isValid():
+                self.drop(key)
+                continue
+            if is_match(handle.object(), name):
+                found.append(handle.object())
+        if len(found) > 1:
+            return None
+        if found:
+            return get_name(found[0])
+        sel = om.MSelectionList()
+        try:
+            sel.add(name)
+        except RuntimeError:
+            return None
+        if sel.length() != 1:
+            return None
+        obj = sel.getDependNode(0)
+        self.add(obj)
+        return get_name(obj)
+
+    def removed(self, obj, client_data):
+        """
+        Callback run before a registered node is deleted that drops it from the cache
+        :param obj: MObject: the node being removed
+        :param client_data: unused callback data
+        """
+        key = om.MObjectHandle(obj).hashCode()
+        self.drop(key)
+        if key in self.callbacks:
+            om.MMessage.removeCallbacks(self.callbacks.pop(key))
+
+    def renamed(self, obj, prev_name, client_data):
+        """
+        Callback run when a registered node is renamed that files it under its new name
+        :param obj: MObject: the node being renamed
+        :param prev_name: str: the name of the node before it was renamed
+        :param client_data: unused callback data
+        """
+        handle = om.MObjectHandle(obj)
+        self.index(handle.hashCode(), handle, om.MFnDependencyNode(obj).name())
+
+
+def get_mobject(node):
+    """
+    Returns the API 2.0 MObject of a given node
+    :param node: str or MObject: the node being queried
+    :return: MObject: the node's MObject or None if it doesn't exist
+    """
+    if isinstance(node, om.MObject):
+        return node
+    sel = om.MSelectionList()
+    try:
+        sel.add(str(node))
+    except RuntimeError:
+        return None
+    return sel.getDependNode(0)
+
+
+def is_match(obj, name):
+    """
+    Checks whether a name picks out a given node: its own name for dependency nodes, or the tail of its full path
+    for DAG nodes (ex: "arm_ctl", "arm_grp|arm_ctl" or "|rig_grp|arm_grp|arm_ctl")
+    :param obj: MObject: the node being checked
+    :param name: str: the name being looked up
+    :return: bool: if the name refers to the node
+    """
+    if not obj.hasFn(om.MFn.kDagNode):
+        return om.MFnDependencyNode(obj).name() == name
+    path = om.MDagPath.getAPathTo(obj).fullPathName()
+    return path == name if name.startswith("|") else path.endswith(f"|{name}")
+
+
+def get_name(obj):
+    """
+    Returns the shortest unique name of a given MObject so no name scan is needed
+    :param obj: MObject: the node being queried
+    :return: str: the node's name
+    """
+    if obj.hasFn(om.MFn.kDagNode):
+        return om.MDagPath.getAPathTo(obj).partialPathName()
+    return om.MFnDependencyNode(obj).name()
+
+
+def add(node):
+    """
+    Registers a newly created node with the current build session (does nothing outside of a session)
+    :param node: str: the node being registered
+    :return: str: the same node
+    """
+    if SESSION is not None:
+        SESSION.add(node)
+    return node
+
+
+def find(name):
+    """
+    Returns the node with a given name, using the current build session's cache if one is running
+    :param name: str: the name of the node being queried
+    :return: str: the node or None if it doesn't exist
+    """
+    if SESSION is not None:
+        return SESSION.find(name)
+    sel = om.MSelectionList()
+    try:
+        sel.add(str(name))
+    except RuntimeError:
+        return None
+    if sel.length() != 1:
+        return None
+    return get_name(sel.getDependNode(0))
+
+
+@contextlib.contextmanager
+def session():
+    """
+    Runs the enclosed code inside a build session. Sessions can be nested; only the outermost one creates
+    and clears the registry
+    """
+    global SESSION
+    if SESSION is None:
+        SESSION = Registry()
+    SESSION.depth += 1
+    try:
+        yield SESSION
+    finally:
+        SESSION.depth -= 1
+        if not SESSION.depth:
+            SESSION.clear()
+            SESSION = None
@@ -0,0 +1,1475 @@
+"""
+Thin scene-access layer used by the builders. Every scene query or edit goes through the functions in this
+module so the builders don't depend on PyMEL and the scene implementation can be swapped out (see set_backend).
+Nodes are passed around as name strings and attributes as "node.attr" plug strings, the same way maya.cmds
+works.
+"""
+import abc
+import contextlib
+
+from core import constants
+
+try:
+    from maya import cmds
+    import maya.api.OpenMaya as om
+except ImportError:
+    cmds = None
+    om = None
+
+
+API = ["exists", "find", "node_type", "list_nodes", "create_node", "create_group", "create_joint",
+       "create_locator", "create_curve", "create_circle", "create_nurbs_plane", "delete", "delete_history",
+       "rename", "duplicate", "get_parent", "get_children", "get_descendants", "get_shapes", "parent",
+       "parent_shape", "get_attr", "set_attr", "set_attr_state", "add_attr", "delete_attr", "list_attrs",
+       "list_indices", "connect_attr", "disconnect_attr", "list_connections", "is_connected", "get_position",
+       "set_position", "get_matrix", "set_matrix", "set_rotation", "move", "set_pivot", "center_pivot",
+       "get_rotate_order", "set_rotate_order", "freeze", "match_transform", "point_constraint",
+       "orient_constraint", "scale_constraint", "parent_constraint", "aim_constraint", "constraint_weights",
+       "ik_handle", "skin_cluster", "cluster", "lattice", "nonlinear", "blend_shape", "blend_shape_targets",
+       "point_on_curve", "rebuild_curve", "get_points", "set_points", "select", "clear_selection", "selected",
+       "maya_version", "warning", "error", "suspend", "resume", "dirty", "new_scene", "set_evaluation", "evaluate",
+       "memory_usage", "apply"]
+
+
+class Scene(abc.ABC):
+    """
+    Describes the scene operations the builders rely on. Backends subclass this and implement every method (a
+    backend that misses one fails as soon as it is created rather than halfway through a build)
+    """
+
+    # Nodes
+    @abc.abstractmethod
+    def exists(self, name):
+        """
+        Returns whether a node or plug with a given name exists
+        :param name: str: the node or plug being queried
+        :return: bool: if it exists
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def find(self, name):
+        """
+        Returns the node with a given name or None if it doesn't exist
+        :param name: str: the name of the node being queried
+        :return: str: the node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def node_type(self, node):
+        """
+        Returns the type of a given node (ex: joint)
+        :param node: str: the node being queried
+        :return: str: the node type
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_nodes(self, node_type=None):
+        """
+        Returns every node in the scene, optionally filtered by type
+        :param node_type: str: the type of node being listed
+        :return: list: the nodes found
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_node(self, node_type, name, parent=None, shading=False):
+        """
+        Creates a node of a given type
+        :param node_type: str: the type of node being created (ex: multMatrix)
+        :param name: str: the name of the node
+        :param parent: str: the parent of the node (DAG nodes only)
+        :param shading: bool: if the node is created as a shading utility node
+        :return: str: the node that was created
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_group(self, name, parent=None):
+        """
+        Creates an empty transform
+        :param name: str: the name of the group
+        :param parent: str: the parent of the group
+        :return: str: the group that was created
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_joint(self, name, position=None, radius=1.0, rotate_order="xyz", parent=None):
+        """
+        Creates a joint at a given world space position
+        :param name: str: the name of the joint
+        :param position: list: the world space position of the joint
+        :param radius: float: the radius of the joint
+        :param rotate_order: str: the rotate order of the joint
+        :param parent: str: the parent of the joint
+        :return: str: the joint that was created
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_locator(self, name):
+        """
+        Creates a space locator
+        :param name: str: the name of the locator
+        :return: str: the locator's transform
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_curve(self, name, points, degree=1):
+        """
+        Creates a NURBS curve with control points at the given positions
+        :param name: str: the name of the curve
+        :param points: list: the control point positions
+        :param degree: int: the degree of the curve
+        :return: str: the curve's transform
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_circle(self, name, normal=(0, 1, 0), radius=1.0, center=(0, 0, 0)):
+        """
+        Creates a NURBS circle
+        :param name: str: the name of the circle
+        :param normal: list: the normal of the circle
+        :param radius: float: the radius of the circle
+        :param center: list: the center of the circle
+        :return: str: the circle's transform
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def create_nurbs_plane(self, name, pivot, axis, width, length_ratio, degree=3, patches_u=1, patches_v=1):
+        """
+        Creates a NURBS plane without construction history
+        :param name: str: the name of the plane
+        :param pivot: list: the pivot of the plane
+        :param axis: list: the normal axis of the plane
+        :param width: float: the width of the plane
+        :param length_ratio: float: the length to width ratio of the plane
+        :param degree: int: the degree of the surface
+        :param patches_u: int: the number of patches in U
+        :param patches_v: int: the number of patches in V
+        :return: str: the plane's transform
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete(self, nodes):
+        """
+        Deletes a node or list of nodes
+        :param nodes: str or list: the nodes being deleted
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_history(self, node):
+        """
+        Deletes the construction history of a given node
+        :param node: str: the node being cleaned up
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rename(self, node, name):
+        """
+        Renames a node
+        :param node: str: the node being renamed
+        :param name: str: the new name
+        :return: str: the node's new name
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def duplicate(self, node, name, parent_only=False):
+        """
+        Duplicates a node
+        :param node: str: the node being duplicated
+        :param name: str: the name of the duplicate
+        :param parent_only: bool: only duplicate the given node and none of its children
+        :return: str: the duplicate
+        """
+        raise NotImplementedError
+
+    # Hierarchy
+    @abc.abstractmethod
+    def get_parent(self, node):
+        """
+        Returns the parent of a given node
+        :param node: str: the node being queried
+        :return: str: the parent or None if the node is parented to the world
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_children(self, node, node_type=None):
+        """
+        Returns the child transforms of a given node (shapes are not included)
+        :param node: str: the node being queried
+        :param node_type: str: only return children of this type
+        :return: list: the children
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_descendants(self, node, node_type=None):
+        """
+        Returns every transform below a given node ordered from the top of the hierarchy down
+        :param node: str: the node being queried
+        :param node_type: str: only return descendants of this type
+        :return: list: the descendants
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_shapes(self, node):
+        """
+        Returns the shape nodes of a given transform
+        :param node: str: the transform being queried
+        :return: list: the shapes
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def parent(self, nodes, parent=None):
+        """
+        Parents a node or list of nodes to a given parent, or to the world if no parent is given
+        :param nodes: str or list: the nodes being parented
+        :param parent: str: the new parent
+        :return: list: the nodes that were parented
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def parent_shape(self, shape, transform):
+        """
+        Moves a shape node under a different transform without changing its local position
+        :param shape: str: the shape being moved
+        :param transform: str: the new transform
+        """
+        raise NotImplementedError
+
+    # Attributes
+    @abc.abstractmethod
+    def get_attr(self, plug):
+        """
+        Returns the value of a given plug
+        :param plug: str: the plug being queried
+        :return: the value of the plug
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_attr(self, plug, value):
+        """
+        Sets the value of a given plug. Lists set compound and matrix attributes
+        :param plug: str: the plug being set
+        :param value: the value being set
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_attr_state(self, plug, lock=None, keyable=None, channel_box=None):
+        """
+        Sets the lock, keyable and channel box state of a plug
+        :param plug: str: the plug being edited
+        :param lock: bool: whether or not the plug is locked
+        :param keyable: bool: whether or not the plug is keyable
+        :param channel_box: bool: whether or not the plug shows in the channel box
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def add_attr(self, node, name, attr_type="float", nice_name=None, enum=None, default=None,
+                 minimum=None, maximum=None, keyable=True):
+        """
+        Adds a user defined attribute to a given node
+        :param node: str: the node receiving the attribute
+        :param name: str: the long name of the attribute
+        :param attr_type: str: the type of attribute (ex: float, enum)
+        :param nice_name: str: the name displayed in the channel box
+        :param enum: str: the enum names (enum attributes only)
+        :param default: the default value
+        :param minimum: the minimum value
+        :param maximum: the maximum value
+        :param keyable: bool: whether or not the attribute is keyable
+        :return: str: the plug that was created
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_attr(self, plug):
+        """
+        Deletes a user defined attribute
+        :param plug: str: the plug being deleted
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_attrs(self, node, user_defined=True):
+        """
+        Returns the attributes on a given node
+        :param node: str: the node being queried
+        :param user_defined: bool: only return user defined attributes
+        :return: list: the attribute names
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_indices(self, plug):
+        """
+        Returns the indices of the elements of a multi attribute that are set or connected
+        :param plug: str: the multi attribute being queried (ex: "node.matrixIn")
+        :return: list: the sorted element indices
+        """
+        raise NotImplementedError
+
+    # Connections
+    @abc.abstractmethod
+    def connect_attr(self, source, destination, force=True):
+        """
+        Connects a source plug to a destination plug
+        :param source: str: the source plug
+        :param destination: str: the destination plug
+        :param force: bool: break any existing incoming connection to the destination
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def disconnect_attr(self, source, destination):
+        """
+        Disconnects two plugs
+        :param source: str: the source plug
+        :param destination: str: the destination plug
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def list_connections(self, plug, source=True, destination=True, plugs=True, pairs=False):
+        """
+        Returns the connections of a given plug or node
+        :param plug: str: the plug or node being queried
+        :param source: bool: include incoming connections
+        :param destination: bool: include outgoing connections
+        :param plugs: bool: return the connected plugs rather than nodes
+        :param pairs: bool: return (source plug, destination plug) tuples of every connection instead
+        :return: list: the connected plugs or nodes
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def is_connected(self, source, destination):
+        """
+        Returns whether two plugs are connected
+        :param source: str: the source plug
+        :param destination: str: the destination plug
+        :return: bool: if they are connected
+        """
+        raise NotImplementedError
+
+    # Transforms
+    @abc.abstractmethod
+    def get_position(self, node, world=True):
+        """
+        Returns the rotate pivot position of a given node or the position of a given component
+        :param node: str: the node or component being queried
+        :param world: bool: return the world space position
+        :return: list: the position
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_position(self, node, position, world=False):
+        """
+        Moves a given node to a position
+        :param node: str: the node being moved
+        :param position: list: the position
+        :param world: bool: whether the position is in world space
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_matrix(self, node, world=True):
+        """
+        Returns the transformation matrix of a given node
+        :param node: str: the node being queried
+        :param world: bool: return the world matrix rather than the local matrix
+        :return: list: the 16 values of the matrix
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_matrix(self, node, matrix, world=True):
+        """
+        Sets the transformation matrix of a given node
+        :param node: str: the node being edited
+        :param matrix: list: the 16 values of the matrix
+        :param world: bool: whether the matrix is in world space
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_rotation(self, node, rotation, world=False):
+        """
+        Sets the rotation of a given node
+        :param node: str: the node being rotated
+        :param rotation: list: the rotation in degrees
+        :param world: bool: whether the rotation is in world space
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def move(self, node, vector, relative=False, object_space=False, pivot=False, axes=None):
+        """
+        Moves a node or component
+        :param node: str: the node or component being moved
+        :param vector: list: the move values
+        :param relative: bool: move relative to the current position
+        :param object_space: bool: move in object space
+        :param pivot: bool: move the node so its rotate pivot ends up at the given position
+        :param axes: str: only move along these world axes, with one vector value per axis (ex: "XZ")
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_pivot(self, node, position, world=True):
+        """
+        Sets the rotate and scale pivots of a given node
+        :param node: str: the node being edited
+        :param position: list: the pivot position
+        :param world: bool: whether the position is in world space
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def center_pivot(self, node):
+        """
+        Centers the pivots of a given node on its bounding box
+        :param node: str: the node being edited
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_rotate_order(self, node):
+        """
+        Returns the rotate order of a given node in uppercase (ex: XYZ)
+        :param node: str: the node being queried
+        :return: str: the rotate order
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_rotate_order(self, node, rotate_order, preserve=True):
+        """
+        Sets the rotate order of a given node
+        :param node: str: the node being edited
+        :param rotate_order: str: the rotate order (ex: xyz)
+        :param preserve: bool: keep the node's orientation
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def freeze(self, node, translate=True, rotate=True, scale=True, normal=0):
+        """
+        Freezes the transforms of a given node (makeIdentity -apply)
+        :param node: str: the node being frozen
+        :param translate: bool: freeze translation
+        :param rotate: bool: freeze rotation
+        :param scale: bool: freeze scale
+        :param normal: int: the normal mode used on shapes
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def match_transform(self, node, target):
+        """
+        Matches the world transform of a node to a target
+        :param node: str: the node being moved
+        :param target: str: the node being matched
+        """
+        raise NotImplementedError
+
+    # Constraints and deformers
+    @abc.abstractmethod
+    def point_constraint(self, drivers, driven, maintain_offset=False):
+        """
+        Creates a point constraint
+        :param drivers: str or list: the driver nodes
+        :param driven: str: the driven node
+        :param maintain_offset: bool: whether or not to preserve the offset of the driven node
+        :return: str: the constraint node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def orient_constraint(self, drivers, driven, maintain_offset=False):
+        """
+        Creates an orient constraint
+        :param drivers: str or list: the driver nodes
+        :param driven: str: the driven node
+        :param maintain_offset: bool: whether or not to preserve the offset of the driven node
+        :return: str: the constraint node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def scale_constraint(self, drivers, driven, maintain_offset=False):
+        """
+        Creates a scale constraint
+        :param drivers: str or list: the driver nodes
+        :param driven: str: the driven node
+        :param maintain_offset: bool: whether or not to preserve the offset of the driven node
+        :return: str: the constraint node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def parent_constraint(self, drivers, driven, maintain_offset=False):
+        """
+        Creates a parent constraint
+        :param drivers: str or list: the driver nodes
+        :param driven: str: the driven node
+        :param maintain_offset: bool: whether or not to preserve the offset of the driven node
+        :return: str: the constraint node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def aim_constraint(self, drivers, driven, aim, up, world_up_type="vector", world_up_object=None,
+                       world_up_vector=(0, 1, 0)):
+        """
+        Creates an aim constraint
+        :param drivers: str or list: the nodes being aimed at
+        :param driven: str: the node being aimed
+        :param aim: list: the aim vector
+        :param up: list: the up vector
+        :param world_up_type: str: "vector" or "object"
+        :param world_up_object: str: the world up object (object world up type only)
+        :param world_up_vector: list: the world up vector
+        :return: str: the constraint node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def constraint_weights(self, constraint):
+        """
+        Returns the driver weight plugs of a given constraint in driver order
+        :param constraint: str: the constraint being queried
+        :return: list: the weight plugs
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def ik_handle(self, name, start, end, solver="ikRPsolver", curve=None):
+        """
+        Creates an IK handle
+        :param name: str: the name of the handle
+        :param start: str: the start joint
+        :param end: str: the end joint
+        :param solver: str: the IK solver type
+        :param curve: str: the curve used by a spline solver
+        :return: list: the handle and end effector
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def skin_cluster(self, joints, node, name):
+        """
+        Skins a node to a list of joints
+        :param joints: list: the influence joints
+        :param node: str: the node being skinned
+        :param name: str: the name of the skin cluster
+        :return: str: the skin cluster
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def cluster(self, component, name):
+        """
+        Creates a cluster deformer on a given component
+        :param component: str: the component being deformed (ex: crv.cv[0])
+        :param name: str: the name of the cluster
+        :return: list: the cluster deformer and its handle
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lattice(self, node, divisions, object_centered=True):
+        """
+        Creates a lattice deformer on a given node
+        :param node: str: the node being deformed
+        :param divisions: list: the S, T, U divisions of the lattice
+        :param object_centered: bool: center the lattice on the node
+        :return: list: the ffd deformer, the lattice and the base lattice
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def nonlinear(self, node, deformer_type):
+        """
+        Creates a nonLinear deformer on a given node
+        :param node: str: the node being deformed
+        :param deformer_type: str: the deformer type (ex: sine)
+        :return: list: the deformer and its handle
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def blend_shape(self, source, target, name=None, index=None, weight=1.0):
+        """
+        Creates a front of chain blendShape, or adds a target to an existing one when an index is given
+        :param source: str: the target shape doing the deforming
+        :param target: str: the base shape being deformed
+        :param name: str: the name of the blendShape node
+        :param index: int: the target index when adding to an existing blendShape
+        :param weight: float: the weight of the added target
+        :return: str: the blendShape node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def blend_shape_targets(self, target):
+        """
+        Returns the blendShape targets applied to a given base shape
+        :param target: str: the base shape being queried
+        :return: list: the target names
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def point_on_curve(self, curve, parameter, percentage=True):
+        """
+        Returns the world space position of a point on a curve
+        :param curve: str: the curve being queried
+        :param parameter: float: the parameter of the point
+        :param percentage: bool: whether the parameter is a percentage of the curve's parameter range
+        :return: list: the position
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def rebuild_curve(self, curve, spans):
+        """
+        Rebuilds a curve with a given number of spans
+        :param curve: str: the curve being rebuilt
+        :param spans: int: the number of spans
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_points(self, node):
+        """
+        Returns the object space control points of a curve or surface. Surface points are returned in u-major
+        order (every v point of the first u row, then the next row)
+        :param node: str: the curve or surface (or its transform) being queried
+        :return: list: the point positions
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_points(self, node, points):
+        """
+        Moves every control point of a curve or surface in one edit
+        :param node: str: the curve or surface (or its transform) being edited
+        :param points: list: the object space point positions in the same order get_points returns them
+        """
+        raise NotImplementedError
+
+    # Session
+    @abc.abstractmethod
+    def select(self, nodes):
+        """
+        Replaces the selection with a given node or list of nodes
+        :param nodes: str or list: the nodes being selected
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def clear_selection(self):
+        """
+        Clears the selection
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def selected(self, node_type=None):
+        """
+        Returns the selected nodes
+        :param node_type: str: only return selected nodes of this type
+        :return: list: the selected nodes
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def maya_version(self):
+        """
+        Returns the major version of Maya
+        :return: int: the version
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def warning(self, message):
+        """
+        Displays a warning
+        :param message: str: the warning
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def error(self, message):
+        """
+        Displays an error and stops the build
+        :param message: str: the error
+        :raises: RuntimeError
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def suspend(self, undo=True):
+        """
+        Puts the scene into a state suited to building a rig: edits are grouped into a single undo chunk (or not
+        recorded at all), the viewport stops refreshing and graph evaluation falls back to the DG
+        :param undo: bool: whether or not the build can be undone in one step; undo is switched off otherwise
+        :return: the state needed to resume the scene
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def resume(self, state):
+        """
+        Restores the scene state saved by suspend
+        :param state: the state returned by suspend
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def dirty(self):
+        """
+        Marks every plug in the scene dirty so the next query evaluates the graph again
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def new_scene(self):
+        """
+        Throws away everything in the scene (unsaved changes included) and starts an empty one
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_evaluation(self, mode):
+        """
+        Sets how the graph is evaluated: "off" evaluates it through the DG one plug at a time, "serial" and
+        "parallel" through the evaluation manager
+        :param mode: str: the evaluation mode
+        :return: str: the previous evaluation mode
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def evaluate(self, nodes):
+        """
+        Evaluates the whole graph again the way playback does (with the current evaluation mode) and returns the
+        world matrices of the given nodes
+        :param nodes: list: the nodes being queried
+        :return: list: the world matrix of each node
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def memory_usage(self):
+        """
+        Returns the memory the scene currently holds
+        :return: int: the bytes in use
+        """
+        raise NotImplementedError
+
+    # Batching
+    def apply(self, ops):
+        """
+        Runs a list of queued operations. Each operation is a tuple of an API method name followed by its
+        arguments (ex: ("connect_attr", "a.output", "b.input", True)). Backends override this to commit the
+        whole list in one go
+        :param ops: list: the operations being run
+        :return: dict: the requested names of the created nodes mapped to their actual names
+        """
+        names = {}
+        for op in ops:
+            result = getattr(self, op[0])(*op[1:])
+            if op[0] == "create_node":
+                names[op[2]] = result
+        return names
+
+
+class MayaScene(Scene):
+    """
+    Scene backend built on maya.cmds and the maya.api.OpenMaya API
+    """
+    def __init__(self):
+        from core import registry
+        self.registry = registry
+
+    # Nodes
+    def exists(self, name):
+        return cmds.objExists(name)
+
+    def find(self, name):
+        return self.registry.find(name)
+
+    def node_type(self, node):
+        return cmds.nodeType(node)
+
+    def list_nodes(self, node_type=None):
+        if node_type is None:
+            return cmds.ls() or []
+        return cmds.ls(type=node_type) or []
+
+    def create_node(self, node_type, name, parent=None, shading=False):
+        if shading:
+            node = cmds.shadingNode(node_type, n=name, au=1)
+        elif parent is not None:
+            node = cmds.createNode(node_type, n=name, p=parent, ss=1)
+        else:
+            node = cmds.createNode(node_type, n=name, ss=1)
+        return self.registry.add(node)
+
+    def create_group(self, name, parent=None):
+        if parent is not None:
+            return self.registry.add(cmds.group(n=name, em=1, p=parent))
+        return self.registry.add(cmds.group(n=name, em=1))
+
+    def create_joint(self, name, position=None, radius=1.0, rotate_order="xyz", parent=None):
+        cmds.select(cl=1)
+        if position is None:
+            position = [0.0, 0.0, 0.0]
+        jnt = cmds.joint(n=name, p=position, roo=rotate_order.lower(), rad=radius)
+        if parent is not None:
+            jnt = cmds.parent(jnt, parent)[0]
+        return self.registry.add(jnt)
+
+    def create_locator(self, name):
+        return self.registry.add(cmds.spaceLocator(n=name)[0])
+
+    def create_curve(self, name, points, degree=1):
+        return self.registry.add(cmds.curve(n=name, d=degree, p=[list(p) for p in points]))
+
+    def create_circle(self, name, normal=(0, 1, 0), radius=1.0, center=(0, 0, 0)):
+        return self.registry.add(cmds.circle(n=name, nr=list(normal), r=radius, c=list(center), ch=0)[0])
+
+    def create_nurbs_plane(self, name, pivot, axis, width, length_ratio, degree=3, patches_u=1, patches_v=1):
+        return self.registry.add(cmds.nurbsPlane(n=name, p=list(pivot), ax=list(axis), w=width, lr=length_ratio,
+                                                 d=degree, u=patches_u, v=patches_v, ch=0)[0])
+
+    def delete(self, nodes):
+        if nodes:
+            cmds.delete(nodes)
+
+    def delete_history(self, node):
+        cmds.delete(node, ch=1)
+
+    def rename(self, node, name):
+        return cmds.rename(node, name)
+
+    def duplicate(self, node, name, parent_only=False):
+        return self.registry.add(cmds.duplicate(node, n=name, po=parent_only)[0])
+
+    # Hierarchy
+    def get_parent(self, node):
+        parent = cmds.listRelatives(node, p=1)
+        if not parent:
+            return None
+        return parent[0]
+
+    def get_children(self, node, node_type=None):
+        children = cmds.listRelatives(node, c=1) or []
+        shapes = set(cmds.listRelatives(node, s=1) or [])
+        return [child for child in children
+                if child not in shapes and (node_type is None or cmds.nodeType(child) == node_type)]
+
+    def get_descendants(self, node, node_type=None):
+        if node_type is not None:
+            return list(reversed(cmds.listRelatives(node, ad=1, type=node_type) or []))
+        descendants = cmds.listRelatives(node, ad=1) or []
+        shapes = set(cmds.ls(descendants, s=1))
+        return [desc for desc in reversed(descendants) if desc not in shapes]
+
+    def get_shapes(self, node):
+        return cmds.listRelatives(node, s=1) or []
+
+    def parent(self, nodes, parent=None):
+        if isinstance(nodes, str):
+            nodes = [nodes]
+        # Like PyMEL, skip nodes that are already children of the new parent rather than erroring
+        target = cmds.ls(parent, l=1)[0] if parent is not None else None
+        nodes = [node for node in nodes if (cmds.listRelatives(node, p=1, f=1) or [None])[0] != target]
+        if not nodes:
+            return []
+        if parent is None:
+            return cmds.parent(nodes, w=1)
+        return cmds.parent(nodes, parent)
+
+    def parent_shape(self, shape, transform):
+        cmds.parent(shape, transform, r=1, s=1)
+
+    # Attributes
+    def get_attr(self, plug):
+        value = cmds.getAttr(plug)
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], tuple):
+            return list(value[0])
+        return value
+
+    def set_attr(self, plug, value):
+        if isinstance(value, str):
+            cmds.setAttr(plug, value, type="string")
+        elif isinstance(value, (list, tuple)) and len(value) == 16:
+            cmds.setAttr(plug, *value, type="matrix")
+        elif isinstance(value, (list, tuple)):
+            cmds.setAttr(plug, *value)
+        else:
+            cmds.setAttr(plug, value)
+
+    def set_attr_state(self, plug, lock=None, keyable=None, channel_box=None):
+        kwargs = {}
+        if lock is not None:
+            kwargs["lock"] = lock
+        if keyable is not None:
+            kwargs["keyable"] = keyable
+        if channel_box is not None:
+            kwargs["channelBox"] = channel_box
+        cmds.setAttr(plug, **kwargs)
+
+    def add_attr(self, node, name, attr_type="float", nice_name=None, enum=None, default=None,
+                 minimum=None, maximum=None, keyable=True):
+        kwargs = {"ln": name, "k": keyable}
+        if attr_type == "string":
+            kwargs["dt"] = attr_type
+        else:
+            kwargs["at"] = attr_type
+        if nice_name is not None:
+            kwargs["nn"] = nice_name
+        if enum is not None:
+            kwargs["en"] = enum
+        if default is not None:
+            kwargs["dv"] = default
+        if minimum is not None:
+            kwargs["min"] = minimum
+        if maximum is not None:
+            kwargs["max"] = maximum
+        cmds.addAttr(node, **kwargs)
+        return f"{node}.{name}"
+
+    def delete_attr(self, plug):
+        cmds.deleteAttr(plug)
+
+    def list_attrs(self, node, user_defined=True):
+        return cmds.listAttr(node, ud=user_defined) or []
+
+    def list_indices(self, plug):
+        return sorted(cmds.getAttr(plug, mi=1) or [])
+
+    # Connections
+    def connect_attr(self, source, destination, force=True):
+        cmds.connectAttr(source, destination, f=force)
+
+    def disconnect_attr(self, source, destination):
+        cmds.disconnectAttr(source, destination)
+
+    def list_connections(self, plug, source=True, destination=True, plugs=True, pairs=False):
+        if not pairs:
+            return cmds.listConnections(plug, s=source, d=destination, p=plugs) or []
+        # With connections on, the results alternate between the queried plug and the plug it connects to
+        result = []
+        if source:
+            found = cmds.listConnections(plug, s=1, d=0, p=1, c=1) or []
+            result.extend((found[i + 1], found[i]) for i in range(0, len(found), 2))
+        if destination:
+            found = cmds.listConnections(plug, s=0, d=1, p=1, c=1) or []
+            result.extend((found[i], found[i + 1]) for i in range(0, len(found), 2))
+        return result
+
+    def is_connected(self, source, destination):
+        return cmds.isConnected(source, destination)
+
+    # Transforms
+    def get_position(self, node, world=True):
+        if "." in node:
+            return cmds.xform(node, q=1, ws=world, os=not world, t=1)
+        return cmds.xform(node, q=1, ws=world, os=not world, rp=1)
+
+    def set_position(self, node, position, world=False):
+        cmds.xform(node, t=list(position), ws=world)
+
+    def get_matrix(self, node, world=True):
+        return cmds.xform(node, q=1, m=1, ws=world, os=not world)
+
+    def set_matrix(self, node, matrix, world=True):
+        cmds.xform(node, m=list(matrix), ws=world, os=not world)
+
+    def set_rotation(self, node, rotation, world=False):
+        cmds.xform(node, ro=list(rotation), ws=world, os=not world)
+
+    def move(self, node, vector, relative=False, object_space=False, pivot=False, axes=None):
+        kwargs = {"r": relative, "os": object_space, "ws": not object_space and not relative}
+        if pivot:
+            kwargs["rpr"] = 1
+        if axes is not None:
+            kwargs[axes.lower()] = 1
+        cmds.move(*vector, node, **kwargs)
+
+    def set_pivot(self, node, position, world=True):
+        cmds.xform(node, piv=list(position), ws=world)
+
+    def center_pivot(self, node):
+        cmds.xform(node, cp=1)
+
+    def get_rotate_order(self, node):
+        return constants.ROTATEORDER[cmds.getAttr(f"{node}.rotateOrder")].upper()
+
+    def set_rotate_order(self, node, rotate_order, preserve=True):
+        cmds.xform(node, roo=rotate_order.lower(), p=preserve)
+
+    def freeze(self, node, translate=True, rotate=True, scale=True, normal=0):
+        cmds.makeIdentity(node, a=1, t=translate, r=rotate, s=scale, n=normal)
+
+    def match_transform(self, node, target):
+        cmds.matchTransform(node, target)
+
+    # Constraints and deformers
+    def point_constraint(self, drivers, driven, maintain_offset=False):
+        return cmds.pointConstraint(drivers, driven, mo=maintain_offset)[0]
+
+    def orient_constraint(self, drivers, driven, maintain_offset=False):
+        return cmds.orientConstraint(drivers, driven, mo=maintain_offset)[0]
+
+    def scale_constraint(self, drivers, driven, maintain_offset=False):
+        return cmds.scaleConstraint(drivers, driven, mo=maintain_offset)[0]
+
+    def parent_constraint(self, drivers, driven, maintain_offset=False):
+        return cmds.parentConstraint(drivers, driven, mo=maintain_offset)[0]
+
+    def aim_constraint(self, drivers, driven, aim, up, world_up_type="vector", world_up_object=None,
+                       world_up_vector=(0, 1, 0)):
+        if world_up_type == "object":
+            return cmds.aimConstraint(drivers, driven, aim=list(aim), u=list(up), wut="object",
+                                      wuo=world_up_object)[0]
+        return cmds.aimConstraint(drivers, driven, aim=list(aim), u=list(up), wut="vector",
+                                  wu=list(world_up_vector))[0]
+
+    def constraint_weights(self, constraint):
+        const_cmd = getattr(cmds, cmds.nodeType(constraint))
+        aliases = const_cmd(constraint, q=1, wal=1) or []
+        return [f"{constraint}.{alias}" for alias in aliases]
+
+    def ik_handle(self, name, start, end, solver="ikRPsolver", curve=None):
+        if curve is not None:
+            return cmds.ikHandle(n=name, sj=start, ee=end, sol=solver, c=curve, ccv=0, pcv=0)
+        return cmds.ikHandle(n=name, sj=start, ee=end, sol=solver)
+
+    def skin_cluster(self, joints, node, name):
+        return cmds.skinCluster(joints, node, n=name, tsb=True, bm=0, sm=0, nw=1)[0]
+
+    def cluster(self, component, name):
+        return cmds.cluster(component, n=name)
+
+    def lattice(self, node, divisions, object_centered=True):
+        return cmds.lattice(node, dv=list(divisions), oc=object_centered, foc=1)
+
+    def nonlinear(self, node, deformer_type):
+        return cmds.nonLinear(node, typ=deformer_type)
+
+    def blend_shape(self, source, target, name=None, index=None, weight=1.0):
+        if index is not None:
+            cmds.blendShape(name, e=1, t=(target, index, source, weight))
+            return name
+        return cmds.blendShape(source, target, n=name, foc=1)[0]
+
+    def blend_shape_targets(self, target):
+        return cmds.blendShape(target, q=1, t=1) or []
+
+    def point_on_curve(self, curve, parameter, percentage=True):
+        return cmds.pointOnCurve(curve, pr=parameter, top=percentage)
+
+    def rebuild_curve(self, curve, spans):
+        cmds.rebuildCurve(curve, s=spans)
+
+    def get_points(self, node):
+        fn = self.get_geometry(node)
+        return [[p.x, p.y, p.z] for p in fn.cvPositions(om.MSpace.kObject)]
+
+    def set_points(self, node, points):
+        fn = self.get_geometry(node)
+        fn.setCVPositions([om.MPoint(*p) for p in points], om.MSpace.kObject)
+        if isinstance(fn, om.MFnNurbsSurface):
+            fn.updateSurface()
+        else:
+            fn.updateCurve()
+
+    # Session
+    def select(self, nodes):
+        cmds.select(nodes, r=1)
+
+    def clear_selection(self):
+        cmds.select(cl=1)
+
+    def selected(self, node_type=None):
+        if node_type is None:
+            return cmds.ls(sl=1) or []
+        return cmds.ls(sl=1, type=node_type) or []
+
+    def maya_version(self):
+        return int(cmds.about(majorVersion=1))
+
+    def warning(self, message):
+        cmds.warning(message)
+
+    def error(self, message):
+        cmds.error(message)
+
+    def suspend(self, undo=True):
+        state = {"chunk": undo, "undo": cmds.undoInfo(q=1, state=1),
+                 "evaluation": cmds.evaluationManager(q=1, mode=1)[0]}
+        if undo:
+            cmds.undoInfo(openChunk=1, chunkName="skwerl_build")
+        else:
+            cmds.undoInfo(stateWithoutFlush=0)
+        cmds.refresh(suspend=1)
+        cmds.evaluationManager(mode="off")
+        return state
+
+    def resume(self, state):
+        # Restore in the reverse order everything was suspended in
+        cmds.evaluationManager(mode=state["evaluation"])
+        cmds.refresh(suspend=0)
+        if state["chunk"]:
+            cmds.undoInfo(closeChunk=1)
+        else:
+            cmds.undoInfo(stateWithoutFlush=state["undo"])
+
+    def dirty(self):
+        cmds.dgdirty(a=1)
+
+    def new_scene(self):
+        cmds.file(new=1, force=1)
+
+    def set_evaluation(self, mode):
+        previous = cmds.evaluationManager(q=1, mode=1)[0]
+        cmds.evaluationManager(mode=mode)
+        return previous
+
+    def evaluate(self, nodes):
+        # Forcing a time update after dirtying everything has the evaluation manager run its whole graph
+        cmds.dgdirty(a=1)
+        cmds.currentTime(cmds.currentTime(q=1), update=1)
+        return [cmds.getAttr(f"{node}.worldMatrix[0]") for node in nodes]
+
+    def memory_usage(self):
+        return int(cmds.memory(heapMemory=1, megaByte=1) * 1024 * 1024)
+
+    # Batching
+    def apply(self, ops):
+        # Nodes are created and named in a first pass so the plugs of the second pass can be looked up
+        mod = om.MDagModifier()
+        created = {}
+        for op in [op for op in ops if op[0] == "create_node"]:
+            node_type, name, parent = op[1], op[2], op[3] if len(op) > 3 else None
+            if parent is not None:
+                parent = created[parent] if parent in created else self.registry.get_mobject(parent)
+                obj = mod.createNode(node_type, parent)
+            elif "dagNode" in (cmds.nodeType(node_type, isTypeName=1, inherited=1) or []):
+                obj = mod.createNode(node_type)
+            else:
+                obj = om.MDGModifier.createNode(mod, node_type)
+            mod.renameNode(obj, name)
+            created[name] = obj
+        mod.doIt()
+        names = {}
+        for name, obj in created.items():
+            names[name] = self.registry.get_name(obj)
+            self.registry.add(obj)
+        # Connections and plug values
+        mod = om.MDagModifier()
+        sources = {}
+        for op in [op for op in ops if op[0] != "create_node"]:
+            if op[0] == "connect_attr":
+                src, dst = self.get_plug(op[1]), self.get_plug(op[2])
+                current = sources.get(op[2], dst.source())
+                if not current.isNull:
+                    if current == src:
+                        continue
+                    if len(op) > 3 and not op[3]:
+                        raise RuntimeError(f"{op[2]} is already connected")
+                    mod.disconnect(current, dst)
+                mod.connect(src, dst)
+                sources[op[2]] = src
+            elif op[0] == "disconnect_attr":
+                mod.disconnect(self.get_plug(op[1]), self.get_plug(op[2]))
+                sources[op[2]] = om.MPlug()
+            elif op[0] == "set_attr":
+                plug = self.get_plug(op[1])
+                if plug.isLocked:
+                    # Match setAttr, which refuses to edit locked plugs
+                    cmds.warning(f"{op[1]} is locked and can't be set")
+                    continue
+                self.set_plug(mod, plug, op[2])
+            else:
+                mod.doIt()
+                mod = om.MDagModifier()
+                getattr(self, op[0])(*op[1:])
+        mod.doIt()
+        return names
+
+    def get_geometry(self, node):
+        """
+        Returns the API 2.0 function set of a NURBS curve or surface
+        :param node: str: the shape or its transform
+        :return: MFnNurbsCurve or MFnNurbsSurface: the function set
+        """
+        sel = om.MSelectionList()
+        sel.add(node)
+        dag = sel.getDagPath(0)
+        if not dag.node().hasFn(om.MFn.kShape):
+            dag.extendToShape()
+        if dag.node().hasFn(om.MFn.kNurbsSurface):
+            return om.MFnNurbsSurface(dag)
+        return om.MFnNurbsCurve(dag)
+
+    def get_plug(self, plug):
+        """
+        Returns the API 2.0 MPlug of a given plug
+        :param plug: str: the plug being queried (ex: "node.attr")
+        :return: MPlug: the plug
+        """
+        sel = om.MSelectionList()
+        sel.add(plug)
+        return sel.getPlug(0)
+
+    def set_plug(self, mod, plug, value):
+        """
+        Queues a new plug value on a modifier, converting angle and distance values from UI units
+        :param mod: MDGModifier: the modifier the value is queued on
+        :param plug: MPlug: the plug being set
+        :param value: the value being set (a 16 item list is treated as a matrix)
+        """
+        attr = plug.attribute()
+        if isinstance(value, str):
+            mod.newPlugValueString(plug, value)
+        elif isinstance(value, (list, tuple)) and len(value) == 16:
+            mod.newPlugValue(plug, om.MFnMatrixData().create(om.MMatrix(list(value))))
+        elif isinstance(value, (list, tuple)):
+            for i, v in enumerate(value):
+                self.set_plug(mod, plug.child(i), v)
+        elif attr.hasFn(om.MFn.kUnitAttribute):
+            unit = om.MFnUnitAttribute(attr).unitType()
+            if unit == om.MFnUnitAttribute.kAngle:
+                mod.newPlugValueMAngle(plug, om.MAngle(value, om.MAngle.uiUnit()))
+            elif unit == om.MFnUnitAttribute.kDistance:
+                mod.newPlugValueMDistance(plug, om.MDistance(value, om.MDistance.uiUnit()))
+            else:
+                mod.newPlugValueDouble(plug, value)
+        elif attr.hasFn(om.MFn.kEnumAttribute) or isinstance(value, bool):
+            mod.newPlugValueInt(plug, int(value))
+        elif attr.hasFn(om.MFn.kNumericAttribute) and om.MFnNumericAttribute(attr).numericType() in [
+                om.MFnNumericData.kBoolean, om.MFnNumericData.kByte, om.MFnNumericData.kChar,
+                om.MFnNumericData.kShort, om.MFnNumericData.kInt, om.MFnNumericData.kLong]:
+            mod.newPlugValueInt(plug, int(value))
+        else:
+            mod.newPlugValueDouble(plug, value)
+
+
+class Transaction(object):
+    # Operations that are queued rather than run straight away
+    QUEUED = ["create_node", "connect_attr", "disconnect_attr", "set_attr"]
+    # Queries that don't depend on queued edits so they don't need to flush the queue first
+    PASSIVE = ["exists", "find", "node_type", "maya_version", "warning"]
+
+    def __init__(self, backend):
+        """
+        Sits in front of a backend and queues utility node creation, connections and plug values so they can be
+        committed with a single apply() call instead of one scene call each. Any other scene call commits
+        the queue first so it always sees an up to date scene
+        :param backend: Scene: the backend the operations are committed to
+        """
+        self.backend = backend
+        self.ops = []
+        self.pending = {}
+        self.commits = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self.backend, name)
+        if name not in API or name in self.PASSIVE:
+            return attr
+
+        def flushed(*args, **kwargs):
+            self.flush()
+            return attr(*args, **kwargs)
+        return flushed
+
+    def exists(self, name):
+        return name in self.pending or self.backend.exists(name)
+
+    def find(self, name):
+        if name in self.pending:
+            return name
+        return self.backend.find(name)
+
+    def node_type(self, node):
+        if node in self.pending:
+            return self.pending[node]
+        return self.backend.node_type(node)
+
+    def create_node(self, node_type, name, parent=None, shading=False):
+        # Shading nodes and clashing names go straight to the backend so the returned name is always right
+        if shading or self.exists(name):
+            self.flush()
+            return self.backend.create_node(node_type, name, parent=parent, shading=shading)
+        self.ops.append(("create_node", node_type, name, parent))
+        self.pending[name] = node_type
+        return name
+
+    def connect_attr(self, source, destination, force=True):
+        self.ops.append(("connect_attr", source, destination, force))
+
+    def disconnect_attr(self, source, destination):
+        self.ops.append(("disconnect_attr", source, destination))
+
+    def set_attr(self, plug, value):
+        self.ops.append(("set_attr", plug, value))
+
+    def flush(self):
+        """
+        Commits the queued operations to the backend
+        :return: dict: the requested names of the created nodes mapped to their actual names
+        """
+        if not self.ops:
+            return {}
+        ops = self.ops
+        self.ops = []
+        self.pending = {}
+        self.commits += 1
+        return self.backend.apply(ops)
+
+
+BACKEND = None
+BUILDING = False
+
+
+def get_backend():
+    """
+    Returns the scene backend the builders are currently running against, setting up the default one the first
+    time a backend is needed
+    :return: Scene: the current backend
+    """
+    if BACKEND is None:
+        set_backend(get_default())
+    return BACKEND
+
+
+def get_default():
+    """
+    Returns the backend the builders run against unless told otherwise: Maya when it's available and an in-memory
+    scene when it isn't
+    :return: Scene: the default backend
+    """
+    if cmds is not None:
+        return MayaScene()
+    # The in-memory scene is built on this module, so it's only imported once this module is done loading
+    from core import memory
+    return memory.MemoryScene()
+
+
+def get_live():
+    """
+    Returns the backend benchmarks measure against: the Maya scene when running inside Maya and a new in-memory
+    scene when running headless
+    :return: Scene: the backend
+    """
+    if isinstance(BACKEND, MayaScene):
+        return BACKEND
+    return get_default()
+
+
+def deferred(name):
+    """
+    Returns a stand-in for an API function that sets up the default backend the first time it's called (see
+    get_backend)
+    :param name: str: the API function
+    :return: function: the stand-in
+    """
+    def call(*args, **kwargs):
+        return getattr(get_backend(), name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+
+def set_backend(backend):
+    """
+    Sets the scene backend used by every function in this module
+    :param backend: Scene: the backend the builders should run against (None goes back to setting up the default
+    backend when it's next needed)
+    :return: Scene: the previous backend
+    """
+    global BACKEND
+    previous = BACKEND
+    BACKEND = backend
+    for name in API:
+        globals()[name] = getattr(backend, name) if backend is not None else deferred(name)
+    return previous
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    Queues the node creation, connections and plug values of the enclosed code and commits them in one go
+    when it exits (or when the enclosed code needs to query the scene). Transactions can be nested; only the
+    outermost one commits. If the enclosed code fails, whatever it queued is still committed before the error is
+    raised, so the scene is left the same as if the code had run unbatched (every query it made has already
+    committed what came before it) and no edit is dropped without a word
+    """
+    if isinstance(BACKEND, Transaction):
+        yield BACKEND
+        return
+    batch = Transaction(get_backend())
+    previous = set_backend(batch)
+    try:
+        yield batch
+    except Exception:
+        set_backend(previous)
+        count = len(batch.ops)
+        try:
+            batch.flush()
+        except Exception as err:
+            warning(f"{count} queued scene operations were lost when a transaction failed: {err}")
+        raise
+    finally:
+        set_backend(previous)
+    batch.flush()
+
+
+@contextlib.contextmanager
+def building(undo=True):
+    """
+    Runs the enclosed build with the scene suspended (see Scene.suspend) and puts the scene back the way it was
+    afterwards, even if the build fails. Builds can be nested; only the outermost one suspends the scene
+    :param undo: bool: whether or not the build can be undone in one step; undo is switched off otherwise
+    """
+    global BUILDING
+    if BUILDING:
+        yield
+        return
+    state = suspend(undo)
+    BUILDING = True
+    try:
+        yield
+    finally:
+        BUILDING = False
+        resume(state)
+
+
+
+# The backend is only set up when it's first used so that backends built on this module (see core.memory) can be
+# imported before or after it
+set_backend(None)
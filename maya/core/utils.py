@@ -1,13 +1,15 @@
 import os
+import hashlib
 import json
-import pymel.core as pm
 from core import constants
-import maya.api.OpenMaya as om
+from core import mathutils
+from core import profiler
+from core import scene
 
 
-ENVPATH = os.environ["MAYA_APP_DIR"]
-SETUPPATH = os.path.join(ENVPATH, pm.about(v=1), "scripts")
-RSTPATH = os.path.join(ENVPATH, pm.about(v=1), "prefs", "scripts")
+ENVPATH = os.environ.get("MAYA_APP_DIR", os.path.join(os.path.expanduser("~"), "maya"))
+SETUPPATH = os.path.join(ENVPATH, str(scene.maya_version()), "scripts")
+RSTPATH = os.path.join(ENVPATH, str(scene.maya_version()), "prefs", "scripts")
 
 
 #############
@@ -18,10 +20,10 @@ def set_sine_unlock_end(hndl):
     Sets up a sine deformer so that the end isn't locked in place
     :param hndl: the sine deformer being manipulated
     """
-    if not hndl.scaleY.get() == hndl.scaleX.get():
+    if not scene.get_attr(f"{hndl}.scaleY") == scene.get_attr(f"{hndl}.scaleX"):
         return
-    hndl.scaleY.set(2 * hndl.scaleY.get())
-    hndl.translateX.set(2 * hndl.translateX.get())
+    scene.set_attr(f"{hndl}.scaleY", 2 * scene.get_attr(f"{hndl}.scaleY"))
+    scene.set_attr(f"{hndl}.translateX", 2 * scene.get_attr(f"{hndl}.translateX"))
 
 
 def set_sine_lock_end(hndl):
@@ -29,10 +31,95 @@ def set_sine_lock_end(hndl):
     Sets up a sine deformer so that the end is locked in place
     :param hndl: the sine deformer being manipulated
     """
-    if hndl.scaleY.get() == hndl.scaleX.get():
+    if scene.get_attr(f"{hndl}.scaleY") == scene.get_attr(f"{hndl}.scaleX"):
         return
-    hndl.scaleY.set(0.5 * hndl.scaleY.get())
-    hndl.translateX.set(0.5 * hndl.translateX.get())
+    scene.set_attr(f"{hndl}.scaleY", 0.5 * scene.get_attr(f"{hndl}.scaleY"))
+    scene.set_attr(f"{hndl}.translateX", 0.5 * scene.get_attr(f"{hndl}.translateX"))
+
+
+#############
+# Fingerprints
+#############
+
+FINGERPRINT = "guidesFingerprint"
+
+
+def get_fingerprint(data):
+    """
+    Returns a short hash of the data a part of the rig is built from
+    :param data: the data being hashed (anything json can write)
+    :return: str: the hash
+    """
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def get_stamp(node):
+    """
+    Returns the fingerprint stored on a node
+    :param node: str: the node being queried
+    :return: str: the fingerprint or None if the node or fingerprint doesn't exist
+    """
+    if not scene.exists(f"{node}.{FINGERPRINT}"):
+        return None
+    return scene.get_attr(f"{node}.{FINGERPRINT}")
+
+
+def set_stamp(node, fingerprint):
+    """
+    Stores a fingerprint on a node
+    :param node: str: the node the fingerprint is stored on (typically the group a part of the rig is built in)
+    :param fingerprint: str: the fingerprint
+    """
+    if not scene.exists(f"{node}.{FINGERPRINT}"):
+        scene.add_attr(node, FINGERPRINT, attr_type="string", keyable=False)
+    scene.set_attr(f"{node}.{FINGERPRINT}", fingerprint)
+
+
+def get_chain_stamp(name):
+    """
+    Returns the fingerprint of the guides a chain's driver joints were last built from (see driver.Build)
+    :param name: str: the name of the chain (ex: LT_arm)
+    :return: str: the fingerprint or None if the chain hasn't been built
+    """
+    return get_stamp(f"{name}_drv_jnt_grp")
+
+
+def is_current(node, name):
+    """
+    Checks whether a part of the rig was built from the current driver joints of its chain
+    :param node: str: the node the part's fingerprint is stored on
+    :param name: str: the name of the chain (ex: LT_arm)
+    :return: bool: if the part is up to date
+    """
+    stamp = get_chain_stamp(name)
+    return stamp is not None and get_stamp(node) == stamp
+
+
+def stamp_chain(node, name):
+    """
+    Marks a part of the rig as built from the current driver joints of its chain
+    :param node: str: the node the part's fingerprint is stored on
+    :param name: str: the name of the chain (ex: LT_arm)
+    """
+    stamp = get_chain_stamp(name)
+    if stamp is not None:
+        set_stamp(node, stamp)
+
+
+def clear_stale(node, name, nodes):
+    """
+    Deletes the nodes of a part of the rig that was built from an older version of its chain so it can be
+    rebuilt. Parts that have never been fingerprinted are left alone
+    :param node: str: the node the part's fingerprint is stored on
+    :param name: str: the name of the chain (ex: LT_arm)
+    :param nodes: list: the nodes the part made
+    :return: bool: if anything was cleared
+    """
+    stamp = get_stamp(node) if scene.exists(node) else None
+    if stamp is None or stamp == get_chain_stamp(name):
+        return False
+    scene.delete([n for n in nodes if scene.exists(n)])
+    return True
 
 
 #############
@@ -41,98 +128,97 @@ def set_sine_lock_end(hndl):
 
 def check_nodes(nodes=None):
     """
-    Checks to see if a list of nodes is given and, if not, assign selected nodes. If the
-    given variable is a string, the function will return PyNodes in their place
+    Checks to see if a list of nodes is given and, if not, assign selected nodes. Nodes are returned as
+    name strings
     :param nodes: List: nodes being checked
     :return: List: nodes being checked and seleced nodes if None
     :raises: Error if nothing selected
     """
     if nodes is None:
-        if not pm.ls(sl=0):
-            pm.warning("Nothing selected.")
+        if not scene.selected():
+            scene.warning("Nothing selected.")
             return None
-        nodes = pm.ls(sl=1)
-    for i, node in enumerate(nodes):
-        if type(node) == "string":
-            nodes[i] = pm.PyNode(node)
-    return nodes
+        nodes = scene.selected()
+    return [str(node) for node in nodes]
 
 
-def check_hypergraph_node(name, node_type, shading=True):
+def check_hypergraph_node(name, node_type, shading=False):
     """
-    Checks to see if a shading node exists and creates one if it doesn't
+    Checks to see if a utility node exists and creates one if it doesn't. Nodes are created as plain DG nodes
+    unless told otherwise so they stay out of the render utility lists
     :param name: str: the name of the node being checked
-    :param node_type: str: the type of shader node being checked (ex: multiplyDoubleLinear)
+    :param node_type: str: the type of utility node being checked (ex: multiplyDoubleLinear)
     :param shading: bool: if the node being created is a shading node
-    :return: PyNode: the shading node being checked
+    :return: str: the utility node being checked
     """
-    if pm.ls(name):
-        return pm.PyNode(name)
-    if not shading:
-        return pm.createNode(node_type, n=name)
-    return pm.shadingNode(node_type, n=name, au=1)
+    node = scene.find(name)
+    if node is not None:
+        return node
+    return scene.create_node(node_type, name, shading=shading)
 
 
 def check_locator(name):
     """
     Checks to see if a locator exists in a scene and creates one if it doesnt
     :param name: str: name of the locator being checked
-    :return: PyNode: the locator being checked
+    :return: str: the locator being checked
     """
-    if pm.ls(name):
-        return pm.PyNode(name)
-    return pm.spaceLocator(n=name)
+    loc = scene.find(name)
+    if loc is not None:
+        return loc
+    return scene.create_locator(name)
 
 
 def invert_attribute(target_attr):
     """
     Creates a node that multiplies the source attribute value by -1 to invert the number. Can be used for both
     singular and vector attribute formats
-    :param target_attr: PyNode.attr: the destination attribute
+    :param target_attr: str: the destination attribute
     :return: the multiply node created
     """
-    if not pm.listConnections(target_attr, p=1):
-        pm.warning(f"{target_attr} has no incoming connections")
+    if not scene.list_connections(target_attr, destination=False):
+        scene.warning(f"{target_attr} has no incoming connections")
         return None
-    source = pm.listConnections(target_attr, p=1)[0]
-    if "unitConversion" in source.name():
-        conversion = pm.PyNode(source.name().split('.')[0])
-        source = pm.listConnections(conversion.input, p=1)[0]
-        pm.disconnectAttr(conversion.output, target_attr)
-        pm.delete(conversion)
-    multName = f"{'_'.join(source.name().split('.'))}_to_{'_'.join(target_attr.split('.'))}_invert_mult"
-    if "double" in source.type():
+    source = scene.list_connections(target_attr, destination=False)[0]
+    if "unitConversion" in source:
+        conversion = source.split('.')[0]
+        source = scene.list_connections(f"{conversion}.input", destination=False)[0]
+        scene.disconnect_attr(f"{conversion}.output", target_attr)
+        scene.delete(conversion)
+    multName = f"{'_'.join(source.split('.'))}_to_{'_'.join(target_attr.split('.'))}_invert_mult"
+    if isinstance(scene.get_attr(source), (int, float)):
         # Single attributes can use a Multiply Double Linear node with input 2 set to -1
         mult = check_hypergraph_node(multName, "multDoubleLinear")
-        mult.input2.set(-1)
+        scene.set_attr(f"{mult}.input2", -1)
     else:
         # Vector formats require a Multiply Divide node with input 2 axes set to -1
         mult = check_hypergraph_node(multName, "multiplyDivide")
         for axis in constants.AXES:
-            eval(f"mult.input2{axis}.set(-1)")
+            scene.set_attr(f"{mult}.input2{axis}", -1)
     # Connect the attributes (may throw a warning since you're forcing a connection)
-    pm.connectAttr(source, mult.input1, f=1)
-    pm.connectAttr(mult.output, target_attr, f=1)
+    scene.connect_attr(source, f"{mult}.input1")
+    scene.connect_attr(f"{mult}.output", target_attr)
     return mult
 
 
+@profiler.stage
 def make_distance(name, start, end):
     """
     Creates a Distance Between node for a given start and end node.
     :param name: str: name of the distance between setup
-    :param start: PyNode: The base node at the start of the measurement
-    :param end: PyNode: The tip node at the end of the measurement
-    :return: PyNode: the distance between node that was created
+    :param start: str: The base node at the start of the measurement
+    :param end: str: The tip node at the end of the measurement
+    :return: str: the distance between node that was created
     """
     baseLoc = check_locator(f"{name}_base_loc")
     tipLoc = check_locator(f"{name}_tip_loc")
     dist = check_hypergraph_node(f"{name}_dist", "distanceBetween")
-    pm.xform(baseLoc, t=pm.xform(start, q=1, ws=1, rp=1))
-    pm.xform(tipLoc, t=pm.xform(end, q=1, ws=1, rp=1))
-    pm.parent(baseLoc, start)
-    pm.parent(tipLoc, end)
-    pm.connectAttr(baseLoc.worldMatrix[0], dist.inMatrix1, f=1)
-    pm.connectAttr(tipLoc.worldMatrix[0], dist.inMatrix2, f=1)
+    scene.set_position(baseLoc, scene.get_position(start))
+    scene.set_position(tipLoc, scene.get_position(end))
+    scene.parent(baseLoc, start)
+    scene.parent(tipLoc, end)
+    scene.connect_attr(f"{baseLoc}.worldMatrix[0]", f"{dist}.inMatrix1")
+    scene.connect_attr(f"{tipLoc}.worldMatrix[0]", f"{dist}.inMatrix2")
     return dist
 
 
@@ -143,16 +229,12 @@ def make_distance(name, start, end):
 def get_parent_and_children(node):
     """
     Returns a list of a given node's parent and list of children in the outliner
-    :param node: PyNode: Node being queiries
+    :param node: str: Node being queiries
     :return: list: The parent and child of the queried node
     """
-    if pm.listRelatives(node, p=1):
-        parent = pm.listRelatives(node, p=1)[0]
-    else:
-        parent = None
-    if pm.listRelatives(node, c=1):
-        children = pm.listRelatives(node, c=1)
-    else:
+    parent = scene.get_parent(node)
+    children = scene.get_children(node)
+    if not children:
         children = None
     return [parent, children]
 
@@ -162,21 +244,21 @@ def make_group(name, child=None, parent=None):
     Looks for or creates then returns a group with a given name, parents it to a defined parent and adds
     defined children to its hierarchy
     :param name: str: the name of the new group
-    :param child: PyNode or list: children of the group being created
-    :param parent: PyNode: parent of the group being created
+    :param child: str or list: children of the group being created
+    :param parent: str: parent of the group being created
     :return: the new group that was created
     """
-    if pm.ls(name):
-        grp = pm.PyNode(name)
-    else:
-        grp = pm.group(n=name, em=1)
+    grp = scene.find(name)
+    if grp is None:
+        grp = scene.create_group(name)
     if child is not None:
-        pm.parent(child, grp)
+        scene.parent(child, grp)
     if parent is not None:
-        pm.parent(grp, parent)
+        scene.parent(grp, parent)
     return grp
 
 
+@profiler.stage
 def make_offset_groups(nodes=None, name=None, freeze=True, reset=True):
     """
     Creates an offset group
@@ -191,24 +273,25 @@ def make_offset_groups(nodes=None, name=None, freeze=True, reset=True):
     if nodes is None:
         return None
     for node in nodes:
-        if node.type() == "nurbsCurve":
+        if scene.node_type(node) == "nurbsCurve":
             continue
         if name is None:
-            name = f"{node.name()}_grp"
+            name = f"{node}_grp"
         grp = make_group(name)
         # TODO: this only changes position. Needs to update rotation too
-        pm.xform(grp, t=pm.xform(node, q=1, ws=1, rp=1))
-        if pm.listRelatives(node, p=1):
-            pm.parent(grp, pm.listRelatives(node, p=1)[0])
+        scene.set_position(grp, scene.get_position(node))
+        if scene.get_parent(node) is not None:
+            scene.parent(grp, scene.get_parent(node))
         if freeze:
             transfer_transforms_to_offset([grp])
-        pm.parent(node, grp)
+        scene.parent(node, grp)
         if reset:
             reset_transforms([node])
         offsetGrps.append(grp)
     return offsetGrps
 
 
+@profiler.stage
 def parent_crv(name=None, nodes=None):
     """
     Parents curve shapes to a node allowing the curve to directly control it
@@ -222,30 +305,31 @@ def parent_crv(name=None, nodes=None):
         return None
     # Get the name of the curve
     if name is None:
-        name = nodes[-1].name()
+        name = nodes[-1]
     # Create an empty group to act as the parents for your curves
-    transform = pm.group(n=name, em=1)
+    transform = scene.create_group(name)
     # Get position and pivot data
-    mtrx = nodes[-1].getMatrix()
-    piv = pm.xform(nodes[-1], q=1, rp=1)
-    pm.xform(transform, piv=piv)
+    mtrx = scene.get_matrix(nodes[-1], world=False)
+    piv = scene.get_position(nodes[-1], world=False)
+    scene.set_pivot(transform, piv, world=False)
     # Parent each curveShape to the new transform node
     for curves in nodes:
-        if not pm.nodeType(curves) == "nurbsCurve":
-            curves = curves.getShapes()
-        parent = pm.listRelatives(curves, p=1)
-        if type(curves) == list:
-            for curve in curves:
-                pm.parent(curve, transform, r=1, s=1)
-        if parent:
-            pm.delete(parent)
+        if not scene.node_type(curves) == "nurbsCurve":
+            curves = scene.get_shapes(curves)
+        else:
+            curves = [curves]
+        parent = scene.get_parent(curves[0]) if curves else None
+        for curve in curves:
+            scene.parent_shape(curve, transform)
+        if parent is not None:
+            scene.delete(parent)
     # Freeze transforms (requires an extra step for Maya versions over 2020)
-    if int(pm.about(v=1)) >= 2020:
+    if scene.maya_version() >= 2020:
         # This stores the transforms in the offset parent matrix
-        pm.setAttr("{}.offsetParentMatrix".format(str(transform)), mtrx)
-        pm.xform(transform, ws=1, m=mtrx)
-    pm.makeIdentity(transform, a=1, n=2)
-    pm.select(transform)
+        scene.set_attr(f"{transform}.offsetParentMatrix", mtrx)
+        scene.set_matrix(transform, mtrx)
+    scene.freeze(transform, normal=2)
+    scene.select(transform)
     return transform
 
 
@@ -256,14 +340,14 @@ def parent_crv(name=None, nodes=None):
 def get_length_of_chain(joint, aim="X"):
     """
     Returns the unit length of a joint chain (not the number of chains)
-    :param joint: PyNode: the base joint for the defined chain
+    :param joint: str: the base joint for the defined chain
     :param aim: str: the aim axis of the given joint
     :return: float: the length of the joint chaoin
     """
     jnts = get_joints_in_chain(joint)[1:]
     chainLen = 0
     for jnt in jnts:
-        jntLen = pm.getAttr(f"{jnt}.translate{aim}")
+        jntLen = scene.get_attr(f"{jnt}.translate{aim}")
         chainLen = chainLen + jntLen
     return chainLen
 
@@ -271,7 +355,7 @@ def get_length_of_chain(joint, aim="X"):
 def get_info_from_joint(joint, name=False, num=False, side=False, task=False):
     """
     Returns returns specified information from a given joint
-    :param joint: PyNode: the joint being queried
+    :param joint: str: the joint being queried
     :param name: bool: returns the name of the defined joint
     :param num: bool: returns the number of joints in the chain with defined joint as base
     :param side: bool: returns the side the defined joint exists on
@@ -279,22 +363,22 @@ def get_info_from_joint(joint, name=False, num=False, side=False, task=False):
     :return: the data specified
     """
     if name:
-        return "_".join(joint.name().split("_")[:2])
+        return "_".join(joint.split("_")[:2])
     if num:
         return len(get_joints_in_chain(joint))
     if side:
-        return joint.name().split("_")[0]
+        return joint.split("_")[0]
     if task:
-        return joint.name().split("_")[-2]
+        return joint.split("_")[-2]
 
 
 def get_joints_in_chain(joint):
     """
     Returns the a list of joints in the chain of a defined base joint
-    :param joint: PyNode: the base joint of the chain
+    :param joint: str: the base joint of the chain
     :return: list: the joints in the chain
     """
-    jnts = [jnt for jnt in reversed(pm.listRelatives(joint, ad=1)) if jnt.type() == "joint"]
+    jnts = scene.get_descendants(joint, node_type="joint")
     jnts.insert(0, joint)
     return jnts
 
@@ -302,98 +386,134 @@ def get_joints_in_chain(joint):
 def get_joint_type(joint):
     """
     Returns the type of joint given (ex: base_IK)
-    :param joint: PyNode: joint being queried
+    :param joint: str: joint being queried
     :return: str: the joint type
     """
-    jointType = joint.name().split("_")[-2]
+    jointType = joint.split("_")[-2]
     subTypes = ["base", "mid", "tip"]
     if jointType in subTypes:
-        jointType = "_".join([joint.name().split("_")[-3], jointType])
+        jointType = "_".join([joint.split("_")[-3], jointType])
     return jointType
 
 
-def make_curve_from_chain(joint, name=None, cubic=True, bind=None):
+@profiler.stage
+def make_curve_from_chain(joint, name=None, cubic=True, bind=None, chain_data=None):
     """
     Makes a curve with control points at the location of each joint in a given chain
-    :param joint: PyNode: The base joint of the chain the curve is being made out of
+    :param joint: str: The base joint of the chain the curve is being made out of
     :param name: str: The name of the curve being created
     :param cubic: bool: whether we want the curve degree to be Cubic or Linear
     :param bind: list: list of joints to bind the curve to
-    :return: PyNode: the curve that was created
+    :param chain_data: ChainData: the captured chain of the joint (saves querying the joints)
+    :return: str: the curve that was created
     """
     # Name the curve
     if name is None:
-        name = joint.name().replace("_jnt", "_crv")
+        name = joint.replace("_jnt", "_crv")
     # Check if curve exists
-    if pm.ls(name):
-        return pm.PyNode(name)
+    crv = scene.find(name)
+    if crv is not None:
+        return crv
     # Get joints and their World Space positions
-    jnts = get_joints_in_chain(joint)
-    pts = [pm.xform(jnt, q=1, ws=1, rp=1) for jnt in jnts]
+    if chain_data is not None:
+        jnts = chain_data.names
+        pts = chain_data.positions.tolist()
+    else:
+        jnts = get_joints_in_chain(joint)
+        pts = [scene.get_position(jnt) for jnt in jnts]
     # Build the curve
     deg = 3
     if not len(jnts) > 4 or not cubic:
         deg = 1
-    crv = pm.curve(n=name, d=deg, p=pts)
+    crv = scene.create_curve(name, pts, degree=deg)
     # Set the pivot point to the curve's base
-    pm.xform(crv, p=1, rp=pts[0])
-    pm.delete(crv, ch=1)
-    crv.inheritsTransform.set(0)
+    scene.set_pivot(crv, pts[0])
+    scene.delete_history(crv)
+    scene.set_attr(f"{crv}.inheritsTransform", 0)
     # Group the curve
     grp = make_group(f"{name}_grp", child=crv, parent=make_group("crv_grp", parent=make_group("utils_grp")))
-    pm.xform(grp, t=pm.xform(joint, q=1, ws=1, rp=1))
+    scene.set_position(grp, pts[0])
     if bind is not None:
         skin_to_joints(bind, crv)
     # Create a curve info node
     info = check_hypergraph_node(f"{name}_info", "curveInfo")
-    pm.connectAttr(crv.worldSpace[0], info.inputCurve)
+    scene.connect_attr(f"{scene.get_shapes(crv)[0]}.worldSpace[0]", f"{info}.inputCurve")
     return crv
 
 
-def duplicate_chain(jnts, chain_type, dup_parent):
+@profiler.stage
+def duplicate_chain(jnts, chain_type, dup_parent, color=None):
     """
     Creates a duplicate of a given joint chain with transforms preserved and parented to a new group
     :param jnts: list: joints being duplicated
     :param chain_type: str: the name of the type of chain that will replace the original joint type (typically 'drv')
     :param dup_parent: The group to parent duplicate chain to
+    :param color: int: the override color of the duplicate joints (copied from the originals if not given)
     :return: list: The duplicated joints that were created
     """
-    dupJnts = []
-    for jnt in jnts:
-        parent = get_parent_and_children(jnt)[0]
-        children = get_parent_and_children(jnt)[1]
-        # Unparent the joint and any children it may have
-        if parent is not None:
-            pm.parent(jnt, w=1)
-        if children is not None:
-            pm.parent(children, w=1)
-        # Duplicate joint
-        try:
-            dupName = jnt.name().replace(get_joint_type(jnt), chain_type)
-        except IndexError:
-            dupName = "_".join([jnt.name(), chain_type])
-        dup = pm.duplicate(jnt, n=dupName)[0]
-        # Set duplicate joint's radius based on chain type
-        if chain_type == "FK":
-            dupRad = jnt.radius.get() * 0.65
-        elif chain_type == "IK":
-            dupRad = jnt.radius.get() * 1.6
-        elif chain_type == "twst":
-            dupRad = jnt.radius.get() * 2.0
-        else:
-            dupRad = jnt.radius.get() * 0.4
-        dup.radius.set(dupRad)
-        # Re-parent joints
-        if parent is not None:
-            pm.parent(jnt, parent)
-        if children is not None:
-            pm.parent(children, jnt)
-        if dupJnts:
-            pm.parent(dup, dupJnts[-1])
-        else:
-            pm.parent(dup, dup_parent)
-        dupJnts.append(dup)
-    return dupJnts
+    return duplicate_chains([jnts], chain_type, dup_parent, color)[0]
+
+
+@profiler.stage
+def duplicate_chains(chains, chain_type, dup_parents, color=None):
+    """
+    Creates duplicates of any number of joint chains at once. Rather than duplicating each joint (which means
+    unparenting it from its chain and putting it back) the duplicates are created as new joints from the world
+    matrices of the originals in a single transaction, so the original hierarchies are never edited. The duplicates
+    keep the rotate order, rotate, rotate axis, preferred angle, segment scale compensate, radius and color of the
+    originals (user defined attributes aren't copied)
+    :param chains: list: the joint chains being duplicated
+    :param chain_type: str: the name of the type of chain that will replace the original joint type (typically 'drv')
+    :param dup_parents: str or list: the group to parent each duplicate chain to (or one group for all of them)
+    :param color: int: the override color of the duplicate joints (copied from the originals if not given)
+    :return: list: the duplicated joints of each chain
+    """
+    if dup_parents is None or isinstance(dup_parents, str):
+        dup_parents = [dup_parents] * len(chains)
+    scale = constants.DUPLICATERADIUS.get(chain_type, 0.4)
+    # Capture everything the duplicates need before anything is created
+    specs = []
+    for jnts, dup_parent in zip(chains, dup_parents):
+        parentMatrix = scene.get_matrix(dup_parent) if dup_parent is not None else mathutils.IDENTITY
+        chainSpecs = []
+        for jnt in jnts:
+            try:
+                dupName = jnt.replace(get_joint_type(jnt), chain_type)
+            except IndexError:
+                dupName = "_".join([jnt, chain_type])
+            roo = scene.get_rotate_order(jnt).lower()
+            rotate = scene.get_attr(f"{jnt}.rotate")
+            rotateAxis = scene.get_attr(f"{jnt}.rotateAxis")
+            world = scene.get_matrix(jnt)
+            # Each duplicate is parented to the one before it, which sits where the original before it does
+            local = mathutils.mult(world, mathutils.inverse(parentMatrix))
+            translate, _, scl = mathutils.decompose(local, roo)
+            # Joints keep their rotate axis and rotate values and take up the rest of their orientation in their
+            # joint orient (a joint rotates by its rotate axis, then its rotate, then its joint orient)
+            rotation = mathutils.mult(mathutils.rotation(rotateAxis), mathutils.rotation(rotate, roo))
+            orient = mathutils.euler(mathutils.mult(mathutils.inverse(rotation), mathutils.orthonormal(local)))
+            override = [1, color] if color is not None else [scene.get_attr(f"{jnt}.overrideEnabled"),
+                                                             scene.get_attr(f"{jnt}.overrideColor")]
+            chainSpecs.append({"name": dupName, "rotateOrder": constants.ROTATEORDER.index(roo),
+                               "radius": scene.get_attr(f"{jnt}.radius") * scale, "translate": translate,
+                               "rotate": rotate, "scale": scl, "rotateAxis": rotateAxis, "jointOrient": orient,
+                               "preferredAngle": scene.get_attr(f"{jnt}.preferredAngle"),
+                               "segmentScaleCompensate": scene.get_attr(f"{jnt}.segmentScaleCompensate"),
+                               "overrideEnabled": override[0], "overrideColor": override[1]})
+            parentMatrix = world
+        specs.append((chainSpecs, dup_parent))
+    # Build the duplicates
+    dupChains = []
+    with scene.transaction():
+        for chainSpecs, dup_parent in specs:
+            dupJnts = []
+            for spec in chainSpecs:
+                dup = scene.create_node("joint", spec.pop("name"), parent=dupJnts[-1] if dupJnts else dup_parent)
+                for attr, value in spec.items():
+                    scene.set_attr(f"{dup}.{attr}", value)
+                dupJnts.append(dup)
+            dupChains.append(dupJnts)
+    return dupChains
 
 
 def make_joint(name, radius=1.0, parent=None, color=1):
@@ -401,38 +521,41 @@ def make_joint(name, radius=1.0, parent=None, color=1):
     Creates a joint with a given name, radius, and parent node
     :param name: str: the name of the joint
     :param radius: float: the radius of the joint
-    :param parent: PyNode: the node the user wants to parent the joint to
+    :param parent: str: the node the user wants to parent the joint to
     :param color: desired color of the joint
-    :return: PyNode: the joint that was created
+    :return: str: the joint that was created
     """
-    joint = pm.joint(n=name, rad=radius)
-    joint.overrideEnabled.set(1)
-    joint.overrideColor.set(color)
-    if parent is not None:
-        pm.parent(joint, parent)
+    joint = scene.create_joint(name, radius=radius, parent=parent)
+    scene.set_attr(f"{joint}.overrideEnabled", 1)
+    scene.set_attr(f"{joint}.overrideColor", color)
     return joint
 
 
+@profiler.stage
 def skin_to_joints(bind_jnts, obj, name=None):
     """
     Apply a skincluster to a given object with given joints
     :param bind_jnts: list: joints being skinned to
-    :param obj: pyMel: object being skinned
+    :param obj: str: object being skinned
     :param name: str: name of skin cluster
-    :return: pyMel: the skincluster that was created
+    :return: str: the skincluster that was created
     """
     if name is None:
-        name = f"{obj.name()}_skinCluster"
-    clstr = pm.skinCluster(bind_jnts, obj, n=name, tsb=True, bm=0, sm=0, nw=1)
+        name = f"{obj}_skinCluster"
+    clstr = scene.skin_cluster(bind_jnts, obj, name)
     return clstr
 
 
-def split_chain(jnt_chain, jnt_type="split", splits=1):
+@profiler.stage
+def split_chain(jnt_chain, jnt_type="split", splits=1, chain_data=None, spacing="uniform"):
     """
     Takes a given joint chain and creates a new chain with each span composed of a given number of split joints
     :param jnt_chain: list: The base chain creating the split chain (Typically a driver joint)
     :param jnt_type: str: The name of the joints being created (can also be 'skn')
     :param splits: int: Number of in between joints for each span
+    :param chain_data: ChainData: the captured chain of jnt_chain (saves querying it)
+    :param spacing: str: 'uniform' spreads the splits evenly along each span, 'curve' spreads them evenly along a
+    smooth curve through the chain (needs chain_data)
     :return: list: All split joints that were created
     """
     # Make sure splits make sense mathematically
@@ -443,30 +566,65 @@ def split_chain(jnt_chain, jnt_type="split", splits=1):
     # Create a group to parent the splits to
     grp = make_group(f"{get_info_from_joint(jnt_chain[0], name=True)}_{jnt_type}_jnt_grp",
                      parent=make_group(f"{jnt_type}_jnt_grp", parent=make_group("jnt_grp")))
+    # Create the base of every span's split chain at once and name them after their spans
+    spans = [constants.get_span(i, len(jnt_chain[:-1])) for i in range(len(jnt_chain[:-1]))]
+    baseJnts = [scene.rename(dups[0], dups[0].replace(dups[0].split("_")[-3], f"{span}01")) for span, dups in
+                zip(spans, duplicate_chains([[jnt] for jnt in jnt_chain[:-1]], jnt_type, grp, color=9))]
+    if chain_data is not None:
+        return make_splits(baseJnts, spans, chain_data, splits, spacing)
+    if spacing != "uniform":
+        scene.warning(f"'{spacing}' spacing needs NumPy; the splits of {jnt_chain[0]} are spaced uniformly")
     allSpltJnts = []
     # Create splits for each joint span
-    for i, jnt in enumerate(jnt_chain[:-1]):
-        # Create the base of the split chain
-        span = constants.get_span(i, len(jnt_chain[:-1]))
-        dupJnt = duplicate_chain([jnt], jnt_type, grp)[0]
-        pm.rename(dupJnt, dupJnt.name().replace(dupJnt.name().split("_")[-3], f"{span}01"))
+    for i, (span, dupJnt) in enumerate(zip(spans, baseJnts)):
         spltJnts = [dupJnt]
         # Create the split joints
         for n in range(splits + 1):
-            spltJnt = pm.duplicate(spltJnts[-1], n=spltJnts[-1].name().replace(
-                spltJnts[-1].name().split("_")[-3], f"{span}{str(n+2).zfill(2)}"))[0]
-            pm.parent(spltJnt, spltJnts[-1])
-            aimAxis = str(spltJnt.getRotationOrder())[0]
-            eval(f"spltJnt.translate{aimAxis}.set((jnt_chain[i+1].translate{aimAxis}.get() / (splits + 1)))")
+            spltJnt = scene.duplicate(spltJnts[-1], spltJnts[-1].replace(
+                spltJnts[-1].split("_")[-3], f"{span}{str(n+2).zfill(2)}"))
+            scene.parent(spltJnt, spltJnts[-1])
+            aimAxis = scene.get_rotate_order(spltJnt)[0]
+            scene.set_attr(f"{spltJnt}.translate{aimAxis}",
+                           scene.get_attr(f"{jnt_chain[i+1]}.translate{aimAxis}") / (splits + 1))
             spltJnts.append(spltJnt)
         # set attributes for split joints
         for n, j in enumerate(spltJnts):
-            j.overrideEnabled.set(1)
-            j.overrideColor.set(9)
+            scene.set_attr(f"{j}.overrideEnabled", 1)
+            scene.set_attr(f"{j}.overrideColor", 9)
             allSpltJnts.append(j)
     return allSpltJnts
 
 
+def make_splits(base_jnts, spans, chain_data, splits, spacing="uniform"):
+    """
+    Creates the split joints of every span of a chain in one go from transforms worked out all at once by the
+    captured chain (see split_chain)
+    :param base_jnts: list: the base joint of each span's split chain
+    :param spans: list: the name of each span
+    :param chain_data: ChainData: the captured chain being split
+    :param splits: int: number of in between joints for each span
+    :param spacing: str: how the split joints are spaced ('uniform' or 'curve')
+    :return: list: all split joints, including the base joints
+    """
+    translates, orients = chain_data.get_splits(splits, spacing)
+    roo = constants.ROTATEORDER.index(chain_data.rotate_order.lower())
+    radii = [scene.get_attr(f"{jnt}.radius") for jnt in base_jnts]
+    allSpltJnts = []
+    with scene.transaction():
+        for span, dupJnt, radius, spanTranslates, spanOrients in zip(spans, base_jnts, radii, translates.tolist(),
+                                                                     orients.tolist()):
+            spltJnts = [dupJnt]
+            for n, (translate, orient) in enumerate(zip(spanTranslates, spanOrients)):
+                name = dupJnt.replace(dupJnt.split("_")[-3], f"{span}{str(n+2).zfill(2)}")
+                spltJnt = scene.create_node("joint", name, parent=spltJnts[-1])
+                for attr, value in [("rotateOrder", roo), ("radius", radius), ("translate", translate),
+                                    ("jointOrient", orient), ("overrideEnabled", 1), ("overrideColor", 9)]:
+                    scene.set_attr(f"{spltJnt}.{attr}", value)
+                spltJnts.append(spltJnt)
+            allSpltJnts.extend(spltJnts)
+    return allSpltJnts
+
+
 #############
 # Text Data
 #############
@@ -501,35 +659,39 @@ def is_frozen(node=None):
     nodes = check_nodes([node])
     if nodes is None:
         return False
-    if nodes[0].getMatrix() == pm.dt.Matrix() and not pm.xform(nodes[0], q=1, ws=1, rp=1) == nodes[0].translate.get():
+    if scene.get_matrix(nodes[0], world=False) == constants.FROZENMTRX and not scene.get_position(
+            nodes[0]) == scene.get_attr(f"{nodes[0]}.translate"):
         return True
     return False
 
 
+@profiler.stage
 def freeze_transforms(nodes=None):
     """
     Freezes the transforms of a given list of nodes
-    :param nodes: list: the list of PyNodes whose transforms are being frozen
-    :return: list: the same list of PyNodes
+    :param nodes: list: the list of nodes whose transforms are being frozen
+    :return: list: the same list of nodes
     """
     nodes = check_nodes(nodes)
     if nodes is None:
         return None
     for node in nodes:
-        if not pm.nodeType(node) == "transform":
-            if pm.listRelatives(node, p=1) and not pm.nodeType(pm.listRelatives(node, p=1)[0]) == "transform":
+        if not scene.node_type(node) == "transform":
+            parent = scene.get_parent(node)
+            if parent is not None and not scene.node_type(parent) == "transform":
                 continue
             else:
-                pm.makeIdentity(pm.listRelatives(node, p=1)[0], a=1)
+                scene.freeze(parent)
         else:
-            pm.makeIdentity(node, a=1)
+            scene.freeze(node)
     return nodes
 
 
+@profiler.stage
 def reset_transforms(nodes=None, t=True, r=True, s=True, m=True, o=True):
     """
     Resets the transformation values of a given node without preserving transforms
-    :param nodes: list: List of PyNodes being edited
+    :param nodes: list: List of nodes being edited
     :param t: bool: Reset Translate attribute values
     :param r: bool: Reset Rotate attribute values
     :param s: bool: Reset Scale attribute values
@@ -549,75 +711,78 @@ def reset_transforms(nodes=None, t=True, r=True, s=True, m=True, o=True):
                     val = 1
                 try:
                     if attr == "offsetParentMatrix":
-                        node.offsetParentMatrix.set(constants.FROZENMTRX)
+                        scene.set_attr(f"{node}.offsetParentMatrix", constants.FROZENMTRX)
                         break
-                    elif attr == "jointOrient" and node.type() != "joint":
+                    elif attr == "jointOrient" and scene.node_type(node) != "joint":
                         continue
                     else:
-                        eval(f"node.{attr}{axis}.set({val})")
+                        scene.set_attr(f"{node}.{attr}{axis}", val)
                 except RuntimeError as e:
                     print(e)
 
 
+@profiler.stage
 def point_constraint_move(source, target):
     """
     Uses a point constrain to move a target node then deletes the consrtraint
-    :param source: PyNode: the object being moved to
-    :param target: PyNode: the object being moved
+    :param source: str: the object being moved to
+    :param target: str: the object being moved
     """
-    constraint = pm.pointConstraint(source, target)
-    pm.delete(constraint)
+    constraint = scene.point_constraint(source, target)
+    scene.delete(constraint)
     try:
-        pm.makeIdentity(target, a=1)
+        scene.freeze(target)
     except RuntimeError as e:
-        pm.warning(str(e))
+        scene.warning(str(e))
 
 
+@profiler.stage
 def transfer_transforms_to_offset(nodes=None):
     """
     Moves all transform values from the transform attributs to the Offset Parent Matrix attribute
-    :param nodes: list: a list of the PyNodes being edited
+    :param nodes: list: a list of the nodes being edited
     """
     nodes = check_nodes(nodes)
     if nodes is None:
         return None
     for node in nodes:
-        localMtrx = om.MMatrix(pm.xform(node, q=1, m=1, ws=0))
-        offsetMtrx = om.MMatrix(node.offsetParentMatrix.get())
-        bakedMtrx = localMtrx * offsetMtrx
-        node.offsetParentMatrix.set(bakedMtrx)
+        localMtrx = scene.get_matrix(node, world=False)
+        offsetMtrx = scene.get_attr(f"{node}.offsetParentMatrix")
+        bakedMtrx = mathutils.mult(localMtrx, offsetMtrx)
+        scene.set_attr(f"{node}.offsetParentMatrix", bakedMtrx)
         reset_transforms([node], m=False)
 
 
+@profiler.stage
 def transfer_offset_to_orient(nodes=None):
     """
     Moves any rotation value in the Offset Parent Matrix over to the Joint Orient attribude
-    :param nodes: list: a list of the PyNodes being edited
+    :param nodes: list: a list of the nodes being edited
     """
     nodes = check_nodes(nodes)
     if nodes is None:
         return
     for node in nodes:
-        if not node.type() == "joint":
+        if not scene.node_type(node) == "joint":
             continue
-        decompose = pm.createNode("decomposeMatrix", n="tempDM")
-        source = pm.listConnections(node.offsetParentMatrix,  p=1, d=0)[0]
-        pm.connectAttr(source, decompose.inputMatrix)
-        decompose.inputRotateOrder.set(node.rotateOrder.get())
-        node.jointOrient.set([-v for v in decompose.outputRotate.get()])
-        pm.delete(decompose)
+        decompose = scene.create_node("decomposeMatrix", "tempDM")
+        source = scene.list_connections(f"{node}.offsetParentMatrix", destination=False)[0]
+        scene.connect_attr(source, f"{decompose}.inputMatrix")
+        scene.set_attr(f"{decompose}.inputRotateOrder", scene.get_attr(f"{node}.rotateOrder"))
+        scene.set_attr(f"{node}.jointOrient", [-v for v in scene.get_attr(f"{decompose}.outputRotate")])
+        scene.delete(decompose)
 
 
 def toggle_inherits_transform(nodes=None):
     """
     Turns the Inherits Transform attribute of a given node off and on
-    :param nodes: list: a list of the PyNodes being edited
+    :param nodes: list: a list of the nodes being edited
     """
     nodes = check_nodes(nodes)
     if nodes is None:
         return
     for node in nodes:
-        if node.inheritsTransform.get():
-            node.inheritsTransform.set(1)
+        if scene.get_attr(f"{node}.inheritsTransform"):
+            scene.set_attr(f"{node}.inheritsTransform", 1)
         else:
-            node.inheritsTransform.set(0)
+            scene.set_attr(f"{node}.inheritsTransform", 0)
@@ -1,4 +1,4 @@
-import pymel.core as pm
+from core import scene
 from ctls import controls
 
 
@@ -22,32 +22,32 @@ DFRMCONN = {
 
 
 def make_ribbon_def_attrs(node, def_type):
-    if "deformers" not in pm.listAttr(node, ud=1):
-        pm.addAttr(node, ln="space", nn="________", at="enum", en="________", k=1)
-        pm.addAttr(node, ln="deformers", nn="DEFORMERS", at="enum", en="________", k=1)
-    pm.addAttr(node, ln=f"{def_type}Options", nn="________", at="enum", en=f"{def_type.upper()}", k=1)
-    pm.addAttr(node, ln=f"{def_type}Blend", nn="Blend", s=1, at="float", min=0.0, max=1.0, k=1)
+    if "deformers" not in scene.list_attrs(node):
+        scene.add_attr(node, "space", attr_type="enum", nice_name="________", enum="________")
+        scene.add_attr(node, "deformers", attr_type="enum", nice_name="DEFORMERS", enum="________")
+    scene.add_attr(node, f"{def_type}Options", attr_type="enum", nice_name="________", enum=f"{def_type.upper()}")
+    scene.add_attr(node, f"{def_type}Blend", nice_name="Blend", minimum=0.0, maximum=1.0)
     if def_type in DFRMATTRS:
         a = DFRMATTRS[def_type]
         for attr in a:
-            pm.addAttr(node, ln=attr, s=a[attr][0], at=a[attr][1], k=a[attr][2], dv=a[attr][3])
             if len(a[attr]) == 6:
-                newAttr = pm.PyNode(f"{node}.{attr}")
-                newAttr.setMin(a[attr][4])
-                newAttr.setMax(a[attr][5])
+                scene.add_attr(node, attr, attr_type=a[attr][1], default=a[attr][3], minimum=a[attr][4],
+                               maximum=a[attr][5], keyable=bool(a[attr][2]))
+            else:
+                scene.add_attr(node, attr, attr_type=a[attr][1], default=a[attr][3], keyable=bool(a[attr][2]))
 
 
 def make_spline_attrs(node, base="Base", tip="Tip", mid=False, head=False):
-    pm.addAttr(node, ln="space", nn="________", at="enum", en="________", k=1)
+    scene.add_attr(node, "space", attr_type="enum", nice_name="________", enum="________")
     if mid:
-        pm.addAttr(node, ln="follow", nn="Follow", at="enum", en=f"Both:{tip}:{base}:World", k=1)
+        scene.add_attr(node, "follow", attr_type="enum", nice_name="Follow", enum=f"Both:{tip}:{base}:World")
     else:
-        pm.addAttr(node, ln="stretch", nn="Stretch", s=1, at="byte", min=0, max=1, k=1)
-    pm.addAttr(node, ln="arch", nn="Arch", s=1, at="float", min=0.0, max=3.0, k=1)
+        scene.add_attr(node, "stretch", attr_type="byte", nice_name="Stretch", minimum=0, maximum=1)
+    scene.add_attr(node, "arch", nice_name="Arch", minimum=0.0, maximum=3.0)
     if head:
-        pm.addAttr(node, ln="inherit", nn="________", at="enum", en="INHERIT", k=1)
-        pm.addAttr(node, ln="position", nn="Position", s=1, at="float", min=0.0, max=1.0, k=1)
-        pm.addAttr(node, ln="orientation", nn="Orientation", s=1, at="float", min=0.0, max=1.0, k=1)
+        scene.add_attr(node, "inherit", attr_type="enum", nice_name="________", enum="INHERIT")
+        scene.add_attr(node, "position", nice_name="Position", minimum=0.0, maximum=1.0)
+        scene.add_attr(node, "orientation", nice_name="Orientation", minimum=0.0, maximum=1.0)
 
 
 class Add:
@@ -1,12 +1,12 @@
 import os
-import pymel.core as pm
 
 from core import constants
 from core import matrix
+from core import scene
 from core import utils
 
 
-SHAPES = utils.get_data_from_json(os.path.join(utils.RSTPATH, "rabid-skwerl-tools", "ctls", "shapes.json"))
+SHAPES = utils.get_data_from_json(os.path.join(os.path.dirname(__file__), "shapes.json"))
 
 
 ###################
@@ -24,13 +24,13 @@ def make_limb_bend_control_joints(jnts):
             name = name.replace(name.split("_")[-3], f"mid{str(i+1).zfill(2)}")
         ctlJntGrp = utils.make_group(f"{name}_grp", parent=grp)
         ctlJnt = utils.duplicate_chain([jnt], "ctl", ctlJntGrp)[0]
-        pm.rename(ctlJnt, name)
-        ctlJnt.radius.set(ctlJnt.radius.get() * 4)
+        ctlJnt = scene.rename(ctlJnt, name)
+        scene.set_attr(f"{ctlJnt}.radius", scene.get_attr(f"{ctlJnt}.radius") * 4)
         # TODO: a warning is being thrown here. It looks like this part of the code is
         #  running multiple times not a big deal
         matrix.parent_constraint(jnt, ctlJntGrp)
         utils.reset_transforms([ctlJntGrp], m=False)
-        pm.parent(ctlJnt, ctlJntGrp)
+        scene.parent(ctlJnt, ctlJntGrp)
         utils.reset_transforms([ctlJnt], m=False)
         ctlJnts.append(ctlJnt)
     return ctlJnts
@@ -49,8 +49,8 @@ def make_shape(name=None, scale=10.0, shape="Cube", rot90=False, mirror_x=False)
     if rot90:
         points = [[point[2], point[1], point[0]] for point in points]
     ptsScaled = [[axis * scale for axis in point] for point in points]
-    ctl = pm.curve(n=name, d=1, p=ptsScaled)
-    pm.delete(ctl, ch=1)
+    ctl = scene.create_curve(name, ptsScaled, degree=1)
+    scene.delete_history(ctl)
     return ctl
 
 
@@ -59,42 +59,42 @@ def make_circle(name=None, scale=10.0, aim="X"):
         name = "circle_ctl1"
     aimAxis = constants.get_axis_vector(aim)
     radius = scale * .3
-    ctl = pm.circle(n=name, nr=aimAxis, r=radius)[0]
-    pm.delete(ctl, ch=1)
+    ctl = scene.create_circle(name, normal=aimAxis, radius=radius)
+    scene.delete_history(ctl)
     return ctl
 
 
 def make_cog(name=None, scale=10.0, aim="Y"):
     ctl = make_shape(name, scale, "COG")
     if aim == "X":
-        pm.xform(ctl, ro=[0, 0, 90])
+        scene.set_rotation(ctl, [0, 0, 90])
     if aim == "Z":
-        pm.xform(ctl, ro=[90, 0, 0])
-    pm.makeIdentity(ctl, a=1)
+        scene.set_rotation(ctl, [90, 0, 0])
+    scene.freeze(ctl)
     return ctl
 
 
 def make_cube(name=None, scale=10.0, length=None, aim="X", mirror=False):
     ctl = make_shape(name, scale, "Cube", mirror_x=mirror)
     if aim == "Y":
-        pm.xform(ctl, ro=[0, 0, 90])
+        scene.set_rotation(ctl, [0, 0, 90])
     if aim == "Z":
-        pm.xform(ctl, ro=[0, -90, 0])
+        scene.set_rotation(ctl, [0, -90, 0])
     if length is not None:
         resize_cube(ctl, length, aim)
-    pm.makeIdentity(ctl, a=1)
+    scene.freeze(ctl)
     return ctl
 
 
 def resize_cube(cube, length, aim="X"):
     cvList = ["{}.cv[{}]".format(str(cube), i) for i in range(
-        pm.getAttr("{}.spans".format(cube)) + 1) if i in [0, 1, 4, 5, 8, 9, 10, 13]]
+        scene.get_attr("{}.spans".format(cube)) + 1) if i in [0, 1, 4, 5, 8, 9, 10, 13]]
     for i, cv in enumerate(cvList):
-        offset = pm.xform(cv, ws=1, t=1, q=1)
+        offset = scene.get_position(cv)
         if i == 0 and offset[constants.get_axis_index(aim)] < 0:
             length = -length
         offset[constants.get_axis_index(aim)] = length
-        pm.xform(cv, ws=1, t=offset)
+        scene.move(cv, offset)
 
 
 def make_gimbal(name=None, scale=10.0, aim="X", angle="Z", invert=False):
@@ -105,10 +105,11 @@ def make_gimbal(name=None, scale=10.0, aim="X", angle="Z", invert=False):
     if invert:
         angleAxis = [-item for item in angleAxis]
     radius = scale * .35
-    cir = pm.circle(r=radius, nr=aimAxis)[0]
-    subCir = pm.circle(c=[item * radius for item in angleAxis], nr=aimAxis, r=radius * .25)[0]
+    cir = scene.create_circle(f"{name}_cir", normal=aimAxis, radius=radius)
+    subCir = scene.create_circle(f"{name}_sub_cir", normal=aimAxis, radius=radius * .25,
+                                 center=[item * radius for item in angleAxis])
     ctl = utils.parent_crv(name, [subCir, cir])
-    pm.delete(ctl, ch=1)
+    scene.delete_history(ctl)
     return ctl
 
 
@@ -121,13 +122,13 @@ def make_icon(name=None, icon_type="FK", scale=10.0, aim="Z"):
         fi = make_shape("f", scale, "F")
     k = make_shape("k", scale, "K")
     icon = utils.parent_crv(name, [k, fi])
-    pm.xform(icon, cp=1)
-    pm.move(icon, [0, 0, 0], rpr=1)
+    scene.center_pivot(icon)
+    scene.move(icon, [0, 0, 0], pivot=True)
     if aim == "X":
-        pm.xform(icon, ro=[0, 90, 0])
+        scene.set_rotation(icon, [0, 90, 0])
     if aim == "Y":
-        pm.xform(icon, ro=[0, 0, 90])
-    pm.makeIdentity(icon, a=1)
+        scene.set_rotation(icon, [0, 0, 90])
+    scene.freeze(icon)
     return icon
 
 
@@ -141,10 +142,10 @@ def make_pin(name=None, scale=10.0, aim="X", up="Y", invert=False):
     length = scale * .3
     radius = scale * .1
     center = [item * (length + radius) for item in upAxis]
-    curve = pm.curve(d=1, p=([0, 0, 0], [item * length for item in upAxis]))
-    circle = pm.circle(c=center, nr=aimAxis, r=radius)[0]
+    curve = scene.create_curve(f"{name}_line", [[0, 0, 0], [item * length for item in upAxis]], degree=1)
+    circle = scene.create_circle(f"{name}_cir", normal=aimAxis, radius=radius, center=center)
     ctl = utils.parent_crv(name, [circle, curve])
-    pm.delete(ctl, ch=1)
+    scene.delete_history(ctl)
     return ctl
 
 
@@ -157,11 +158,11 @@ def make_sphere(name=None, scale=10.0):
     if name is None:
         name = "sphere_ctl1"
     radius = scale * .2
-    crv1 = pm.circle(nr=[1, 0, 0], r=radius)
-    crv2 = pm.circle(nr=[0, 1, 0], r=radius)
-    crv3 = pm.circle(nr=[0, 0, 1], r=radius)
-    ctl = utils.parent_crv(name, [crv3[0], crv2[0], crv1[0]])
-    pm.delete(ctl, ch=1)
+    crv1 = scene.create_circle(f"{name}_x_cir", normal=[1, 0, 0], radius=radius)
+    crv2 = scene.create_circle(f"{name}_y_cir", normal=[0, 1, 0], radius=radius)
+    crv3 = scene.create_circle(f"{name}_z_cir", normal=[0, 0, 1], radius=radius)
+    ctl = utils.parent_crv(name, [crv3, crv2, crv1])
+    scene.delete_history(ctl)
     return ctl
 
 
@@ -176,8 +177,8 @@ def make_spline(name=None, scale=10.0, aim="X", up="Y", invert=False):
         rotation[1] = 90
     if invert:
         rotation = [-axis for axis in rotation]
-    pm.xform(ctl, ro=rotation)
-    pm.makeIdentity(ctl, a=1)
+    scene.set_rotation(ctl, rotation)
+    scene.freeze(ctl)
     return ctl
 
 
@@ -188,9 +189,9 @@ def make_square(name=None, scale=10.0, aim="X"):
     vector[constants.get_axis_index(aim)] = 0
     indexes = [x for i, x in enumerate(range(3)) if not i == constants.get_axis_index(aim)]
     ptVector = [v * (scale * .3) for v in vector]
-    ctl = pm.curve(n=name, d=1, p=[ptVector, [-v if i == indexes[0] else v for i, v in enumerate(ptVector)], [
-        -v for v in ptVector], [-v if i == indexes[1] else v for i, v in enumerate(ptVector)], ptVector])
-    pm.delete(ctl, ch=1)
+    ctl = scene.create_curve(name, [ptVector, [-v if i == indexes[0] else v for i, v in enumerate(ptVector)], [
+        -v for v in ptVector], [-v if i == indexes[1] else v for i, v in enumerate(ptVector)], ptVector], degree=1)
+    scene.delete_history(ctl)
     return ctl
 
 
@@ -198,17 +199,17 @@ def make_trs(name=None, scale=10.0, aim="Y"):
     if name is None:
         name = "trs_ctl"
     outer = make_shape("trs_outerRing", scale, "TRS")
-    circle = pm.circle(n="trs_innerRing", nr=[0, 1, 0], r=1.9 * scale)[0]
+    circle = scene.create_circle("trs_innerRing", normal=[0, 1, 0], radius=1.9 * scale)
     lt = make_shape("trs_ltArrow", scale, "TRS Arrow")
     rt = make_shape("trs_rtArrow", scale, "TRS Arrow", mirror_x=True)
     up = make_shape("trs_upArrow", scale, "TRS Arrow", rot90=True)
     dn = make_shape("trs_dnArrow", scale, "TRS Arrow", rot90=True, mirror_x=True)
     ctl = utils.parent_crv(name, [circle, lt, rt, up, dn, outer])
     if aim == "X":
-        pm.xform(ctl, ro=[0, 0, 90])
+        scene.set_rotation(ctl, [0, 0, 90])
     if aim == "Z":
-        pm.xform(ctl, ro=[90, 0, 0])
-    pm.makeIdentity(ctl, a=1)
+        scene.set_rotation(ctl, [90, 0, 0])
+    scene.freeze(ctl)
     return ctl
 
 
@@ -217,25 +218,25 @@ def make_fkik(name=None, scale=10.0, aim="Z"):
         name = "fkik_ctl1"
     fk = make_icon("{}_fk".format(name.split("_")[0]), icon_type="FK", scale=(scale * .3), aim=aim)
     ik = make_icon("{}_ik".format(name.split("_")[0]), icon_type="IK", scale=(scale * .3), aim=aim)
-    fkShapes = fk.getShapes()
-    ikShapes = ik.getShapes()
+    fkShapes = scene.get_shapes(fk)
+    ikShapes = scene.get_shapes(ik)
     box = make_shape("{}_ik".format(name.split("_")[0]), scale=(scale * .3), shape="FKIK Box")
     if aim == "X":
         i = 1
-        pm.xform(box, ro=[0, 90, 0])
-        pm.makeIdentity(box, a=1)
+        scene.set_rotation(box, [0, 90, 0])
+        scene.freeze(box)
     elif aim == "Y":
         i = 2
-        pm.xform(box, ro=[90, 0, 0])
-        pm.makeIdentity(box, a=1)
+        scene.set_rotation(box, [90, 0, 0])
+        scene.freeze(box)
     else:
         i = 1
     lineBase = [0, 0, 0]
     lineTip = [0, 0, 0]
     lineBase[i] = scale * -.13423841468
     lineTip[i] = scale * -.3
-    line = pm.curve(n="line", d=1, p=[lineBase, lineTip])
-    lineShapes = line.getShapes()
+    line = scene.create_curve("line", [lineBase, lineTip], degree=1)
+    lineShapes = scene.get_shapes(line)
     ctl = utils.parent_crv(name, [line, fk, ik, box])
     return [ctl, fkShapes, ikShapes, lineShapes]
 
@@ -251,26 +252,26 @@ def make_global_controls(scale=10):
     cog = make_cog("root_ctl", .6 * scale)
     grp = utils.make_group("global_ctl_grp", trs)
     utils.make_group("ctl_grp", grp)
-    pm.parent(cog, loc)
-    pm.parent(loc, trs)
+    scene.parent(cog, loc)
+    scene.parent(loc, trs)
     # Set the rotation order and lock the X & Z scale axis to the Y df each controls
     ctls = [trs, loc, cog]
     for ctl in ctls:
-        ctl.rotateOrder.set(2)
-        pm.connectAttr(ctl.scalY, ctl.scaleX)
-        pm.connectAttr(ctl.scaleY, ctl.scaleX)
+        scene.set_attr(f"{ctl}.rotateOrder", 2)
+        scene.connect_attr(f"{ctl}.scaleY", f"{ctl}.scaleX")
+        scene.connect_attr(f"{ctl}.scaleY", f"{ctl}.scaleZ")
         # Color the shape nodes
-        for shape in ctl.getShapes():
-            shape.overrideEnabled.set(1)
-            shape.overrideColor.set(17)
+        for shape in scene.get_shapes(ctl):
+            scene.set_attr(f"{shape}.overrideEnabled", 1)
+            scene.set_attr(f"{shape}.overrideColor", 17)
     # Add scale multipliers to scale the driver joints and
-    gMult = pm.shadingNode("multDoubleLinear", n="global_scale_mult", au=1)
-    lMult = pm.shadingNode("multDoubleLinear", n="local_scale_mult", au=1)
+    gMult = scene.create_node("multDoubleLinear", "global_scale_mult")
+    lMult = scene.create_node("multDoubleLinear", "local_scale_mult")
     # Connect the nodes
-    pm.connectAttr(trs.scaleY, gMult.input1, f=1)
-    pm.connectAttr(cog.scaleY, gMult.input2, f=1)
-    pm.connectAttr(gMult.output, lMult.input1, f=1)
-    pm.connectAttr(cog.scaleY, lMult.input2, f=1)
+    scene.connect_attr(f"{trs}.scaleY", f"{gMult}.input1")
+    scene.connect_attr(f"{cog}.scaleY", f"{gMult}.input2")
+    scene.connect_attr(f"{gMult}.output", f"{lMult}.input1")
+    scene.connect_attr(f"{cog}.scaleY", f"{lMult}.input2")
     # TODO: add attributes to controls
 
 
@@ -287,25 +288,25 @@ class Build(object):
         self.ctls = {"FK": [],
                      "IK": [],
                      "Tweak": []}
-        pm.select(cl=1)
+        scene.clear_selection()
 
     def set_ik_mid_follow(self):
         # TODO: get to work with one mid ctl
         # TODO: figure out how to apply to two mid ctls (they can go fuck themselves if they want more XD)
-        both = pm.shadingNode("condition", n="CT_neck_mid01_both_cond", au=1)
-        tip = pm.shadingNode("condition", n="CT_neck_mid01_tip_cond", au=1)
-        base = pm.shadingNode("condition", n="CT_neck_mid01_base_cond", au=1)
-        world = pm.shadingNode("condition", n="CT_neck_mid01_world_cond", au=1)
-        weights = pm.parentConstraint("CT_neck_mid01_IK_ctl_grp_parentConstraint1", q=1, wal=1)
+        both = scene.create_node("condition", "CT_neck_mid01_both_cond")
+        tip = scene.create_node("condition", "CT_neck_mid01_tip_cond")
+        base = scene.create_node("condition", "CT_neck_mid01_base_cond")
+        world = scene.create_node("condition", "CT_neck_mid01_world_cond")
+        weights = scene.constraint_weights("CT_neck_mid01_IK_ctl_grp_parentConstraint1")
         for node in [both, tip, base, world]:
-            node.colorIfTrueR.set(1)
-            node.colorIfFalseR.set(0)
-        both.colorIfTrueG.set(1)
-        both.colorIfFalseG.set(0)
-        tip.secondTerm.set(1)
-        base.secondTerm.set(2)
-        world.secondTerm.set(3)
-        pm.connectAttr(both.outColorR, weights[0], f=1)
-        pm.connectAttr(both.outColorG, weights[1], f=1)
-        pm.connectAttr(both.outColorB, weights[2], f=1)
+            scene.set_attr(f"{node}.colorIfTrueR", 1)
+            scene.set_attr(f"{node}.colorIfFalseR", 0)
+        scene.set_attr(f"{both}.colorIfTrueG", 1)
+        scene.set_attr(f"{both}.colorIfFalseG", 0)
+        scene.set_attr(f"{tip}.secondTerm", 1)
+        scene.set_attr(f"{base}.secondTerm", 2)
+        scene.set_attr(f"{world}.secondTerm", 3)
+        scene.connect_attr(f"{both}.outColorR", weights[0])
+        scene.connect_attr(f"{both}.outColorG", weights[1])
+        scene.connect_attr(f"{both}.outColorB", weights[2])
 
@@ -1,7 +1,8 @@
-import pymel.core as pm
-import maya.api.OpenMaya as om
-
+from core import chain
 from core import constants
+from core import nurbs
+from core import profiler
+from core import scene
 from core import utils
 from jnts import follow
 from jnts import orient
@@ -10,6 +11,7 @@ from jnts import twist
 
 class Build(object):
     # TODO: Orient base to world needs more testing
+    @profiler.stage
     def __init__(self, guides_obj, spline=False, orientation="xyz", orient_tip=True,
                  orient_base_to_world=True, orient_chain_to_world=False, make_twist=False, make_follow=False):
         """
@@ -23,76 +25,119 @@ class Build(object):
         :param make_twist: bool: weather or not to add a twist joint at the base of the chain
         :param make_follow: weather or not to create a set of follow joints
         """
-        self.guides = guides_obj
-        self.spline = spline
-        self.name = self.guides.name
-        self.orientation = orientation
-        self.orient_tip = orient_tip
-        self.orient_base = orient_base_to_world
-        self.orient_to_world = orient_chain_to_world
-        self.rig_grp = utils.make_group("rig_grp_DO_NOT_TOUCH")
-        self.main_joints_grp = utils.make_group("jnt_grp", parent=self.rig_grp)
-        self.main_utils_grp = utils.make_group("utils_grp", parent=self.rig_grp)
-        self.driver_joints_grp = utils.make_group(f"{self.name}_drv_jnt_grp",
-                                                  parent=utils.make_group("drv_jnt_grp", parent=self.main_joints_grp))
-        self.aim_vector = constants.get_axis_vector(self.orientation[0].capitalize(), invert=self.guides.mirror)
-        self.up_vector = constants.get_axis_vector(self.orientation[1].capitalize())
-        self.tertiary_vector = constants.get_axis_vector(self.orientation[2].capitalize(), invert=self.guides.mirror)
-        self.driver_joints = self.make_driver_chain()
-        self.long_axis = self.get_long_axis()
-        self.check_rotation()
-        self.up_loc = self.make_up_loc()
-        self.crv_name = f"{utils.get_info_from_joint(self.driver_joints[0], name=True)}_crv"
-        self.crv = utils.make_curve_from_chain(self.driver_joints[0], name=self.crv_name, bind=self.driver_joints)
-        self.crv_info = pm.PyNode(f"{self.crv.name()}_info")
-        if make_twist:
-            self.twist_obj = twist.Build(self.driver_joints[0])
-        if make_follow:
-            self.followObj = follow.Build(self.driver_joints, self.aim_vector, self.up_vector, self.up_loc)
-        pm.select(cl=1)
+        with scene.building():
+            self.guides = guides_obj
+            self.spline = spline
+            self.name = self.guides.name
+            self.orientation = orientation
+            self.orient_tip = orient_tip
+            self.orient_base = orient_base_to_world
+            self.orient_to_world = orient_chain_to_world
+            self.rig_grp = utils.make_group("rig_grp_DO_NOT_TOUCH")
+            self.main_joints_grp = utils.make_group("jnt_grp", parent=self.rig_grp)
+            self.main_utils_grp = utils.make_group("utils_grp", parent=self.rig_grp)
+            self.driver_joints_grp = utils.make_group(
+                f"{self.name}_drv_jnt_grp", parent=utils.make_group("drv_jnt_grp", parent=self.main_joints_grp))
+            self.aim_vector = constants.get_axis_vector(self.orientation[0].capitalize(), invert=self.guides.mirror)
+            self.up_vector = constants.get_axis_vector(self.orientation[1].capitalize())
+            self.tertiary_vector = constants.get_axis_vector(self.orientation[2].capitalize(),
+                                                             invert=self.guides.mirror)
+            # Chains are only rebuilt when their guides or build options have changed since the last build
+            self.fingerprint = self.get_fingerprint(spline=spline, make_twist=make_twist, make_follow=make_follow)
+            self.changed = not (utils.get_stamp(self.driver_joints_grp) == self.fingerprint
+                                and scene.get_children(self.driver_joints_grp))
+            if self.changed:
+                if scene.exists(f"{self.name}_up_loc"):
+                    scene.delete(f"{self.name}_up_loc")
+                self.driver_joints = self.make_driver_chain()
+                self.chain_data = chain.capture(self.driver_joints, list(range(-1, len(self.driver_joints) - 1)))
+                self.long_axis = self.get_long_axis()
+                self.check_rotation()
+                utils.set_stamp(self.driver_joints_grp, self.fingerprint)
+            else:
+                self.driver_joints = utils.get_joints_in_chain(scene.get_children(self.driver_joints_grp)[0])
+                self.chain_data = chain.capture(self.driver_joints, list(range(-1, len(self.driver_joints) - 1)))
+                self.long_axis = self.get_long_axis()
+            self.up_loc = self.make_up_loc()
+            self.crv_name = f"{utils.get_info_from_joint(self.driver_joints[0], name=True)}_crv"
+            self.crv = utils.make_curve_from_chain(self.driver_joints[0], name=self.crv_name, bind=self.driver_joints,
+                                                   chain_data=self.chain_data)
+            self.crv_info = f"{self.crv}_info"
+            self.crv_data = nurbs.Curve.from_chain(self.chain_data) if self.chain_data is not None else None
+            if make_twist:
+                self.twist_obj = twist.Build(self.driver_joints[0], chain_data=self.chain_data)
+            if make_follow:
+                self.followObj = follow.Build(self.driver_joints, self.aim_vector, self.up_vector, self.up_loc,
+                                              chain_data=self.chain_data)
+            scene.clear_selection()
 
+    @profiler.stage
     def check_rotation(self):
         """
-        Checks the rotation of joints along the chain to see if they align with the overall chain.
+        Checks the rotation of joints along the chain to see if they align with the overall chain, then checks the
+        chain for mirroring and twisting issues. The corrections for the whole chain are worked out at once from
+        the world matrices of its joints (see orient.correct_chain) and written back in one go
+        """
+        if len(self.driver_joints) < 3:
+            return
+        # Determine which vector to "look" at the tertiary axes from
+        axis_v = constants.get_axis_vector("X" if self.long_axis == "Z" else "Z")
+        if self.chain_data is None:
+            self.check_rotation_by_joint(axis_v)
+            return
+        guide_vectors = [[round(v, 3) for v in scene.get_position(guide)] for guide in self.guides.allGuides][:3]
+        corrected = orient.correct_chain(self.chain_data.matrices, self.orientation, axis_v,
+                                         scene.get_matrix(self.driver_joints_grp),
+                                         self.guides.mirror and constants.is_straight_line(guide_vectors),
+                                         self.orient_tip)
+        if corrected is None:
+            return
+        with scene.transaction():
+            for jnt, translate, orient_val in zip(self.driver_joints, *[a.tolist() for a in corrected]):
+                scene.set_attr(f"{jnt}.translate", translate)
+                scene.set_attr(f"{jnt}.rotate", [0.0, 0.0, 0.0])
+                scene.set_attr(f"{jnt}.jointOrient", orient_val)
+        self.chain_data.refresh()
+
+    def check_rotation_by_joint(self, axis_v):
+        """
+        Fixes the chain one joint at a time (what check_rotation falls back on without NumPy)
+        :param axis_v: list: the world vector the tertiary axes are compared along
         """
         for i, jnt in enumerate(self.driver_joints[1:-1], 1):
             prev_jnt = self.driver_joints[i - 1]
             # Get the World Space Matrix of the joints
-            jnt_ws = pm.xform(jnt, q=1, m=1, ws=1)
-            prevJntWS = pm.xform(prev_jnt, q=1, m=1, ws=1)
+            jnt_ws = scene.get_matrix(jnt)
+            prevJntWS = scene.get_matrix(prev_jnt)
             # Get Axis Direction (matrix)
             mtx_range = constants.get_axis_matrix_range(self.orientation[-1])
-            jnt_axis = om.MVector(jnt_ws[mtx_range[0]:mtx_range[1]])
-            prev_jnt_axis = om.MVector(prevJntWS[mtx_range[0]:mtx_range[1]])
-            # Determine which vector to "look" at the axis from
-            if self.long_axis == "Z":
-                axis_v = constants.get_axis_vector("X")
-            else:
-                axis_v = constants.get_axis_vector("Z")
+            jnt_axis = jnt_ws[mtx_range[0]:mtx_range[1]]
+            prev_jnt_axis = prevJntWS[mtx_range[0]:mtx_range[1]]
             # Get Axis direction based on axis vector (range -1.0 - 1.0)
-            jnt_axis_dir = jnt_axis * om.MVector(axis_v[0], axis_v[1], axis_v[2])
-            prev_jnt_axis_dir = prev_jnt_axis * om.MVector(axis_v[0], axis_v[1], axis_v[2])
+            jnt_axis_dir = sum(a * v for a, v in zip(jnt_axis, axis_v))
+            prev_jnt_axis_dir = sum(a * v for a, v in zip(prev_jnt_axis, axis_v))
             # Are axes looking up (is it positive according to the axis vector)?
             jnt_up = constants.is_positive(jnt_axis_dir)
             prevJntUp = constants.is_positive(prev_jnt_axis_dir)
             if not jnt_up == prevJntUp:
                 self.fix_rotation(jnt, self.driver_joints[i - 1], self.driver_joints[i + 1])
-            self.check_mirror()
-            self.check_twist()
+        self.check_mirror()
+        self.check_twist()
 
+    @profiler.stage
     def check_mirror(self):
         """
         There's a weird quirk where chains in a straight line don't mirror properly; this corrects that
         """
-        guide_vectors = [[round(v, 3) for v in pm.xform(guide, q=1, ws=1, rp=1)] for guide in self.guides.allGuides][:3]
+        guide_vectors = [[round(v, 3) for v in scene.get_position(guide)] for guide in self.guides.allGuides][:3]
         for joint in [joint for joint in self.driver_joints
                       if constants.is_straight_line(guide_vectors) and self.guides.mirror]:
             if joint != self.driver_joints[-1]:
-                children = pm.listRelatives(joint, c=1)
-                pm.parent(children, w=1)
-                eval(f"joint.rotate{str(joint.getRotationOrder())[0]}.set(180)")
-                pm.makeIdentity(joint, a=1)
-                pm.parent(children, joint)
+                children = scene.get_children(joint)
+                scene.parent(children)
+                scene.set_attr(f"{joint}.rotate{scene.get_rotate_order(joint)[0]}", 180)
+                scene.freeze(joint)
+                scene.parent(children, joint)
             elif self.orient_tip:
                 utils.reset_transforms([joint], t=False, r=False, s=False, m=False, o=True)
             else:
@@ -102,26 +147,27 @@ class Build(object):
         """
         Checks to make sure the rotation order of a given node is the same as the class orientation and
         fixes it if not
-        :param node: PyNode: the node being checked
-        :return: PyNode: the same node that's fixed (if needed)
+        :param node: str: the node being checked
+        :return: str: the same node that's fixed (if needed)
         """
-        if not self.orientation == (str(node.getRotationOrder()).lower()):
-            pm.xform(node, roo=self.orientation, p=1)
+        if not self.orientation == scene.get_rotate_order(node).lower():
+            scene.set_rotate_order(node, self.orientation)
         return node
 
+    @profiler.stage
     def check_twist(self):
         """
         Checks the joint orientation to make sure there isn't a 180 degree offset
         """
         for joint in self.driver_joints:
-            joint_orient = joint.jointOrient.get()
-            if abs(round(joint_orient[constants.get_axis_index(str(joint.getRotationOrder())[0])], 3)) == 180:
+            joint_orient = scene.get_attr(f"{joint}.jointOrient")
+            if abs(round(joint_orient[constants.get_axis_index(scene.get_rotate_order(joint)[0])], 3)) == 180:
                 if joint != self.driver_joints[-1]:
-                    joint_orient[constants.get_axis_index(str(joint.getRotationOrder())[0])] = 0
-                    children = pm.listRelatives(joint, c=1)
-                    pm.parent(children, w=1)
-                    joint.jointOrient.set(joint_orient)
-                    pm.parent(children, joint)
+                    joint_orient[constants.get_axis_index(scene.get_rotate_order(joint)[0])] = 0
+                    children = scene.get_children(joint)
+                    scene.parent(children)
+                    scene.set_attr(f"{joint}.jointOrient", joint_orient)
+                    scene.parent(children, joint)
                 elif self.orient_tip:
                     utils.reset_transforms([joint], t=False, r=False, s=False, m=False, o=True)
                 else:
@@ -130,21 +176,33 @@ class Build(object):
     def fix_rotation(self, joint, prev_jnt, next_jnt):
         """
         Corrects rotation issues along the chain
-        :param joint: PyNode: the joint being fixed
-        :param prev_jnt: PyNode: the parent joint of the joint being fixed
-        :param next_jnt: PyNode: the child joint of the joint being fixed
+        :param joint: str: the joint being fixed
+        :param prev_jnt: str: the parent joint of the joint being fixed
+        :param next_jnt: str: the child joint of the joint being fixed
         """
         rotList = [0, 0, 0]
         rotAmnt = 180
         rotList[constants.get_axis_index(self.orientation[0])] = rotAmnt
-        pm.parent(joint, w=1)
-        if pm.listRelatives(joint, c=1):
-            pm.parent(next_jnt, w=1)
-        pm.xform(joint, ro=rotList, os=1)
-        pm.makeIdentity(joint, a=1)
-        pm.parent(joint, prev_jnt)
-        if not pm.listRelatives(next_jnt, p=1):
-            pm.parent(next_jnt, joint)
+        scene.parent(joint)
+        if scene.get_children(joint):
+            scene.parent(next_jnt)
+        scene.set_rotation(joint, rotList)
+        scene.freeze(joint)
+        scene.parent(joint, prev_jnt)
+        if scene.get_parent(next_jnt) is None:
+            scene.parent(next_jnt, joint)
+
+    def get_fingerprint(self, **options):
+        """
+        Returns the fingerprint of everything the driver chain is built from: the world position of each guide,
+        the chain's orientation, mirror and invert settings and the build options
+        :param options: the build options that aren't stored on the class
+        :return: str: the fingerprint
+        """
+        positions = [[round(v, 4) for v in scene.get_position(guide)] for guide in self.guides.allGuides]
+        return utils.get_fingerprint([self.guides.allGuides, positions, self.guides.scale, self.guides.mirror,
+                                      self.guides.invert, self.orientation, self.orient_tip, self.orient_base,
+                                      self.orient_to_world, options])
 
     def get_long_axis(self, joint=None):
         """
@@ -154,13 +212,15 @@ class Build(object):
         :param joint: joint being queried
         """
         if joint is None:
+            if self.chain_data is not None:
+                return self.chain_data.long_axis
             joint = self.driver_joints[0]
-        aimWM = pm.xform(joint, q=1, m=1, ws=1)
+        aimWM = scene.get_matrix(joint)
         mtrxRange = constants.get_axis_matrix_range(self.orientation[0])
-        aimMtrx = om.MVector(aimWM[mtrxRange[0]:mtrxRange[1]])
-        aimUpX = abs(aimMtrx * om.MVector(1, 0, 0))
-        aimUpY = abs(aimMtrx * om.MVector(0, 1, 0))
-        aimUpZ = abs(aimMtrx * om.MVector(0, 0, 1))
+        aimMtrx = aimWM[mtrxRange[0]:mtrxRange[1]]
+        aimUpX = abs(aimMtrx[0])
+        aimUpY = abs(aimMtrx[1])
+        aimUpZ = abs(aimMtrx[2])
         aimValue = max([aimUpX, aimUpY, aimUpZ])
         if aimValue == aimUpX:
             return "X"
@@ -169,26 +229,27 @@ class Build(object):
         else:
             return "Z"
 
+    @profiler.stage
     def make_driver_chain(self):
         """
         Build the joint chain that will act as the driver for this section of the rig
         :return: list: the joints that were created
         """
         # Double check to make sure driver chain doesn't exist
-        if pm.listRelatives(self.driver_joints_grp, c=1):
-            pm.delete(pm.listRelatives(self.driver_joints_grp, ad=1))
-            pm.delete(f"{self.name}_crv")
-        # Clear Selection
-        pm.select(cl=1)
+        if scene.get_children(self.driver_joints_grp):
+            scene.delete(scene.get_children(self.driver_joints_grp))
+            if scene.exists(f"{self.name}_crv"):
+                scene.delete(f"{self.name}_crv")
         # Create a joint for each guide
         jntList = []
         for guide in self.guides.allGuides:
-            jntName = guide.name().replace("_guide", "_drv_jnt")
-            jntPos = pm.xform(guide, q=1, ws=1, rp=1)
+            jntName = guide.replace("_guide", "_drv_jnt")
+            jntPos = scene.get_position(guide)
             jntRad = self.guides.scale * .1
-            jnt = pm.joint(n=jntName, p=jntPos, roo=self.orientation, rad=jntRad)
-            jnt.overrideEnabled.set(1)
-            jnt.overrideColor.set(1)
+            jnt = scene.create_joint(jntName, position=jntPos, radius=jntRad, rotate_order=self.orientation,
+                                     parent=jntList[-1] if jntList else None)
+            scene.set_attr(f"{jnt}.overrideEnabled", 1)
+            scene.set_attr(f"{jnt}.overrideColor", 1)
             jntList.append(jnt)
         # Set proper rotation and orientation for the guides
         orient.joints_in_chain(jntList, orient_tip=self.orient_tip, group=self.driver_joints_grp,
@@ -196,16 +257,19 @@ class Build(object):
                                neg=self.guides.invert, mirror=self.guides.mirror)
         return jntList
 
+    @profiler.stage
     def make_up_loc(self):
         """
         Creates an up locator for this portion of the rig that will be used to constrain Twist joints and IK chains
-        :return: PyNode: the up locator that was created
-        """
-        if pm.ls(f"{self.name}_up_loc"):
-            return pm.PyNode(f"{self.name}_up_loc")
-        loc = pm.spaceLocator(n=f"{self.name}_up_loc")
-        pt = pm.pointConstraint(self.driver_joints[0], loc)
-        ornt = pm.orientConstraint(self.driver_joints[0], loc)
-        pm.delete(pt, ornt)
-        pm.move(loc, [-v * (self.guides.scale * .2) for v in self.tertiary_vector], r=1, os=1)
+        :return: str: the up locator that was created
+        """
+        loc = scene.find(f"{self.name}_up_loc")
+        if loc is not None:
+            return loc
+        loc = scene.create_locator(f"{self.name}_up_loc")
+        pt = scene.point_constraint(self.driver_joints[0], loc)
+        ornt = scene.orient_constraint(self.driver_joints[0], loc)
+        scene.delete([pt, ornt])
+        scene.move(loc, [-v * (self.guides.scale * .2) for v in self.tertiary_vector], relative=True,
+                   object_space=True)
         return loc
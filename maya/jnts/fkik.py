@@ -1,6 +1,7 @@
-import pymel.core as pm
-
+from core import chain
 from core import matrix
+from core import profiler
+from core import scene
 from core import utils
 from core import blend_colors
 from rigs import stretch
@@ -8,54 +9,69 @@ from rigs import stretch
 
 # TODO: currently, the base joint is receiving transform values when the offset should be maintained
 
+@profiler.stage
 def make_fkik_chains(jnts=None, bc=True, primary=None):
-    # get list of joints if none are provided
-    if jnts is None:
-        if not pm.ls(sl=1):
-            return pm.error("please select base joints of chains")
-        jnts = [jnt for jnt in pm.ls(sl=1) if jnt.type() == "joint"]
-        if not jnts:
-            return pm.error("make sure you select joints")
-    fkikData = {}
-    for jnt in jnts:
-        pm.select(jnt, r=1)
-        fkik = Build(bc=bc, primary=primary)
-        fkikData[jnt.name()] = fkik
-    return fkikData
+    with scene.building():
+        # get list of joints if none are provided
+        if jnts is None:
+            if not scene.selected():
+                return scene.error("please select base joints of chains")
+            jnts = scene.selected(node_type="joint")
+            if not jnts:
+                return scene.error("make sure you select joints")
+        fkikData = {}
+        for jnt in jnts:
+            scene.select(jnt)
+            fkik = Build(bc=bc, primary=primary)
+            fkikData[jnt] = fkik
+        return fkikData
 
 
 # TODO: controls_obj should be dropped in here as well. The object-oriented nature of this will allow
 #  data to be queried more easily
 class Build(object):
+    @profiler.stage
     def __init__(self, driver_obj=None, fk=True, ik=True, bc=False, primary=None):
         self.driver = driver_obj
         if self.driver is not None:
             self.name = self.driver.name
             self.driverJoints = self.driver.driver_joints
+            self.chain_data = self.driver.chain_data
         else:
-            self.name = utils.get_info_from_joint(pm.ls(sl=1)[0], name=1)
-            self.driverJoints = utils.get_joints_in_chain(pm.ls(sl=1)[0])
+            self.name = utils.get_info_from_joint(scene.selected()[0], name=1)
+            self.driverJoints = utils.get_joints_in_chain(scene.selected()[0])
+            self.chain_data = chain.capture(self.driverJoints)
         self.fk = fk
         self.ik = ik
         self.fkJointsGrp = utils.make_group(f"{self.name}_FK_jnt_grp", parent=utils.make_group("FK_jnt_grp"))
         self.ikJointsGrp = utils.make_group(f"{self.name}_IK_jnt_grp", parent=utils.make_group("IK_jnt_grp"))
-        pm.xform(self.fkJointsGrp, t=pm.xform(self.driverJoints[0], q=1, ws=1, rp=1))
-        pm.xform(self.ikJointsGrp, t=pm.xform(self.driverJoints[0], q=1, ws=1, rp=1))
+        position = self.chain_data.positions[0].tolist() if self.chain_data is not None else scene.get_position(
+            self.driverJoints[0])
+        scene.set_position(self.fkJointsGrp, position)
+        scene.set_position(self.ikJointsGrp, position)
         if self.driver is not None:
-            if not pm.listRelatives("FK_jnt_grp", p=1):
-                pm.parent("FK_jnt_grp", self.driver.main_joints_grp)
-            if not pm.listRelatives("IK_jnt_grp", p=1):
-                pm.parent("IK_jnt_grp", self.driver.main_joints_grp)
+            if not scene.get_parent("FK_jnt_grp"):
+                scene.parent("FK_jnt_grp", self.driver.main_joints_grp)
+            if not scene.get_parent("IK_jnt_grp"):
+                scene.parent("IK_jnt_grp", self.driver.main_joints_grp)
+        # Leave the chains alone if they were built from the current driver chain
+        self.current = utils.is_current(self.fkJointsGrp, self.name)
+        stale = scene.get_children(self.fkJointsGrp) + scene.get_children(self.ikJointsGrp)
+        for jnt in ["_".join(jnt.split("_")[:-1]) for jnt in self.driverJoints]:
+            stale += [f"{jnt}_blend", f"{jnt}_to_{jnt}_dec"]
+        utils.clear_stale(self.fkJointsGrp, self.name, stale)
         self.fkJoints = self.get_chain(chain_type="FK")
         self.ikJoints = self.get_chain(chain_type="IK")
-        if bc:
-            self.blends = self.get_blends(mtrx=False)
-        else:
-            if primary is None:
+        self.blends = None
+        if not self.current:
+            if bc:
+                self.blends = self.get_blends(mtrx=False)
+            elif primary is None:
                 self.blends = self.get_blends(mtrx=True)
             else:
                 self.primary = primary
                 self.make_matrix_constraints()
+            utils.stamp_chain(self.fkJointsGrp, self.name)
 
         # TODO: setup IK system
         # TODO: determine when to use a spline
@@ -93,9 +109,9 @@ class Build(object):
             return None
         # Set chain's naming convention
         name = f"{self.name}_base_{chain_type}_jnt"
-        if not pm.ls(name):
+        if not scene.exists(name):
             return self.make_chain(chain_type)
-        return utils.get_joints_in_chain(pm.PyNode(name))
+        return utils.get_joints_in_chain(scene.find(name))
 
     def make_chain(self, chain_type="FK"):
         if chain_type == "FK":
@@ -104,18 +120,16 @@ class Build(object):
         else:
             color = 29
             parent = self.ikJointsGrp
-        newChain = utils.duplicate_chain(utils.get_joints_in_chain(self.driverJoints[0]), chain_type, parent)
-        for jnt in newChain:
-            jnt.overrideEnabled.set(1)
-            jnt.overrideColor.set(color)
-        return newChain
+        jnts = self.chain_data.names if self.chain_data is not None else utils.get_joints_in_chain(
+            self.driverJoints[0])
+        return utils.duplicate_chain(jnts, chain_type, parent, color=color)
 
     def make_matrix_constraints(self):
-        for grp in [self.fkJointsGrp, self.ikJointsGrp] + pm.listRelatives(self.driverJoints[0], p=1):
-            child = pm.listRelatives(grp, c=1)[0]
-            pm.parent(child, pm.listRelatives(grp, p=1)[0])
-            pm.makeIdentity(grp, a=1)
-            pm.parent(child, grp)
+        for grp in [self.fkJointsGrp, self.ikJointsGrp, scene.get_parent(self.driverJoints[0])]:
+            child = scene.get_children(grp)[0]
+            scene.parent(child, scene.get_parent(grp))
+            scene.freeze(grp)
+            scene.parent(child, grp)
         srcJnts = self.ikJoints
         tgtJnts = self.fkJoints
         if not self.primary == "IK":
@@ -124,8 +138,8 @@ class Build(object):
         for i, jnt in enumerate(srcJnts):
             tgt_const = matrix.parent_constraint(jnt, tgtJnts[i])
             drive_const = matrix.parent_constraint(tgtJnts[i], self.driverJoints[i])
-            tgt_const.useTranslate.set(0)
-            drive_const.useTranslate.set(0)
+            scene.set_attr(f"{tgt_const}.useTranslate", 0)
+            scene.set_attr(f"{drive_const}.useTranslate", 0)
 
 
 
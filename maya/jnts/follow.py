@@ -1,12 +1,21 @@
-import pymel.core as pm
-
-from core import utils
 from core import matrix
+from core import profiler
+from core import scene
+from core import utils
 from rigs import ik
 
 
 class Build(object):
-    def __init__(self, driver_jnts, aim, up, up_loc):
+    @profiler.stage
+    def __init__(self, driver_jnts, aim, up, up_loc, chain_data=None):
+        """
+        Builds a two joint follow chain from the base to the tip of a driver chain
+        :param driver_jnts: list: the driver joints
+        :param aim: list: the aim vector of the chain
+        :param up: list: the up vector of the chain
+        :param up_loc: str: the up locator of the chain
+        :param chain_data: ChainData: the captured driver chain (saves querying it)
+        """
         self.name = utils.get_info_from_joint(driver_jnts[0], name=True)
         self.driverJoints = driver_jnts
         self.aimVector = aim
@@ -16,10 +25,19 @@ class Build(object):
             "flw_jnt_grp", parent=utils.make_group("jnt_grp")))
         self.followHndlGrp = utils.make_group(f"{self.name}_hndl_grp", parent=utils.make_group(
             "hndl_grp", parent=utils.make_group("utils_grp")))
-        pm.xform(self.followJointGrp, t=pm.xform(self.driverJoints[0], q=1, ws=1, rp=1))
-        pm.xform(self.followHndlGrp, t=pm.xform(self.driverJoints[0], q=1, ws=1, rp=1))
+        # Leave the follow joints alone if they were built from the current driver chain
+        if utils.is_current(self.followJointGrp, self.name):
+            self.followJoints = utils.get_joints_in_chain(scene.get_children(self.followJointGrp, "joint")[0])
+            return
+        utils.clear_stale(self.followJointGrp, self.name, scene.get_children(self.followJointGrp) + [
+            f"{self.name}_flw_hndl"])
+        position = chain_data.positions[0].tolist() if chain_data is not None else scene.get_position(
+            self.driverJoints[0])
+        scene.set_position(self.followJointGrp, position)
+        scene.set_position(self.followHndlGrp, position)
         self.followJoints = self.make_follow_jnts()
-        pm.select(cl=1)
+        utils.stamp_chain(self.followJointGrp, self.name)
+        scene.clear_selection()
 
     def make_follow_jnts(self):
         """
@@ -28,24 +46,24 @@ class Build(object):
         """
         jnts = [self.driverJoints[0], self.driverJoints[-1]]
         flwJnts = utils.duplicate_chain(jnts, "flw", self.followJointGrp)
-        pm.parent(flwJnts[-1], w=1)
-        flwJnts[0].overrideColor.set(10)
-        flwJnts[1].overrideColor.set(10)
+        scene.parent(flwJnts[-1])
+        scene.set_attr(f"{flwJnts[0]}.overrideColor", 10)
+        scene.set_attr(f"{flwJnts[1]}.overrideColor", 10)
         # Orient base joint
-        aim = pm.aimConstraint(flwJnts[-1], flwJnts[0], aim=self.aimVector,
-                               u=self.upVector, wut="object", wuo=self.upLoc)
-        pm.delete(aim)
-        pm.makeIdentity(flwJnts[0], a=1)
+        aim = scene.aim_constraint(flwJnts[-1], flwJnts[0], aim=self.aimVector, up=self.upVector,
+                                   world_up_type="object", world_up_object=self.upLoc)
+        scene.delete(aim)
+        scene.freeze(flwJnts[0])
         # Parent and orient tip joint
-        pm.parent(flwJnts[-1], flwJnts[0])
+        scene.parent(flwJnts[-1], flwJnts[0])
         utils.reset_transforms([flwJnts[-1]], t=False)
         # Create IK setup
         hndl = ik.make_handle(flwJnts[0], flwJnts[-1], f"{self.name}_flw_hndl", "singleChain")[0]
-        pm.parent(hndl, self.followHndlGrp)
-        pm.pointConstraint(self.driverJoints[-1], hndl)
-        pm.parent(self.upLoc, flwJnts[0])
+        scene.parent(hndl, self.followHndlGrp)
+        scene.point_constraint(self.driverJoints[-1], hndl)
+        scene.parent(self.upLoc, flwJnts[0])
         # Setup Constraints
         matrix.point_constraint(self.driverJoints[-1], hndl, frozen=True)
-        pm.pointConstraint(self.driverJoints[0], flwJnts[0])
-        pm.scaleConstraint(pm.listRelatives(self.driverJoints[0], p=1)[0], self.followJointGrp)
+        scene.point_constraint(self.driverJoints[0], flwJnts[0])
+        scene.scale_constraint(scene.get_parent(self.driverJoints[0]), self.followJointGrp)
         return flwJnts
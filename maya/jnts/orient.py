@@ -1,8 +1,17 @@
-import pymel.core as pm
-
 from core import constants
+from core import mathutils
+from core import matrices
+from core import scene
 from core import utils
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+WORLDUP = (0.0, 1.0, 0.0)
+
 
 def orient_joint(joint, aim_obj, up_obj=None, local=False, neg=False, mirror=False):
     """
@@ -14,19 +23,20 @@ def orient_joint(joint, aim_obj, up_obj=None, local=False, neg=False, mirror=Fal
     :param neg: if True, orient the joint to the negative of the up vector
     :param mirror: if True, orient the joint to the mirror of the aim vector
     """
-    roo = str(joint.getRotationOrder())
-    up = constants.get_axis_vector(roo[1].capitalize(), invert=mirror)
-    aim = constants.get_axis_vector(roo[0].capitalize(), invert=mirror)
+    roo = scene.get_rotate_order(joint)
+    up = constants.get_axis_vector(roo[1], invert=mirror)
+    aim = constants.get_axis_vector(roo[0], invert=mirror)
     if local:
         up = [-v for v in constants.get_axis_vector(roo[2], invert=mirror)]
     if neg:
         up = [-v for v in up]
     if up_obj is None:
-        aimConst = pm.aimConstraint([aim_obj], joint, aim=aim, u=up, wut="vector")
+        aimConst = scene.aim_constraint([aim_obj], joint, aim=aim, up=up)
     else:
-        aimConst = pm.aimConstraint([aim_obj], joint, aim=aim, u=up, wut="object", wuo=up_obj)
-    pm.delete(aimConst)
-    pm.makeIdentity(joint, a=1)
+        aimConst = scene.aim_constraint([aim_obj], joint, aim=aim, up=up, world_up_type="object",
+                                        world_up_object=up_obj)
+    scene.delete(aimConst)
+    scene.freeze(joint)
 
 
 def base_joint(joint, jnt_list, to_world=True, chain_to_world=False, neg=False, mirror=False):
@@ -62,7 +72,7 @@ def mid_joints(joint, i, jnt_list, to_world=False, neg=False, mirror=False):
         orient_joint(joint, jnt_list[i + 1], neg=neg, mirror=mirror)
     else:
         orient_joint(joint, jnt_list[i + 1], jnt_list[i - 1], neg=neg, mirror=mirror)
-    pm.parent(joint, jnt_list[i - 1])
+    scene.parent(joint, jnt_list[i - 1])
 
 
 def tip_joint(joint, prev_jnt=None, to_joint=True):
@@ -72,13 +82,13 @@ def tip_joint(joint, prev_jnt=None, to_joint=True):
     :param prev_jnt: previous joint in the chain
     :param to_joint: if True, orient the joint to the rest of the chain
     """
-    if prev_jnt is None and pm.listRelatives(joint, p=1):
-        pm.parent(joint, w=1)
+    if prev_jnt is None and scene.get_parent(joint) is not None:
+        scene.parent(joint)
     # Orient tip to World or local
     if not to_joint:
-        pm.xform(joint, ws=1, ro=(0, 0, 0))
-        pm.makeIdentity(joint, a=1)
-    pm.parent(joint, prev_jnt)
+        scene.set_rotation(joint, (0, 0, 0), world=True)
+        scene.freeze(joint)
+    scene.parent(joint, prev_jnt)
     if to_joint:
         utils.reset_transforms([joint], t=False, r=False, s=False, m=False, o=True)
 
@@ -86,7 +96,8 @@ def tip_joint(joint, prev_jnt=None, to_joint=True):
 def joints_in_chain(joints=None, orient_tip=True, group=None,
                     base_to_world=True, chain_to_world=False, neg=False, mirror=False):
     """
-    Uses an aim constraint to orient all the joints in a chain
+    Orients all the joints in a chain. The orients are solved straight from the joint positions (see solve_chains)
+    and written back in one go; without NumPy the chain is oriented one aim constraint at a time instead
     :param joints: list of joints to orient
     :param orient_tip: if True, orient the tip joint to the rest of the chain
     :param group: the group the chain is parented to
@@ -96,13 +107,201 @@ def joints_in_chain(joints=None, orient_tip=True, group=None,
     :param mirror: if True, orient the joint to the mirror of the aim vector
     """
     if joints is None:
-        if not pm.ls(sl=1) or pm.ls(sl=1)[0].type() != "joint":
-            pm.error("Joint not selected")
-        joints = utils.get_joints_in_chain(pm.ls(sl=1)[0])
+        if not scene.selected() or scene.node_type(scene.selected()[0]) != "joint":
+            scene.error("Joint not selected")
+        joints = utils.get_joints_in_chain(scene.selected()[0])
+    if np is None:
+        aim_joints_in_chain(joints, orient_tip, group, base_to_world, chain_to_world, neg, mirror)
+        return
+    joints_in_chains([joints], orient_tip=orient_tip, groups=[group], base_to_world=base_to_world,
+                     chain_to_world=chain_to_world, neg=neg, mirror=mirror)
+
+
+def joints_in_chains(chains, orient_tip=True, groups=None, base_to_world=True, chain_to_world=False, neg=False,
+                     mirror=False):
+    """
+    Orients several joint chains at once. Every chain is put into its hierarchy first, then the orients of all of
+    them are solved together and written back in a single transaction
+    :param chains: list: the joint chains (lists of joints) to orient
+    :param orient_tip: bool: if True, orient the tip joints to the rest of their chains
+    :param groups: list: the group each chain is parented to (or None to leave it in the world)
+    :param base_to_world: bool: if True, orient the base joints in world space
+    :param chain_to_world: bool: if True, orient the chains in world space
+    :param neg: bool: if True, orient the joints to the negative of the up vector
+    :param mirror: bool: if True, orient the joints to the mirror of the aim vector
+    """
+    groups = groups or [None] * len(chains)
+    specs = []
+    for joints, group in zip(chains, groups):
+        positions = [scene.get_position(jnt) for jnt in joints]
+        scene.parent(joints[0], group)
+        for i, jnt in enumerate(joints[1:], 1):
+            scene.parent(jnt, joints[i - 1])
+        parent_matrix = None
+        if group is not None:
+            scene.set_position(group, positions[0])
+            parent_matrix = scene.get_matrix(group)
+        specs.append({"positions": positions, "rotate_order": scene.get_rotate_order(joints[0]),
+                      "parent_matrix": parent_matrix, "orient_tip": orient_tip, "base_to_world": base_to_world,
+                      "chain_to_world": chain_to_world, "neg": neg, "mirror": mirror})
+    solved = solve_chains(specs)
+    with scene.transaction():
+        for joints, (translates, orients) in zip(chains, solved):
+            for jnt, translate, orient in zip(joints, translates.tolist(), orients.tolist()):
+                scene.set_attr(f"{jnt}.translate", translate)
+                scene.set_attr(f"{jnt}.rotate", [0.0, 0.0, 0.0])
+                scene.set_attr(f"{jnt}.jointOrient", orient)
+
+
+#############
+# Solver
+#############
+
+def solve_chains(chains):
+    """
+    Solves the joint orients of any number of chains from their world positions, matching what orienting them
+    one aim constraint at a time does. The aim frames of every joint of every chain are solved in one go
+    :param chains: list: a dict per chain with its "positions" (world position of each joint, base to tip),
+    "rotate_order" (aim, up and tertiary axes), "parent_matrix" (world matrix of the node the base joint is
+    parented to or None) and the joints_in_chain options (orient_tip, base_to_world, chain_to_world, neg, mirror)
+    :return: list: a (translates, joint orients) pair of (N, 3) arrays per chain, in the local space of each
+    joint's parent
+    """
+    inputs = [get_aim_inputs(chain) for chain in chains]
+    frames = matrices.aim(*[np.concatenate(arrays) for arrays in zip(*inputs)])
+    result = []
+    start = 0
+    for chain in chains:
+        positions = np.asarray(chain["positions"], dtype=float)
+        count = len(positions) - 1
+        world = np.empty((count + 1, 3, 3))
+        world[:-1] = frames[start:start + count]
+        world[-1] = world[-2] if chain["orient_tip"] else np.eye(3)
+        start += count
+        result.append(get_locals(positions, world, chain["parent_matrix"]))
+    return result
+
+
+def get_locals(positions, frames, parent_matrix=None):
+    """
+    Returns the translates and joint orients that put the joints of a chain (each parented to the one before it)
+    at the given world positions and rotations
+    :param positions: array: (N, 3) world positions
+    :param frames: array: (N, 3, 3) world rotations
+    :param parent_matrix: list: the world matrix of the node the base joint is parented to (None for the world)
+    :return: array, array: (N, 3) translates and (N, 3) joint orients
+    """
+    parent = np.eye(4) if parent_matrix is None else np.reshape(parent_matrix, (4, 4))
+    parents = np.concatenate([matrices.normalize(parent[:3, :3])[None], frames[:-1]])
+    # Rotations are orthonormal so their transpose is their inverse
+    orients = np.einsum("nij,nkj->nik", frames, parents)
+    translates = np.einsum("nj,nkj->nk", positions[1:] - positions[:-1], frames[:-1])
+    base = np.append(positions[0], 1.0) @ np.linalg.inv(parent)
+    return np.concatenate([base[None, :3], translates]), matrices.get_eulers(orients)
+
+
+def correct_chain(world_matrices, rotate_order, axis_vector, parent_matrix=None, mirror_straight=False,
+                  orient_tip=True):
+    """
+    Finds and corrects the joints of an oriented chain that flipped, all from the world matrices of the chain:
+        - mid joints whose tertiary axis points the other way to the base joint's (seen from a given axis) are
+          turned 180 degrees around their aim axis
+        - straight mirrored chains (which don't mirror properly) have every joint but the tip turned the same way
+        - joints left with a 180 degree joint orient around their aim axis have it taken out
+    Children keep their world position and rotation through every correction, the same way they would if they
+    were unparented while their parent was fixed
+    :param world_matrices: list: the world matrix of each joint, base to tip
+    :param rotate_order: str: the aim, up and tertiary axes of the chain
+    :param axis_vector: list: the world vector the tertiary axes are compared along
+    :param parent_matrix: list: the world matrix of the node the base joint is parented to (None for the world)
+    :param mirror_straight: bool: whether or not the chain is mirrored and straight
+    :param orient_tip: bool: whether or not the tip joint is oriented along the same axis as its parent
+    :return: array, array: the (N, 3) translates and joint orients of the corrected chain (None if nothing changed)
+    """
+    world = np.reshape(np.asarray(world_matrices, dtype=float), (-1, 4, 4))
+    positions = world[:, 3, :3]
+    frames = matrices.normalize(world[:, :3, :3].reshape(-1, 3)).reshape(-1, 3, 3)
+    aim = constants.get_axis_index(rotate_order[0])
+    tertiary = constants.get_axis_index(rotate_order[-1])
+    others = [i for i in range(3) if i != aim]
+    # Turning a joint 180 degrees around its aim axis flips its other two axes
+    up = frames[:, tertiary] @ np.asarray(axis_vector, dtype=float) > 0
+    flips = np.zeros(len(frames), dtype=bool)
+    flips[1:-1] = up[1:-1] != up[0]
+    if mirror_straight:
+        flips[:-1] = ~flips[:-1]
+    frames[np.ix_(flips, others)] *= -1
+    changed = bool(flips.any())
+    if mirror_straight:
+        frames[-1] = frames[-2] if orient_tip else np.eye(3)
+        changed = True
+    # Take out 180 degree twists one joint at a time since fixing a joint changes the orient of its child
+    parent = np.eye(3) if parent_matrix is None else matrices.normalize(np.reshape(parent_matrix, (4, 4))[:3, :3])
+    for i in range(len(frames)):
+        parentFrame = parent if i == 0 else frames[i - 1]
+        orient = matrices.get_eulers((frames[i] @ parentFrame.T)[None])[0]
+        if abs(round(orient[aim], 3)) != 180:
+            continue
+        changed = True
+        if i < len(frames) - 1:
+            orient[aim] = 0.0
+            frames[i] = np.reshape(mathutils.rotation(orient.tolist()), (4, 4))[:3, :3] @ parentFrame
+        else:
+            frames[i] = parentFrame if orient_tip else np.eye(3)
+    if not changed:
+        return None
+    return get_locals(positions, frames, parent_matrix)
+
+
+def get_aim_inputs(chain):
+    """
+    Returns what an aim constraint would be given for every joint in a chain but the tip: the local aim and up
+    axes and the world aim and up directions
+    :param chain: dict: the chain (see solve_chains)
+    :return: tuple: four (N - 1, 3) arrays
+    """
+    positions = np.asarray(chain["positions"], dtype=float)
+    roo = chain["rotate_order"].upper()
+    count = len(positions) - 1
+    sign = -1.0 if chain["mirror"] else 1.0
+    flip = -1.0 if chain["neg"] else 1.0
+    aim_axis = np.tile(np.asarray(constants.get_axis_vector(roo[0])) * sign, (count, 1))
+    up_axis = np.tile(np.asarray(constants.get_axis_vector(roo[1])) * sign * flip, (count, 1))
+    aim_dir = positions[1:] - positions[:-1]
+    up_dir = np.tile(WORLDUP, (count, 1))
+    if not chain["chain_to_world"]:
+        # Mid joints take their up from the joint before them
+        up_dir[1:] = positions[:-2] - positions[1:-1]
+    if chain["chain_to_world"]:
+        # The base joint points its tertiary axis down
+        up_axis[0] = -np.asarray(constants.get_axis_vector(roo[2])) * sign * flip
+    elif count > 1:
+        # The base joint takes its up from the joint after the next one. Only a chain too short for that is left
+        # with the world up base_to_world asks for (aiming with it first makes no difference to longer chains)
+        up_dir[0] = positions[2] - positions[0]
+    return aim_axis, up_axis, aim_dir, up_dir
+
+
+#############
+# Aim constraints
+#############
+
+def aim_joints_in_chain(joints, orient_tip=True, group=None,
+                        base_to_world=True, chain_to_world=False, neg=False, mirror=False):
+    """
+    Uses an aim constraint to orient all the joints in a chain
+    :param joints: list of joints to orient
+    :param orient_tip: if True, orient the tip joint to the rest of the chain
+    :param group: the group the chain is parented to
+    :param base_to_world: if True, orient the base joint in world space
+    :param chain_to_world: if True, orient the chain in world space
+    :param neg: if True, orient the joint to the negative of the up vector
+    :param mirror: if True, orient the joint to the mirror of the aim vector
+    """
     # Unparent all joints before orienting
     for jnt in joints:
-        if pm.listRelatives(jnt, p=1):
-            pm.parent(jnt, w=1)
+        if scene.get_parent(jnt) is not None:
+            scene.parent(jnt)
     # Orient Joints
     for i, jnt in enumerate(joints):
         # Set orientation for the Base Joint
@@ -116,5 +315,5 @@ def joints_in_chain(joints=None, orient_tip=True, group=None,
         else:
             mid_joints(jnt, i, jnt_list=joints, to_world=chain_to_world, neg=neg, mirror=mirror)
     if group is not None:
-        pm.xform(group, t=pm.xform(joints[0], q=1, ws=1, rp=1))
-        pm.parent(joints[0], group)
+        scene.set_position(group, scene.get_position(joints[0]))
+        scene.parent(joints[0], group)
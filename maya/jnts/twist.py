@@ -1,60 +1,82 @@
-import pymel.core as pm
-
 from core import constants
 from core import matrix
+from core import profiler
+from core import scene
 from core import utils
 from rigs import ik
 
 
 class Build(object):
-    def __init__(self, base_jnt):
+    @profiler.stage
+    def __init__(self, base_jnt, chain_data=None):
+        """
+        Builds a twist joint at the base of a chain that follows the chain without twisting along its aim axis
+        :param base_jnt: str: the base joint of the chain
+        :param chain_data: ChainData: the captured chain the base joint belongs to (saves querying it)
+        """
         self.name = utils.get_info_from_joint(base_jnt, name=True)
         self.base = base_jnt
-        self.child = pm.listRelatives(self.base, c=1)[0]
+        self.chain_data = chain_data
+        if chain_data is not None:
+            self.child = chain_data.names[chain_data.names.index(base_jnt) + 1]
+            self.roo = chain_data.rotate_order
+            self.position = chain_data.positions[chain_data.names.index(base_jnt)].tolist()
+        else:
+            self.child = scene.get_children(self.base)[0]
+            self.roo = scene.get_rotate_order(self.base)
+            self.position = scene.get_position(self.base)
         self.twist_joint_grp = utils.make_group(f"{self.name}_twst_jnt_grp", parent=utils.make_group(
             "twst_jnt_grp", parent=utils.make_group("jnt_grp")))
         self.twist_handle_grp = utils.make_group(f"{utils.get_info_from_joint(base_jnt, name=True)}_hndl_grp",
                                                  parent=utils.make_group("utils_grp"))
-        pm.xform(self.twist_joint_grp, t=pm.xform(self.base, q=1, ws=1, rp=1))
-        pm.xform(self.twist_handle_grp, t=pm.xform(self.base, q=1, ws=1, rp=1))
+        self.up_loc = f"{utils.get_info_from_joint(self.base, name=True)}_up_loc"
+        # Leave the twist alone if it was built from the current driver chain
+        if utils.is_current(self.twist_joint_grp, self.name):
+            self.twist_joint = base_jnt.replace(utils.get_joint_type(base_jnt), "twst")
+            return
+        utils.clear_stale(self.twist_joint_grp, self.name, scene.get_children(self.twist_joint_grp) + [
+            f"{self.name}_twst_hndl"])
+        scene.set_position(self.twist_joint_grp, self.position)
+        scene.set_position(self.twist_handle_grp, self.position)
         self.twist_joint = utils.duplicate_chain([base_jnt], "twst", self.twist_joint_grp)[0]
-        self.up_loc = pm.PyNode(f"{utils.get_info_from_joint(self.base, name=True)}_up_loc")
         self.make_twist()
+        utils.stamp_chain(self.twist_joint_grp, self.name)
 
     def make_twist(self):
-        aimV = constants.get_axis_vector(str(self.base.getRotationOrder())[0])
-        upV = constants.get_axis_vector(str(self.base.getRotationOrder())[-1])
-        aim = pm.aimConstraint(self.child, self.twist_joint, aim=aimV, u=upV, wut="object", wuo=self.up_loc)
-        self.twist_joint.overrideEnabled.set(1)
-        self.twist_joint.overrideColor.set(18)
-        pm.pointConstraint(self.base, self.twist_joint)
+        roo = self.roo
+        aimV = constants.get_axis_vector(roo[0])
+        upV = constants.get_axis_vector(roo[-1])
+        aim = scene.aim_constraint(self.child, self.twist_joint, aim=aimV, up=upV, world_up_type="object",
+                                   world_up_object=self.up_loc)
+        scene.set_attr(f"{self.twist_joint}.overrideEnabled", 1)
+        scene.set_attr(f"{self.twist_joint}.overrideColor", 18)
+        scene.point_constraint(self.base, self.twist_joint)
         self.make_twist_follow()
         # Check to make sure twist joint has the same orientation of the base joint
-        if round(abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[0]}.get()"))) == 180 and round(
-                abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[-1]}.get()"))) == 180:
-            pm.delete(aim)
-            pm.aimConstraint(self.child, self.twist_joint, aim=[-v for v in aimV],
-                             u=[-v for v in upV], wut="object", wuo=self.up_loc)
-        if round(abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[0]}.get()"))) == 180 and not round(
-                abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[-1]}.get()"))) == 180:
-            pm.delete(aim)
-            pm.aimConstraint(self.child, self.twist_joint, aim=aimV,
-                             u=[-v for v in upV], wut="object", wuo=self.up_loc)
-        if round(abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[-1]}.get()"))) == 180 and not \
-                round(abs(eval(f"self.twist_joint.rotate{str(self.base.getRotationOrder())[0]}.get()"))) == 180:
-            pm.delete(aim)
-            pm.aimConstraint(self.child, self.twist_joint, aim=[-v for v in aimV],
-                             u=upV, wut="object", wuo=self.up_loc)
-        pm.scaleConstraint(pm.listRelatives(self.base, p=1)[0], self.twist_joint_grp)
+        aimRot = round(abs(scene.get_attr(f"{self.twist_joint}.rotate{roo[0]}")))
+        tertRot = round(abs(scene.get_attr(f"{self.twist_joint}.rotate{roo[-1]}")))
+        if aimRot == 180 and tertRot == 180:
+            scene.delete(aim)
+            scene.aim_constraint(self.child, self.twist_joint, aim=[-v for v in aimV], up=[-v for v in upV],
+                                 world_up_type="object", world_up_object=self.up_loc)
+        if aimRot == 180 and not tertRot == 180:
+            scene.delete(aim)
+            scene.aim_constraint(self.child, self.twist_joint, aim=aimV, up=[-v for v in upV],
+                                 world_up_type="object", world_up_object=self.up_loc)
+        if tertRot == 180 and not aimRot == 180:
+            scene.delete(aim)
+            scene.aim_constraint(self.child, self.twist_joint, aim=[-v for v in aimV], up=upV,
+                                 world_up_type="object", world_up_object=self.up_loc)
+        scene.scale_constraint(scene.get_parent(self.base), self.twist_joint_grp)
 
     def make_twist_follow(self):
         flw_jnts = utils.duplicate_chain([self.base, self.child], "twst_flw", self.twist_joint_grp)
         hndl = ik.make_handle(flw_jnts[0], flw_jnts[1],
                               name=f"{utils.get_info_from_joint(self.base, name=True)}_twst_hndl",
                               solver="singleChain")
-        flw_jnts[0].overrideColor.set(10)
-        flw_jnts[1].overrideColor.set(10)
-        pm.parent(hndl[0], self.twist_handle_grp)
-        pm.parent(self.up_loc, flw_jnts[0])
+        scene.set_attr(f"{flw_jnts[0]}.overrideColor", 10)
+        scene.set_attr(f"{flw_jnts[1]}.overrideColor", 10)
+        scene.parent(hndl[0], self.twist_handle_grp)
+        scene.parent(self.up_loc, flw_jnts[0])
         matrix.point_constraint(self.child, hndl[0], frozen=True)
-        pm.pointConstraint(self.base, flw_jnts[0])
+        scene.point_constraint(self.base, flw_jnts[0])
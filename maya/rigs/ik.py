@@ -1,6 +1,6 @@
-import pymel.core as pm
-
 from core import constants
+from core import profiler
+from core import scene
 from core import utils
 
 
@@ -10,24 +10,26 @@ SOLVERS = {"rotatePlane": "ikRPsolver",
            "spring": "ikSpringSolver"}
 
 
+@profiler.stage
 def make_handle(start, end, name=None, solver="rotatePlane", spline_crv=None):
     if name is None:
-        name = start.name().replace("_jnt", "_hndl")
+        name = start.replace("_jnt", "_hndl")
     solver = SOLVERS[solver]
     if solver == "ikSplineSolver":
         if spline_crv is not None:
-            hndl = pm.ikHandle(n=name, sj=start, ee=end, sol=solver, c=spline_crv, ccv=0, pcv=0)
+            hndl = scene.ik_handle(name, start, end, solver=solver, curve=spline_crv)
         else:
-            pm.warning(f"{name} needs a spline curve to build a spline IK setup")
+            scene.warning(f"{name} needs a spline curve to build a spline IK setup")
             return None
     else:
-        hndl = pm.ikHandle(n=name, sj=start, ee=end, sol=solver)
+        hndl = scene.ik_handle(name, start, end, solver=solver)
     for a in constants.AXES:
-        eval(f"hndl[0].poleVector{a}.set(0)")
+        scene.set_attr(f"{hndl[0]}.poleVector{a}", 0)
     return hndl
 
 
 class Build:
+    @profiler.stage
     def __init__(self, driver_obj, jnts, handle_name=None, ctls_obj=None, spline=False):
         self.driver = driver_obj
         self.joints = jnts
@@ -51,24 +53,24 @@ class Build:
     def get_name(self, name):
         if name is not None:
             return name
-        return self.joints[0].name().replace("_jnt", "_IK_hndl")
+        return self.joints[0].replace("_jnt", "_IK_hndl")
 
     def get_pole_vectors(self):
         return "poleVectors"
 
     def make_ik_system(self):
         if len(self.joints) == 2:
-            hndlList = [pm.ikHandle(n=self.handleName, sj=self.joints[0], ee=self.joints[-1])[0]]
+            hndlList = [scene.ik_handle(self.handleName, self.joints[0], self.joints[-1])[0]]
             if self.ctlsObj is None:
                 for axis in constants.AXES:
-                    pm.setAttr(f"{hndlList[0]}.poleVector{axis}", 0)
+                    scene.set_attr(f"{hndlList[0]}.poleVector{axis}", 0)
         elif len(self.joints) == 3 and not self.spline:
             pass
         elif len(self.joints) == 4 and not self.spline:
             pass
         else:
             pass
-        pm.parent(hndlList, self.handlesGrp)
+        scene.parent(hndlList, self.handlesGrp)
         return hndlList
 
     def make_ik_driver(self):
@@ -77,8 +79,8 @@ class Build:
     def make_ik_end(self, ik_chain):
         jnt = ik_chain[-1]
         dupName = str(jnt).replace("_IK_", "_end_IK_")
-        dup = pm.duplicate(jnt, n=dupName)[0]
-        pm.parent(dup, jnt)
+        dup = scene.duplicate(jnt, dupName)
+        scene.parent(dup, jnt)
         offsetAmnt = self.driver.guidesObj.scale * .05
-        pm.setAttr("{}.translateX".format(dup), offsetAmnt)
+        scene.set_attr("{}.translateX".format(dup), offsetAmnt)
         return dup
\ No newline at end of file
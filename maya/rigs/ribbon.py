@@ -1,4 +1,10 @@
-import pymel.core as pm
+import bisect
+import math
+
+from core import mathutils
+from core import nurbs
+from core import profiler
+from core import scene
 from core import utils
 from core import constants
 from ctls import attributes
@@ -6,18 +12,24 @@ from ctls import attributes
 
 INVERT = ["leg"]
 UNLOCKTIP = ["tail"]
+# The most spans an adaptive ribbon gives a segment
+MAXSPANS = 16
 
 
 # TODO: Setup micro controls for ribbon
 class Ribbon(object):
+    @profiler.stage
     def __init__(self, name, spans, width, scale=10, orient="Z", normal="X", aim_axis="X", up_axis="Y",
-                 mirror=False, invert=False, sine=True, twist=True, skin_jnts=True, matrix=True, lock_tip=True):
+                 mirror=False, invert=False, sine=True, twist=True, skin_jnts=True, matrix=True, lock_tip=True,
+                 shared_pin=True, deformer_stack=False, pins=None):
         if orient == normal or aim_axis == up_axis:
-            pm.error("The neither the ribbon's nor its joint's aim axes can be the same as their up axis")
+            scene.error("The neither the ribbon's nor its joint's aim axes can be the same as their up axis")
         self.name = name
         if "_rbn" not in self.name:
             self.name = f"{name}_rbn"
         self.spans = spans
+        # The number of skin joints pinned to the ribbon (one per span unless told otherwise)
+        self.pins = pins if pins is not None else spans
         self.width = width
         self.scale = scale
         self.orient = orient.upper()
@@ -29,6 +41,11 @@ class Ribbon(object):
         self.sine = sine
         self.twist = twist
         self.matrix = matrix
+        if self.matrix and scene.maya_version() < 2020:
+            # uvPin and offsetParentMatrix came in with Maya 2020 so older versions pin with follicles
+            self.matrix = False
+        self.sharedPin = shared_pin
+        self.deformerStack = deformer_stack
         self.rbn = self.make_ribbon()
         self.deformers = []
         self.deformRbns = []
@@ -40,14 +57,17 @@ class Ribbon(object):
         if self.deformers:
             for d in self.deformers:
                 attributes.make_ribbon_def_attrs(self.rbn, d)
-                self.make_ribbon_deformer(d)
-                self.make_ribbon_blendshape(self.deformRbns[-1], self.rbn)
-                self.connect_ribbon_deformer(self.deformRbns[-1])
+                if self.deformerStack:
+                    self.make_stack_deformer(d)
+                else:
+                    self.make_ribbon_deformer(d)
+                    self.make_ribbon_blendshape(self.deformRbns[-1], self.rbn)
+                self.connect_ribbon_deformer(d)
         if skin_jnts:
             self.skinJoints = self.make_skin_joints()
         self.ctlJoints = []
         if not lock_tip:
-            self.rbn.lockTip.set(0)
+            scene.set_attr(f"{self.rbn}.lockTip", 0)
 
     def connect_lock_tip(self, hndl):
         """
@@ -56,13 +76,13 @@ class Ribbon(object):
         :param hndl: The deformer handle being manipulated
         """
         # Create the math nodes to do the calculations
-        cond = pm.shadingNode("condition", au=1, n=f"{self.name}_lock_tip_cond")
-        mult = pm.shadingNode("multDoubleLinear", au=1, n=f"{self.name}_lock_tip_mult")
+        cond = scene.create_node("condition", f"{self.name}_lock_tip_cond")
+        mult = scene.create_node("multDoubleLinear", f"{self.name}_lock_tip_mult")
         # Set the values
-        cond.secondTerm.set(1)
-        cond.colorIfTrueR.set(1)
-        cond.colorIfFalseR.set(2)
-        mult.input1.set(hndl.scaleY.get())
+        scene.set_attr(f"{cond}.secondTerm", 1)
+        scene.set_attr(f"{cond}.colorIfTrueR", 1)
+        scene.set_attr(f"{cond}.colorIfFalseR", 2)
+        scene.set_attr(f"{mult}.input1", scene.get_attr(f"{hndl}.scaleY"))
         # Get the translate axis for the handle
         if self.orient != "Y":
             if not self.orient == "Z" and not self.normal == "Y":
@@ -74,102 +94,178 @@ class Ribbon(object):
         else:
             pos = "Y"
         # Make the connections
-        pm.connectAttr(self.rbn.lockTip, cond.firstTerm, f=1)
-        pm.connectAttr(cond.outColorR, mult.input2, f=1)
-        pm.connectAttr(mult.output, f"{hndl}.translate{pos}", f=1)
-        pm.connectAttr(mult.output, hndl.scaleY, f=1)
+        scene.connect_attr(f"{self.rbn}.lockTip", f"{cond}.firstTerm")
+        scene.connect_attr(f"{cond}.outColorR", f"{mult}.input2")
+        scene.connect_attr(f"{mult}.output", f"{hndl}.translate{pos}")
+        scene.connect_attr(f"{mult}.output", f"{hndl}.scaleY")
         if self.invert:
-            negMult = pm.shadingNode("multDoubleLinear", au=1, n=f"{self.name}_lock_tip_neg")
-            negMult.input2.set(-1)
-            pm.connectAttr(mult.output, negMult.input1, f=1)
-            pm.connectAttr(negMult.output, f"{hndl}.translate{pos}", f=1)
+            negMult = scene.create_node("multDoubleLinear", f"{self.name}_lock_tip_neg")
+            scene.set_attr(f"{negMult}.input2", -1)
+            scene.connect_attr(f"{mult}.output", f"{negMult}.input1")
+            scene.connect_attr(f"{negMult}.output", f"{hndl}.translate{pos}")
 
-    def connect_ribbon_deformer(self, def_rbn):
+    def connect_ribbon_deformer(self, def_type):
         """
         Make the connections to the main ribbon based on the deformer created
-        :param def_rbn: The deformer ribbon being connected to the main ribbon
+        :param def_type: The deformer being connected to the main ribbon
         """
         # Make connections
-        defType = def_rbn.name().split("_")[-2]
-        pm.connectAttr(f"{self.rbn.name()}.{defType}Blend", f"{self.rbn.name()}_def_bs.{self.rbn.name()}_{defType}_bs")
-        hndl = pm.PyNode(f"{self.rbn.name()}_{defType}_def_hndl")
-        if defType in attributes.DFRMCONN:
-            if defType == "sine":
+        scene.connect_attr(f"{self.rbn}.{def_type}Blend", self.get_deformer_blend(def_type))
+        hndl = f"{self.rbn}_{def_type}_def_hndl"
+        if def_type in attributes.DFRMCONN:
+            if def_type == "sine":
                 self.connect_lock_tip(hndl)
-            a = attributes.DFRMCONN[defType]
+            a = attributes.DFRMCONN[def_type]
             for attr in a:
                 if a[attr] in constants.TRNSFRMATTRS:
                     # Transform values go to the offset parent matrix of the deformer' tranform node
                     oAxis = f"{a[attr]}".capitalize() + f"{self.orient}"
-                    if pm.ls(f"{hndl.name()[:-5]}_{attr}_mtrx"):
-                        mtrx = pm.PyNode(f"{hndl.name()[:-5]}_{attr}_mtrx")
-                    else:
-                        mtrx = pm.createNode("composeMatrix", n=f"{hndl.name()[:-5]}_{attr}_mtrx")
-                    pm.connectAttr(f"{self.rbn.name()}.{attr}", f"{mtrx}.input{oAxis}", f=1)
-                    pm.connectAttr(f"{mtrx}.outputMatrix", f"{hndl}.offsetParentMatrix", f=1)
+                    mtrx = utils.check_hypergraph_node(f"{hndl[:-5]}_{attr}_mtrx", "composeMatrix")
+                    scene.connect_attr(f"{self.rbn}.{attr}", f"{mtrx}.input{oAxis}")
+                    scene.connect_attr(f"{mtrx}.outputMatrix", f"{hndl}.offsetParentMatrix")
                 else:
                     # All other values plug drirectly into the deformer's shape node
-                    pm.connectAttr(f"{self.rbn.name()}.{attr}", f"{hndl}Shape.{a[attr]}", f=1)
+                    scene.connect_attr(f"{self.rbn}.{attr}", f"{hndl}Shape.{a[attr]}")
 
     def follicle_pin(self, joint, i):
         """
-        Use a follicle node to pin joint to ribbon surface
+        Use a follicle node to pin joint to ribbon surface. The follicle drives the joint's translate and rotate
+        directly and the joint's rotate axis turns the follicle's axes into the ones a uvPin would give it
         :param joint: joint being pinned
         :param i: order joint is in chain
+        :return: str: the follicle's transform
+        """
+        if scene.exists(f"{joint}_flcl"):
+            return scene.find(f"{joint}_flcl")
+        flclGrp = self.get_follicle_group()
+        rbnShape = scene.get_shapes(self.rbn)[0]
+        with scene.transaction():
+            flcl = scene.create_node("transform", f"{joint}_flcl", parent=flclGrp)
+            flclShape = scene.create_node("follicle", f"{flcl}Shape", parent=flcl)
+            # Set follicle values
+            scene.set_attr(f"{flclShape}.parameterU", self.get_pin_parameter(i))
+            scene.set_attr(f"{flclShape}.parameterV", 0.5)
+            scene.set_attr(f"{joint}.rotateAxis", self.get_follicle_offset())
+            # Create connections
+            scene.connect_attr(f"{rbnShape}.local", f"{flclShape}.inputSurface")
+            scene.connect_attr(f"{rbnShape}.worldMatrix[0]", f"{flclShape}.inputWorldMatrix")
+            scene.connect_attr(f"{flclShape}.outTranslate", f"{joint}.translate")
+            scene.connect_attr(f"{flclShape}.outRotate", f"{joint}.rotate")
+        return flcl
+
+    def get_follicle_group(self):
+        """
+        Looks for or creates the group the ribbon's follicles live in
+        :return: str: the group
         """
-        pass
+        flclGrp = f"{self.name}_flcl_grp"
+        if scene.exists(flclGrp):
+            return scene.find(flclGrp)
+        flclGrp = utils.make_group(flclGrp, child=None, parent=f"{self.name}_grp")
+        # Follicles output world space values so their group mustn't move them again
+        scene.set_attr(f"{flclGrp}.inheritsTransform", 0)
+        scene.set_attr(f"{flclGrp}.visibility", 0)
+        return flclGrp
 
+    @profiler.stage
+    def follicle_pins(self, joints):
+        """
+        Pin every joint to ribbon surface with a follicle of its own, creating and connecting all of them in one
+        go
+        :param joints: list: the joints being pinned in order along the ribbon
+        :return: list: the follicles' transforms
+        """
+        self.get_follicle_group()
+        with scene.transaction():
+            return [self.follicle_pin(joint, i) for i, joint in enumerate(joints)]
+
+    @profiler.stage
     def make_ribbon(self):
         """
         Create the ribbon that will be the base for your rig
-        :return: PyNode ribbon that was created
+        :return: str: ribbon that was created
         """
         ratio = 3.0 / self.width
         oVal = self.set_ribbon_orient_values()
         # Check to see if ribbon exists
-        if pm.ls(self.name):
-            return pm.PyNode(self.name)
+        if scene.exists(self.name):
+            return scene.find(self.name)
         # Build ribbon
-        rbn = pm.nurbsPlane(p=oVal[0], ax=oVal[1], w=self.width, lr=ratio,
-                            d=3, u=(self.spans - 1), v=1, name=self.name, ch=0)[0]
+        rbn = scene.create_nurbs_plane(self.name, oVal[0], oVal[1], self.width, ratio,
+                                       degree=3, patches_u=(self.spans - 1), patches_v=1)
         self.orient_ribbon(rbn)
-        rbn.inheritsTransform.set(0)
+        scene.set_attr(f"{rbn}.inheritsTransform", 0)
         # Parent ribbon to group
         utilGrp = utils.make_group("util_grp")
         rbnsGrp = utils.make_group("rbn_grp", child=None, parent=utilGrp)
         utils.make_group(f"{self.name}_grp", child=rbn, parent=rbnsGrp)
         return rbn
 
+    @profiler.stage
     def make_ribbon_deformer(self, def_type):
         """
         Create the ribbon that will receive the given deformer
         :param def_type: deformer being applied to the ribbon
-        :return: PyNode deformer ribbon
+        :return: str: deformer ribbon
         """
         # Check to make sure deformer ribbon doesn't exist
-        if pm.ls(f"{self.rbn.name()}_{def_type}_bs"):
-            return pm.PyNode(f"{self.rbn.name()}_{def_type}_bs")
+        if scene.exists(f"{self.rbn}_{def_type}_bs"):
+            return scene.find(f"{self.rbn}_{def_type}_bs")
         # Create deformer components
-        bsRbn = pm.duplicate(self.rbn, n=f"{self.rbn.name()}_{def_type}_bs")[0]
-        for attr in pm.listAttr(bsRbn, ud=1):
-            pm.deleteAttr(bsRbn, at=attr)
-        dfrm = pm.nonLinear(bsRbn, typ=def_type)
+        bsRbn = scene.duplicate(self.rbn, f"{self.rbn}_{def_type}_bs")
+        for attr in scene.list_attrs(bsRbn):
+            scene.delete_attr(f"{bsRbn}.{attr}")
+        utils.make_group(name=f"{self.rbn}_{def_type}_grp", child=bsRbn, parent=f"{self.rbn}_grp")
+        self.apply_deformer(bsRbn, def_type)
+        self.deformRbns.append(bsRbn)
+        return bsRbn
+
+    @profiler.stage
+    def make_stack_deformer(self, def_type):
+        """
+        Apply the given deformer straight to the ribbon on top of the ones already there so all of them are
+        evaluated in one deformation chain without any copies of the ribbon
+        :param def_type: deformer being applied to the ribbon
+        :return: str: deformer handle
+        """
+        # Check to make sure deformer doesn't exist
+        if scene.exists(f"{self.rbn}_{def_type}_def_hndl"):
+            return scene.find(f"{self.rbn}_{def_type}_def_hndl")
+        return self.apply_deformer(self.rbn, def_type)
+
+    def apply_deformer(self, rbn, def_type):
+        """
+        Adds a nonlinear deformer to a ribbon and orients, names and groups its handle
+        :param rbn: ribbon receiving the deformer
+        :param def_type: deformer being applied to the ribbon
+        :return: str: deformer handle
+        """
+        dfrm = scene.nonlinear(rbn, def_type)
         self.orient_deformer(dfrm[1])
         # Set attribute values
         if def_type == "sine":
-            dfrm[0].dropoff.set(1)
+            scene.set_attr(f"{dfrm[0]}.dropoff", 1)
         # Group deformer components in outliner
-        bsGrp = utils.make_group(name=f"{self.rbn.name()}_{def_type}_grp",
-                                 child=[bsRbn, dfrm[1]],
-                                 parent=f"{self.rbn.name()}_grp")
-        bsGrp.visibility.set(0)
-        pm.select(cl=1)
+        dfrmGrp = utils.make_group(name=f"{self.rbn}_{def_type}_grp",
+                                   child=dfrm[1],
+                                   parent=f"{self.rbn}_grp")
+        scene.set_attr(f"{dfrmGrp}.visibility", 0)
+        scene.clear_selection()
         # Rename deformer components
-        pm.rename(dfrm[0], f"{self.rbn.name()}_{def_type}_def")
-        pm.rename(dfrm[1], f"{self.rbn.name()}_{def_type}_def_hndl")
-        self.deformHndls.append(pm.PyNode(f"{self.rbn.name()}_{def_type}_def_hndl"))
-        self.deformRbns.append(bsRbn)
-        return bsRbn
+        scene.rename(dfrm[0], f"{self.rbn}_{def_type}_def")
+        self.deformHndls.append(scene.rename(dfrm[1], f"{self.rbn}_{def_type}_def_hndl"))
+        return self.deformHndls[-1]
+
+    def get_deformer_blend(self, def_type):
+        """
+        Returns the plug that blends the given deformer in: its envelope when it's part of the ribbon's deformer
+        stack or its target weight on the ribbon's blendshape otherwise
+        :param def_type: deformer being blended
+        :return: str: the plug
+        """
+        if self.deformerStack:
+            return f"{self.rbn}_{def_type}_def.envelope"
+        return f"{self.rbn}_def_bs.{self.rbn}_{def_type}_bs"
 
     def make_ribbon_blendshape(self, source, target):
         """
@@ -178,13 +274,14 @@ class Ribbon(object):
         :param target: ribbon getting deformed
         """
         # Create blendshape or add to existing one
-        bsName = f"{target.name()}_def_bs"
-        if pm.ls(bsName):
-            bsLen = len(pm.blendShape(target, q=1, t=1))
-            pm.blendShape(bsName, e=1, t=(target, bsLen, source, 1.0))
+        bsName = f"{target}_def_bs"
+        if scene.exists(bsName):
+            bsLen = len(scene.blend_shape_targets(bsName))
+            scene.blend_shape(source, target, name=bsName, index=bsLen, weight=1.0)
         else:
-            pm.blendShape(source, target, n=bsName, foc=1)
+            scene.blend_shape(source, target, name=bsName)
 
+    @profiler.stage
     def make_skin_joints(self):
         """
         Create the joints that will be pinned to the ribbon's surface
@@ -193,30 +290,38 @@ class Ribbon(object):
         # Check to see if joints exist
         # TODO: set rotation order for joints
         grpName = f"{self.name[:-4]}_skn_jnt_grp"
-        if pm.ls(grpName):
-            return pm.listRelatives(grpName, c=1)
-        grp = pm.group(n=grpName, em=1)
-        if pm.ls("skn_jnt_grp"):
-            pm.parent(grpName, "skn_jnt_grp")
-        # Make a joint for each span and add it to the jntList
+        if scene.exists(grpName):
+            return scene.get_children(grpName)
+        grp = scene.create_group(grpName)
+        if scene.exists("skn_jnt_grp"):
+            scene.parent(grp, "skn_jnt_grp")
+        # Work out where the pins will put the joints so they're in place before the pins evaluate
+        restMatrices = None
+        if nurbs.np is not None:
+            restMatrices = self.get_pin_matrices()
+            self.check_pins(restMatrices)
+        # Make a joint for each pin and add it to the jntList
         jntList = []
-        for i in range(self.spans):
+        for i in range(self.pins):
             # Create joint
             jntName = f"{self.name[:-4]}{str(i + 1).zfill(2)}_skn_jnt"
-            jnt = pm.joint(rad=(0.1 * self.scale), n=jntName)
-            jnt.overrideEnabled.set(1)
-            jnt.overrideColor.set(9)
+            jnt = scene.create_joint(jntName, radius=(0.1 * self.scale))
+            scene.set_attr(f"{jnt}.overrideEnabled", 1)
+            scene.set_attr(f"{jnt}.overrideColor", 9)
             utils.reset_transforms([jnt])
-            # Pin joint to ribbon
-            if self.matrix:
+            if restMatrices is not None and self.matrix:
+                scene.set_attr(f"{jnt}.offsetParentMatrix", restMatrices[i].ravel().tolist())
+            # Pin joint to ribbon (follicles and a shared uvPin pin every joint at once below)
+            if self.matrix and not self.sharedPin:
                 self.matrix_pin(jnt, i)
-            else:
-                self.follicle_pin(jnt, i)
             # Add joint to parent grp
-            pm.parent(jnt, grp)
-            pm.select(cl=1)
+            scene.parent(jnt, grp)
             # Add joint to data set
             jntList.append(jnt)
+        if not self.matrix:
+            self.follicle_pins(jntList)
+        elif self.sharedPin:
+            self.shared_matrix_pin(jntList)
         self.skinJoints = jntList
         return jntList
 
@@ -226,12 +331,47 @@ class Ribbon(object):
         :param joint: joint being pinned
         :param i: order joint is in the chain
         """
-        if pm.ls(f"{joint.name()}_uvPin"):
-            return pm.PyNode(f"{joint.name()}_uvPin")
-        uvPin = pm.shadingNode("uvPin", au=1, n=f"{joint.name()}_uvPin")
+        if scene.exists(f"{joint}_uvPin"):
+            return scene.find(f"{joint}_uvPin")
+        uvPin = scene.create_node("uvPin", f"{joint}_uvPin")
         # Set UV Pin node values
-        uvPin.coordinate[0].coordinateV.set(0.5)
-        uvPin.coordinate[0].coordinateU.set(i / (self.spans - 1.0))
+        scene.set_attr(f"{uvPin}.coordinate[0].coordinateV", 0.5)
+        scene.set_attr(f"{uvPin}.coordinate[0].coordinateU", self.get_pin_parameter(i))
+        nVal, tVal = self.get_pin_axes()
+        scene.set_attr(f"{uvPin}.normalAxis", nVal)
+        scene.set_attr(f"{uvPin}.tangentAxis", tVal)
+        # Create connections
+        scene.connect_attr(f"{uvPin}.outputMatrix[0]", f"{joint}.offsetParentMatrix")
+        scene.connect_attr(f"{scene.get_shapes(self.rbn)[0]}.worldSpace[0]", f"{uvPin}.deformedGeometry")
+        return uvPin
+
+    @profiler.stage
+    def shared_matrix_pin(self, joints):
+        """
+        Use a single uvPin node to pin every joint to ribbon surface; each joint gets a coordinate and an output
+        matrix of its own but the ribbon's shape only feeds one node
+        :param joints: list: the joints being pinned in order along the ribbon
+        :return: str: the uvPin node
+        """
+        if scene.exists(f"{self.name}_uvPin"):
+            return scene.find(f"{self.name}_uvPin")
+        nVal, tVal = self.get_pin_axes()
+        with scene.transaction():
+            uvPin = scene.create_node("uvPin", f"{self.name}_uvPin")
+            scene.set_attr(f"{uvPin}.normalAxis", nVal)
+            scene.set_attr(f"{uvPin}.tangentAxis", tVal)
+            for i, joint in enumerate(joints):
+                scene.set_attr(f"{uvPin}.coordinate[{i}].coordinateV", 0.5)
+                scene.set_attr(f"{uvPin}.coordinate[{i}].coordinateU", self.get_pin_parameter(i))
+                scene.connect_attr(f"{uvPin}.outputMatrix[{i}]", f"{joint}.offsetParentMatrix")
+            scene.connect_attr(f"{scene.get_shapes(self.rbn)[0]}.worldSpace[0]", f"{uvPin}.deformedGeometry")
+        return uvPin
+
+    def get_pin_axes(self):
+        """
+        Returns the axes the pins put the ribbon's normal and tangent on based on class orientation
+        :return: int, int: the normal and tangent axes (0-2 for X, Y, Z and 3-5 for -X, -Y, -Z)
+        """
         nVal = constants.AXES.index(self.upAxis)
         tVal = constants.AXES.index(self.aimAxis)
         if self.mirror:
@@ -241,12 +381,63 @@ class Ribbon(object):
         if self.mirror:
             if self.orient == "Y" or self.orient == "Z":
                 nVal = nVal + 3
-        uvPin.normalAxis.set(nVal)
-        uvPin.tangentAxis.set(tVal)
-        # Create connections
-        pm.connectAttr(uvPin.outputMatrix[0], joint.offsetParentMatrix)
-        pm.connectAttr(self.rbn.getShape().worldSpace, uvPin.deformedGeometry)
-        return uvPin
+        return nVal, tVal
+
+    def get_follicle_offset(self):
+        """
+        Returns the rotation that takes a follicle's axes (X along the ribbon, Z along its normal) to the ones the
+        uvPins give the skin joints (see get_pin_axes)
+        :return: list: the rotation in degrees
+        """
+        nVal, tVal = self.get_pin_axes()
+        rows = [None, None, None]
+        rows[tVal % 3] = [1.0 if tVal < 3 else -1.0, 0.0, 0.0]
+        rows[nVal % 3] = [0.0, 0.0, 1.0 if nVal < 3 else -1.0]
+        r = rows.index(None)
+        rows[r] = mathutils.cross(rows[(r + 1) % 3], rows[(r + 2) % 3])
+        return mathutils.euler(mathutils.from_rows(*rows))
+
+    def get_surface(self):
+        """
+        Works out the ribbon make_ribbon builds without looking at the scene
+        :return: Surface: the ribbon's surface in world space
+        """
+        oVal = self.set_ribbon_orient_values()
+        rotate, scale = self.get_ribbon_transform()
+        return nurbs.Surface.plane(oVal[0], oVal[1], self.width, 3.0 / self.width, degree=3,
+                                   patches_u=(self.spans - 1), patches_v=1,
+                                   matrix=mathutils.compose(rotate=rotate, scale=scale))
+
+    def get_pin_matrices(self):
+        """
+        Works out the rest matrices the pins give the skin joints without waiting for the pins to evaluate
+        :return: array: (pins, 4, 4) world matrices
+        """
+        nVal, tVal = self.get_pin_axes()
+        return self.get_surface().get_pin_matrices([self.get_pin_parameter(i) for i in range(self.pins)], 0.5,
+                                                   normal_axis=nVal, tangent_axis=tVal)
+
+    def get_pin_parameter(self, i):
+        """
+        Returns where along the ribbon a skin joint is pinned
+        :param i: order joint is in the chain
+        :return: float: the normalized U coordinate
+        """
+        return i / (self.pins - 1.0)
+
+    def check_pins(self, matrices):
+        """
+        Warns if the pins would flip the skin joints: their aim axes should all point the same way along the
+        ribbon and their up axes shouldn't turn over from one joint to the next
+        :param matrices: array: the rest matrices of the skin joints (see get_pin_matrices)
+        """
+        aim = matrices[:, constants.get_axis_index(self.aimAxis), :3]
+        up = matrices[:, constants.get_axis_index(self.upAxis), :3]
+        along = (aim[:-1] * (matrices[1:, 3, :3] - matrices[:-1, 3, :3])).sum(axis=1)
+        if (along > 0.0).any() and (along < 0.0).any():
+            scene.warning(f"The skin joints of {self.name} don't all aim the same way along the ribbon")
+        if ((up[1:] * up[:-1]).sum(axis=1) < 0.0).any():
+            scene.warning(f"The up axes of {self.name}'s skin joints flip along the ribbon")
 
     def orient_deformer(self, hndl):
         """
@@ -259,35 +450,51 @@ class Ribbon(object):
                 rVal = 90
             if self.mirror and not self.invert:
                 rVal = 90
-            hndl.rotateZ.set(rVal)
+            scene.set_attr(f"{hndl}.rotateZ", rVal)
         if self.orient == "Y":
             if self.invert and not self.mirror:
-                hndl.rotateZ.set(180)
+                scene.set_attr(f"{hndl}.rotateZ", 180)
             if self.mirror and not self.invert:
-                hndl.rotateZ.set(180)
+                scene.set_attr(f"{hndl}.rotateZ", 180)
         if self.orient == "Z":
             rVal = 90
             if self.invert and not self.mirror:
                 rVal = -90
             if self.mirror and not self.invert:
                 rVal = -90
-            hndl.rotateX.set(rVal)
+            scene.set_attr(f"{hndl}.rotateX", rVal)
         aList = [self.orient, self.normal]
         if aList == ["X", "Z"] or aList == ["Y", "Z"]:
-            hndl.rotateY.set(90)
+            scene.set_attr(f"{hndl}.rotateY", 90)
         if aList == ["Z", "Y"]:
-            hndl.rotateZ.set(90)
+            scene.set_attr(f"{hndl}.rotateZ", 90)
 
     def orient_ribbon(self, rbn):
         """
         Orients the ribbon based on class orientation
         :param rbn: the ribon being oriented.
         """
+        rotate, scale = self.get_ribbon_transform()
+        for axis, value in zip(constants.AXES, rotate):
+            if value:
+                scene.set_attr(f"{rbn}.rotate{axis}", value)
+        for axis, value in zip(constants.AXES, scale):
+            if value != 1:
+                scene.set_attr(f"{rbn}.scale{axis}", value)
+        scene.freeze(rbn, translate=False, scale=False)
+
+    def get_ribbon_transform(self):
+        """
+        Returns the rotation and scale that orient the ribbon based on class orientation
+        :return: list, list: rotate and scale values
+        """
+        rotate = [0, 0, 0]
+        scale = [1, 1, 1]
         if self.orient == "X":
             if self.invert and not self.mirror:
-                rbn.scaleX.set(-1)
+                scale[0] = -1
             if self.mirror and not self.invert:
-                rbn.scaleX.set(-1)
+                scale[0] = -1
         if self.orient == "Y":
             rVal = 90
             if self.invert and not self.mirror:
@@ -295,9 +502,9 @@ class Ribbon(object):
             if self.mirror and not self.invert:
                 rVal = -90
             if self.normal == "X":
-                rbn.rotateX.set(rVal)
+                rotate[0] = rVal
             if self.normal == "Z":
-                rbn.rotateZ.set(rVal)
+                rotate[2] = rVal
         if self.orient == "Z":
             if self.normal == "Y":
                 rVal = -90
@@ -305,13 +512,13 @@ class Ribbon(object):
                     rVal = 90
                 if self.mirror and not self.invert:
                     rVal = 90
-                rbn.rotateY.set(rVal)
+                rotate[1] = rVal
             if self.normal == "X":
                 if self.invert and self.mirror:
-                    rbn.rotateX.set(180)
+                    rotate[0] = 180
                 if not self.invert and not self.mirror:
-                    rbn.rotateX.set(180)
-        pm.makeIdentity(rbn, r=1, a=1)
+                    rotate[0] = 180
+        return rotate, scale
 
     def set_ribbon_orient_values(self):
         """
@@ -328,127 +535,387 @@ class Ribbon(object):
 
 # TODO: Test refactor
 class Builder(Ribbon):
-    def __init__(self, driver_obj, ctls_obj=None, spans_per=3):
-        self.driver = driver_obj
-        self.controls = ctls_obj
-        self.lockTip = True
-        self.invert = False
-        if self.driver.name.split("_")[1] in UNLOCKTIP:
-            self.lockTip = False
-        if self.driver.name.split("_")[1] in INVERT:
-            self.invert = True
-        super().__init__(name=f"{self.driver.name}_rbn",
-                         spans=spans_per*len(self.driver.driver_joints),
-                         width=utils.get_length_of_chain(self.driver.driver_joints[0]),
-                         orient=self.driver.aim_vector,
-                         normal=self.driver.up_vector,
-                         mirror=self.driver.mirror,
-                         invert=self.invert,
-                         lock_tip=self.lockTip)
-        pm.select(cl=1)
+    @profiler.stage
+    def __init__(self, driver_obj, ctls_obj=None, spans_per=3, deformer_stack=False, adaptive=False,
+                 tolerance=None, min_spans=1, pins=None):
+        """
+        Builds a ribbon along a driver chain. The ribbon gets spans_per spans for every driver joint unless adaptive
+        is on, in which case each segment of the chain gets the fewest spans that keep the ribbon within tolerance
+        of the joints (straight segments need one, tight bends more). An adaptive ribbon never gets more spans than
+        spans_per would give it, falling back to those when it can't do better. Either way the number of skin joints
+        is set separately and the counts chosen are kept in self.fit (see format_fit)
+        :param driver_obj: the driver chain the ribbon follows
+        :param spans_per: int: the spans per driver joint (and skin joints per driver joint unless pins is given)
+        :param deformer_stack: bool: whether the deformers go straight onto the ribbon (see make_stack_deformer)
+        :param adaptive: bool: whether to work out the spans of each segment from the chain's shape
+        :param tolerance: float: how far an adaptive ribbon may stray from the joints (by default as far as the
+            ribbon spans_per gives does)
+        :param min_spans: int: the fewest spans an adaptive ribbon gives a segment (deformers like sine need a few)
+        :param pins: int: the number of skin joints
+        """
+        with scene.building():
+            self.driver = driver_obj
+            self.controls = ctls_obj
+            self.lockTip = True
+            self.invert = False
+            if self.driver.name.split("_")[1] in UNLOCKTIP:
+                self.lockTip = False
+            if self.driver.name.split("_")[1] in INVERT:
+                self.invert = True
+            # Leave the ribbon alone if it was built from the current driver chain
+            name = f"{self.driver.name}_rbn"
+            sknJntGrp = f"{self.driver.name}_skn_jnt_grp"
+            if utils.is_current(f"{name}_grp", self.driver.name):
+                self.name = name
+                self.rbn = name
+                self.skinJoints = scene.get_children(sknJntGrp)
+                self.ctlJoints = []
+                self.fit = None
+                return
+            stale = [f"{name}_grp", f"{name}_def_bs", f"{name}_uvPin", sknJntGrp]
+            stale += [f"{name}_lock_tip_{suffix}" for suffix in ["cond", "mult", "neg"]]
+            if scene.exists(sknJntGrp):
+                stale += [f"{jnt}_uvPin" for jnt in scene.get_children(sknJntGrp)]
+            utils.clear_stale(f"{name}_grp", self.driver.name, stale)
+            # Work out how the ribbon's spans are spread over the chain (it only follows the chain along its orient
+            # and normal axes)
+            axes = [constants.get_axis_index(axis) for axis in self.driver.orientation[:2]]
+            positions = [[p[i] if i in axes else 0.0 for i in range(3)] for p in self.get_chain_positions()]
+            spans = spans_per * len(self.driver.driver_joints)
+            self.breaks = get_breaks([1] * (len(positions) - 1))
+            errors = get_fit_errors(positions, spans - 1, self.breaks)
+            segments = None
+            if adaptive and tolerance is None and errors is not None:
+                # Match the even ribbon's fit, keeping the even layout if it can't be matched with fewer spans
+                tolerance = max(errors)
+                segments = get_segment_spans(positions, tolerance, min_spans)
+                segments = segments if sum(segments) <= spans - 1 else None
+            elif adaptive and tolerance is not None:
+                segments = get_segment_spans(positions, tolerance, min_spans)
+            adaptive = segments is not None
+            if adaptive:
+                spans = sum(segments) + 1
+                self.breaks = get_breaks(segments)
+                errors = get_fit_errors(positions, spans - 1, self.breaks)
+            pins = pins if pins is not None else spans_per * len(self.driver.driver_joints)
+            self.pinParameters = get_pin_parameters(positions, spans - 1, self.breaks, pins) if adaptive else None
+            self.fit = {"ribbon": name, "spans": spans - 1, "pins": pins, "tolerance": tolerance if adaptive else None,
+                        "error": max(errors) if errors is not None else None}
+            super().__init__(name=f"{self.driver.name}_rbn",
+                             spans=spans,
+                             width=utils.get_length_of_chain(self.driver.driver_joints[0]),
+                             orient=self.driver.orientation[0],
+                             normal=self.driver.orientation[1],
+                             mirror=self.driver.guides.mirror,
+                             invert=self.invert,
+                             lock_tip=self.lockTip,
+                             deformer_stack=deformer_stack,
+                             pins=pins)
+            utils.stamp_chain(f"{self.name}_grp", self.driver.name)
+            scene.clear_selection()
 
     def connect_lock_tip(self, hndl):
         # Set position
-        baseLoc = pm.spaceLocator(n=f"{self.name}_lock_base")
-        tipLoc = pm.spaceLocator(n=f"{self.name}_lock_tip")
-        pm.xform(baseLoc, t=pm.xform(self.driver.driver_joints[0], q=1, ws=1, rp=1), ws=1)
-        pm.xform(tipLoc, t=pm.xform(self.driver.driver_joints[-1], q=1, ws=1, rp=1), ws=1)
-        ptCon = pm.pointConstraint(baseLoc, tipLoc, hndl)
-        pm.connectAttr(self.rbn.lockTip, f"{ptCon.name()}.{baseLoc}W0")
-        pm.parent(baseLoc, tipLoc, f"{self.name}_{hndl.name().split('_')[-3]}_grp")
+        baseLoc = scene.create_locator(f"{self.name}_lock_base")
+        tipLoc = scene.create_locator(f"{self.name}_lock_tip")
+        scene.set_position(baseLoc, scene.get_position(self.driver.driver_joints[0]), world=True)
+        scene.set_position(tipLoc, scene.get_position(self.driver.driver_joints[-1]), world=True)
+        ptCon = scene.point_constraint([baseLoc, tipLoc], hndl)
+        scene.connect_attr(f"{self.rbn}.lockTip", f"{ptCon}.{baseLoc}W0")
+        scene.parent([baseLoc, tipLoc], f"{self.name}_{hndl.split('_')[-3]}_grp")
         # Set Scale with math nodes
-        cond = pm.shadingNode("condition", au=1, n=f"{self.name}_lock_tip_cond")
-        mult = pm.shadingNode("multDoubleLinear", au=1, n=f"{self.name}_lock_tip_mult")
+        cond = scene.create_node("condition", f"{self.name}_lock_tip_cond")
+        mult = scene.create_node("multDoubleLinear", f"{self.name}_lock_tip_mult")
         # Set attributes
-        cond.secondTerm.set(1)
-        cond.colorIfTrueR.set(1)
-        cond.colorIfFalseR.set(2)
-        mult.input1.set(hndl.scaleY.get())
+        scene.set_attr(f"{cond}.secondTerm", 1)
+        scene.set_attr(f"{cond}.colorIfTrueR", 1)
+        scene.set_attr(f"{cond}.colorIfFalseR", 2)
+        scene.set_attr(f"{mult}.input1", scene.get_attr(f"{hndl}.scaleY"))
         # Make scale connections
-        pm.connectAttr(self.rbn.lockTip, cond.firstTerm, f=1)
-        pm.connectAttr(cond.outColorR, mult.input2, f=1)
-        pm.connectAttr(mult.output, hndl.scaleY)
+        scene.connect_attr(f"{self.rbn}.lockTip", f"{cond}.firstTerm")
+        scene.connect_attr(f"{cond}.outColorR", f"{mult}.input2")
+        scene.connect_attr(f"{mult}.output", f"{hndl}.scaleY")
 
-    def connect_ribbon_deformer(self, def_rbn):
+    def connect_ribbon_deformer(self, def_type):
         """
         Make the connections to the main ribbon based on the deformer created
-        :param def_rbn: The deformer ribbon being connected to the main ribbon
+        :param def_type: The deformer being connected to the main ribbon
         """
         # Make connections
-        dfrmType = def_rbn.name().split("_")[-2]
-        pm.connectAttr(f"{self.rbn.name()}.{dfrmType}Blend",
-                       f"{self.rbn.name()}_def_bs.{self.rbn.name()}_{dfrmType}_bs")
-        hndl = pm.PyNode(f"{self.rbn.name()}_{dfrmType}_def_hndl")
-        if dfrmType in attributes.DFRMCONN:
-            if dfrmType == "sine":
+        scene.connect_attr(f"{self.rbn}.{def_type}Blend", self.get_deformer_blend(def_type))
+        hndl = f"{self.rbn}_{def_type}_def_hndl"
+        if def_type in attributes.DFRMCONN:
+            if def_type == "sine":
                 self.connect_lock_tip(hndl)
-            a = attributes.DFRMCONN[dfrmType]
+            a = attributes.DFRMCONN[def_type]
             for attr in a:
                 if a[attr] in constants.TRNSFRMATTRS:
                     # Transform values go to the offset parent matrix of the deformer' tranform node
                     oAxis = f"{a[attr]}".capitalize() + f"{self.orient}"
-                    if pm.ls(f"{hndl.name()[:-5]}_{attr}_mtrx"):
-                        mtrx = pm.PyNode(f"{hndl.name()[:-5]}_{attr}_mtrx")
-                    else:
-                        mtrx = pm.createNode("composeMatrix", n=f"{hndl.name()[:-5]}_{attr}_mtrx")
-                    pm.connectAttr(f"{self.rbn.name()}.{attr}", f"{mtrx}.input{oAxis}", f=1)
-                    pm.connectAttr(f"{mtrx}.outputMatrix", f"{hndl}.offsetParentMatrix", f=1)
+                    mtrx = utils.check_hypergraph_node(f"{hndl[:-5]}_{attr}_mtrx", "composeMatrix")
+                    scene.connect_attr(f"{self.rbn}.{attr}", f"{mtrx}.input{oAxis}")
+                    scene.connect_attr(f"{mtrx}.outputMatrix", f"{hndl}.offsetParentMatrix")
                 else:
                     # All other values plug drirectly into the deformer's shape node
-                    pm.connectAttr(f"{self.rbn.name()}.{attr}", f"{hndl}Shape.{a[attr]}", f=1)
+                    scene.connect_attr(f"{self.rbn}.{attr}", f"{hndl}Shape.{a[attr]}")
 
+    @profiler.stage
     def make_ribbon(self):
         """
         Create the ribbon that will be the base for your rig
-        :return: PyNode ribbon that was created
+        :return: str: ribbon that was created
         """
         ratio = 3.0 / self.width
         oVal = self.set_ribbon_orient_values()
         # Check to see if ribbon exists
-        if pm.ls(self.name):
-            return pm.PyNode(self.name)
+        if scene.exists(self.name):
+            return scene.find(self.name)
         # Build ribbon
-        rbn = pm.nurbsPlane(p=oVal[0], ax=oVal[1], w=self.width, lr=ratio,
-                            d=3, u=(self.spans - 1), v=1, name=self.name, ch=0)[0]
+        rbn = scene.create_nurbs_plane(self.name, oVal[0], oVal[1], self.width, ratio,
+                                       degree=3, patches_u=(self.spans - 1), patches_v=1)
         self.orient_ribbon(rbn)
         self.position_ribbon_on_chain(rbn)
-        rbn.inheritsTransform.set(0)
+        scene.set_attr(f"{rbn}.inheritsTransform", 0)
         # Parent ribbon to group
         grp = utils.make_group(f"{self.name}_grp", child=rbn, parent=utils.make_group(
             "rbn_grp", parent=utils.make_group("utils_grp")))
-        pm.xform(grp, t=pm.xform(self.driver.driver_joints[0], q=1, ws=1, rp=1))
+        scene.set_position(grp, scene.get_position(self.driver.driver_joints[0]))
         # TODO: skin ribbon to chain
         return rbn
 
+    @profiler.stage
     def position_ribbon_on_chain(self, rbn):
-        # Set Variables
-        num = utils.get_info_from_joint(self.driver.driver_joints[0], num=True)
-        dv = [2, 2, 2]
-        dv[constants.get_axis_index(self.orient)] = num
-        # Create Lattice
-        pm.select(rbn, r=1)
-        lat = pm.lattice(pm.ls(sl=1), dv=dv, oc=1, foc=1)
-        self.move_lattice(lat)
-        # Delete history and transform data
-        pm.xform(rbn, piv=pm.xform(self.driver.driver_joints[0], q=1, ws=1, rp=1), ws=1)
-        pm.makeIdentity(rbn, a=1)
-        pm.delete(rbn, ch=1)
-
-    def move_lattice(self, lattice):
-        rbnDir = [self.orient, self.normal]
-        lattice[0].local.set(1)
-        for i, jnt in enumerate(self.driver.driver_joints):
-            pm.select(f"{lattice[1]}.pt[0:1][0:1][{i}]", r=1)
-            if "X" in rbnDir and "Y" in rbnDir:
-                pm.move((pm.xform(jnt, q=1, ws=1, rp=1))[:1], xy=1, ws=1)
-            elif "X" in rbnDir and "Z" in rbnDir:
-                tVal = [(pm.xform(jnt, q=1, ws=1, rp=1))[0], (pm.xform(jnt, q=1, ws=1, rp=1))[-1]]
-                pm.move(tVal, xz=1, ws=1)
-            else:
-                pm.move((pm.xform(jnt, q=1, ws=1, rp=1))[1:], yz=1, ws=1)
+        """
+        Fits the ribbon to the driver chain by moving its CVs straight to where they belong (see get_chain_points)
+        :param rbn: str: the ribbon being fitted
+        """
+        # Bake the ribbon's orientation into its CVs so they're in world space
+        scene.freeze(rbn)
+        scene.set_points(rbn, self.get_chain_points(scene.get_points(rbn)))
+        scene.set_pivot(rbn, scene.get_position(self.driver.driver_joints[0]))
+
+    def get_chain_points(self, points):
+        """
+        Works out where the ribbon's CVs go to follow the driver chain. The ribbon is cut into a slice per joint
+        along its orient axis and each slice is put on its joint along the orient and normal axes; the CVs in
+        between are spread linearly from one slice to the next (what a lattice with local influence does)
+        :param points: list: the world space CVs of the flat ribbon
+        :return: list: the world space CVs of the fitted ribbon
+        """
+        positions = self.get_chain_positions()
+        oIndex = constants.get_axis_index(self.orient)
+        axes = [oIndex, constants.get_axis_index(self.normal)]
+        low = min(p[oIndex] for p in points)
+        size = max(p[oIndex] for p in points) - low
+        result = []
+        for point in points:
+            cell, t = get_cell(self.breaks, (point[oIndex] - low) / size)
+            point = list(point)
+            for axis in axes:
+                start, end = positions[cell][axis], positions[cell + 1][axis]
+                point[axis] = start + (end - start) * t
+            result.append(point)
+        return result
+
+    def get_chain_positions(self):
+        """
+        Returns the positions of the driver joints
+        :return: list: the world space positions
+        """
+        if self.driver.chain_data is not None:
+            return self.driver.chain_data.positions.tolist()
+        return [scene.get_position(jnt) for jnt in self.driver.driver_joints]
+
+    def get_pin_parameter(self, i):
+        # Skin joints are spread evenly over the segments of the chain however many spans each of them has
+        if self.pinParameters is not None:
+            return self.pinParameters[i]
+        last = len(self.breaks) - 1
+        t = i / (self.pins - 1.0) * last
+        cell = min(int(t), last - 1)
+        return self.breaks[cell] + (self.breaks[cell + 1] - self.breaks[cell]) * (t - cell)
+
+    def get_surface(self):
+        # The flat ribbon make_ribbon starts from with its CVs moved onto the chain
+        surface = super().get_surface()
+        shape = surface.points.shape
+        points = self.get_chain_points(surface.points.reshape(-1, 3).tolist())
+        return nurbs.Surface(nurbs.np.reshape(points, shape), surface.degree)
 
     def orient_deformer(self, hndl):
         up = constants.get_axis_vector(self.normal)
-        pos = pm.pointConstraint(self.driver.driver_joints[0], self.driver.driver_joints[-1], hndl)
-        aim = pm.aimConstraint(self.driver.driver_joints[-1], hndl, aim=[0, 1, 0], u=[1, 0, 0], wu=up, wut="vector")
-        pm.delete(aim, pos)
+        pos = scene.point_constraint([self.driver.driver_joints[0], self.driver.driver_joints[-1]], hndl)
+        aim = scene.aim_constraint(self.driver.driver_joints[-1], hndl, aim=[0, 1, 0], up=[1, 0, 0],
+                                   world_up_vector=up)
+        scene.delete([aim, pos])
+
+
+#############
+# Span layout
+#############
+
+def get_breaks(segment_spans):
+    """
+    Returns where each joint of a chain falls along a ribbon given the spans every segment of the chain gets
+    :param segment_spans: list: the spans of each segment
+    :return: list: the normalized U coordinate of every joint
+    """
+    total = float(sum(segment_spans))
+    breaks = [0.0]
+    for spans in segment_spans:
+        breaks.append(breaks[-1] + spans / total)
+    breaks[-1] = 1.0
+    return breaks
+
+
+def get_cell(breaks, u):
+    """
+    Returns the segment of the chain a point on a ribbon belongs to and how far along the segment it is
+    :param breaks: list: the normalized U coordinate of every joint (see get_breaks)
+    :param u: float: the normalized U coordinate of the point
+    :return: int, float: the segment and the position along it from 0 to 1
+    """
+    u = max(0.0, min(1.0, u))
+    cell = max(0, min(bisect.bisect_right(breaks, u) - 1, len(breaks) - 2))
+    return cell, (u - breaks[cell]) / (breaks[cell + 1] - breaks[cell])
+
+
+def get_segment_spans(positions, tolerance, min_spans=1, max_spans=MAXSPANS):
+    """
+    Works out the fewest spans each segment of a chain needs for a ribbon fitted to it to pass within tolerance of
+    its joints. A cubic ribbon cuts each corner of the chain by about a third of its CV spacing times the sine of
+    half the bend, so straight segments need a single span and long segments ending in tight bends need more. The
+    guess is then checked against the fitted ribbon itself (see get_fit_errors), topped up where it falls short and
+    trimmed where it doesn't need to be
+    :param positions: list: the positions of the joints
+    :param tolerance: float: how far the ribbon may stray from the joints
+    :param min_spans: int: the fewest spans a segment gets
+    :param max_spans: int: the most spans a segment gets
+    :return: list: the spans of each segment
+    """
+    bends = [0.0] * len(positions)
+    for i in range(1, len(positions) - 1):
+        a = mathutils.sub(positions[i], positions[i - 1])
+        b = mathutils.sub(positions[i + 1], positions[i])
+        if mathutils.length(a) > 1e-9 and mathutils.length(b) > 1e-9:
+            cos = mathutils.dot(mathutils.normalize(a), mathutils.normalize(b))
+            bends[i] = math.sqrt(max(0.0, (1.0 - cos) / 2.0))
+    segments = []
+    for i in range(len(positions) - 1):
+        length = mathutils.distance(positions[i], positions[i + 1])
+        spans = math.ceil(length * max(bends[i], bends[i + 1]) / (3.0 * tolerance) - 1e-9)
+        segments.append(max(min_spans, min(max_spans, spans)))
+    errors = get_fit_errors(positions, sum(segments), get_breaks(segments))
+    while errors is not None and max(errors) > tolerance:
+        # Give the segments on either side of every joint the ribbon misses another span
+        grown = False
+        for i, error in enumerate(errors):
+            for j in [i - 1, i] if error > tolerance else []:
+                if 0 <= j < len(segments) and segments[j] < max_spans:
+                    segments[j] += 1
+                    grown = True
+        if not grown:
+            scene.warning(f"A ribbon with {max_spans} spans a segment still misses its chain by {max(errors):.3g}")
+            break
+        errors = get_fit_errors(positions, sum(segments), get_breaks(segments))
+    if errors is None or max(errors) > tolerance:
+        return segments
+    # Take back any span the ribbon stays within tolerance without, starting with the densest segments
+    for i in sorted(range(len(segments)), key=lambda j: -segments[j]):
+        while segments[i] > min_spans:
+            segments[i] -= 1
+            if max(get_fit_errors(positions, sum(segments), get_breaks(segments))) > tolerance:
+                segments[i] += 1
+                break
+    return segments
+
+
+def get_fit_errors(positions, spans, breaks):
+    """
+    Measures how far the centre of a ribbon fitted to a chain (see Builder.get_chain_points) passes from each of
+    its joints. The ribbon's CVs sit on the chain so it only strays from the chain where it rounds a corner
+    :param positions: list: the positions of the joints
+    :param spans: int: the spans of the ribbon
+    :param breaks: list: the normalized U coordinate of every joint (see get_breaks)
+    :return: list: the distance from each joint to the ribbon (None without NumPy)
+    """
+    if nurbs.np is None:
+        return None
+    return get_closest_params(get_centre_curve(positions, spans, breaks), positions, breaks)[1].tolist()
+
+
+def get_pin_parameters(positions, spans, breaks, pins):
+    """
+    Spreads skin joints evenly by arc length over the segments of a chain, measured from where the ribbon passes
+    each joint. A ribbon whose spans vary from one segment to the next neither runs at an even speed nor passes its
+    joints right at their breaks, so even steps in U won't do
+    :param positions: list: the positions of the joints
+    :param spans: int: the spans of the ribbon
+    :param breaks: list: the normalized U coordinate of every joint (see get_breaks)
+    :param pins: int: the number of skin joints
+    :return: list: the normalized U coordinate of every skin joint (None without NumPy)
+    """
+    if nurbs.np is None:
+        return None
+    curve = get_centre_curve(positions, spans, breaks)
+    lengths = curve.get_lengths(get_closest_params(curve, positions, breaks)[0])
+    last = len(breaks) - 1
+    targets = []
+    for i in range(pins):
+        t = i / (pins - 1.0) * last
+        cell = min(int(t), last - 1)
+        targets.append(lengths[cell] + (lengths[cell + 1] - lengths[cell]) * (t - cell))
+    return (curve.get_params(targets) / curve.spans).tolist()
+
+
+def get_centre_curve(positions, spans, breaks):
+    """
+    Returns the curve running down the middle of a ribbon fitted to a chain (see Builder.get_chain_points)
+    :param positions: list: the positions of the joints
+    :param spans: int: the spans of the ribbon
+    :param breaks: list: the normalized U coordinate of every joint (see get_breaks)
+    :return: Curve: the curve
+    """
+    points = []
+    for u in nurbs.get_greville(spans, 3):
+        cell, t = get_cell(breaks, u)
+        points.append(mathutils.lerp(positions[cell], positions[cell + 1], t))
+    return nurbs.Curve(points, 3)
+
+
+def get_closest_params(curve, positions, breaks, samples=8, passes=3):
+    """
+    Finds where the centre curve of a ribbon passes closest to each joint of its chain. Each joint is searched for
+    within a span of its break, then again and again in ever smaller windows around the closest sample
+    :param curve: Curve: the centre curve (see get_centre_curve)
+    :param positions: list: the positions of the joints
+    :param breaks: list: the normalized U coordinate of every joint (see get_breaks)
+    :param samples: int: the number of samples each search takes either side of its centre
+    :param passes: int: the number of searches
+    :return: array, array: the parameter and distance of the closest point to each joint
+    """
+    np = nurbs.np
+    joints = np.asarray(positions, dtype=float)
+    params = np.asarray(breaks, dtype=float) * curve.spans
+    offsets = np.linspace(-1.0, 1.0, 2 * samples + 1)
+    for i in range(passes):
+        candidates = np.clip(params[:, None] + offsets[None, :] / samples ** i, 0.0, curve.spans)
+        points = curve.get_points(candidates.ravel()).reshape(candidates.shape + (3,))
+        distances = np.linalg.norm(points - joints[:, None, :], axis=2)
+        closest = distances.argmin(axis=1)
+        params = candidates[np.arange(len(joints)), closest]
+    return params, distances[np.arange(len(joints)), closest]
+
+
+def format_fit(fits):
+    """
+    Lays out the span and pin counts chosen for a number of ribbons (see Builder.fit)
+    :param fits: list: the fits of the ribbons
+    :return: str: a table of the counts
+    """
+    lines = [f"{'ribbon':<24}{'spans':>8}{'pins':>8}{'error':>12}{'tolerance':>12}"]
+    for fit in fits:
+        error = f"{fit['error']:>12.4f}" if fit["error"] is not None else f"{'-':>12}"
+        tolerance = f"{fit['tolerance']:>12.4f}" if fit["tolerance"] is not None else f"{'-':>12}"
+        lines.append(f"{fit['ribbon']:<24}{fit['spans']:>8}{fit['pins']:>8}{error}{tolerance}")
+    return "\n".join(lines)
@@ -1,6 +1,8 @@
-import pymel.core as pm
-
+from core import chain
 from core import constants
+from core import nurbs
+from core import profiler
+from core import scene
 from core import utils
 from ctls import controls
 from rigs import ik
@@ -13,14 +15,16 @@ UPINDEX = {"X": 6, "Y": 0, "Z": 3}
 # TODO: Spline and control joints still need to scale
 # TODO: This module should have a Build() class
 
-def make_spline_control_joints(joint, curve, span="upper", splits=1, const_node=None):
+@profiler.stage
+def make_spline_control_joints(joint, curve, span="upper", splits=1, const_node=None, curve_data=None):
     """
     Create the joints that drive a spline curve and will eventually be driven by a control
-    :param joint: PyNode: base joint driving the overall rig (typically the Driver Joint)
-    :param curve: PyNode: the spline curve being driven by joints
+    :param joint: str: base joint driving the overall rig (typically the Driver Joint)
+    :param curve: str: the spline curve being driven by joints
     :param span: str: the span name of the section you are creating joints for
     :param splits: int: number of joint in between the ones at the top and bottom of the curve
-    :param const_node: PyNode: Used if any axes are constrained (typically a Twist Joint)
+    :param const_node: str: Used if any axes are constrained (typically a Twist Joint)
+    :param curve_data: Curve: the curve as it is now (saves sampling it in the scene)
     :return: list: control joints that were created
     """
     # Create the outliner group to store the nodes this process creates
@@ -29,93 +33,116 @@ def make_spline_control_joints(joint, curve, span="upper", splits=1, const_node=
         f"{name}_grp", parent=utils.make_group(
             f"{utils.get_info_from_joint(joint, name=True)}_ctl_jnt_grp", parent=utils.make_group(
                 "ctl_jnt_grp", parent=utils.make_group("jnt_grp"))))
-    pm.xform(grp, t=pm.xform(joint, q=1, ws=1, rp=1))
+    scene.set_position(grp, scene.get_position(joint))
     # Check variables
     if splits < 0:
         splits = -splits
     if splits > 1:
-        pm.rebuildCurve(curve, s=curve.spans.get())
+        scene.rebuild_curve(curve, scene.get_attr(f"{curve}.spans"))
+        curve_data = None
+    # Find where every control joint goes along the curve
+    if curve_data is None and nurbs.np is not None:
+        curve_data = nurbs.Curve.from_scene(curve)
+    if curve_data is not None:
+        positions = curve_data.sample(splits + 2).tolist()
+    else:
+        positions = [scene.point_on_curve(curve, i/(splits + 1)) for i in range(splits + 2)]
     if const_node is not None:
-        pm.pointConstraint(const_node, grp)
+        scene.point_constraint(const_node, grp)
     else:
-        pm.pointConstraint(joint, grp)
+        scene.point_constraint(joint, grp)
     # Create control joints
     ctl_jnts = []
     for i in range(splits + 2):
         jnt = utils.duplicate_chain([joint], "ctl", grp)[0]
-        pm.rename(jnt, name.replace("_ctl", f"_ctl{str(i+1).zfill(2)}"))
-        jnt.radius.set(jnt.radius.get() * 2)
-        pm.parent(jnt, w=1)
-        pm.xform(jnt, t=pm.pointOnCurve(curve, pr=i/(splits + 1), top=1))
-        pm.parent(jnt, grp)
+        jnt = scene.rename(jnt, name.replace("_ctl", f"_ctl{str(i+1).zfill(2)}"))
+        scene.set_attr(f"{jnt}.radius", scene.get_attr(f"{jnt}.radius") * 2)
+        scene.parent(jnt)
+        scene.set_position(jnt, positions[i])
+        scene.parent(jnt, grp)
         ctl_jnts.append(jnt)
     if splits:
         for i, midJnt in enumerate(ctl_jnts[1:-1]):
             mid_grp = utils.make_offset_groups([midJnt], reset=False)
             # TODO: will this work just as well with the matrix orient constraint?
-            pm.orientConstraint(mid_grp, ctl_jnts[0])
-            pt_const = pm.pointConstraint([ctl_jnts[0], ctl_jnts[-1]], mid_grp, mo=1)
-            eval(f"pt_const.{ctl_jnts[0].name()}W0.set({1 - ((i + 1) / (splits + 1))})")
-            eval(f"pt_const.{ctl_jnts[-1].name()}W1.set({(i + 1) / (splits + 1)})")
+            scene.orient_constraint(mid_grp, ctl_jnts[0])
+            pt_const = scene.point_constraint([ctl_jnts[0], ctl_jnts[-1]], mid_grp, maintain_offset=True)
+            scene.set_attr(f"{pt_const}.{ctl_jnts[0]}W0", 1 - ((i + 1) / (splits + 1)))
+            scene.set_attr(f"{pt_const}.{ctl_jnts[-1]}W1", (i + 1) / (splits + 1))
     utils.skin_to_joints(ctl_jnts, curve)
     return ctl_jnts
 
 
+@profiler.stage
 def make_spline_twist(jnt_chain, curve, handle, index=0, twist_jnt=None, invert=False):
     """
     Uses a list of joints to drive an advanced spline twist setup. Can either be used for a single-span
     chain like a neck, spine, or tail, or in a multi span chain like an arm or leg.
     :param jnt_chain: list: the joints driving the twist
-    :param curve: PyNode: the curve driving the spline
-    :param handle: PyNode: the IK handle with the twist attribute
+    :param curve: str: the curve driving the spline
+    :param handle: str: the IK handle with the twist attribute
     :param index: int: the iteration integer of the function (used in for loops)
-    :param twist_jnt: PyNode: defined if the spline chain has a twist joint
+    :param twist_jnt: str: defined if the spline chain has a twist joint
     :param invert: bool: mirrored joints
     """
-    twist_axis = str(jnt_chain[0].getRotationOrder())[0]
-    up_axis = str(jnt_chain[0].getRotationOrder())[1]
+    twist_axis = scene.get_rotate_order(jnt_chain[0])[0]
+    up_axis = scene.get_rotate_order(jnt_chain[0])[1]
     # Set the twist attributes in the handle
-    handle.dTwistControlEnable.set(1)
-    handle.dWorldUpType.set(3)
-    handle.dForwardAxis.set(constants.AXES.index(twist_axis) * 2)
-    handle.dWorldUpAxis.set(UPINDEX[up_axis])
+    scene.set_attr(f"{handle}.dTwistControlEnable", 1)
+    scene.set_attr(f"{handle}.dWorldUpType", 3)
+    scene.set_attr(f"{handle}.dForwardAxis", constants.AXES.index(twist_axis) * 2)
+    scene.set_attr(f"{handle}.dWorldUpAxis", UPINDEX[up_axis])
     for i, v in enumerate(constants.get_axis_vector(up_axis)):
-        eval(f"handle.dWorldUpVector{constants.AXES[i]}.set({v})")
-    handle.dTwistValueType.set(1)
+        scene.set_attr(f"{handle}.dWorldUpVector{constants.AXES[i]}", v)
+    scene.set_attr(f"{handle}.dTwistValueType", 1)
     # Make the connections
     if index == 0 and len(jnt_chain) > 2:
         if twist_jnt is None:
             twist_jnt = jnt_chain[0]
-        pm.connectAttr(twist_jnt.worldMatrix[0], handle.dWorldUpMatrix)
-        addNode = utils.check_hypergraph_node(curve.name().replace("_crv", "_add"), "addDoubleLinear")
-        pm.connectAttr(eval(f"jnt_chain[index].rotate{twist_axis}"), addNode.input1)
-        pm.connectAttr(eval(f"jnt_chain[index + 1].rotate{twist_axis}"), addNode.input2)
-        pm.connectAttr(addNode.output, handle.dTwistEnd)
+        scene.connect_attr(f"{twist_jnt}.worldMatrix[0]", f"{handle}.dWorldUpMatrix")
+        addNode = utils.check_hypergraph_node(curve.replace("_crv", "_add"), "addDoubleLinear")
+        scene.connect_attr(f"{jnt_chain[index]}.rotate{twist_axis}", f"{addNode}.input1")
+        scene.connect_attr(f"{jnt_chain[index + 1]}.rotate{twist_axis}", f"{addNode}.input2")
+        scene.connect_attr(f"{addNode}.output", f"{handle}.dTwistEnd")
     else:
-        pm.connectAttr(jnt_chain[index].worldMatrix[0], handle.dWorldUpMatrix)
-        pm.connectAttr(jnt_chain[index + 1].rotateX, handle.dTwistEnd)
+        scene.connect_attr(f"{jnt_chain[index]}.worldMatrix[0]", f"{handle}.dWorldUpMatrix")
+        scene.connect_attr(f"{jnt_chain[index + 1]}.rotateX", f"{handle}.dTwistEnd")
     # Inverted chains need the twist rotate value to be inverted as well
     if invert:
-        utils.invert_attribute(handle.dTwistEnd)
-        handle.dForwardAxis.set(handle.dForwardAxis.get() + 1)
-        handle.dWorldUpAxis.set(handle.dWorldUpAxis.get() + 1)
+        utils.invert_attribute(f"{handle}.dTwistEnd")
+        scene.set_attr(f"{handle}.dForwardAxis", scene.get_attr(f"{handle}.dForwardAxis") + 1)
+        scene.set_attr(f"{handle}.dWorldUpAxis", scene.get_attr(f"{handle}.dWorldUpAxis") + 1)
         for i, v in enumerate(constants.get_axis_vector(up_axis, invert=True)):
-            eval(f"handle.dWorldUpVector{constants.AXES[i]}.set({v})")
+            scene.set_attr(f"{handle}.dWorldUpVector{constants.AXES[i]}", v)
 
 
-def make_split_spline(jnt_chain, twist_jnt=None, chain_type="spline", splits=3, invert=False):
+@profiler.stage
+def make_split_spline(jnt_chain, twist_jnt=None, chain_type="spline", splits=3, invert=False, chain_data=None,
+                      spacing="uniform"):
     """
     Creates a new "split" joint chain that has a stretchy splike IK and control joints.
     :param jnt_chain: list: joint chain that is acting as the base (typically the driver joint
-    :param twist_jnt: PyNode: looks for a twist joint and, if none provided assigns the base joint
+    :param twist_jnt: str: looks for a twist joint and, if none provided assigns the base joint
     :param chain_type: str:
     :param splits: int: number of mid joints between the base and tip of a joint span
     :param invert: bool: mirrored joints need rotations inverted
-    :return: list: the instantiated stretch classes of the chain.
+    :param chain_data: ChainData: the captured chain of jnt_chain (saves querying it)
+    :param spacing: str: how the split joints are spaced along each span (see utils.split_chain)
+    :return: list: the instantiated stretch classes of the chain (empty if the chain is already up to date)
     """
     if twist_jnt is None:
         twist_jnt = jnt_chain[0]
-    spilne_jnts = utils.split_chain(jnt_chain, chain_type, 3)
+    # Leave the spline alone if it was built from the current driver chain
+    name = utils.get_info_from_joint(jnt_chain[0], name=True)
+    split_grp = f"{name}_{chain_type}_jnt_grp"
+    if utils.is_current(split_grp, name):
+        return []
+    spans = [constants.get_span(i, len(jnt_chain[:-1])) for i in range(len(jnt_chain[:-1]))]
+    utils.clear_stale(split_grp, name, [split_grp, f"{name}_ctl_jnt_grp"] + [
+        f"{name}_{span}_{suffix}" for span in spans for suffix in ["crv_grp", "hndl"]])
+    spilne_jnts = utils.split_chain(jnt_chain, chain_type, 3, chain_data=chain_data, spacing=spacing)
+    # Every span of the split chain is a chain of its own
+    split_data = chain.capture(spilne_jnts, [-1 if i % 5 == 0 else i - 1 for i in range(len(spilne_jnts))])
     all_ctl_jnts = []
     hndl_grp = utils.make_group(f"{utils.get_info_from_joint(jnt_chain[0], name=True)}_hndl_grp",
                                 parent=utils.make_group("hndl_grp", parent=utils.make_group("utils_grp")))
@@ -124,23 +151,27 @@ def make_split_spline(jnt_chain, twist_jnt=None, chain_type="spline", splits=3,
         # Create a spline setup for each span of the chain
         if not i == len(jnt_chain[:-2]):
             # Make sure a chain isn't parented to the chain above it
-            pm.parent(spilne_jnts[(i + 1) * (splits + 2)], pm.listRelatives(spilne_jnts[0], p=1)[0])
+            scene.parent(spilne_jnts[(i + 1) * (splits + 2)], scene.get_parent(spilne_jnts[0]))
         # Set up the rig components
         span = constants.get_span(i, len(jnt_chain[:-1]))
+        span_data = split_data.segment(i * 5, (i + 1) * 5) if split_data is not None else None
+        curve_data = nurbs.Curve.from_chain(span_data) if span_data is not None else None
         crv = utils.make_curve_from_chain(spilne_jnts[i * 5],
-                                          name=f"{utils.get_info_from_joint(jnt, name=True)}_{span}_crv")
-        pm.parent(pm.listRelatives(crv, p=1), utils.make_group(f"{utils.get_info_from_joint(jnt, name=True)}_crv_grp"))
+                                          name=f"{utils.get_info_from_joint(jnt, name=True)}_{span}_crv",
+                                          chain_data=span_data)
+        scene.parent(scene.get_parent(crv), utils.make_group(f"{utils.get_info_from_joint(jnt, name=True)}_crv_grp"))
         if not i:
-            ctl_jnts = make_spline_control_joints(jnt, crv, span, splits=1, const_node=twist_jnt)
-            pm.pointConstraint(jnt, ctl_jnts[0])
+            ctl_jnts = make_spline_control_joints(jnt, crv, span, splits=1, const_node=twist_jnt,
+                                                  curve_data=curve_data)
+            scene.point_constraint(jnt, ctl_jnts[0])
         else:
-            ctl_jnts = make_spline_control_joints(jnt, crv, span, splits=1, const_node=jnt)
+            ctl_jnts = make_spline_control_joints(jnt, crv, span, splits=1, const_node=jnt, curve_data=curve_data)
         all_ctl_jnts.append(ctl_jnts)
-        jnts = utils.get_joints_in_chain(spilne_jnts[i * 5])
-        hndl = ik.make_handle(jnts[0], jnts[-1], name=crv.name().replace("_crv", "_hndl"),
+        jnts = span_data.names if span_data is not None else utils.get_joints_in_chain(spilne_jnts[i * 5])
+        hndl = ik.make_handle(jnts[0], jnts[-1], name=crv.replace("_crv", "_hndl"),
                               solver="spline", spline_crv=crv)[0]
-        pm.parent(hndl, hndl_grp)
-        stretch_obj = stretch.Build(utils.get_joints_in_chain(spilne_jnts[i * 5]), crv)
+        scene.parent(hndl, hndl_grp)
+        stretch_obj = stretch.Build(jnts, crv, chain_data=span_data, curve_data=curve_data)
         make_spline_twist(jnt_chain, crv, hndl, i, twist_jnt, invert)
         stretch_obj_list.append(stretch_obj)
     bend_jnts = controls.make_limb_bend_control_joints(jnt_chain)
@@ -149,21 +180,22 @@ def make_split_spline(jnt_chain, twist_jnt=None, chain_type="spline", splits=3,
             connect_splines(jnt_chain[i + 1], ctl_jnts[-1])
         else:
             connect_splines(bend_jnts[i], ctl_jnts[-1], all_ctl_jnts[i + 1][0])
+    utils.stamp_chain(split_grp, name)
     return stretch_obj_list
 
 
 def connect_splines(mid, upper, lower=None):
     """
     Uses matrix constraints and a bit of math to merge the ends of two chains and dirve it with a single joint
-    :param mid: PyNode: joint that will connect both splines
-    :param upper: PyNode: last joint controlling the upper spline
-    :param lower: PyNode: first joint controlling the lower spline
+    :param mid: str: joint that will connect both splines
+    :param upper: str: last joint controlling the upper spline
+    :param lower: str: first joint controlling the lower spline
     :return:
     """
-    aim = str(mid.getRotationOrder())[0]
-    # pm.connectAttr(eval(f"mid.scale{aim}"), eval(f"upper.scale{aim}"), f=1)
+    aim = scene.get_rotate_order(mid)[0]
+    # scene.connect_attr(f"{mid}.scale{aim}", f"{upper}.scale{aim}")
     if lower is not None:
-        pm.pointConstraint(mid, lower)
-        # pm.connectAttr(eval(f"mid.scale{aim}"), eval(f"lower.scale{aim}"), f=1)
-    pm.pointConstraint(mid, upper)
-    pm.connectAttr(eval(f"mid.scale{aim}"), eval(f"upper.scale{aim}"), f=1)
+        scene.point_constraint(mid, lower)
+        # scene.connect_attr(f"{mid}.scale{aim}", f"{lower}.scale{aim}")
+    scene.point_constraint(mid, upper)
+    scene.connect_attr(f"{mid}.scale{aim}", f"{upper}.scale{aim}")
@@ -1,25 +1,30 @@
-import pymel.core as pm
+from core import profiler
+from core import scene
 from core import utils
 
 
 class Build(object):
     # TODO: only works for spline curve rigs like necks and tails. Needs to be able to work with
     #  distance-based rigs like arms and legs
-    def __init__(self, stretch_jnts, curve, skin_jnts=None, vol=True):
+    @profiler.stage
+    def __init__(self, stretch_jnts, curve, skin_jnts=None, vol=True, chain_data=None, curve_data=None):
         """
         Builds a stretch rig for a given set of joints and sets up scale functionality on skinned joints to
         preserve volume if specified.
         :param stretch_jnts: list: joints the stretch is being applied to
-        :param curve: PyNode: Curve who's relative length is driving the scale operations
+        :param curve: str: Curve who's relative length is driving the scale operations
         :param skin_jnts: list: if the joints being skinned are separate from the stretch joints
         :param vol: bool: whether or not to preserve the volume of a given node
+        :param chain_data: ChainData: the captured chain of the stretch joints (saves querying them)
+        :param curve_data: Curve: the rest shape of the curve (saves querying its length)
         """
         self.name = "_".join(stretch_jnts[0].split("_")[:-1])
         self.stretchJoints = stretch_jnts
-        self.curveInfo = utils.check_hypergraph_node(f"{curve.name()}_info", "curveInfo")
+        self.curveInfo = utils.check_hypergraph_node(f"{curve}_info", "curveInfo")
         self.skinJoints = skin_jnts
         self.vol = vol
-        self.roo = str(self.stretchJoints[0].getRotationOrder())
+        self.chain_data = chain_data
+        self.roo = chain_data.rotate_order if chain_data is not None else scene.get_rotate_order(self.stretchJoints[0])
         # self.ikCtl = ctls_obj.ikMain
         # Create Stretch Nodes
         self.stretchVal = utils.check_hypergraph_node(f"{self.name}_stretch_val", "multiplyDivide")
@@ -28,29 +33,32 @@ class Build(object):
         self.scaleMult = utils.check_hypergraph_node(f"{self.name}_scale_mult", "multDoubleLinear")
         self.squashDiv = utils.check_hypergraph_node(f"{self.name}_squash_div", "multiplyDivide")
         self.stretchMult = utils.check_hypergraph_node(f"{self.name}_stretch_scale_mult", "multDoubleLinear")
-        self.arcLength = self.curveInfo.arcLength.get()
+        if curve_data is not None:
+            self.arcLength = curve_data.length
+        else:
+            self.arcLength = scene.get_attr(f"{self.curveInfo}.arcLength")
         # TODO: stretch switch needs to be set up
         self.ikStretchSwitch = None
         # Set Attribute Values
         for i in range(2):
-            if not eval(f"self.localMult.input{i + 1}.get()"):
-                eval(f"self.localMult.input{i + 1}.set(1)")
-        self.scaleMult.input1.set(self.arcLength)
-        self.stretchVal.operation.set(2)
-        self.squashVal.operation.set(3)
-        self.squashVal.input2X.set(0.5)
-        self.squashDiv.operation.set(2)
-        self.squashDiv.input1X.set(1)
+            if not scene.get_attr(f"{self.localMult}.input{i + 1}"):
+                scene.set_attr(f"{self.localMult}.input{i + 1}", 1)
+        scene.set_attr(f"{self.scaleMult}.input1", self.arcLength)
+        scene.set_attr(f"{self.stretchVal}.operation", 2)
+        scene.set_attr(f"{self.squashVal}.operation", 3)
+        scene.set_attr(f"{self.squashVal}.input2X", 0.5)
+        scene.set_attr(f"{self.squashDiv}.operation", 2)
+        scene.set_attr(f"{self.squashDiv}.input1X", 1)
         # Connect Nodes
-        pm.connectAttr(self.localMult.output, self.scaleMult.input2, f=1)
-        pm.connectAttr(self.curveInfo.arcLength, self.stretchVal.input1X, f=1)
-        pm.connectAttr(self.scaleMult.output, self.stretchVal.input2X, f=1)
-        pm.connectAttr(self.stretchVal.outputX, self.squashVal.input1X, f=1)
-        pm.connectAttr(self.squashVal.outputX, self.squashDiv.input2X, f=1)
-        pm.connectAttr(self.squashDiv.outputX, self.stretchMult.input1, f=1)
-        pm.connectAttr(self.scaleMult.input2, self.stretchMult.input2, f=1)
+        scene.connect_attr(f"{self.localMult}.output", f"{self.scaleMult}.input2")
+        scene.connect_attr(f"{self.curveInfo}.arcLength", f"{self.stretchVal}.input1X")
+        scene.connect_attr(f"{self.scaleMult}.output", f"{self.stretchVal}.input2X")
+        scene.connect_attr(f"{self.stretchVal}.outputX", f"{self.squashVal}.input1X")
+        scene.connect_attr(f"{self.squashVal}.outputX", f"{self.squashDiv}.input2X")
+        scene.connect_attr(f"{self.squashDiv}.outputX", f"{self.stretchMult}.input1")
+        scene.connect_attr(f"{self.scaleMult}.input2", f"{self.stretchMult}.input2")
         for strJnt in self.stretchJoints[:-1]:
-            pm.connectAttr(self.stretchVal.outputX, eval(f"strJnt.scale{self.roo[0].upper()}"), f=1)
+            scene.connect_attr(f"{self.stretchVal}.outputX", f"{strJnt}.scale{self.roo[0].upper()}")
         self.set_skin_scale()
 
     def make_ik_stretch(self):
@@ -69,16 +77,16 @@ class Build(object):
         dist = utils.make_distance(name=f"{utils.get_info_from_joint(self.stretchJoints[0], name=True)}_IK",
                                    start=self.stretchJoints[0], end=self.ikCtl)
         # Set Attribute Values
-        ikScaleMult.input1.set(chainLen)
-        ikStretchVal.operation.set(2)
-        cond.secondTerm.set(1)
-        cond.operation.set(2)
+        scene.set_attr(f"{ikScaleMult}.input1", chainLen)
+        scene.set_attr(f"{ikStretchVal}.operation", 2)
+        scene.set_attr(f"{cond}.secondTerm", 1)
+        scene.set_attr(f"{cond}.operation", 2)
         # Connect Nodes
-        pm.connectAttr(self.localMult.output, ikScaleMult.input2, f=1)
-        pm.connectAttr(dist.distance, ikStretchVal.input1X, f=1)
-        pm.connectAttr(ikStretchVal.outputX, cond.firstTerm, f=1)
-        pm.connectAttr(ikStretchVal.outputX, cond.colorIfTrueR, f=1)
-        pm.connectAttr(ikStretchVal.outputX, self.ikStretchSwitch.colorIfTrueR, f=1)
+        scene.connect_attr(f"{self.localMult}.output", f"{ikScaleMult}.input2")
+        scene.connect_attr(f"{dist}.distance", f"{ikStretchVal}.input1X")
+        scene.connect_attr(f"{ikStretchVal}.outputX", f"{cond}.firstTerm")
+        scene.connect_attr(f"{ikStretchVal}.outputX", f"{cond}.colorIfTrueR")
+        scene.connect_attr(f"{ikStretchVal}.outputX", f"{self.ikStretchSwitch}.colorIfTrueR")
         # connect locators to dist node
 
     def set_ik_jnt_scale(self):
@@ -87,12 +95,12 @@ class Build(object):
         """
         # TODO: I'm not sure this method is necessary and could just be part of the make_ik_stretch() method
         # Create nodes
-        self.ikStretchSwitch = pm.shadingNode("condition", n=f"{self.name}_stretch_sw", au=1)
-        ikJnts = utils.get_joints_in_chain(pm.PyNode(f"{self.name}_base_IK_jnt"))
+        self.ikStretchSwitch = scene.create_node("condition", f"{self.name}_stretch_sw")
+        ikJnts = utils.get_joints_in_chain(f"{self.name}_base_IK_jnt")
         # Make connections
-        pm.connectAttr(self.stretchVal.outputX, self.ikStretchSwitch.colorIfTrueR, f=1)
+        scene.connect_attr(f"{self.stretchVal}.outputX", f"{self.ikStretchSwitch}.colorIfTrueR")
         for jnt in ikJnts:
-            pm.connectAttr(self.ikStretchSwitch.outColorR, eval(f"jnt.scale{self.roo[0].upper()}"), f=1)
+            scene.connect_attr(f"{self.ikStretchSwitch}.outColorR", f"{jnt}.scale{self.roo[0].upper()}")
         """if not self.ik.spline:
             self.make_ik_stretch()"""
 
@@ -103,13 +111,13 @@ class Build(object):
         """
         if self.skinJoints is not None:
             for sknJnt in self.skinJoints:
-                pm.connectAttr(self.scaleMult.input2, eval(f"sknJnt.scale{self.roo[0].upper()}"), f=1)
+                scene.connect_attr(f"{self.scaleMult}.input2", f"{sknJnt}.scale{self.roo[0].upper()}")
                 if self.vol:
-                    pm.connectAttr(self.stretchMult.output, eval(f"sknJnt.scale{self.roo[1].upper()}"), f=1)
-                    pm.connectAttr(self.stretchMult.output, eval(f"sknJnt.scale{self.roo[2].upper()}"), f=1)
+                    scene.connect_attr(f"{self.stretchMult}.output", f"{sknJnt}.scale{self.roo[1].upper()}")
+                    scene.connect_attr(f"{self.stretchMult}.output", f"{sknJnt}.scale{self.roo[2].upper()}")
         else:
             for strJnt in [jnt for jnt in self.stretchJoints if self.vol]:
-                pm.connectAttr(self.stretchMult.output, eval(f"strJnt.scale{self.roo[1].upper()}"), f=1)
-                pm.connectAttr(self.stretchMult.output, eval(f"strJnt.scale{self.roo[2].upper()}"), f=1)
+                scene.connect_attr(f"{self.stretchMult}.output", f"{strJnt}.scale{self.roo[1].upper()}")
+                scene.connect_attr(f"{self.stretchMult}.output", f"{strJnt}.scale{self.roo[2].upper()}")
 
 
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+# The packages are imported from the maya folder the same way Maya's script path does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import memory  # noqa: E402
+from core import scene  # noqa: E402
+
+
+@pytest.fixture
+def memory_scene():
+    """
+    Runs a test against an empty in-memory scene and puts the previous backend back afterwards
+    """
+    backend = memory.MemoryScene()
+    previous = scene.set_backend(backend)
+    try:
+        yield backend
+    finally:
+        scene.set_backend(previous)
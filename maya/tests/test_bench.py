@@ -0,0 +1,23 @@
+from bench import constraints
+from bench import pins
+from core import memory
+from core import scene
+
+
+def test_pins_run_in_the_given_backend():
+    backend = memory.MemoryScene()
+    results = pins.run(counts=[4], repeat=1, backend=backend)
+    assert {mode: entry["nodes"] for mode, entry in results[4].items()} == {"follicle": 4, "single": 4, "shared": 1}
+    assert all(entry["memory"] > 0 for entry in results[4].values())
+    # Every mode gets a new scene and the evaluation mode is put back afterwards
+    assert backend.report()["calls"]["new_scene"] == 6
+    assert backend.evaluation == "off"
+    assert not isinstance(scene.get_live(), scene.MayaScene)
+
+
+def test_constraints_run_in_the_given_backend():
+    backend = memory.MemoryScene()
+    results = constraints.run(count=5, repeat=1, backend=backend)
+    assert results["matrix"]["nodes"] < results["network"]["nodes"]
+    assert results["matrix"]["drift"] < 1e-9 < results["network"]["drift"]
+    assert backend.report()["calls"]["new_scene"] == 2
@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from core import constants
+from core import mathutils
+from core import matrices
+
+np = pytest.importorskip("numpy")
+
+
+def get_rotates(count=20, seed=0):
+    rand = random.Random(seed)
+    rotates = [[rand.uniform(-180.0, 180.0) for _ in range(3)] for _ in range(count)]
+    # Gimbal lock for the rotate orders with y in the middle
+    return rotates + [[30.0, 90.0, 0.0], [-45.0, -90.0, 0.0]]
+
+
+@pytest.mark.parametrize("rotate_order", constants.ROTATEORDER)
+def test_rotations_match_mathutils(rotate_order):
+    rotates = get_rotates()
+    expected = [mathutils.rotation(rotate, rotate_order) for rotate in rotates]
+    assert matrices.compose(rotate=rotates, rotate_order=rotate_order).reshape(-1, 16) == \
+        pytest.approx(np.asarray(expected))
+
+
+@pytest.mark.parametrize("rotate_order", constants.ROTATEORDER)
+def test_eulers_match_mathutils(rotate_order):
+    rotations = [mathutils.rotation(rotate, rotate_order) for rotate in get_rotates()]
+    eulers = matrices.get_eulers(matrices.as_matrices(rotations)[:, :3, :3], rotate_order)
+    expected = [mathutils.euler(m, rotate_order) for m in rotations]
+    assert eulers == pytest.approx(np.asarray(expected), abs=1e-9)
+    # The angles give back the rotations they came from
+    assert matrices.get_rotations(eulers, rotate_order) == \
+        pytest.approx(matrices.as_matrices(rotations)[:, :3, :3], abs=1e-9)
+
+
+def test_aim_matches_mathutils():
+    rand = random.Random(1)
+    rows = [[[rand.uniform(-1.0, 1.0) for _ in range(3)] for _ in range(4)] for _ in range(20)]
+    # Aim and up along the same line
+    rows.append([[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 2.0, 0.0], [0.0, 1.0, 0.0]])
+    frames = matrices.aim(*[np.asarray([row[i] for row in rows]) for i in range(4)])
+    for frame, row in zip(frames, rows):
+        expected = mathutils.aim(*row)
+        assert frame.reshape(9) == pytest.approx([expected[r * 4 + c] for r in range(3) for c in range(3)])
+
+
+def test_decompose_matches_mathutils():
+    rand = random.Random(2)
+    rotates = get_rotates(seed=2)
+    translates = [[rand.uniform(-10.0, 10.0) for _ in range(3)] for _ in rotates]
+    scales = [[rand.uniform(0.5, 2.0) for _ in range(3)] for _ in rotates]
+    composed = [mathutils.compose(t, r, s, "yzx") for t, r, s in zip(translates, rotates, scales)]
+    assert matrices.compose(translates, rotates, scales, rotate_order="yzx").reshape(-1, 16) == \
+        pytest.approx(np.asarray(composed))
+    translate, rotate, scale, shear = matrices.decompose(composed, "yzx")
+    for i, m in enumerate(composed):
+        expected = mathutils.decompose(m, "yzx")
+        assert translate[i] == pytest.approx(expected[0])
+        assert rotate[i] == pytest.approx(expected[1], abs=1e-9)
+        assert scale[i] == pytest.approx(expected[2])
+    assert shear == pytest.approx(np.zeros((len(composed), 3)), abs=1e-9)
+
+
+def test_offsets_match_mathutils():
+    driven = [mathutils.compose([1.0, 2.0, 3.0], [10.0, 20.0, 30.0]), mathutils.compose([0.0, 1.0, 0.0])]
+    driver = [mathutils.compose([4.0, 0.0, 1.0], [0.0, 90.0, 0.0], [2.0, 2.0, 2.0]), mathutils.IDENTITY]
+    offsets = matrices.get_offsets(driven, driver)
+    for offset, a, b in zip(offsets, driven, driver):
+        assert offset.reshape(16) == pytest.approx(mathutils.mult(a, mathutils.inverse(b)))
+        # The offset puts the driven node back where it was once it follows the driver
+        assert (offset @ matrices.as_matrices(b)[0]).reshape(16) == pytest.approx(a)
@@ -0,0 +1,107 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from core import mathutils
+from core import scene
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", ["core.memory", "core.plan", "core.scene"])
+def test_import_on_its_own(module):
+    # Each module has to work as the first thing imported, not only once core.scene has been loaded
+    code = f"import {module}; from core import memory; memory.MemoryScene()"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_default_backend_is_set_up_on_first_use():
+    previous = scene.set_backend(None)
+    try:
+        assert scene.BACKEND is None
+        scene.create_group("default_grp")
+        assert scene.get_backend().exists("default_grp")
+    finally:
+        scene.set_backend(previous)
+
+
+def test_parenting(memory_scene):
+    grp = scene.create_group("arm_grp")
+    jnt = scene.create_joint("arm_jnt", position=[0.0, 1.0, 0.0])
+    scene.parent(jnt, grp)
+    assert scene.get_parent(jnt) == grp
+    assert scene.get_children(grp) == [jnt]
+    assert scene.get_descendants(grp) == [jnt]
+    # Parenting keeps the joint where it was in world space
+    scene.set_attr(f"{grp}.translate", [1.0, 2.0, 3.0])
+    scene.parent(jnt)
+    assert scene.get_parent(jnt) is None
+    assert scene.get_position(jnt) == pytest.approx([1.0, 3.0, 3.0])
+    assert scene.get_attr(f"{jnt}.translate") == pytest.approx([1.0, 3.0, 3.0])
+
+
+def test_world_matrices(memory_scene):
+    grp = scene.create_group("arm_grp")
+    jnt = scene.create_joint("arm_jnt", position=[0.0, 1.0, 0.0], parent=grp)
+    scene.set_attr(f"{grp}.translate", [1.0, 2.0, 3.0])
+    scene.set_attr(f"{grp}.rotate", [0.0, 0.0, 90.0])
+    scene.set_attr(f"{jnt}.jointOrient", [30.0, 0.0, 0.0])
+    expected = mathutils.mult(mathutils.compose([0.0, 1.0, 0.0], [30.0, 0.0, 0.0]),
+                              mathutils.compose([1.0, 2.0, 3.0], [0.0, 0.0, 90.0]))
+    assert scene.get_matrix(jnt) == pytest.approx(expected)
+    assert scene.get_position(jnt) == pytest.approx([0.0, 2.0, 3.0])
+    # The offsetParentMatrix sits between the parent and the local transforms
+    scene.set_attr(f"{jnt}.offsetParentMatrix", mathutils.translation([0.0, 0.0, 5.0]))
+    assert scene.get_position(jnt) == pytest.approx([0.0, 2.0, 8.0])
+
+
+def test_connections(memory_scene):
+    src = scene.create_group("src_grp")
+    tgt = scene.create_group("tgt_grp")
+    mult = scene.create_node("multMatrix", "src_mult")
+    scene.connect_attr(f"{src}.worldMatrix[0]", f"{mult}.matrixIn[0]")
+    scene.set_attr(f"{mult}.matrixIn[1]", mathutils.translation([0.0, 0.0, 5.0]))
+    scene.connect_attr(f"{mult}.matrixSum", f"{tgt}.offsetParentMatrix")
+    assert scene.is_connected(f"{mult}.matrixSum", f"{tgt}.offsetParentMatrix")
+    assert scene.list_connections(f"{tgt}.offsetParentMatrix", destination=False) == [f"{mult}.matrixSum"]
+    assert scene.list_connections(mult, source=False, plugs=False) == [tgt]
+    # Driven plugs pick up changes upstream
+    scene.set_attr(f"{src}.translate", [1.0, 2.0, 3.0])
+    assert scene.get_position(tgt) == pytest.approx([1.0, 2.0, 8.0])
+    scene.disconnect_attr(f"{mult}.matrixSum", f"{tgt}.offsetParentMatrix")
+    assert not scene.list_connections(f"{tgt}.offsetParentMatrix")
+    assert scene.get_position(tgt) == pytest.approx([0.0, 0.0, 0.0])
+    with pytest.raises(RuntimeError):
+        scene.connect_attr(f"{src}.translate", f"{mult}.matrixIn[0]", force=False)
+
+
+def test_op_counts(memory_scene):
+    grp = scene.create_group("arm_grp")
+    with scene.transaction():
+        for i in range(3):
+            mult = scene.create_node("multMatrix", f"arm{i}_mult")
+            scene.connect_attr(f"{grp}.worldMatrix[0]", f"{mult}.matrixIn[0]")
+    report = memory_scene.report()
+    # The queued edits reach the scene in a single apply call (the transaction only checks the names are free)
+    assert report["calls"] == {"apply": 1, "create_group": 1, "exists": 3}
+    assert report["batched_ops"] == 6
+    assert report["nodes_created"] == {"multMatrix": 3, "transform": 1}
+    assert report["nodes"] == 4
+    memory_scene.reset_counts()
+    assert memory_scene.report()["total_calls"] == 0
+
+
+def test_new_scene_and_evaluate(memory_scene):
+    grp = scene.create_group("arm_grp")
+    scene.set_attr(f"{grp}.translate", [1.0, 2.0, 3.0])
+    assert scene.evaluate([grp]) == [pytest.approx(mathutils.translation([1.0, 2.0, 3.0]))]
+    assert scene.set_evaluation("parallel") == "off"
+    assert scene.set_evaluation("off") == "parallel"
+    scene.new_scene()
+    assert not scene.list_nodes() and not scene.exists(grp)
+    # The calls made so far are still counted
+    assert memory_scene.report()["calls"]["new_scene"] == 1
@@ -0,0 +1,68 @@
+import pytest
+
+from core import migrate
+from core import scene
+
+np = pytest.importorskip("numpy")
+
+MOVES = {"translate": [1.0, -2.0, 0.5], "rotate": [20.0, -35.0, 10.0]}
+
+
+def make_rig():
+    """
+    Builds a driver and a driven node for each constraint type migrate converts plus an aim constraint
+    :return: list: the driven nodes
+    """
+    driven = []
+    for i, name in enumerate(["point", "orient", "parent", "aim"]):
+        drv = scene.create_group(f"{name}_drv_grp")
+        scene.set_attr(f"{drv}.translate", [2.0 * i, 1.0, -1.0])
+        scene.set_attr(f"{drv}.rotate", [10.0 * i, 30.0, -15.0])
+        node = scene.create_group(f"{name}_grp")
+        if name == "parent":
+            scene.set_attr(f"{node}.translate", [0.5, 3.0, 2.0])
+        if name == "aim":
+            scene.set_attr(f"{node}.translate", [-3.0, 0.0, 0.0])
+            scene.aim_constraint(drv, node, [1.0, 0.0, 0.0], [0.0, 1.0, 0.0])
+        else:
+            getattr(scene, f"{name}_constraint")(drv, node, maintain_offset=True)
+        driven.append(node)
+    return driven
+
+
+def get_matrix(node):
+    return np.asarray(scene.get_matrix(node)).reshape(4, 4)
+
+
+def test_migrate_keeps_the_pose(memory_scene):
+    driven = make_rig()
+    drivers = [f"{node[:-4]}_drv_grp" for node in driven]
+    before = [get_matrix(node) for node in driven]
+    rest = [get_matrix(drv) for drv in drivers]
+    converted, skipped = migrate.migrate()
+    assert converted == {"pointConstraint": 1, "orientConstraint": 1, "scaleConstraint": 0, "parentConstraint": 1,
+                         "aimConstraint": 0}
+    assert not scene.list_nodes("pointConstraint") + scene.list_nodes("orientConstraint") + \
+        scene.list_nodes("parentConstraint")
+    for node, matrix in zip(driven, before):
+        assert get_matrix(node) == pytest.approx(matrix, abs=1e-9)
+    # The matrix constraints pass on how their drivers move from where they were
+    for drv in drivers:
+        for attr, value in MOVES.items():
+            scene.set_attr(f"{drv}.{attr}", value)
+    deltas = [np.linalg.inv(a).dot(get_matrix(drv)) for a, drv in zip(rest, drivers)]
+    point = before[0].copy()
+    point[3, :3] += get_matrix(drivers[0])[3, :3] - rest[0][3, :3]
+    orient = before[1].copy()
+    orient[:3, :3] = before[1][:3, :3].dot(deltas[1][:3, :3])
+    parent = before[2].dot(deltas[2])
+    for node, matrix in zip(driven, [point, orient, parent]):
+        assert get_matrix(node) == pytest.approx(matrix, abs=1e-9)
+
+
+def test_aim_constraints_are_reported(memory_scene):
+    make_rig()
+    aim = scene.list_nodes("aimConstraint")
+    _, skipped = migrate.migrate()
+    assert skipped == [[aim[0], "aimConstraint", "aim constraints have no core.matrix equivalent"]]
+    assert scene.list_nodes("aimConstraint") == aim
@@ -0,0 +1,139 @@
+import itertools
+import math
+
+import pytest
+
+from core import mathutils
+from core import nurbs
+from core import scene
+
+np = pytest.importorskip("numpy")
+
+PARAMS = [0.0, 0.3, 1.0, 1.7, 2.5, 3.2, 4.0]
+
+
+def get_coefficients(spans, degree):
+    """
+    Returns the control values that make a clamped uniform B-spline give u and u ** 2 at every parameter u (the
+    Greville abscissae and the blossom of u ** 2)
+    """
+    knots = nurbs.get_knots(spans + degree, degree)
+    windows = [knots[i + 1:i + degree + 1] for i in range(spans + degree)]
+    linear = [sum(window) / degree for window in windows]
+    square = [np.mean([a * b for a, b in itertools.combinations(window, 2)]) for window in windows]
+    return np.asarray(linear), np.asarray(square)
+
+
+def get_parabola_length(u):
+    """
+    Returns the arc length of the parabola (u, u ** 2) from 0 to u
+    """
+    return u * math.sqrt(1.0 + 4.0 * u * u) / 2.0 + math.asinh(2.0 * u) / 4.0
+
+
+def make_parabola(spans=4, degree=3):
+    linear, square = get_coefficients(spans, degree)
+    return nurbs.Curve(np.stack([linear, square, np.zeros_like(linear)], axis=1), degree)
+
+
+@pytest.mark.parametrize("degree", [2, 3])
+def test_curve_matches_parabola(degree):
+    curve = make_parabola(degree=degree)
+    u = np.asarray(PARAMS)
+    assert curve.spans == 4
+    assert curve.get_points(u) == pytest.approx(np.stack([u, u * u, np.zeros_like(u)], axis=1))
+    derivatives = np.stack([np.ones_like(u), 2.0 * u, np.zeros_like(u)], axis=1)
+    assert curve.get_tangents(u, normalize=False) == pytest.approx(derivatives)
+    assert curve.get_tangents(u) == pytest.approx(derivatives / np.linalg.norm(derivatives, axis=1)[:, None])
+    # Parameters past either end are clamped to it
+    assert curve.get_points([-1.0, 5.0]) == pytest.approx(np.asarray([[0.0, 0.0, 0.0], [4.0, 16.0, 0.0]]))
+
+
+def test_curve_lengths_match_parabola():
+    curve = make_parabola()
+    expected = [get_parabola_length(u) for u in PARAMS]
+    assert curve.length == pytest.approx(expected[-1], rel=1e-9)
+    assert curve.get_lengths(PARAMS) == pytest.approx(expected, rel=1e-9)
+    assert curve.get_params(expected) == pytest.approx(PARAMS, abs=1e-9)
+    points = curve.sample(5, by_length=True)
+    assert [get_parabola_length(x) for x in points[:, 0]] == pytest.approx(np.linspace(0.0, expected[-1], 5))
+    assert curve.sample(5)[:, 0] == pytest.approx([0.0, 1.0, 2.0, 3.0, 4.0])
+
+
+def test_linear_curve_goes_through_its_points():
+    points = [[0.0, 0.0, 0.0], [2.0, 1.0, 0.0], [3.0, 1.0, 2.0]]
+    curve = nurbs.Curve(points, degree=3)
+    # Too few points for a cubic curve, so it's lowered to a quadratic one like Maya does
+    assert curve.degree == 2
+    curve = nurbs.Curve(points, degree=1)
+    expected = np.asarray([points[0], [1.0, 0.5, 0.0], points[1], points[2]])
+    assert curve.get_points([0.0, 0.5, 1.0, 2.0]) == pytest.approx(expected)
+    assert curve.length == pytest.approx(math.sqrt(5.0) + math.sqrt(5.0))
+
+
+def test_curve_from_scene(memory_scene):
+    crv = scene.create_curve("arm_crv", make_parabola().points.tolist(), degree=3)
+    grp = scene.create_group("arm_grp")
+    scene.parent(crv, grp)
+    scene.set_attr(f"{grp}.translate", [1.0, 2.0, 3.0])
+    scene.set_attr(f"{grp}.rotate", [0.0, 0.0, 90.0])
+    curve = nurbs.Curve.from_scene(crv)
+    matrix = scene.get_matrix(crv)
+    expected = [mathutils.transform_point([u, u * u, 0.0], matrix) for u in PARAMS]
+    assert curve.get_points(PARAMS) == pytest.approx(np.asarray(expected))
+
+
+def make_saddle(spans=(3, 2), degree=(3, 2)):
+    """
+    Returns the surface (u, v, u ** 2 - v ** 2) over its parameter range
+    """
+    linearU, squareU = get_coefficients(spans[0], degree[0])
+    linearV, squareV = get_coefficients(spans[1], degree[1])
+    u, v = np.meshgrid(linearU, linearV, indexing="ij")
+    z = squareU[:, None] - squareV[None, :]
+    return nurbs.Surface(np.stack([u, v, z], axis=2), degree)
+
+
+def test_surface_matches_saddle():
+    surface = make_saddle()
+    assert surface.spans == (3, 2)
+    u = np.asarray([0.0, 0.4, 1.5, 2.2, 3.0])
+    v = np.asarray([0.0, 1.3, 0.5, 2.0, 1.0])
+    points, tangents, binormals = surface.evaluate(u, v, normalized=False)
+    zeros, ones = np.zeros_like(u), np.ones_like(u)
+    assert points == pytest.approx(np.stack([u, v, u * u - v * v], axis=1))
+    assert tangents == pytest.approx(np.stack([ones, zeros, 2.0 * u], axis=1))
+    assert binormals == pytest.approx(np.stack([zeros, ones, -2.0 * v], axis=1))
+    # Normalized parameters run over the same surface from 0 to 1
+    assert surface.get_points(u / 3.0, v / 2.0) == pytest.approx(points)
+    # A single parameter is used for every value of the other
+    assert surface.get_points(1.5, v, normalized=False)[:, 0] == pytest.approx(np.full_like(v, 1.5))
+
+
+def test_surface_frames_match_saddle():
+    surface = make_saddle()
+    u, v = np.asarray([0.5, 2.0, 3.0]), np.asarray([1.5, 0.0, 2.0])
+    _, tangents, binormals, normals = surface.get_frames(u, v, normalized=False)
+    expected = np.stack([-2.0 * u, 2.0 * v, np.ones_like(u)], axis=1)
+    assert normals == pytest.approx(expected / np.linalg.norm(expected, axis=1)[:, None])
+    frames = np.stack([tangents, binormals, normals], axis=1)
+    assert np.einsum("nij,nkj->nik", frames, frames) == pytest.approx(np.tile(np.eye(3), (len(u), 1, 1)))
+    matrices = surface.get_pin_matrices(u, v, normal_axis=2, tangent_axis=3, normalized=False)
+    assert matrices[:, 0, :3] == pytest.approx(-tangents)
+    assert matrices[:, 2, :3] == pytest.approx(normals)
+    assert matrices[:, 1, :3] == pytest.approx(np.cross(normals, -tangents))
+    assert matrices[:, 3] == pytest.approx(np.append(surface.get_points(u, v, False), np.ones((3, 1)), axis=1))
+
+
+def test_plane_matches_scene(memory_scene):
+    rbn = scene.create_nurbs_plane("arm_rbn", [1.0, 2.0, 0.0], [0.0, 0.0, 1.0], 10.0, 0.2, patches_u=5)
+    scene.set_attr(f"{rbn}.rotate", [0.0, 30.0, 0.0])
+    matrix = scene.get_matrix(rbn)
+    plane = nurbs.Surface.plane([1.0, 2.0, 0.0], [0.0, 0.0, 1.0], 10.0, 0.2, patches_u=5, matrix=matrix)
+    assert nurbs.Surface.from_scene(rbn).points == pytest.approx(plane.points)
+    # The plane runs along -X and Y (its width and length) evenly over its parameters
+    u = np.asarray([0.0, 0.25, 0.5, 1.0])
+    v = np.asarray([0.5, 0.0, 1.0, 0.75])
+    expected = [mathutils.transform_point([1.0 - (a - 0.5) * 10.0, 2.0 + (b - 0.5) * 2.0, 0.0], matrix)
+                for a, b in zip(u, v)]
+    assert plane.get_points(u, v) == pytest.approx(np.asarray(expected))
@@ -0,0 +1,131 @@
+import pytest
+
+from core import mathutils
+from core import matrix
+from core import optimize
+from core import scene
+
+
+def make_round_trip(stretch=None):
+    """
+    Builds a decompose/compose pair between a driver and a driven group, optionally with a scale applied after the
+    driver's world matrix (which only shears the matrix once the driver rotates)
+    """
+    driver = scene.create_group("src_grp")
+    driven = scene.create_group("tgt_grp")
+    source = f"{driver}.worldMatrix[0]"
+    if stretch is not None:
+        mult = scene.create_node("multMatrix", "src_mult")
+        scene.connect_attr(source, f"{mult}.matrixIn[0]")
+        scene.set_attr(f"{mult}.matrixIn[1]", mathutils.scaling(stretch))
+        source = f"{mult}.matrixSum"
+    scene.connect_attr(source, f"{driven}.offsetParentMatrix")
+    dec, comp = matrix.decompose_constraint(driven)
+    return driver, driven, comp
+
+
+def test_round_trip_is_bypassed(memory_scene):
+    _, driven, comp = make_round_trip()
+    dec = comp.replace("_comp", "_dec")
+    report = optimize.run([driven])
+    # The compose node is bypassed, which leaves the decompose node driving nothing
+    assert not scene.exists(comp) and not scene.exists(dec)
+    assert report["removed"]["identity"] == 1 and report["removed"]["dead"] == 1
+    assert report["drift"] < 1e-9
+
+
+def test_round_trip_is_checked_in_other_poses(memory_scene):
+    driver, driven, comp = make_round_trip(stretch=[1.0, 2.0, 1.0])
+    rest = scene.get_attr(f"{driver}.rotate")
+    # The pair cancels out at the current pose but not once the driver rotates
+    assert optimize.get_round_trip(comp, optimize.get_incoming(comp)) is None
+    assert scene.get_attr(f"{driver}.rotate") == rest
+    report = optimize.run([driven])
+    assert scene.exists(comp)
+    assert report["drift"] < 1e-9
+
+
+def test_drivers(memory_scene):
+    driver, driven, _ = make_round_trip()
+    scene.connect_attr(f"{scene.create_group('ctl_grp')}.translateX", f"{driver}.translateY")
+    plugs = optimize.get_drivers([driven])
+    assert f"{driver}.rotateX" in plugs and f"{driver}.translateX" in plugs
+    assert f"{driver}.translateY" not in plugs
+    assert "ctl_grp.translateX" in plugs
+
+
+@pytest.mark.parametrize("node_type, attrs", [("multDoubleLinear", {"input2": -1.0}),
+                                              ("addDoubleLinear", {"input2": 30.0}),
+                                              ("reverse", {})])
+def test_angle_conversions_around_a_linear_node(memory_scene, node_type, attrs):
+    ctl = scene.create_group("arm_ctl")
+    jnt = scene.create_joint("arm_jnt")
+    scene.set_attr(f"{ctl}.rotateX", 20.0)
+    # What Maya makes of utils.invert_attribute: the angle is converted to degrees and back around the node
+    before = scene.create_node("unitConversion", "arm_uc1")
+    after = scene.create_node("unitConversion", "arm_uc2")
+    scene.set_attr(f"{before}.conversionFactor", optimize.DEGREES)
+    scene.set_attr(f"{after}.conversionFactor", 1.0 / optimize.DEGREES)
+    linear = scene.create_node(node_type, "arm_linear")
+    for attr, value in attrs.items():
+        scene.set_attr(f"{linear}.{attr}", value)
+    channel = "X" if node_type == "reverse" else "1"
+    scene.connect_attr(f"{ctl}.rotateX", f"{before}.input")
+    scene.connect_attr(f"{before}.output", f"{linear}.input{channel}")
+    scene.connect_attr(f"{linear}.output{'X' if node_type == 'reverse' else ''}", f"{after}.input")
+    scene.connect_attr(f"{after}.output", f"{jnt}.rotateX")
+    rotate = scene.get_attr(f"{jnt}.rotateX")
+    report = optimize.run([jnt])
+    assert not scene.list_nodes("unitConversion") and not scene.exists(linear)
+    assert report["removed"]["conversions"] == 2
+    blend = scene.list_connections(f"{jnt}.rotateX", destination=False, plugs=False)
+    assert [scene.node_type(node) for node in blend] == ["animBlendNodeAdditiveDA"]
+    assert scene.get_attr(f"{jnt}.rotateX") == pytest.approx(rotate)
+    assert report["drift"] < 1e-9
+
+
+def test_duplicates_need_the_same_settings(memory_scene):
+    src = scene.create_group("src_grp")
+    tgt = scene.create_group("tgt_grp")
+    sums = []
+    for i, value in enumerate([[1.0, 2.0], [1.0, 3.0], [1.0, 3.0]]):
+        pma = scene.create_node("plusMinusAverage", f"arm{i}_pma")
+        scene.connect_attr(f"{src}.translateX", f"{pma}.input1D[0]")
+        scene.connect_attr(f"{src}.translateY", f"{pma}.input1D[1]")
+        scene.set_attr(f"{pma}.input2D[0]", value)
+        scene.connect_attr(f"{pma}.output1D", f"{tgt}.translate{'XYZ'[i]}")
+        sums.append(pma)
+    # Only the nodes that differ in nothing but their name are merged
+    removed = optimize.optimize(nodes=[tgt])
+    assert removed["merged"] == 1
+    assert scene.exists(sums[0]) and scene.exists(sums[1]) and not scene.exists(sums[2])
+
+
+def test_named_nodes_are_kept(memory_scene):
+    nodes = [scene.create_node("curveInfo", "arm_crv_info"), scene.create_node("distanceBetween", "arm_dist"),
+             scene.create_node("multMatrix", "arm_mult")]
+    removed = optimize.optimize(nodes=nodes)
+    assert removed["dead"] == 1
+    assert scene.exists("arm_crv_info") and scene.exists("arm_dist")
+    assert not scene.exists("arm_mult")
+
+
+def test_only_the_rig_is_optimized(memory_scene):
+    _, driven, comp = make_round_trip()
+    # Utility nodes that aren't upstream of the rig are someone else's, however dead or constant they look
+    spare = scene.create_node("multMatrix", "spare_mult")
+    const = scene.create_node("multDoubleLinear", "const_mult")
+    other = scene.create_group("other_grp")
+    scene.connect_attr(f"{const}.output", f"{other}.translateX")
+    report = optimize.run([driven])
+    assert not scene.exists(comp)
+    assert scene.exists(spare) and scene.exists(const)
+    assert scene.is_connected(f"{const}.output", f"{other}.translateX")
+    assert report["removed"]["folded"] == 0
+
+
+@pytest.mark.parametrize("node_type, name, kept", [("curveInfo", "arm_crv_info", True),
+                                                   ("curveInfo", "arm_len", False),
+                                                   ("multMatrix", "arm_info", False)])
+def test_is_kept(node_type, name, kept):
+    assert optimize.is_kept(name, node_type) == kept
@@ -0,0 +1,67 @@
+import pytest
+
+from bench import pipeline
+from core import chain
+from core import guides
+from core import memory
+from core import scene
+from jnts import driver
+from jnts import orient
+
+pytest.importorskip("numpy")
+
+POSITIONS = [[0.0, 0.0, 0.0], [3.0, 1.0, -0.5], [6.0, -0.5, 0.5], [9.0, 0.5, 0.0], [11.0, 0.0, 1.0]]
+
+
+def make_chain(prefix, rotate_order, positions=POSITIONS):
+    return [scene.create_joint(f"{prefix}_{i}_jnt", position=position, rotate_order=rotate_order)
+            for i, position in enumerate(positions)]
+
+
+@pytest.mark.parametrize("rotate_order", ["xyz", "yzx", "zxy"])
+@pytest.mark.parametrize("options", [{},
+                                     {"orient_tip": False},
+                                     {"chain_to_world": True},
+                                     {"neg": True},
+                                     {"mirror": True},
+                                     {"base_to_world": False, "neg": True, "mirror": True}])
+def test_solve_matches_aim_constraints(memory_scene, rotate_order, options):
+    solved = make_chain("solved", rotate_order)
+    aimed = make_chain("aimed", rotate_order)
+    orient.joints_in_chain(solved, group=scene.create_group("solved_grp"), **options)
+    orient.aim_joints_in_chain(aimed, group=scene.create_group("aimed_grp"), **options)
+    # World matrices are compared since the same rotation can be given by angles 360 degrees apart
+    for a, b in zip(solved, aimed):
+        assert scene.get_matrix(a) == pytest.approx(scene.get_matrix(b), abs=1e-9)
+    assert scene.get_parent(solved[0]) == "solved_grp"
+    assert all(scene.get_parent(jnt) == parent for jnt, parent in zip(solved[1:], solved))
+
+
+def test_solve_chains_batches_chains(memory_scene):
+    specs = [{"positions": positions, "rotate_order": "xyz", "parent_matrix": None, "orient_tip": True,
+              "base_to_world": True, "chain_to_world": False, "neg": False, "mirror": False}
+             for positions in [POSITIONS, POSITIONS[:3], POSITIONS[::-1]]]
+    together = orient.solve_chains(specs)
+    for spec, (translates, orients) in zip(specs, together):
+        alone = orient.solve_chains([spec])[0]
+        assert translates == pytest.approx(alone[0])
+        assert orients == pytest.approx(alone[1])
+
+
+def build_driver(side, bend):
+    guidesObj = guides.Build("limb01", side, chain_len=5, mirror=side == "RT")
+    if bend:
+        pipeline.offset_guides(guidesObj, 0.0, bend)
+    driverObj = driver.Build(guidesObj)
+    return [scene.get_matrix(jnt) for jnt in driverObj.driver_joints]
+
+
+@pytest.mark.parametrize("side, bend", [("LT", 1.5), ("RT", 1.5), ("LT", 0.0), ("RT", 0.0)])
+def test_correct_chain_matches_joint_by_joint(memory_scene, monkeypatch, side, bend):
+    corrected = build_driver(side, bend)
+    # Without a chain snapshot the driver fixes its joints one at a time
+    scene.set_backend(memory.MemoryScene())
+    monkeypatch.setattr(chain, "np", None)
+    fixed = build_driver(side, bend)
+    for a, b in zip(corrected, fixed):
+        assert a == pytest.approx(b, abs=1e-9)
@@ -0,0 +1,24 @@
+import pytest
+
+from bench import pipeline
+from core import scene
+
+
+def test_mirrored_chains_are_mirrors(memory_scene):
+    guidesObjs = pipeline.make_guide_sets(chains=2, joints=4, tails=0)
+    pairs = [guidesObjs[i:i + 2] for i in range(0, len(guidesObjs), 2)]
+    for lt, rt in pairs:
+        for ltGuide, rtGuide in zip(lt.allGuides, rt.allGuides):
+            x, y, z = scene.get_position(ltGuide)
+            assert scene.get_position(rtGuide) == pytest.approx([-x, y, z])
+    # The mid guides are bent off the line between the base and tip
+    heights = [scene.get_position(guide)[1] for guide in guidesObjs[0].allGuides]
+    assert heights == pytest.approx([0.0, -1.5, 1.5, 0.0])
+
+
+def test_run_reports_every_stage():
+    results = pipeline.run(chains=1, joints=4, tails=0, adaptive=True)
+    assert list(results["stages"]) == pipeline.STAGES
+    lt, rt = results["ribbons"]
+    assert lt["spans"] == rt["spans"]
+    assert lt["error"] <= lt["tolerance"]
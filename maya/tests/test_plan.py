@@ -0,0 +1,92 @@
+import pytest
+
+from core import guides
+from core import memory
+from core import plan
+from core import scene
+from jnts import driver
+from jnts import fkik
+from rigs import ribbon
+
+np = pytest.importorskip("numpy")
+
+STAGES = ["driver", "fkik", "ribbon"]
+
+
+def build_guides(side="LT"):
+    return guides.Build("limb01", side, chain_len=5, mirror=side == "RT")
+
+
+def get_build(guides_nodes):
+    """
+    Returns the nodes a build added to the scene and the world matrices of its joints
+    """
+    nodes = set(scene.list_nodes()) - guides_nodes
+    return nodes, {jnt: scene.get_matrix(jnt) for jnt in sorted(nodes) if scene.node_type(jnt) == "joint"}
+
+
+@pytest.fixture
+def clear_cache():
+    plan.CACHE.clear()
+    yield
+    plan.CACHE.clear()
+
+
+@pytest.mark.parametrize("side", ["LT", "RT"])
+def test_plan_matches_direct_build(memory_scene, clear_cache, side):
+    guidesObj = build_guides(side)
+    guidesNodes = set(scene.list_nodes())
+    driverObj = driver.Build(guidesObj)
+    fkik.Build(driverObj)
+    ribbon.Builder(driverObj)
+    direct, directJoints = get_build(guidesNodes)
+    scene.set_backend(memory.MemoryScene())
+    guidesObj = build_guides(side)
+    guidesNodes = set(scene.list_nodes())
+    plan.compile_plan(guidesObj, STAGES).apply()
+    planned, plannedJoints = get_build(guidesNodes)
+    assert planned == direct
+    for jnt, matrix in directJoints.items():
+        assert np.asarray(plannedJoints[jnt]) == pytest.approx(np.asarray(matrix), abs=1e-6)
+
+
+def test_apply_twice(memory_scene, clear_cache):
+    guidesObj = build_guides()
+    guidesNodes = set(scene.list_nodes())
+    result = plan.compile_plan(guidesObj, STAGES)
+    names = result.apply()
+    nodes, joints = get_build(guidesNodes)
+    # Applying again leaves the scene as it was instead of making the command made nodes over again
+    assert result.apply() == names
+    again, againJoints = get_build(guidesNodes)
+    assert again == nodes
+    for jnt, matrix in joints.items():
+        assert np.asarray(againJoints[jnt]) == pytest.approx(np.asarray(matrix), abs=1e-9)
+
+
+def test_json_round_trip(memory_scene, clear_cache, tmp_path):
+    result = plan.compile_plan(build_guides(), STAGES)
+    loaded = plan.from_json(result.to_json())
+    assert loaded.ops == result.ops and loaded.key == result.key
+    assert not loaded.diff(result)
+    result.save(str(tmp_path / "plan.json"))
+    assert plan.load(str(tmp_path / "plan.json")).ops == result.ops
+    # Plans saved by another version aren't loaded
+    assert plan.from_json(result.to_json().replace(f'"version": {plan.VERSION}', '"version": -1')) is None
+
+
+def test_compile_hits_cache(memory_scene, clear_cache, monkeypatch, tmp_path):
+    guidesObj = build_guides()
+    result = plan.compile_plan(guidesObj, STAGES, cache_dir=str(tmp_path))
+    calls = []
+    monkeypatch.setitem(plan.STAGES, "driver", lambda context, **kwargs: calls.append(context))
+    assert plan.compile_plan(guidesObj, STAGES) is result
+    # The cache folder stands in for the session cache
+    plan.CACHE.clear()
+    assert plan.compile_plan(guidesObj, STAGES, cache_dir=str(tmp_path)).ops == result.ops
+    assert not calls
+    # Other options are compiled afresh
+    plan.CACHE.clear()
+    with pytest.raises(KeyError):
+        plan.compile_plan(guidesObj, STAGES, options={"ribbon": {"spans_per": 2}})
+    assert len(calls) == 1
@@ -0,0 +1,47 @@
+from core import guides
+from core import profiler
+from core import scene
+from jnts import driver
+from rigs import ribbon
+
+
+def check_totals(frame):
+    """
+    Checks that every stage's totals are its own counts plus its children's all the way down
+    """
+    for key in ["commands", "nodes"]:
+        assert frame[f"total_{key}"] == frame[key] + sum(child[f"total_{key}"] for child in frame["children"])
+    for child in frame["children"]:
+        check_totals(child)
+
+
+def test_stages_are_only_wrapped_while_profiling(memory_scene):
+    init = driver.Build.__init__
+    assert init in profiler.STAGES
+    assert driver.Build.__dict__["__init__"] is init
+    with profiler.profile() as prof:
+        wrapped = driver.Build.__dict__["__init__"]
+        assert wrapped is not init and wrapped.__wrapped__ is init
+        assert isinstance(scene.get_backend(), profiler.Counter)
+        # Profiles don't nest
+        with profiler.profile() as inner:
+            assert inner is prof
+        assert driver.Build.__dict__["__init__"] is wrapped
+    assert driver.Build.__dict__["__init__"] is init
+    assert scene.get_backend() is memory_scene
+
+
+def test_stage_counts_add_up(memory_scene):
+    guidesObj = guides.Build("limb01", "LT", chain_len=5)
+    memory_scene.reset_counts()
+    with profiler.profile() as prof:
+        ribbon.Builder(driver.Build(guidesObj))
+    report = prof.report()
+    check_totals(report)
+    # Every scene command is counted once, against the stage that issued it
+    assert report["total_commands"] == sum(memory_scene.calls.values())
+    stages = {child["name"]: child for child in report["children"]}
+    assert set(stages) == {"driver.Build", "ribbon.Builder"}
+    assert all(stage["total_commands"] and stage["total_nodes"] for stage in stages.values())
+    folded = dict(line.rsplit(" ", 1) for line in prof.folded("commands").splitlines())
+    assert sum(int(v) for v in folded.values()) == report["total_commands"]
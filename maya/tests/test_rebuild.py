@@ -0,0 +1,65 @@
+import pytest
+
+from bench import pipeline
+from core import guides
+from core import scene
+from core import utils
+from jnts import driver
+from jnts import fkik
+from rigs import ribbon
+
+np = pytest.importorskip("numpy")
+
+
+def make_guides(bend=1.5):
+    guidesObj = guides.Build("limb01", "LT", chain_len=5)
+    pipeline.offset_guides(guidesObj, 2.0, bend)
+    return guidesObj
+
+
+def build(guides_obj):
+    driverObj = driver.Build(guides_obj)
+    fkik.Build(driverObj)
+    ribbon.Builder(driverObj)
+    return driverObj
+
+
+def get_state():
+    """
+    Returns the scene's nodes and the world matrix of every joint
+    """
+    nodes = set(scene.list_nodes())
+    return nodes, {jnt: np.asarray(scene.get_matrix(jnt)) for jnt in scene.list_nodes("joint")}
+
+
+def test_unchanged_rebuild_keeps_nodes(memory_scene):
+    guidesObj = make_guides()
+    build(guidesObj)
+    nodes, matrices = get_state()
+    driverObj = build(guidesObj)
+    # Nothing was rebuilt, so nothing was deleted and remade under a new name
+    assert not driverObj.changed
+    assert utils.is_current(f"{driverObj.name}_rbn_grp", driverObj.name)
+    rebuilt, rebuiltMatrices = get_state()
+    assert rebuilt == nodes
+    for jnt, matrix in matrices.items():
+        assert rebuiltMatrices[jnt] == pytest.approx(matrix)
+
+
+def test_moved_guide_rebuild_matches_fresh_build(memory_scene):
+    guidesObj = make_guides()
+    build(guidesObj)
+    guide = guidesObj.allGuides[2]
+    position = scene.get_position(guide)
+    scene.set_position(guide, [position[0], position[1] + 1.0, position[2] - 0.5], world=True)
+    driverObj = build(guidesObj)
+    assert driverObj.changed
+    rebuilt, rebuiltMatrices = get_state()
+    scene.new_scene()
+    guidesObj = make_guides()
+    scene.set_position(guidesObj.allGuides[2], [position[0], position[1] + 1.0, position[2] - 0.5], world=True)
+    build(guidesObj)
+    fresh, freshMatrices = get_state()
+    assert rebuilt == fresh
+    for jnt, matrix in freshMatrices.items():
+        assert rebuiltMatrices[jnt] == pytest.approx(matrix, abs=1e-9)
@@ -0,0 +1,47 @@
+import pytest
+
+from core import registry
+
+if registry.om is None:
+    pytest.skip("the registry runs on Maya's API", allow_module_level=True)
+
+from maya import cmds  # noqa: E402
+
+
+@pytest.fixture
+def maya_session():
+    """
+    Runs a test in a new Maya scene inside a build session (starting Maya up when run from mayapy)
+    """
+    if not hasattr(cmds, "file"):
+        import maya.standalone
+        maya.standalone.initialize()
+    cmds.file(new=1, force=1)
+    with registry.session() as session:
+        yield session
+
+
+def test_same_short_names(maya_session):
+    grps = [cmds.group(n=name, em=1) for name in ["LT_arm_grp", "RT_arm_grp"]]
+    ctls = [registry.add(cmds.group(n="arm_ctl", em=1, p=grp)) for grp in grps]
+    assert ctls == ["LT_arm_grp|arm_ctl", "RT_arm_grp|arm_ctl"]
+    # A short name two nodes share finds neither, like it would in Maya
+    assert registry.find("arm_ctl") is None
+    assert registry.find("LT_arm_grp|arm_ctl") == ctls[0]
+    assert registry.find("|RT_arm_grp|arm_ctl") == ctls[1]
+
+
+def test_rename_and_delete(maya_session):
+    grps = [cmds.group(n=name, em=1) for name in ["LT_arm_grp", "RT_arm_grp"]]
+    ctls = [registry.add(cmds.group(n="arm_ctl", em=1, p=grp)) for grp in grps]
+    cmds.rename(ctls[0], "LT_arm_ctl")
+    assert registry.find("LT_arm_ctl") == "LT_arm_ctl"
+    # The other node is the only one left with the old name
+    assert registry.find("arm_ctl") == "arm_ctl"
+    assert registry.find("LT_arm_grp|arm_ctl") is None
+    cmds.delete(ctls[1])
+    assert registry.find("arm_ctl") is None
+    assert not maya_session.keys.get("arm_ctl")
+    # Reparenting is picked up when the path is looked up
+    cmds.parent("LT_arm_ctl", "RT_arm_grp")
+    assert registry.find("RT_arm_grp|LT_arm_ctl") == "LT_arm_ctl"
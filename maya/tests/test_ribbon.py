@@ -0,0 +1,126 @@
+import pytest
+
+from bench import pipeline
+from core import constants
+from core import guides
+from core import nurbs
+from core import scene
+from jnts import driver
+from rigs import ribbon
+
+np = pytest.importorskip("numpy")
+
+
+def build_ribbon(side="LT", adaptive=False):
+    guidesObj = guides.Build("limb01", side, chain_len=5, mirror=side == "RT")
+    pipeline.offset_guides(guidesObj, 2.0, 1.5)
+    return ribbon.Builder(driver.Build(guidesObj), adaptive=adaptive)
+
+
+@pytest.mark.parametrize("side, adaptive", [("LT", False), ("RT", False), ("LT", True)])
+def test_chain_points_follow_joints(memory_scene, side, adaptive):
+    rbnObj = build_ribbon(side, adaptive)
+    positions = [scene.get_position(jnt) for jnt in rbnObj.driver.driver_joints]
+    axes = [constants.get_axis_index(rbnObj.orient), constants.get_axis_index(rbnObj.normal)]
+    # The flat ribbon's CVs are cut where each joint falls along it, plus one cut halfway between two joints
+    params = rbnObj.breaks + [(rbnObj.breaks[1] + rbnObj.breaks[2]) / 2.0]
+    points = [[0.0, 0.0, 0.0] for _ in params]
+    for point, u in zip(points, params):
+        point[axes[0]] = -3.0 + 12.0 * u
+        point[3 - sum(axes)] = 0.25
+    fitted = rbnObj.get_chain_points(points)
+    # Cuts at a joint land on that joint along the orient and normal axes and keep their width
+    for point, position in zip(fitted, positions):
+        assert [point[axis] for axis in axes] == pytest.approx([position[axis] for axis in axes])
+        assert point[3 - sum(axes)] == 0.25
+    # Cuts between two joints are spread linearly between them
+    assert [fitted[-1][axis] for axis in axes] == \
+        pytest.approx([(positions[1][axis] + positions[2][axis]) / 2.0 for axis in axes])
+
+
+@pytest.mark.parametrize("side, adaptive", [("LT", False), ("RT", False), ("LT", True)])
+def test_ribbon_passes_joints(memory_scene, side, adaptive):
+    rbnObj = build_ribbon(side, adaptive)
+    surface = nurbs.Surface.from_scene(rbnObj.rbn)
+    # The offline surface is the one the ribbon was fitted to in the scene
+    assert rbnObj.get_surface().points == pytest.approx(surface.points)
+    centre = surface.get_points(np.linspace(0.0, 1.0, 2001), 0.5)
+    joints = np.asarray([scene.get_position(jnt) for jnt in rbnObj.driver.driver_joints])
+    distances = np.linalg.norm(centre[None] - joints[:, None], axis=2).min(axis=1)
+    assert distances.max() == pytest.approx(rbnObj.fit["error"], abs=1e-3)
+    # The ends of the ribbon sit right on the ends of the chain
+    assert centre[[0, -1]] == pytest.approx(joints[[0, -1]])
+    if adaptive:
+        assert distances.max() <= rbnObj.fit["tolerance"]
+
+
+BENT = [[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [5.0, 2.0, 0.0], [5.0, 5.0, 0.0], [7.0, 6.0, 0.0]]
+
+
+def test_straight_chain_gets_a_span_a_segment():
+    positions = [[2.0 * i, 0.0, 0.0] for i in range(5)]
+    segments = ribbon.get_segment_spans(positions, 1e-6)
+    assert segments == [1, 1, 1, 1]
+    assert max(ribbon.get_fit_errors(positions, sum(segments), ribbon.get_breaks(segments))) < 1e-9
+
+
+def test_bent_chain_meets_tolerance():
+    counts = []
+    for tolerance in [0.3, 0.1, 0.05]:
+        segments = ribbon.get_segment_spans(BENT, tolerance)
+        assert max(ribbon.get_fit_errors(BENT, sum(segments), ribbon.get_breaks(segments))) <= tolerance
+        counts.append(sum(segments))
+    # Tighter tolerances take more spans
+    assert counts == sorted(counts) and counts[0] < counts[-1]
+
+
+@pytest.mark.parametrize("pins", [2, 5, 12])
+def test_pin_count_is_independent_of_spans(pins):
+    lengths = []
+    for segments in [[1, 1, 1, 1], [2, 4, 4, 2], [6, 3, 9, 2]]:
+        spans = sum(segments)
+        params = ribbon.get_pin_parameters(BENT, spans, ribbon.get_breaks(segments), pins)
+        assert len(params) == pins
+        assert params[0] == pytest.approx(0.0) and params[-1] == pytest.approx(1.0)
+        assert params == sorted(params)
+        curve = ribbon.get_centre_curve(BENT, spans, ribbon.get_breaks(segments))
+        lengths.append(curve.get_lengths(np.asarray(params) * spans))
+    # The pins are spread the same way along the chain however dense the ribbon is
+    for a in lengths[1:]:
+        assert a / a[-1] == pytest.approx(lengths[0] / lengths[0][-1], abs=0.05)
+
+
+def test_adaptive_ribbon_costs_no_more_than_even(memory_scene):
+    even = build_ribbon("LT")
+    scene.new_scene()
+    adaptive = build_ribbon("LT", adaptive=True)
+    assert adaptive.fit["spans"] <= even.fit["spans"]
+    assert adaptive.fit["error"] <= even.fit["error"] + 1e-9
+    assert adaptive.fit["tolerance"] == pytest.approx(even.fit["error"])
+    assert len(adaptive.skinJoints) == len(even.skinJoints)
+
+
+def get_source(plug):
+    sources = scene.list_connections(plug, destination=False)
+    return sources[0] if sources else None
+
+
+def test_deformer_stack(memory_scene):
+    rbnObj = ribbon.Ribbon("tail", spans=6, width=12.0, deformer_stack=True)
+    rbn = rbnObj.rbn
+    # The deformers go straight onto the ribbon instead of onto copies blended back in
+    assert not [node for node in scene.list_nodes() if node.endswith("_bs")]
+    for def_type in ["sine", "twist"]:
+        assert memory_scene.nodes[f"{rbn}_{def_type}_def"].data["geometry"].parent.name == rbn
+        assert get_source(f"{rbn}_{def_type}_def.envelope") == f"{rbn}.{def_type}Blend"
+    sineShape = f"{rbn}_sine_def_hndlShape"
+    twistShape = f"{rbn}_twist_def_hndlShape"
+    assert get_source(f"{sineShape}.amplitude") == f"{rbn}.amplitude"
+    assert get_source(f"{sineShape}.wavelength") == f"{rbn}.wavelength"
+    assert get_source(f"{twistShape}.startAngle") == f"{rbn}.base"
+    assert get_source(f"{twistShape}.endAngle") == f"{rbn}.tip"
+    # Locking the tip halves the sine handle's length
+    hndl = f"{rbn}_sine_def_hndl"
+    scale = scene.get_attr(f"{hndl}.scaleY")
+    scene.set_attr(f"{rbn}.lockTip", 0)
+    assert scene.get_attr(f"{hndl}.scaleY") == pytest.approx(scale * 2.0)
@@ -0,0 +1,56 @@
+import pytest
+
+from core import scene
+
+
+def test_backend_must_implement_the_api():
+    class Partial(scene.Scene):
+        def exists(self, name):
+            return False
+
+    with pytest.raises(TypeError):
+        Partial()
+    # Every API function but apply (which has a default) is abstract
+    assert scene.Scene.__abstractmethods__ == set(scene.API) - {"apply"}
+
+
+def test_transaction_commits_once(memory_scene):
+    with scene.transaction() as batch:
+        grp = scene.create_node("transform", "arm_grp")
+        scene.set_attr(f"{grp}.translateX", 2.0)
+        # Nested transactions share the outer queue
+        with scene.transaction() as inner:
+            assert inner is batch
+            scene.create_node("multMatrix", "arm_mult")
+        assert memory_scene.report()["batched_ops"] == 0
+    assert batch.commits == 1
+    assert memory_scene.report()["batched_ops"] == 3
+    assert scene.get_backend() is memory_scene
+
+
+def test_transaction_commits_before_queries(memory_scene):
+    with scene.transaction() as batch:
+        grp = scene.create_node("transform", "arm_grp")
+        scene.set_attr(f"{grp}.translateX", 2.0)
+        assert scene.get_attr(f"{grp}.translateX") == 2.0
+        assert batch.commits == 1
+
+
+def test_failed_transaction_keeps_its_edits(memory_scene):
+    with pytest.raises(ValueError):
+        with scene.transaction():
+            mult = scene.create_node("multMatrix", "arm_mult")
+            grp = scene.create_node("transform", "arm_grp")
+            scene.connect_attr(f"{mult}.matrixSum", f"{grp}.offsetParentMatrix")
+            raise ValueError("build failed")
+    assert scene.get_backend() is memory_scene
+    assert scene.is_connected("arm_mult.matrixSum", "arm_grp.offsetParentMatrix")
+
+
+def test_failed_commit_is_reported(memory_scene):
+    with pytest.raises(ValueError):
+        with scene.transaction():
+            scene.connect_attr("missing_mult.matrixSum", "missing_grp.offsetParentMatrix")
+            raise ValueError("build failed")
+    assert any("1 queued scene operations were lost" in msg for msg in memory_scene.warnings)
+
@@ -0,0 +1,40 @@
+import pytest
+
+from core import scene
+from core import utils
+
+
+def make_chain():
+    """
+    Builds a three joint chain with rotate axes, rotate values and preferred angles set
+    """
+    joints = []
+    positions = [[0.0, 0.0, 0.0], [4.0, 1.0, 0.0], [8.0, 0.0, 1.0]]
+    rotateAxes = [[0.0, 0.0, 0.0], [10.0, 0.0, 25.0], [0.0, -30.0, 0.0]]
+    for i, (position, rotateAxis) in enumerate(zip(positions, rotateAxes)):
+        jnt = scene.create_joint(f"LT_arm_{i}_drv_jnt", position=position, parent=joints[-1] if joints else None,
+                                 rotate_order="yzx")
+        scene.set_attr(f"{jnt}.rotateAxis", rotateAxis)
+        scene.set_attr(f"{jnt}.rotate", [5.0 * i, -10.0, 15.0])
+        scene.set_attr(f"{jnt}.preferredAngle", [0.0, 0.0, -45.0 * i])
+        joints.append(jnt)
+    scene.set_attr(f"{joints[1]}.segmentScaleCompensate", 0)
+    return joints
+
+
+def test_duplicate_chain(memory_scene):
+    joints = make_chain()
+    worlds = [scene.get_matrix(jnt) for jnt in joints]
+    grp = scene.create_group("LT_arm_ik_grp")
+    scene.set_attr(f"{grp}.translate", [0.0, 2.0, 0.0])
+    dups = utils.duplicate_chain(joints, "IK", grp)
+    assert dups == [jnt.replace("_drv_", "_IK_") for jnt in joints]
+    assert [scene.get_parent(dup) for dup in dups] == [grp] + dups[:-1]
+    for jnt, dup, world in zip(joints, dups, worlds):
+        assert scene.get_matrix(dup) == pytest.approx(world)
+        for attr in ["rotate", "rotateAxis", "preferredAngle", "segmentScaleCompensate", "rotateOrder"]:
+            assert scene.get_attr(f"{dup}.{attr}") == pytest.approx(scene.get_attr(f"{jnt}.{attr}"))
+    # The originals are left alone
+    assert [scene.get_parent(jnt) for jnt in joints] == [None] + joints[:-1]
+    for jnt, world in zip(joints, worlds):
+        assert scene.get_matrix(jnt) == pytest.approx(world)